@@ -4,13 +4,20 @@ from app.agent.toolcall import ToolCallAgent
 from app.config import config
 from app.prompt.visualization import NEXT_STEP_PROMPT, SYSTEM_PROMPT
 from app.tool import (
+    ArtifactStats,
     MySQLDescribeTable,
     MySQLGetDatabaseInfo,
+    MySQLJobResult,
+    MySQLJobStatus,
     MySQLListTables,
+    MySQLPivot,
     MySQLReadQuery,
     MySQLSaveQueryResults,
+    MySQLSearchTables,
     MySQLShowCreateTable,
     MySQLShowTableIndexes,
+    MySQLSubmitQuery,
+    MySQLTimeBucket,
     Terminate,
     ToolCollection,
 )
@@ -48,12 +55,19 @@ class DataAnalysis(ToolCallAgent):
             AskHuman(),
             # MySQL database tools
             MySQLReadQuery(),
+            MySQLTimeBucket(),
+            MySQLPivot(),
             MySQLListTables(),
+            MySQLSearchTables(),
             MySQLDescribeTable(),
             MySQLShowTableIndexes(),
             MySQLShowCreateTable(),
             MySQLGetDatabaseInfo(),
             MySQLSaveQueryResults(),
+            MySQLSubmitQuery(),
+            MySQLJobStatus(),
+            MySQLJobResult(),
+            ArtifactStats(),
             Terminate(),
         )
     )
@@ -8,13 +8,21 @@ from app.config import config
 from app.logger import logger
 from app.prompt.manus import NEXT_STEP_PROMPT, SYSTEM_PROMPT
 from app.tool import (
+    ArtifactStats,
     MySQLDescribeTable,
     MySQLGetDatabaseInfo,
+    MySQLIndexAdvisor,
+    MySQLJobResult,
+    MySQLJobStatus,
     MySQLListTables,
+    MySQLPivot,
     MySQLReadQuery,
     MySQLSaveQueryResults,
+    MySQLSearchTables,
     MySQLShowCreateTable,
     MySQLShowTableIndexes,
+    MySQLSubmitQuery,
+    MySQLTimeBucket,
     Terminate,
     ToolCollection,
 )
@@ -46,12 +54,20 @@ class SimpleManus(ToolCallAgent):
             AskHuman(),
             # MySQL database tools
             MySQLReadQuery(),
+            MySQLTimeBucket(),
+            MySQLPivot(),
             MySQLListTables(),
+            MySQLSearchTables(),
             MySQLDescribeTable(),
             MySQLShowTableIndexes(),
             MySQLShowCreateTable(),
             MySQLGetDatabaseInfo(),
             MySQLSaveQueryResults(),
+            MySQLIndexAdvisor(),
+            MySQLSubmitQuery(),
+            MySQLJobStatus(),
+            MySQLJobResult(),
+            ArtifactStats(),
             Terminate(),
         )
     )
@@ -89,12 +105,20 @@ class Manus(ToolCallAgent):
             AskHuman(),
             # MySQL database tools
             MySQLReadQuery(),
+            MySQLTimeBucket(),
+            MySQLPivot(),
             MySQLListTables(),
+            MySQLSearchTables(),
             MySQLDescribeTable(),
             MySQLShowTableIndexes(),
             MySQLShowCreateTable(),
             MySQLGetDatabaseInfo(),
             MySQLSaveQueryResults(),
+            MySQLIndexAdvisor(),
+            MySQLSubmitQuery(),
+            MySQLJobStatus(),
+            MySQLJobResult(),
+            ArtifactStats(),
             Terminate(),
         )
     )
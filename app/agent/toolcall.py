@@ -1,15 +1,20 @@
 import asyncio
+import inspect
 import json
-from typing import Any, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 from pydantic import Field
 
 from app.agent.react import ReActAgent
-from app.exceptions import TokenLimitExceeded
+from app.compaction import ContextCompactor
+from app.exceptions import BudgetExceeded, TokenLimitExceeded
+from app.llm_usage import current_usage_ledger
 from app.logger import logger
 from app.prompt.toolcall import NEXT_STEP_PROMPT, SYSTEM_PROMPT
 from app.schema import TOOL_CHOICE_TYPE, AgentState, Message, ToolCall, ToolChoice
 from app.tool import CreateChatCompletion, Terminate, ToolCollection
+from app.tool.mysql_jobs import job_owner
+from app.tool.mysql_snapshot import SNAPSHOT_SESSIONS
 
 
 TOOL_CALL_REQUIRED = "Tool calls required but none provided"
@@ -32,6 +37,18 @@ class ToolCallAgent(ReActAgent):
 
     tool_calls: List[ToolCall] = Field(default_factory=list)
     _current_base64_image: Optional[str] = None
+    # Read-only tool calls started while the response was still streaming
+    _early_tasks: Dict[str, asyncio.Task] = {}
+    # Completed tool calls of the streaming response, in response order
+    _early_calls: List[ToolCall] = []
+
+    # Called with each fragment of the model's thoughts when streaming
+    thought_listeners: List[Callable[[str], Any]] = Field(
+        default_factory=list, exclude=True
+    )
+
+    # Shrinks the history before it reaches the model's context limit
+    compactor: ContextCompactor = Field(default_factory=ContextCompactor, exclude=True)
 
     max_steps: int = 30
     max_observe: Optional[Union[int, bool]] = None
@@ -42,27 +59,71 @@ class ToolCallAgent(ReActAgent):
             user_msg = Message.user_message(self.next_step_prompt)
             self.messages += [user_msg]
 
-        try:
-            # Get response with tool options
-            response = await self.llm.ask_tool(
+        # Tell the agent once when the session's budget is nearly spent
+        ledger = current_usage_ledger()
+        warning = ledger.take_warning() if ledger is not None else None
+        if warning:
+            logger.warning(f"Usage budget warning for {self.name}: {warning}")
+            self.messages += [Message.user_message(warning)]
+
+        system_msgs = (
+            [Message.system_message(self.system_prompt)] if self.system_prompt else None
+        )
+        await self._compact_context(system_msgs)
+
+        compacted = False
+        while True:
+            self._early_tasks = {}
+            self._early_calls = []
+            request = dict(
                 messages=self.messages,
-                system_msgs=(
-                    [Message.system_message(self.system_prompt)]
-                    if self.system_prompt
-                    else None
-                ),
-                tools=self.available_tools.to_params(),
+                system_msgs=system_msgs,
+                tools=self.available_tools.catalog,
                 tool_choice=self.tool_choices,
             )
-        except ValueError:
-            raise
-        except Exception as e:
-            # Check if this is a RetryError containing TokenLimitExceeded
-            if hasattr(e, "__cause__") and isinstance(e.__cause__, TokenLimitExceeded):
-                token_limit_error = e.__cause__
-                logger.error(
-                    f"🚨 Token limit error (from RetryError): {token_limit_error}"
+            try:
+                # Get response with tool options
+                if self.llm.stream_tool_calls and self.tool_choices != ToolChoice.NONE:
+                    response = await self.llm.ask_tool_stream(
+                        **request,
+                        on_content=self._emit_thought,
+                        on_tool_call=self._dispatch_early,
+                    )
+                else:
+                    response = await self.llm.ask_tool(**request)
+                break
+            except (ValueError, asyncio.CancelledError):
+                await self._cancel_early_tasks()
+                raise
+            except Exception as e:
+                await self._cancel_early_tasks()
+                # Token limit errors are not retried and arrive as they were raised
+                token_limit_error = (
+                    e
+                    if isinstance(e, TokenLimitExceeded)
+                    else getattr(e, "__cause__", None)
                 )
+                if not isinstance(token_limit_error, TokenLimitExceeded):
+                    raise
+                if isinstance(token_limit_error, BudgetExceeded):
+                    # Compacting would only spend more of an exhausted budget
+                    logger.error(f"🚨 Usage budget exhausted: {token_limit_error}")
+                    self.memory.add_message(
+                        Message.assistant_message(
+                            f"Session usage budget exhausted, cannot continue execution: {str(token_limit_error)}"
+                        )
+                    )
+                    self.state = AgentState.FINISHED
+                    return False
+                if not compacted and await self._compact_context(
+                    system_msgs, force=True
+                ):
+                    compacted = True
+                    logger.warning(
+                        f"Token limit reached, retrying after compaction: {token_limit_error}"
+                    )
+                    continue
+                logger.error(f"🚨 Token limit error: {token_limit_error}")
                 self.memory.add_message(
                     Message.assistant_message(
                         f"Maximum token limit reached, cannot continue execution: {str(token_limit_error)}"
@@ -70,7 +131,6 @@ class ToolCallAgent(ReActAgent):
                 )
                 self.state = AgentState.FINISHED
                 return False
-            raise
 
         self.tool_calls = tool_calls = (
             response.tool_calls if response and response.tool_calls else []
@@ -120,6 +180,7 @@ class ToolCallAgent(ReActAgent):
 
             return bool(self.tool_calls)
         except Exception as e:
+            await self._cancel_early_tasks()
             logger.error(f"🚨 Oops! The {self.name}'s thinking process hit a snag: {e}")
             self.memory.add_message(
                 Message.assistant_message(
@@ -138,39 +199,53 @@ class ToolCallAgent(ReActAgent):
             return self.messages[-1].content or "No content or commands to execute"
 
         results = []
-        for command in self.tool_calls:
-            # Reset base64_image for each tool call
-            self._current_base64_image = None
-
-            result = await self.execute_tool(command)
+        try:
+            for command in self.tool_calls:
+                early = self._early_tasks.pop(command.id, None)
+                result, base64_image = (
+                    await early if early else await self._execute_tool(command)
+                )
+                self._current_base64_image = base64_image
 
-            if self.max_observe:
-                result = result[: self.max_observe]
+                if self.max_observe:
+                    result = result[: self.max_observe]
 
-            logger.info(
-                f"🎯 Tool '{command.function.name}' completed its mission! Result: {result}"
-            )
+                logger.info(
+                    f"🎯 Tool '{command.function.name}' completed its mission! Result: {result}"
+                )
 
-            # Add tool response to memory
-            tool_msg = Message.tool_message(
-                content=result,
-                tool_call_id=command.id,
-                name=command.function.name,
-                base64_image=self._current_base64_image,
-            )
-            self.memory.add_message(tool_msg)
-            results.append(result)
+                # Add tool response to memory
+                tool_msg = Message.tool_message(
+                    content=result,
+                    tool_call_id=command.id,
+                    name=command.function.name,
+                    base64_image=base64_image,
+                )
+                self.memory.add_message(tool_msg)
+                results.append(result)
+        finally:
+            # Early calls the final response did not keep, or left after an error
+            await self._cancel_early_tasks()
 
         return "\n\n".join(results)
 
     async def execute_tool(self, command: ToolCall) -> str:
         """Execute a single tool call with robust error handling"""
+        observation, self._current_base64_image = await self._execute_tool(command)
+        return observation
+
+    async def _execute_tool(self, command: ToolCall) -> Tuple[str, Optional[str]]:
+        """Execute a tool call; returns the observation and the image it produced.
+
+        Early calls run concurrently, so the image travels with the result
+        instead of through shared agent state.
+        """
         if not command or not command.function or not command.function.name:
-            return "Error: Invalid command format"
+            return "Error: Invalid command format", None
 
         name = command.function.name
         if name not in self.available_tools.tool_map:
-            return f"Error: Unknown tool '{name}'"
+            return f"Error: Unknown tool '{name}'", None
 
         try:
             # Parse arguments
@@ -184,9 +259,7 @@ class ToolCallAgent(ReActAgent):
             await self._handle_special_tool(name=name, result=result)
 
             # Check if result is a ToolResult with base64_image
-            if hasattr(result, "base64_image") and result.base64_image:
-                # Store the base64_image for later use in tool_message
-                self._current_base64_image = result.base64_image
+            base64_image = getattr(result, "base64_image", None) or None
 
             # Format result for display (standard case)
             observation = (
@@ -195,17 +268,79 @@ class ToolCallAgent(ReActAgent):
                 else f"Cmd `{name}` completed with no output"
             )
 
-            return observation
+            return observation, base64_image
         except json.JSONDecodeError:
             error_msg = f"Error parsing arguments for {name}: Invalid JSON format"
             logger.error(
                 f"📝 Oops! The arguments for '{name}' don't make sense - invalid JSON, arguments:{command.function.arguments}"
             )
-            return f"Error: {error_msg}"
+            return f"Error: {error_msg}", None
         except Exception as e:
             error_msg = f"⚠️ Tool '{name}' encountered a problem: {str(e)}"
             logger.exception(error_msg)
-            return f"Error: {error_msg}"
+            return f"Error: {error_msg}", None
+
+    async def _compact_context(
+        self, system_msgs: Optional[List[Message]], force: bool = False
+    ) -> bool:
+        """Compact the history if it is over the watermark; True if it shrank"""
+        if not self.compactor.enabled:
+            return False
+        try:
+            result = await self.compactor.compact(
+                self.llm, self.memory.messages, system_msgs, force=force
+            )
+        except Exception as e:
+            logger.warning(f"Context compaction failed: {e}")
+            return False
+        return result is not None and result.tokens_saved > 0
+
+    async def _emit_thought(self, fragment: str) -> None:
+        """Pass a streamed fragment of the model's text to the listeners"""
+        for listener in self.thought_listeners:
+            try:
+                outcome = listener(fragment)
+                if inspect.isawaitable(outcome):
+                    await outcome
+            except Exception as e:
+                logger.warning(f"Thought listener failed: {e}")
+
+    def _dispatch_early(self, command: ToolCall) -> None:
+        """Start a completed read-only tool call while the model is still generating.
+
+        A call only starts early when every earlier call of the response is
+        read-only, already started and not a tool it depends on; anything
+        else keeps the original order. Results are collected in act() in
+        the original order; other tools still run there, after the whole
+        response has arrived.
+        """
+        previous = list(self._early_calls)
+        self._early_calls.append(command)
+        if command.id in self._early_tasks:
+            return
+        tool = self.available_tools.get_tool(command.function.name)
+        if (
+            tool is None
+            or not tool.read_only
+            or self._is_special_tool(command.function.name)
+        ):
+            return
+        for call in previous:
+            if (
+                call.id not in self._early_tasks
+                or call.function.name in tool.depends_on
+            ):
+                return
+        logger.info(f"⚡ Starting read-only tool '{tool.name}' early")
+        self._early_tasks[command.id] = asyncio.create_task(self._execute_tool(command))
+
+    async def _cancel_early_tasks(self) -> None:
+        """Cancel early calls that will not be acted on and wait until they stop"""
+        tasks = list(self._early_tasks.values())
+        self._early_tasks = {}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
     async def _handle_special_tool(self, name: str, result: Any, **kwargs):
         """Handle special tool execution and state changes"""
@@ -244,7 +379,11 @@ class ToolCallAgent(ReActAgent):
 
     async def run(self, request: Optional[str] = None) -> str:
         """Run the agent with cleanup when done."""
-        try:
-            return await super().run(request)
-        finally:
-            await self.cleanup()
+        # Read queries of one run share a consistent snapshot when enabled,
+        # and background query jobs are only visible to the run that owns them
+        with job_owner():
+            async with SNAPSHOT_SESSIONS.scope():
+                try:
+                    return await super().run(request)
+                finally:
+                    await self.cleanup()
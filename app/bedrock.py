@@ -1,16 +1,33 @@
+import asyncio
+import functools
 import json
 import sys
+import threading
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 import boto3
 
 
-# Global variables to track the current tool use ID across function calls
-# Tmp solution
-CURRENT_TOOLUSE_ID = None
+# boto3 calls block, so they run on a thread pool of this size; it also bounds
+# the number of concurrent Bedrock requests (a stream holds a thread until done)
+MAX_CONCURRENT_CALLS = 8
+
+# Bedrock stop reasons and their OpenAI finish_reason
+FINISH_REASONS = {
+    "end_turn": "stop",
+    "stop_sequence": "stop",
+    "tool_use": "tool_calls",
+    "max_tokens": "length",
+    "guardrail_intervened": "content_filter",
+    "content_filtered": "content_filter",
+}
+
+# Marks the end of a stream on the queue between the reader thread and the loop
+_STREAM_END = object()
 
 
 # Class to handle OpenAI-style response formatting
@@ -36,11 +53,14 @@ class OpenAIResponse:
 
 # Main client class for interacting with Amazon Bedrock
 class BedrockClient:
-    def __init__(self):
+    def __init__(self, max_concurrency: int = MAX_CONCURRENT_CALLS):
         # Initialize Bedrock client, you need to configure AWS env first
         try:
             self.client = boto3.client("bedrock-runtime")
-            self.chat = Chat(self.client)
+            self.executor = ThreadPoolExecutor(
+                max_workers=max_concurrency, thread_name_prefix="bedrock"
+            )
+            self.chat = Chat(self.client, self.executor)
         except Exception as e:
             print(f"Error initializing Bedrock client: {e}")
             sys.exit(1)
@@ -48,14 +68,171 @@ class BedrockClient:
 
 # Chat interface class
 class Chat:
-    def __init__(self, client):
-        self.completions = ChatCompletions(client)
+    def __init__(self, client, executor: ThreadPoolExecutor):
+        self.completions = ChatCompletions(client, executor)
+
+
+class BedrockStream:
+    """Async iterator of OpenAI-style chunks over a Bedrock ConverseStream.
+
+    A worker thread reads the blocking event stream and hands events to the
+    event loop through a queue; the stream is closed when the consumer stops
+    early.
+    """
+
+    def __init__(self, events, executor: ThreadPoolExecutor, model: str):
+        self.events = events
+        self.executor = executor
+        self.model = model
+        self.id = f"chatcmpl-{uuid.uuid4()}"
+        self.created = int(time.time())
+        # Bedrock content block index -> OpenAI tool call index
+        self._tool_indexes: Dict[int, int] = {}
+        self._finish_reason: Optional[str] = None
+
+    def __aiter__(self):
+        return self._chunks()
+
+    def _read(self, loop, queue: asyncio.Queue, stop: threading.Event) -> None:
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # The event loop is gone, nobody is reading any more
+                stop.set()
+
+        try:
+            for event in self.events or []:
+                if stop.is_set():
+                    break
+                put(event)
+        except Exception as e:
+            put(e)
+        finally:
+            close = getattr(self.events, "close", None)
+            if stop.is_set() and close is not None:
+                close()
+            put(_STREAM_END)
+
+    async def _chunks(self):
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        loop.run_in_executor(self.executor, self._read, loop, queue, stop)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _STREAM_END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                chunk = self._convert_event(item)
+                if chunk is not None:
+                    yield chunk
+        finally:
+            stop.set()
+        if self._finish_reason is not None:
+            # No metadata event arrived to carry the finish reason
+            yield self._chunk({}, finish_reason=self._finish_reason)
+
+    def _chunk(self, delta: dict, finish_reason=None, usage=None) -> OpenAIResponse:
+        return OpenAIResponse(
+            {
+                "id": self.id,
+                "created": self.created,
+                "model": self.model,
+                "object": "chat.completion.chunk",
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": {
+                            "role": "assistant",
+                            "content": delta.get("content"),
+                            "tool_calls": delta.get("tool_calls"),
+                        },
+                        "finish_reason": finish_reason,
+                    }
+                ],
+                "usage": usage,
+            }
+        )
+
+    def _convert_event(self, event: dict) -> Optional[OpenAIResponse]:
+        # Convert one ConverseStream event to an OpenAI chunk, if it carries one
+        if "contentBlockStart" in event:
+            start = event["contentBlockStart"]
+            tool_use = start.get("start", {}).get("toolUse")
+            if not tool_use:
+                return None
+            index = len(self._tool_indexes)
+            self._tool_indexes[start.get("contentBlockIndex", index)] = index
+            return self._chunk(
+                {
+                    "tool_calls": [
+                        {
+                            "index": index,
+                            "id": tool_use["toolUseId"],
+                            "type": "function",
+                            "function": {"name": tool_use["name"], "arguments": ""},
+                        }
+                    ]
+                }
+            )
+        if "contentBlockDelta" in event:
+            block = event["contentBlockDelta"]
+            delta = block.get("delta", {})
+            if delta.get("text"):
+                return self._chunk({"content": delta["text"]})
+            if "toolUse" in delta:
+                index = self._tool_indexes.get(block.get("contentBlockIndex"), 0)
+                return self._chunk(
+                    {
+                        "tool_calls": [
+                            {
+                                "index": index,
+                                "id": None,
+                                "type": "function",
+                                "function": {
+                                    "name": None,
+                                    "arguments": delta["toolUse"].get("input", ""),
+                                },
+                            }
+                        ]
+                    }
+                )
+            return None
+        if "messageStop" in event:
+            # Sent together with the usage from the metadata event that follows
+            stop_reason = event["messageStop"].get("stopReason", "end_turn")
+            self._finish_reason = FINISH_REASONS.get(stop_reason, "stop")
+            return None
+        if "metadata" in event:
+            usage = event["metadata"].get("usage", {})
+            finish_reason, self._finish_reason = self._finish_reason, None
+            return self._chunk(
+                {},
+                finish_reason=finish_reason or "stop",
+                usage={
+                    "completion_tokens": usage.get("outputTokens", 0),
+                    "prompt_tokens": usage.get("inputTokens", 0),
+                    "total_tokens": usage.get("totalTokens", 0),
+                },
+            )
+        return None
 
 
 # Core class handling chat completions functionality
 class ChatCompletions:
-    def __init__(self, client):
+    def __init__(self, client, executor: ThreadPoolExecutor):
         self.client = client
+        self.executor = executor
+
+    async def _call(self, method, **kwargs) -> Any:
+        # Run a blocking boto3 call on the Bedrock thread pool
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(method, **kwargs)
+        )
 
     def _convert_openai_tools_to_bedrock_format(self, tools):
         # Convert OpenAI function calling format to Bedrock tool format
@@ -83,50 +260,62 @@ class ChatCompletions:
                 bedrock_tools.append(bedrock_tool)
         return bedrock_tools
 
+    @staticmethod
+    def _text_blocks(content) -> List[dict]:
+        # OpenAI content may be a string or a list of parts; keep the text
+        if isinstance(content, str):
+            return [{"text": content}] if content else []
+        return [
+            {"text": part["text"]}
+            for part in content or []
+            if isinstance(part, dict) and part.get("type") == "text" and part["text"]
+        ]
+
     def _convert_openai_messages_to_bedrock_format(self, messages):
         # Convert OpenAI message format to Bedrock message format
         bedrock_messages = []
         system_prompt = []
         for message in messages:
             if message.get("role") == "system":
-                system_prompt = [{"text": message.get("content")}]
+                system_prompt = self._text_blocks(message.get("content"))
             elif message.get("role") == "user":
                 bedrock_message = {
                     "role": message.get("role", "user"),
-                    "content": [{"text": message.get("content")}],
+                    "content": self._text_blocks(message.get("content")),
                 }
                 bedrock_messages.append(bedrock_message)
             elif message.get("role") == "assistant":
                 bedrock_message = {
                     "role": "assistant",
-                    "content": [{"text": message.get("content")}],
+                    "content": self._text_blocks(message.get("content")),
                 }
-                openai_tool_calls = message.get("tool_calls", [])
-                if openai_tool_calls:
+                for tool_call in message.get("tool_calls") or []:
                     bedrock_tool_use = {
-                        "toolUseId": openai_tool_calls[0]["id"],
-                        "name": openai_tool_calls[0]["function"]["name"],
-                        "input": json.loads(
-                            openai_tool_calls[0]["function"]["arguments"]
-                        ),
+                        "toolUseId": tool_call["id"],
+                        "name": tool_call["function"]["name"],
+                        "input": json.loads(tool_call["function"]["arguments"] or "{}"),
                     }
                     bedrock_message["content"].append({"toolUse": bedrock_tool_use})
-                    global CURRENT_TOOLUSE_ID
-                    CURRENT_TOOLUSE_ID = openai_tool_calls[0]["id"]
                 bedrock_messages.append(bedrock_message)
             elif message.get("role") == "tool":
-                bedrock_message = {
-                    "role": "user",
-                    "content": [
-                        {
-                            "toolResult": {
-                                "toolUseId": CURRENT_TOOLUSE_ID,
-                                "content": [{"text": message.get("content")}],
-                            }
-                        }
-                    ],
+                tool_result = {
+                    "toolResult": {
+                        "toolUseId": message.get("tool_call_id"),
+                        "content": self._text_blocks(message.get("content"))
+                        or [{"text": "."}],
+                    }
                 }
-                bedrock_messages.append(bedrock_message)
+                # Results of one assistant turn go back in a single user message
+                previous = bedrock_messages[-1] if bedrock_messages else None
+                if (
+                    previous is not None
+                    and previous["role"] == "user"
+                    and previous["content"]
+                    and all("toolResult" in block for block in previous["content"])
+                ):
+                    previous["content"].append(tool_result)
+                else:
+                    bedrock_messages.append({"role": "user", "content": [tool_result]})
             else:
                 raise ValueError(f"Invalid role: {message.get('role')}")
         return system_prompt, bedrock_messages
@@ -146,10 +335,8 @@ class ChatCompletions:
             for content_item in bedrock_response["output"]["message"]["content"]:
                 if content_item.get("toolUse"):
                     bedrock_tool_use = content_item["toolUse"]
-                    global CURRENT_TOOLUSE_ID
-                    CURRENT_TOOLUSE_ID = bedrock_tool_use["toolUseId"]
                     openai_tool_call = {
-                        "id": CURRENT_TOOLUSE_ID,
+                        "id": bedrock_tool_use["toolUseId"],
                         "type": "function",
                         "function": {
                             "name": bedrock_tool_use["name"],
@@ -166,16 +353,18 @@ class ChatCompletions:
             "system_fingerprint": None,
             "choices": [
                 {
-                    "finish_reason": bedrock_response.get("stopReason", "end_turn"),
+                    "finish_reason": FINISH_REASONS.get(
+                        bedrock_response.get("stopReason", "end_turn"), "stop"
+                    ),
                     "index": 0,
                     "message": {
                         "content": content,
                         "role": bedrock_response.get("output", {})
                         .get("message", {})
                         .get("role", "assistant"),
-                        "tool_calls": openai_tool_calls
-                        if openai_tool_calls != []
-                        else None,
+                        "tool_calls": (
+                            openai_tool_calls if openai_tool_calls != [] else None
+                        ),
                         "function_call": None,
                     },
                 }
@@ -192,6 +381,28 @@ class ChatCompletions:
         }
         return OpenAIResponse(openai_format)
 
+    def _build_request(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        tools: Optional[List[dict]],
+    ) -> dict:
+        (
+            system_prompt,
+            bedrock_messages,
+        ) = self._convert_openai_messages_to_bedrock_format(messages)
+        request = {
+            "modelId": model,
+            "system": system_prompt,
+            "messages": bedrock_messages,
+            "inferenceConfig": {"temperature": temperature, "maxTokens": max_tokens},
+        }
+        if tools:
+            request["toolConfig"] = {"tools": tools}
+        return request
+
     async def _invoke_bedrock(
         self,
         model: str,
@@ -203,17 +414,8 @@ class ChatCompletions:
         **kwargs,
     ) -> OpenAIResponse:
         # Non-streaming invocation of Bedrock model
-        (
-            system_prompt,
-            bedrock_messages,
-        ) = self._convert_openai_messages_to_bedrock_format(messages)
-        response = self.client.converse(
-            modelId=model,
-            system=system_prompt,
-            messages=bedrock_messages,
-            inferenceConfig={"temperature": temperature, "maxTokens": max_tokens},
-            toolConfig={"tools": tools} if tools else None,
-        )
+        request = self._build_request(model, messages, max_tokens, temperature, tools)
+        response = await self._call(self.client.converse, **request)
         openai_response = self._convert_bedrock_response_to_openai_format(response)
         return openai_response
 
@@ -226,78 +428,14 @@ class ChatCompletions:
         tools: Optional[List[dict]] = None,
         tool_choice: Literal["none", "auto", "required"] = "auto",
         **kwargs,
-    ) -> OpenAIResponse:
-        # Streaming invocation of Bedrock model
-        (
-            system_prompt,
-            bedrock_messages,
-        ) = self._convert_openai_messages_to_bedrock_format(messages)
-        response = self.client.converse_stream(
-            modelId=model,
-            system=system_prompt,
-            messages=bedrock_messages,
-            inferenceConfig={"temperature": temperature, "maxTokens": max_tokens},
-            toolConfig={"tools": tools} if tools else None,
-        )
+    ) -> BedrockStream:
+        # Streaming invocation of Bedrock model; errors opening the stream
+        # are raised here, events arrive through the returned iterator
+        request = self._build_request(model, messages, max_tokens, temperature, tools)
+        response = await self._call(self.client.converse_stream, **request)
+        return BedrockStream(response.get("stream"), self.executor, model)
 
-        # Initialize response structure
-        bedrock_response = {
-            "output": {"message": {"role": "", "content": []}},
-            "stopReason": "",
-            "usage": {},
-            "metrics": {},
-        }
-        bedrock_response_text = ""
-        bedrock_response_tool_input = ""
-
-        # Process streaming response
-        stream = response.get("stream")
-        if stream:
-            for event in stream:
-                if event.get("messageStart", {}).get("role"):
-                    bedrock_response["output"]["message"]["role"] = event[
-                        "messageStart"
-                    ]["role"]
-                if event.get("contentBlockDelta", {}).get("delta", {}).get("text"):
-                    bedrock_response_text += event["contentBlockDelta"]["delta"]["text"]
-                    print(
-                        event["contentBlockDelta"]["delta"]["text"], end="", flush=True
-                    )
-                if event.get("contentBlockStop", {}).get("contentBlockIndex") == 0:
-                    bedrock_response["output"]["message"]["content"].append(
-                        {"text": bedrock_response_text}
-                    )
-                if event.get("contentBlockStart", {}).get("start", {}).get("toolUse"):
-                    bedrock_tool_use = event["contentBlockStart"]["start"]["toolUse"]
-                    tool_use = {
-                        "toolUseId": bedrock_tool_use["toolUseId"],
-                        "name": bedrock_tool_use["name"],
-                    }
-                    bedrock_response["output"]["message"]["content"].append(
-                        {"toolUse": tool_use}
-                    )
-                    global CURRENT_TOOLUSE_ID
-                    CURRENT_TOOLUSE_ID = bedrock_tool_use["toolUseId"]
-                if event.get("contentBlockDelta", {}).get("delta", {}).get("toolUse"):
-                    bedrock_response_tool_input += event["contentBlockDelta"]["delta"][
-                        "toolUse"
-                    ]["input"]
-                    print(
-                        event["contentBlockDelta"]["delta"]["toolUse"]["input"],
-                        end="",
-                        flush=True,
-                    )
-                if event.get("contentBlockStop", {}).get("contentBlockIndex") == 1:
-                    bedrock_response["output"]["message"]["content"][1]["toolUse"][
-                        "input"
-                    ] = json.loads(bedrock_response_tool_input)
-        print()
-        openai_response = self._convert_bedrock_response_to_openai_format(
-            bedrock_response
-        )
-        return openai_response
-
-    def create(
+    async def create(
         self,
         model: str,
         messages: List[Dict[str, str]],
@@ -307,13 +445,13 @@ class ChatCompletions:
         tools: Optional[List[dict]] = None,
         tool_choice: Literal["none", "auto", "required"] = "auto",
         **kwargs,
-    ) -> OpenAIResponse:
+    ):
         # Main entry point for chat completion
         bedrock_tools = []
         if tools is not None:
             bedrock_tools = self._convert_openai_tools_to_bedrock_format(tools)
         if stream:
-            return self._invoke_bedrock_stream(
+            return await self._invoke_bedrock_stream(
                 model,
                 messages,
                 max_tokens,
@@ -323,7 +461,7 @@ class ChatCompletions:
                 **kwargs,
             )
         else:
-            return self._invoke_bedrock(
+            return await self._invoke_bedrock(
                 model,
                 messages,
                 max_tokens,
@@ -0,0 +1,175 @@
+"""Compaction of agent history as it approaches the context limit.
+
+Once a request's input crosses ``trigger_tokens``, ``ContextCompactor``
+shrinks the history in two stages until it is under the target:
+
+1. Old tool outputs are replaced with digests (their first characters and a
+   note of the original size).
+2. Older turns are summarized with a model call, ``summary_llm``, and replaced
+   by a single summary message.
+
+The original user request and the most recent messages are never touched,
+and a tool result is only ever removed together with the assistant message
+that called it, so the history stays valid for the API.
+"""
+
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.config import CompactionSettings, config
+from app.llm import LLM
+from app.llm_rate_limit import LLMPriority
+from app.logger import logger
+from app.prompt.compaction import DIGEST_NOTE, SUMMARY_PREFIX, SUMMARY_SYSTEM_PROMPT
+from app.schema import Message, Role
+
+
+class CompactionResult(BaseModel):
+    """Outcome of one compaction."""
+
+    tokens_before: int
+    tokens_after: int
+    digested: int = 0
+    summarized: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+class ContextCompactor:
+    """Keeps an agent's history under the configured token watermark."""
+
+    def __init__(self, settings: Optional[CompactionSettings] = None):
+        self.settings = settings or config.compaction
+        self.results: List[CompactionResult] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.enabled
+
+    @staticmethod
+    def count(
+        llm: LLM, messages: List[Message], system_msgs: Optional[List[Message]] = None
+    ) -> int:
+        return llm.count_message_tokens(
+            llm.format_messages((system_msgs or []) + messages)
+        )
+
+    async def compact(
+        self,
+        llm: LLM,
+        messages: List[Message],
+        system_msgs: Optional[List[Message]] = None,
+        force: bool = False,
+    ) -> Optional[CompactionResult]:
+        """Compact ``messages`` in place if they are over the watermark.
+
+        With ``force`` (after a token limit error) both stages run regardless
+        of the watermark. Returns None when nothing was compacted.
+        """
+        before = self.count(llm, messages, system_msgs)
+        if not force and before < self.settings.trigger_tokens:
+            return None
+        target = (
+            0
+            if force
+            else int(self.settings.trigger_tokens * self.settings.target_ratio)
+        )
+
+        head = self._head(messages)
+        boundary = self._recent_boundary(messages, head)
+        result = CompactionResult(tokens_before=before, tokens_after=before)
+
+        for i in range(head, boundary):
+            digest = self._digest(messages[i])
+            if digest is not None:
+                messages[i] = digest
+                result.digested += 1
+        if result.digested:
+            result.tokens_after = self.count(llm, messages, system_msgs)
+
+        if result.tokens_after > target and boundary - head > 1:
+            older = messages[head:boundary]
+            summary = await self._summarize(older)
+            messages[head:boundary] = [
+                Message.user_message(f"{SUMMARY_PREFIX}\n{summary}")
+            ]
+            result.summarized = len(older)
+            result.tokens_after = self.count(llm, messages, system_msgs)
+
+        if not result.digested and not result.summarized:
+            return None
+        self.results.append(result)
+        logger.info(
+            f"🗜️ Compacted context: {result.tokens_before} -> {result.tokens_after} tokens "
+            f"(saved {result.tokens_saved}; {result.digested} tool outputs digested, "
+            f"{result.summarized} messages summarized)"
+        )
+        return result
+
+    @staticmethod
+    def _head(messages: List[Message]) -> int:
+        """Messages up to and including the original user request are kept."""
+        for i, message in enumerate(messages):
+            if message.role == Role.USER:
+                return i + 1
+        return 0
+
+    def _recent_boundary(self, messages: List[Message], head: int) -> int:
+        """Start of the protected recent messages, never inside a tool call group."""
+        start = max(head, len(messages) - self.settings.keep_recent_messages)
+        while start > head and messages[start].role == Role.TOOL:
+            start -= 1
+        return start
+
+    def _digest(self, message: Message) -> Optional[Message]:
+        content = message.content or ""
+        if message.role != Role.TOOL or len(content) <= self.settings.digest_chars:
+            return None
+        head = content[: self.settings.digest_chars]
+        return message.model_copy(
+            update={
+                "content": f"{head}\n{DIGEST_NOTE.format(chars=len(content))}",
+                "base64_image": None,
+            }
+        )
+
+    def _transcript(self, messages: List[Message]) -> str:
+        limit = self.settings.digest_chars
+        lines = []
+        for message in messages:
+            if message.content:
+                lines.append(f"[{message.role}] {message.content[:limit]}")
+            for call in message.tool_calls or []:
+                lines.append(
+                    f"[{message.role}] 调用 {call.function.name}"
+                    f"({call.function.arguments[:limit]})"
+                )
+        transcript = "\n".join(lines)
+        # The latest of the older turns matter most
+        return transcript[-self.settings.summary_input_chars :]
+
+    async def _summarize(self, messages: List[Message]) -> str:
+        transcript = self._transcript(messages)
+        try:
+            llm = LLM(config_name=self.settings.summary_llm)
+            return await llm.ask(
+                [Message.user_message(transcript)],
+                system_msgs=[Message.system_message(SUMMARY_SYSTEM_PROMPT)],
+                stream=False,
+                cache=False,
+                priority=LLMPriority.BACKGROUND,
+            )
+        except Exception as e:
+            # The transcript itself is a usable, if longer, summary
+            logger.warning(f"Context summary failed, keeping an outline: {e}")
+            return transcript[-self.settings.digest_chars * 4 :]
+
+    def metrics(self) -> dict:
+        return {
+            "compactions": len(self.results),
+            "tokens_saved": sum(result.tokens_saved for result in self.results),
+            "last": self.results[-1].model_dump() if self.results else None,
+        }
@@ -16,6 +16,21 @@ PROJECT_ROOT = get_project_root()
 WORKSPACE_ROOT = PROJECT_ROOT / "workspace"
 
 
+class LLMEndpointSettings(BaseModel):
+    """One of several equivalent endpoints serving the same model"""
+
+    base_url: str = Field(..., description="API base URL")
+    api_key: str = Field(..., description="API key")
+    api_type: Optional[str] = Field(
+        None, description="Defaults to the model's api_type"
+    )
+    api_version: Optional[str] = Field(
+        None, description="Defaults to the model's api_version"
+    )
+    weight: float = Field(1.0, description="Relative share of requests")
+    name: Optional[str] = Field(None, description="Label used in metrics and logs")
+
+
 class LLMSettings(BaseModel):
     model: str = Field(..., description="Model name")
     base_url: str = Field(..., description="API base URL")
@@ -28,6 +43,136 @@ class LLMSettings(BaseModel):
     temperature: float = Field(1.0, description="Sampling temperature")
     api_type: str = Field(..., description="Azure, Openai, or Ollama")
     api_version: str = Field(..., description="Azure Openai version if AzureOpenai")
+    requests_per_minute: Optional[int] = Field(
+        None,
+        description="Requests per minute allowed for this model, per endpoint (None for unlimited)",
+    )
+    tokens_per_minute: Optional[int] = Field(
+        None,
+        description="Tokens per minute allowed for this model, per endpoint (None for unlimited)",
+    )
+    max_retries: int = Field(5, description="Retries of transient LLM errors")
+    max_retry_time: float = Field(
+        120.0, description="Maximum seconds spent retrying one LLM call"
+    )
+    hedge_requests: bool = Field(
+        False,
+        description="Send a duplicate of non-streaming requests slower than p95 latency",
+    )
+    stream_tool_calls: bool = Field(
+        False,
+        description="Stream tool requests so read-only tools start before the response ends",
+    )
+    prompt_cache_control: bool = Field(
+        False,
+        description="Mark the stable request prefix with Anthropic-style cache_control",
+    )
+    stream_usage: bool = Field(
+        True,
+        description="Request usage on streamed calls (stream_options.include_usage)",
+    )
+    input_price_per_million: float = Field(
+        0.0, description="Price of one million prompt tokens, for usage costs"
+    )
+    output_price_per_million: float = Field(
+        0.0, description="Price of one million completion tokens, for usage costs"
+    )
+    endpoints: List[LLMEndpointSettings] = Field(
+        default_factory=list,
+        description="Equivalent endpoints to balance over instead of base_url alone",
+    )
+    routing: str = Field(
+        "least_outstanding",
+        description="Endpoint selection: least_outstanding or latency_ewma",
+    )
+
+
+class LLMCacheSettings(BaseModel):
+    """Disk-backed cache of LLM responses"""
+
+    enabled: bool = Field(False, description="Whether to cache LLM responses")
+    mode: str = Field(
+        "cache",
+        description=(
+            "cache: serve hits and store misses; record: always call the API and "
+            "store the response; replay: serve only from the cache and fail on a miss"
+        ),
+    )
+    path: str = Field(
+        "llm_cache.sqlite",
+        description="Cache database path, relative paths are under the workspace",
+    )
+    max_size_mb: float = Field(
+        256.0, description="Least recently used entries are evicted above this size"
+    )
+    call_sites: List[str] = Field(
+        default_factory=lambda: ["ask", "ask_tool", "ask_with_images"],
+        description="LLM methods whose responses are cached by default",
+    )
+
+
+class LLMHTTPSettings(BaseModel):
+    """Shared HTTP connection pools of the LLM clients, one per endpoint"""
+
+    max_connections: int = Field(
+        100, description="Maximum open connections per endpoint"
+    )
+    max_keepalive_connections: int = Field(
+        20, description="Idle connections kept open per endpoint"
+    )
+    keepalive_expiry: float = Field(
+        60.0, description="Seconds an idle connection is kept open"
+    )
+    http2: bool = Field(
+        False, description="Use HTTP/2 where the server supports it (needs h2)"
+    )
+    connect_timeout: float = Field(10.0, description="Connect timeout in seconds")
+    read_timeout: float = Field(
+        300.0, description="Read timeout in seconds when a call sets none"
+    )
+    write_timeout: float = Field(30.0, description="Write timeout in seconds")
+    pool_timeout: float = Field(
+        30.0, description="Seconds to wait for a free connection from the pool"
+    )
+
+
+class CompactionSettings(BaseModel):
+    """Compaction of agent history as it approaches the context limit"""
+
+    enabled: bool = Field(False, description="Whether to compact agent history")
+    trigger_tokens: int = Field(
+        60000, description="Compact once a request's input reaches this many tokens"
+    )
+    target_ratio: float = Field(
+        0.5, description="Compact down to this fraction of trigger_tokens"
+    )
+    keep_recent_messages: int = Field(
+        12, description="Most recent messages that are never compacted"
+    )
+    digest_chars: int = Field(
+        400, description="Characters of an old tool output kept in its digest"
+    )
+    summary_llm: str = Field(
+        "default",
+        description="LLM config used to summarize older turns, e.g. a cheaper model",
+    )
+    summary_input_chars: int = Field(
+        20000, description="Older turns passed to the summarizer are cut to this size"
+    )
+
+
+class UsageSettings(BaseModel):
+    """Per-session token and cost accounting and budgets"""
+
+    session_token_budget: Optional[int] = Field(
+        None, description="Maximum prompt plus completion tokens of one session"
+    )
+    session_cost_budget: Optional[float] = Field(
+        None, description="Maximum cost of one session, in the unit of the prices"
+    )
+    warn_ratio: float = Field(
+        0.8, description="Warn the agent once this fraction of a budget is spent"
+    )
 
 
 class MySQLSettings(BaseModel):
@@ -35,13 +180,50 @@ class MySQLSettings(BaseModel):
 
     host: str = Field("127.0.0.1", description="MySQL server host")
     port: int = Field(3306, description="MySQL server port")
-    user: str = Field(..., description="MySQL username")
-    password: str = Field(..., description="MySQL password")
+    user: str = Field("", description="MySQL username")
+    password: str = Field("", description="MySQL password")
     database: str = Field(..., description="MySQL database name")
     charset: str = Field("utf8mb4", description="Character set to use")
     connect_timeout: int = Field(30, description="Connection timeout in seconds")
     read_timeout: int = Field(30, description="Read timeout in seconds")
     write_timeout: int = Field(30, description="Write timeout in seconds")
+    schema_cache_ttl: int = Field(
+        600, description="Seconds to cache the schema catalog used for table search"
+    )
+    max_concurrent_queries: int = Field(
+        8, description="Maximum concurrent queries per database endpoint"
+    )
+    max_queued_queries: int = Field(
+        32, description="Maximum queries waiting for a slot before rejecting"
+    )
+    queue_timeout: float = Field(
+        30.0, description="Seconds a query may wait for a slot before failing"
+    )
+    job_read_timeout: int = Field(
+        3600, description="Read timeout in seconds for background query jobs"
+    )
+    backend: str = Field(
+        "pymysql",
+        description="Database backend: 'pymysql' or 'sqlite' (offline stand-in)",
+    )
+    sqlite_path: str = Field(
+        "workspace/mysql_fake.db",
+        description="SQLite file used by the 'sqlite' backend, relative to the project root",
+    )
+    auto_repair: bool = Field(
+        False,
+        description="Re-run queries with an unambiguous fix for unknown table/column errors",
+    )
+    snapshot_sessions: bool = Field(
+        False,
+        description="Pin one read-only consistent-snapshot connection per agent session",
+    )
+    snapshot_idle_timeout: float = Field(
+        120.0, description="Seconds an unused snapshot session stays open"
+    )
+    snapshot_max_age: float = Field(
+        600.0, description="Maximum age in seconds of a consistent snapshot"
+    )
 
 
 class ProxySettings(BaseModel):
@@ -119,6 +301,18 @@ class MCPSettings(BaseModel):
 
 class AppConfig(BaseModel):
     llm: Dict[str, LLMSettings]
+    llm_cache: Optional[LLMCacheSettings] = Field(
+        None, description="LLM response cache configuration"
+    )
+    llm_http: Optional[LLMHTTPSettings] = Field(
+        None, description="LLM HTTP connection pool configuration"
+    )
+    compaction: Optional[CompactionSettings] = Field(
+        None, description="Agent context compaction configuration"
+    )
+    usage: Optional[UsageSettings] = Field(
+        None, description="Per-session usage budget configuration"
+    )
     mysql: Optional[MySQLSettings] = Field(None, description="MySQL configuration")
     sandbox: Optional[SandboxSettings] = Field(
         None, description="Sandbox configuration"
@@ -184,8 +378,40 @@ class Config:
             "temperature": base_llm.get("temperature", 1.0),
             "api_type": base_llm.get("api_type", ""),
             "api_version": base_llm.get("api_version", ""),
+            "requests_per_minute": base_llm.get("requests_per_minute"),
+            "tokens_per_minute": base_llm.get("tokens_per_minute"),
+            "max_retries": base_llm.get("max_retries", 5),
+            "max_retry_time": base_llm.get("max_retry_time", 120.0),
+            "hedge_requests": base_llm.get("hedge_requests", False),
+            "stream_tool_calls": base_llm.get("stream_tool_calls", False),
+            "prompt_cache_control": base_llm.get("prompt_cache_control", False),
+            "stream_usage": base_llm.get("stream_usage", True),
+            "input_price_per_million": base_llm.get("input_price_per_million", 0.0),
+            "output_price_per_million": base_llm.get("output_price_per_million", 0.0),
+            "endpoints": base_llm.get("endpoints", []),
+            "routing": base_llm.get("routing", "least_outstanding"),
         }
 
+        llm_cache_config = raw_config.get("llm_cache")
+        llm_cache_settings = (
+            LLMCacheSettings(**llm_cache_config) if llm_cache_config else None
+        )
+
+        llm_http_config = raw_config.get("llm_http")
+        llm_http_settings = (
+            LLMHTTPSettings(**llm_http_config) if llm_http_config else None
+        )
+
+        compaction_config = raw_config.get("compaction")
+        compaction_settings = (
+            CompactionSettings(**compaction_config)
+            if compaction_config
+            else CompactionSettings()
+        )
+
+        usage_config = raw_config.get("usage")
+        usage_settings = UsageSettings(**usage_config) if usage_config else None
+
         # MySQL configuration
         mysql_config = raw_config.get("mysql", {})
         mysql_settings = None
@@ -216,10 +442,19 @@ class Config:
             "llm": {
                 "default": default_settings,
                 **{
-                    name: {**default_settings, **override_config}
+                    name: {
+                        **default_settings,
+                        # A model with its own base_url does not inherit the pool
+                        **({"endpoints": []} if "base_url" in override_config else {}),
+                        **override_config,
+                    }
                     for name, override_config in llm_overrides.items()
                 },
             },
+            "llm_cache": llm_cache_settings,
+            "llm_http": llm_http_settings,
+            "compaction": compaction_settings,
+            "usage": usage_settings,
             "mysql": mysql_settings,
             "sandbox": sandbox_settings,
             "mcp_config": mcp_settings,
@@ -238,6 +473,22 @@ class Config:
     def llm(self) -> Dict[str, LLMSettings]:
         return self._config.llm
 
+    @property
+    def llm_cache(self) -> Optional[LLMCacheSettings]:
+        return self._config.llm_cache
+
+    @property
+    def llm_http(self) -> LLMHTTPSettings:
+        return self._config.llm_http or LLMHTTPSettings()
+
+    @property
+    def compaction(self) -> CompactionSettings:
+        return self._config.compaction or CompactionSettings()
+
+    @property
+    def usage(self) -> UsageSettings:
+        return self._config.usage or UsageSettings()
+
     @property
     def mysql(self) -> Optional[MySQLSettings]:
         return self._config.mysql
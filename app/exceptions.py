@@ -11,3 +11,19 @@ class OpenManusError(Exception):
 
 class TokenLimitExceeded(OpenManusError):
     """Exception raised when the token limit is exceeded"""
+
+
+class DatabaseBusyError(OpenManusError):
+    """Exception raised when a database endpoint cannot admit more queries"""
+
+
+class LLMCacheMiss(OpenManusError):
+    """Exception raised when a replayed LLM request is not in the response cache"""
+
+
+class LLMDeadlineExceeded(OpenManusError):
+    """Exception raised when an LLM call cannot finish before the caller's deadline"""
+
+
+class BudgetExceeded(TokenLimitExceeded):
+    """Exception raised when a session has spent its token or cost budget"""
@@ -9,6 +9,8 @@ from pydantic import Field
 from app.agent.base import AgentState, BaseAgent
 from app.flow.base import BaseFlow
 from app.llm import LLM
+from app.llm_rate_limit import LLMPriority
+from app.llm_usage import usage_scope
 from app.logger import logger
 from app.schema import Message, ToolChoice
 from app.tool.planning import PlanningTool
@@ -199,12 +201,16 @@ class PlanningFlow(BaseFlow):
         )
 
         # Call LLM with PlanningTool
-        response = await self.llm.ask_tool(
-            messages=[user_message],
-            system_msgs=[system_message],
-            tools=[self.planning_tool.to_param()],
-            tool_choice=ToolChoice.AUTO,
-        )
+        with usage_scope("planning"):
+            response = await self.llm.ask_tool(
+                messages=[user_message],
+                system_msgs=[system_message],
+                tools=[self.planning_tool.to_param()],
+                tool_choice=ToolChoice.AUTO,
+                # Identical requests recur across runs and retries
+                cache=True,
+                priority=LLMPriority.PLANNING,
+            )
 
         # Process tool calls if present
         if response.tool_calls:
@@ -467,9 +473,12 @@ class PlanningFlow(BaseFlow):
 请基于以上执行结果，直接回答用户的原始问题。重点关注实际得到的数据和信息，而不是执行过程本身。"""
             )
 
-            response = await self.llm.ask(
-                messages=[user_message], system_msgs=[system_message]
-            )
+            with usage_scope("planning"):
+                response = await self.llm.ask(
+                    messages=[user_message],
+                    system_msgs=[system_message],
+                    priority=LLMPriority.PLANNING,
+                )
 
             return response
         except Exception as e:
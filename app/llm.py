@@ -1,5 +1,24 @@
+import hashlib
+import inspect
+import json
 import math
-from typing import Dict, List, Optional, Union
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import tiktoken
 from openai import (
@@ -11,26 +30,38 @@ from openai import (
     RateLimitError,
 )
 from openai.types.chat import ChatCompletion, ChatCompletionMessage
-from tenacity import (
-    retry,
-    retry_if_exception_type,
-    stop_after_attempt,
-    wait_random_exponential,
-)
 
 from app.bedrock import BedrockClient
-from app.config import LLMSettings, config
-from app.exceptions import TokenLimitExceeded
+from app.config import LLMCacheSettings, LLMSettings, config
+from app.exceptions import LLMCacheMiss, TokenLimitExceeded
+from app.llm_http import LLM_HTTP_CLIENTS
+from app.llm_prompt_cache import (
+    PromptCacheStats,
+    add_cache_control,
+    cached_prompt_tokens,
+    current_prompt_cache_stats,
+)
+from app.llm_rate_limit import LLM_RATE_LIMITERS, LLMPriority
+from app.llm_retry import RetryPolicy, deadline_remaining, is_retryable, with_retry
+from app.llm_router import Endpoint, EndpointRouter, RoutedClient
+from app.llm_stream import TokenStream, current_token_stream
+from app.llm_usage import current_usage_ledger, usage_cost
 from app.logger import logger  # Assuming a logger is set up in your app
 from app.schema import (
     ROLE_VALUES,
     TOOL_CHOICE_TYPE,
     TOOL_CHOICE_VALUES,
+    Function,
     Message,
+    ToolCall,
     ToolChoice,
 )
 
 
+if TYPE_CHECKING:
+    from app.tool.tool_collection import ToolCatalog
+
+
 REASONING_MODELS = ["o1", "o3-mini"]
 MULTIMODAL_MODELS = [
     "gpt-4-vision-preview",
@@ -54,8 +85,14 @@ class TokenCounter:
     HIGH_DETAIL_TARGET_SHORT_SIDE = 768
     TILE_SIZE = 512
 
+    # Per-message counts kept across calls; the history is re-sent every step
+    MESSAGE_CACHE_SIZE = 4096
+
     def __init__(self, tokenizer):
         self.tokenizer = tokenizer
+        self._message_cache: "OrderedDict[Hashable, int]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     def count_text(self, text: str) -> int:
         """Calculate tokens for a text string"""
@@ -144,31 +181,294 @@ class TokenCounter:
                 token_count += self.count_text(function.get("arguments", ""))
         return token_count
 
+    @staticmethod
+    def _message_key(message: dict) -> Hashable:
+        """Fingerprint of everything in a message that affects its token count.
+
+        Formatted messages are rebuilt on every call, but their strings are the
+        same objects, so hashing the key is cheap while re-encoding is not.
+        Any edit to the message produces a different key, which invalidates the
+        cached count.
+        """
+        content = message.get("content")
+        if isinstance(content, list):
+            items = []
+            for item in content:
+                if isinstance(item, dict):
+                    if "text" in item:
+                        items.append(("text", item["text"]))
+                    elif "image_url" in item:
+                        # The image data does not affect the estimate
+                        items.append(
+                            (
+                                "image",
+                                item.get("detail", "medium"),
+                                tuple(item.get("dimensions", ())),
+                            )
+                        )
+                else:
+                    items.append(item)
+            content = tuple(items)
+        tool_calls = tuple(
+            (
+                tool_call["function"].get("name", ""),
+                tool_call["function"].get("arguments", ""),
+            )
+            for tool_call in message.get("tool_calls") or []
+            if "function" in tool_call
+        )
+        return (
+            message.get("role", ""),
+            content,
+            tool_calls,
+            message.get("name", ""),
+            message.get("tool_call_id", ""),
+        )
+
+    def count_message(self, message: dict) -> int:
+        """Calculate tokens for one message, reusing the count of an unchanged one"""
+        key = self._message_key(message)
+        cached = self._message_cache.get(key)
+        if cached is not None:
+            self._message_cache.move_to_end(key)
+            self.cache_hits += 1
+            return cached
+
+        self.cache_misses += 1
+        tokens = self.BASE_MESSAGE_TOKENS  # Base tokens per message
+
+        # Add role tokens
+        tokens += self.count_text(message.get("role", ""))
+
+        # Add content tokens
+        if "content" in message:
+            tokens += self.count_content(message["content"])
+
+        # Add tool calls tokens
+        if "tool_calls" in message:
+            tokens += self.count_tool_calls(message["tool_calls"])
+
+        # Add name and tool_call_id tokens
+        tokens += self.count_text(message.get("name", ""))
+        tokens += self.count_text(message.get("tool_call_id", ""))
+
+        self._message_cache[key] = tokens
+        if len(self._message_cache) > self.MESSAGE_CACHE_SIZE:
+            self._message_cache.popitem(last=False)
+        return tokens
+
     def count_message_tokens(self, messages: List[dict]) -> int:
         """Calculate the total number of tokens in a message list"""
         total_tokens = self.FORMAT_TOKENS  # Base format tokens
-
         for message in messages:
-            tokens = self.BASE_MESSAGE_TOKENS  # Base tokens per message
+            total_tokens += self.count_message(message)
+        return total_tokens
 
-            # Add role tokens
-            tokens += self.count_text(message.get("role", ""))
 
-            # Add content tokens
-            if "content" in message:
-                tokens += self.count_content(message["content"])
+class ToolCallAssembler:
+    """Rebuilds tool calls from streamed deltas.
 
-            # Add tool calls tokens
-            if "tool_calls" in message:
-                tokens += self.count_tool_calls(message["tool_calls"])
+    A call is complete as soon as it has an id, a name and arguments that
+    parse as a JSON object; a partial object never parses, so this happens
+    exactly when its last argument fragment has arrived.
+    """
 
-            # Add name and tool_call_id tokens
-            tokens += self.count_text(message.get("name", ""))
-            tokens += self.count_text(message.get("tool_call_id", ""))
+    def __init__(self):
+        self._calls: Dict[int, Dict[str, str]] = {}
+        self._completed: set = set()
 
-            total_tokens += tokens
+    def add(self, deltas: List[Any]) -> List[ToolCall]:
+        """Apply tool call deltas and return the calls that just completed."""
+        touched = []
+        for delta in deltas:
+            index = delta.index if delta.index is not None else len(self._calls)
+            call = self._calls.setdefault(
+                index, {"id": "", "name": "", "arguments": ""}
+            )
+            if delta.id:
+                call["id"] = delta.id
+            function = delta.function
+            if function is not None:
+                call["name"] += function.name or ""
+                call["arguments"] += function.arguments or ""
+            touched.append(index)
+
+        completed = []
+        for index in dict.fromkeys(touched):
+            if index not in self._completed and self._is_complete(index):
+                self._completed.add(index)
+                completed.append(self._tool_call(index))
+        return completed
+
+    def finish(self) -> Tuple[List[ToolCall], List[ToolCall]]:
+        """All calls in order, and the ones that never completed early."""
+        calls = [self._tool_call(index) for index in sorted(self._calls)]
+        pending = [
+            call
+            for index, call in zip(sorted(self._calls), calls)
+            if index not in self._completed
+        ]
+        return calls, pending
+
+    def _is_complete(self, index: int) -> bool:
+        call = self._calls[index]
+        if not call["id"] or not call["name"]:
+            return False
+        try:
+            return isinstance(json.loads(call["arguments"]), dict)
+        except ValueError:
+            return False
 
-        return total_tokens
+    def _tool_call(self, index: int) -> ToolCall:
+        call = self._calls[index]
+        return ToolCall(
+            id=call["id"],
+            function=Function(name=call["name"], arguments=call["arguments"]),
+        )
+
+
+class ResponseCache:
+    """Disk-backed LLM response cache in a SQLite file.
+
+    Entries are keyed by a hash of the canonical request. Modes:
+    ``cache`` serves hits and stores misses, ``record`` always calls the API
+    and overwrites the entry, and ``replay`` serves only from the cache so a
+    recorded pipeline can run offline.
+    """
+
+    MODES = ("cache", "record", "replay")
+
+    def __init__(self, settings: LLMCacheSettings):
+        if settings.mode not in self.MODES:
+            raise ValueError(
+                f"Invalid llm_cache mode: {settings.mode} (expected one of {self.MODES})"
+            )
+        self.mode = settings.mode
+        self.call_sites = set(settings.call_sites)
+        self.max_bytes = int(settings.max_size_mb * 1024 * 1024)
+        path = Path(settings.path)
+        self.path = path if path.is_absolute() else config.workspace_root / path
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, site TEXT, value TEXT, size INTEGER, "
+            "created REAL, accessed REAL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(site: str, **request) -> str:
+        """Hash the canonical JSON of a request"""
+        canonical = json.dumps(
+            {"site": site, **request},
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def enabled_for(self, site: str, override: Optional[bool] = None) -> bool:
+        return override if override is not None else site in self.call_sites
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a response; counts the hit or miss"""
+        if self.mode == "record":
+            self.misses += 1
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE responses SET accessed = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+                self._conn.commit()
+        if row is None:
+            self.misses += 1
+            if self.mode == "replay":
+                raise LLMCacheMiss(
+                    f"LLM response cache has no recorded response for request {key[:16]}"
+                )
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, site: str, value: str) -> None:
+        """Store a response, evicting least recently used entries over the limit"""
+        if self.mode == "replay":
+            return
+        size = len(value.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, site, value, size, now, now),
+            )
+            total = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+            if total > self.max_bytes:
+                for old_key, old_size in self._conn.execute(
+                    "SELECT key, size FROM responses WHERE key != ? "
+                    "ORDER BY accessed",
+                    (key,),
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    self._conn.execute(
+                        "DELETE FROM responses WHERE key = ?", (old_key,)
+                    )
+                    total -= old_size
+                    self.evictions += 1
+            self._conn.commit()
+        self.writes += 1
+
+    def stats(self) -> Dict[str, Union[int, str]]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """The shared response cache, or None when it is not enabled"""
+    global _response_cache
+    settings = config.llm_cache
+    if not settings or not settings.enabled:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(settings)
+    return _response_cache
 
 
 class LLM:
@@ -196,6 +496,21 @@ class LLM:
             self.api_key = llm_config.api_key
             self.api_version = llm_config.api_version
             self.base_url = llm_config.base_url
+            self.stream_tool_calls = getattr(llm_config, "stream_tool_calls", False)
+            self.prompt_cache_control = getattr(
+                llm_config, "prompt_cache_control", False
+            )
+            # Bedrock streams do not take stream_options
+            self.stream_usage = (
+                getattr(llm_config, "stream_usage", True) and self.api_type != "aws"
+            )
+            self.prompt_cache = PromptCacheStats()
+            self.input_price_per_million = getattr(
+                llm_config, "input_price_per_million", 0.0
+            )
+            self.output_price_per_million = getattr(
+                llm_config, "output_price_per_million", 0.0
+            )
 
             # Add token counting related attributes
             self.total_input_tokens = 0
@@ -213,18 +528,76 @@ class LLM:
                 # If the model is not in tiktoken's presets, use cl100k_base as default
                 self.tokenizer = tiktoken.get_encoding("cl100k_base")
 
-            if self.api_type == "azure":
-                self.client = AsyncAzureOpenAI(
-                    base_url=self.base_url,
-                    api_key=self.api_key,
-                    api_version=self.api_version,
+            requests_per_minute = getattr(llm_config, "requests_per_minute", None)
+            tokens_per_minute = getattr(llm_config, "tokens_per_minute", None)
+            endpoints = getattr(llm_config, "endpoints", None)
+            if endpoints:
+                # Several equivalent endpoints: balance and fail over between them
+                self.client = RoutedClient(
+                    EndpointRouter(
+                        [
+                            Endpoint(
+                                endpoint.name or endpoint.base_url,
+                                self._build_client(
+                                    endpoint.api_type or self.api_type,
+                                    endpoint.base_url,
+                                    endpoint.api_key,
+                                    endpoint.api_version or self.api_version,
+                                ),
+                                endpoint.weight,
+                                # Each endpoint (base URL or key) has its own quota
+                                LLM_RATE_LIMITERS.get_limiter(
+                                    self.model,
+                                    endpoint.name or endpoint.base_url,
+                                    requests_per_minute,
+                                    tokens_per_minute,
+                                ),
+                            )
+                            for endpoint in endpoints
+                        ],
+                        strategy=llm_config.routing,
+                        is_failure=is_retryable,
+                    )
                 )
-            elif self.api_type == "aws":
-                self.client = BedrockClient()
             else:
-                self.client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+                self.client = self._build_client(
+                    self.api_type, self.base_url, self.api_key, self.api_version
+                )
 
             self.token_counter = TokenCounter(self.tokenizer)
+            self.retry_policy = RetryPolicy(
+                max_attempts=getattr(llm_config, "max_retries", 5) + 1,
+                max_retry_time=getattr(llm_config, "max_retry_time", 120.0),
+                hedge=getattr(llm_config, "hedge_requests", False),
+            )
+            # Shared by every instance that talks to the same model endpoint
+            self.rate_limiter = LLM_RATE_LIMITERS.get_limiter(
+                self.model,
+                self.base_url,
+                requests_per_minute,
+                tokens_per_minute,
+            )
+
+    @staticmethod
+    def _build_client(api_type: str, base_url: str, api_key: str, api_version: str):
+        # RetryPolicy is the only retry layer: SDK retries would hide 429s and
+        # endpoint failures from the rate limiter and router, and overrun deadlines
+        if api_type == "azure":
+            return AsyncAzureOpenAI(
+                base_url=base_url,
+                api_key=api_key,
+                api_version=api_version,
+                http_client=LLM_HTTP_CLIENTS.get(base_url),
+                max_retries=0,
+            )
+        elif api_type == "aws":
+            return BedrockClient()
+        return AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=LLM_HTTP_CLIENTS.get(base_url),
+            max_retries=0,
+        )
 
     def count_tokens(self, text: str) -> int:
         """Calculate the number of tokens in a text"""
@@ -235,34 +608,248 @@ class LLM:
     def count_message_tokens(self, messages: List[dict]) -> int:
         return self.token_counter.count_message_tokens(messages)
 
-    def update_token_count(self, input_tokens: int, completion_tokens: int = 0) -> None:
+    def update_token_count(
+        self,
+        input_tokens: int,
+        completion_tokens: int = 0,
+        site: str = "llm",
+        usage: Any = None,
+    ) -> None:
         """Update token counts"""
         # Only track tokens if max_input_tokens is set
         self.total_input_tokens += input_tokens
         self.total_completion_tokens += completion_tokens
+        self._record_usage(site, input_tokens, completion_tokens, usage)
         logger.info(
             f"Token usage: Input={input_tokens}, Completion={completion_tokens}, "
             f"Cumulative Input={self.total_input_tokens}, Cumulative Completion={self.total_completion_tokens}, "
             f"Total={input_tokens + completion_tokens}, Cumulative Total={self.total_input_tokens + self.total_completion_tokens}"
         )
 
+    def _record_usage(
+        self,
+        site: str,
+        input_tokens: int,
+        completion_tokens: int,
+        usage: Any = None,
+        calls: int = 1,
+    ) -> None:
+        """Add a call's usage and cost to the current session's ledger"""
+        ledger = current_usage_ledger()
+        if ledger is None:
+            return
+        ledger.record(
+            self.model,
+            site,
+            input_tokens,
+            completion_tokens,
+            cached_tokens=cached_prompt_tokens(usage),
+            cost=usage_cost(
+                input_tokens,
+                completion_tokens,
+                self.input_price_per_million,
+                self.output_price_per_million,
+            ),
+            calls=calls,
+        )
+
+    def _used_input_tokens(self) -> int:
+        # Within a session only its own usage counts towards max_input_tokens
+        ledger = current_usage_ledger()
+        if ledger is not None:
+            return ledger.prompt_tokens(self.model)
+        return self.total_input_tokens
+
     def check_token_limit(self, input_tokens: int) -> bool:
         """Check if token limits are exceeded"""
         if self.max_input_tokens is not None:
-            return (self.total_input_tokens + input_tokens) <= self.max_input_tokens
+            return (self._used_input_tokens() + input_tokens) <= self.max_input_tokens
         # If max_input_tokens is not set, always return True
         return True
 
     def get_limit_error_message(self, input_tokens: int) -> str:
         """Generate error message for token limit exceeded"""
+        used = self._used_input_tokens()
         if (
             self.max_input_tokens is not None
-            and (self.total_input_tokens + input_tokens) > self.max_input_tokens
+            and (used + input_tokens) > self.max_input_tokens
         ):
-            return f"Request may exceed input token limit (Current: {self.total_input_tokens}, Needed: {input_tokens}, Max: {self.max_input_tokens})"
+            return f"Request may exceed input token limit (Current: {used}, Needed: {input_tokens}, Max: {self.max_input_tokens})"
 
         return "Token limit exceeded"
 
+    def check_budget(self, input_tokens: int) -> None:
+        """Raise BudgetExceeded if the current session cannot afford the request"""
+        ledger = current_usage_ledger()
+        if ledger is not None:
+            ledger.check_budget(input_tokens)
+
+    async def _create(
+        self,
+        site: str,
+        params: dict,
+        input_tokens: int,
+        priority: LLMPriority,
+        hedge: bool = False,
+    ):
+        """One completion request through the rate limiter.
+
+        The request timeout is capped by the caller's deadline, and cache
+        breakpoints are added when prompt_cache_control is set. Streaming
+        requests ask for usage unless stream_usage is off. Hedging is only
+        safe for non-streaming requests.
+
+        Returns:
+            The API response and its rate limiter reservation.
+        """
+        params = (
+            add_cache_control(params) if self.prompt_cache_control else dict(params)
+        )
+        if params.get("stream") and self.stream_usage:
+            # Usage (with cached tokens) arrives in a final chunk without choices
+            params["stream_options"] = {"include_usage": True}
+        remaining = deadline_remaining()
+        if remaining is not None:
+            params["timeout"] = max(
+                1.0, min(params.get("timeout") or remaining, remaining)
+            )
+
+        async def attempt():
+            async with self._route() as (client, rate_limiter):
+                async with LLM_RATE_LIMITERS.admit(
+                    rate_limiter, input_tokens, priority
+                ) as reservation:
+                    response = await client.chat.completions.create(**params)
+            return response, reservation
+
+        if hedge:
+            response, reservation = await self.retry_policy.hedge(site, attempt)
+        else:
+            response, reservation = await attempt()
+        if not params.get("stream"):
+            self._record_prompt_cache(getattr(response, "usage", None))
+        return response, reservation
+
+    @asynccontextmanager
+    async def _route(self):
+        """The client and rate limiter for one request.
+
+        Routed requests are admitted on the limiter of the endpoint the
+        router picks, so its quota and 429 pauses are its own.
+        """
+        if isinstance(self.client, RoutedClient):
+            async with self.client.router.route() as endpoint:
+                yield endpoint.client, endpoint.rate_limiter or self.rate_limiter
+        else:
+            yield self.client, self.rate_limiter
+
+    def _record_prompt_cache(self, usage: Any) -> None:
+        """Count cached prompt tokens for this model and the current session"""
+        self.prompt_cache.record(usage)
+        session_stats = current_prompt_cache_stats()
+        if session_stats is not None:
+            session_stats.record(usage)
+
+    def _prepare_tool_request(
+        self,
+        messages: List[Union[dict, Message]],
+        system_msgs: Optional[List[Union[dict, Message]]],
+        timeout: int,
+        tools: Optional[Union[List[dict], "ToolCatalog"]],
+        tool_choice: TOOL_CHOICE_TYPE,  # type: ignore
+        temperature: Optional[float],
+        kwargs: dict,
+    ) -> Tuple[dict, int, "ToolCatalog"]:
+        """Validate a tool request and build its (non-streaming) parameters.
+
+        Returns:
+            The request parameters, the input token estimate and the tool catalog.
+
+        Raises:
+            TokenLimitExceeded: If token limits are exceeded
+            ValueError: If tools, tool_choice, or messages are invalid
+        """
+        # Validate tool_choice
+        if tool_choice not in TOOL_CHOICE_VALUES:
+            raise ValueError(f"Invalid tool_choice: {tool_choice}")
+
+        # Check if the model supports images
+        supports_images = self.model in MULTIMODAL_MODELS
+
+        # Format messages
+        if system_msgs:
+            system_msgs = self.format_messages(system_msgs, supports_images)
+            messages = system_msgs + self.format_messages(messages, supports_images)
+        else:
+            messages = self.format_messages(messages, supports_images)
+
+        # Calculate input token count
+        input_tokens = self.count_message_tokens(messages)
+
+        # Imported here because app.tool imports this module
+        from app.tool.tool_collection import ToolCatalog
+
+        # Tool schemas are counted as the serialized JSON, once per catalog
+        if isinstance(tools, ToolCatalog):
+            catalog, tools = tools, tools.params
+        else:
+            catalog = ToolCatalog(tools or [])
+        input_tokens += catalog.token_count(self.tokenizer)
+
+        # Check if token limits are exceeded
+        if not self.check_token_limit(input_tokens):
+            error_message = self.get_limit_error_message(input_tokens)
+            # Raise a special exception that won't be retried
+            raise TokenLimitExceeded(error_message)
+        self.check_budget(input_tokens)
+
+        # Validate tools if provided
+        if tools:
+            for tool in tools:
+                if not isinstance(tool, dict) or "type" not in tool:
+                    raise ValueError("Each tool must be a dict with 'type' field")
+
+        # Set up the completion request
+        params = {
+            "model": self.model,
+            "messages": messages,
+            "tools": tools,
+            "tool_choice": tool_choice,
+            "timeout": timeout,
+            **kwargs,
+        }
+
+        if self.model in REASONING_MODELS:
+            params["max_completion_tokens"] = self.max_tokens
+        else:
+            params["max_tokens"] = self.max_tokens
+            params["temperature"] = (
+                temperature if temperature is not None else self.temperature
+            )
+
+        params["stream"] = False
+        return params, input_tokens, catalog
+
+    def _tool_cache_lookup(
+        self, override: Optional[bool], params: dict, catalog: "ToolCatalog"
+    ) -> Tuple[Optional[ResponseCache], Optional[str]]:
+        # The catalog hash stands in for the full tool schemas in the key
+        key_params = {
+            k: v for k, v in params.items() if k not in ("tools", "timeout", "stream")
+        }
+        key_params["tools"] = catalog.hash
+        return self._cache_lookup("ask_tool", override, key_params)
+
+    @staticmethod
+    def _cache_lookup(
+        site: str, override: Optional[bool], params: dict
+    ) -> Tuple[Optional[ResponseCache], Optional[str]]:
+        """The response cache and request key, or (None, None) if not caching"""
+        response_cache = get_response_cache()
+        if response_cache is None or not response_cache.enabled_for(site, override):
+            return None, None
+        return response_cache, response_cache.make_key(site, **params)
+
     @staticmethod
     def format_messages(
         messages: List[Union[dict, Message]], supports_images: bool = False
@@ -351,19 +938,15 @@ class LLM:
 
         return formatted_messages
 
-    @retry(
-        wait=wait_random_exponential(min=1, max=60),
-        stop=stop_after_attempt(6),
-        retry=retry_if_exception_type(
-            (OpenAIError, Exception, ValueError)
-        ),  # Don't retry TokenLimitExceeded
-    )
     async def ask(
         self,
         messages: List[Union[dict, Message]],
         system_msgs: Optional[List[Union[dict, Message]]] = None,
         stream: bool = True,
         temperature: Optional[float] = None,
+        cache: Optional[bool] = None,
+        priority: LLMPriority = LLMPriority.STEP,
+        token_stream: Optional[TokenStream] = None,
     ) -> str:
         """
         Send a prompt to the LLM and get the response.
@@ -373,12 +956,17 @@ class LLM:
             system_msgs: Optional system messages to prepend
             stream (bool): Whether to stream the response
             temperature (float): Sampling temperature for the response
+            cache (bool): Use the response cache; None follows llm_cache.call_sites
+            priority (LLMPriority): Rate limiter lane for this request
+            token_stream (TokenStream): Receives streamed tokens; defaults to the
+                stream bound with stream_tokens, else tokens go to stdout
 
         Returns:
             str: The generated response
 
         Raises:
             TokenLimitExceeded: If token limits are exceeded
+            LLMCacheMiss: If replaying and the request was not recorded
             ValueError: If messages are invalid or response is empty
             OpenAIError: If API call fails after retries
             Exception: For unexpected errors
@@ -402,6 +990,7 @@ class LLM:
                 error_message = self.get_limit_error_message(input_tokens)
                 # Raise a special exception that won't be retried
                 raise TokenLimitExceeded(error_message)
+            self.check_budget(input_tokens)
 
             params = {
                 "model": self.model,
@@ -416,50 +1005,105 @@ class LLM:
                     temperature if temperature is not None else self.temperature
                 )
 
+            response_cache, cache_key = self._cache_lookup("ask", cache, params)
+            if cache_key is not None:
+                cached = response_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
             if not stream:
                 # Non-streaming request
-                response = await self.client.chat.completions.create(
-                    **params, stream=False
+                response, reservation = await self.retry_policy.run(
+                    lambda: self._create(
+                        "ask",
+                        {**params, "stream": False},
+                        input_tokens,
+                        priority,
+                        hedge=True,
+                    ),
+                    name="ask",
                 )
+                reservation.record_usage(response.usage.total_tokens)
 
                 if not response.choices or not response.choices[0].message.content:
                     raise ValueError("Empty or invalid response from LLM")
 
                 # Update token counts
                 self.update_token_count(
-                    response.usage.prompt_tokens, response.usage.completion_tokens
+                    response.usage.prompt_tokens,
+                    response.usage.completion_tokens,
+                    site="ask",
+                    usage=response.usage,
                 )
 
-                return response.choices[0].message.content
+                content = response.choices[0].message.content
+                if cache_key is not None:
+                    response_cache.put(cache_key, "ask", content)
+                return content
 
-            # Streaming request, For streaming, update estimated token count before making the request
-            self.update_token_count(input_tokens)
-
-            response = await self.client.chat.completions.create(**params, stream=True)
+            # Started before the request so queueing counts towards first output
+            token_stream = token_stream or current_token_stream()
+            if token_stream is not None:
+                token_stream.start()
 
             collected_messages = []
             completion_text = ""
-            async for chunk in response:
-                chunk_message = chunk.choices[0].delta.content or ""
-                collected_messages.append(chunk_message)
-                completion_text += chunk_message
-                print(chunk_message, end="", flush=True)
+            usage = None
+            try:
+                # Only opening the stream is retried: once tokens have been
+                # forwarded a retry would send the response twice
+                response, reservation = await self.retry_policy.run(
+                    lambda: self._create(
+                        "ask", {**params, "stream": True}, input_tokens, priority
+                    ),
+                    name="ask_stream",
+                )
 
-            print()  # Newline after streaming
+                async for chunk in response:
+                    # With include_usage the last chunk carries usage and no choices
+                    if getattr(chunk, "usage", None):
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    chunk_message = chunk.choices[0].delta.content or ""
+                    collected_messages.append(chunk_message)
+                    completion_text += chunk_message
+                    if token_stream is not None:
+                        await token_stream.write(chunk_message)
+                    else:
+                        print(chunk_message, end="", flush=True)
+            finally:
+                if token_stream is not None:
+                    await token_stream.end()
+                else:
+                    print()  # Newline after streaming
             full_response = "".join(collected_messages).strip()
             if not full_response:
                 raise ValueError("Empty response from streaming LLM")
 
-            # estimate completion tokens for streaming response
-            completion_tokens = self.count_tokens(completion_text)
-            logger.info(
-                f"Estimated completion tokens for streaming response: {completion_tokens}"
-            )
-            self.total_completion_tokens += completion_tokens
+            if usage is not None:
+                reservation.record_usage(usage.total_tokens)
+                self.update_token_count(
+                    usage.prompt_tokens,
+                    usage.completion_tokens,
+                    site="ask",
+                    usage=usage,
+                )
+                self._record_prompt_cache(usage)
+            else:
+                # estimate completion tokens for streaming response
+                completion_tokens = self.count_tokens(completion_text)
+                logger.info(
+                    f"Estimated completion tokens for streaming response: {completion_tokens}"
+                )
+                reservation.record_usage(input_tokens + completion_tokens)
+                self.update_token_count(input_tokens, completion_tokens, site="ask")
 
+            if cache_key is not None:
+                response_cache.put(cache_key, "ask", full_response)
             return full_response
 
-        except TokenLimitExceeded:
+        except (TokenLimitExceeded, LLMCacheMiss):
             # Re-raise token limit errors without logging
             raise
         except ValueError:
@@ -478,13 +1122,7 @@ class LLM:
             logger.exception(f"Unexpected error in ask")
             raise
 
-    @retry(
-        wait=wait_random_exponential(min=1, max=60),
-        stop=stop_after_attempt(6),
-        retry=retry_if_exception_type(
-            (OpenAIError, Exception, ValueError)
-        ),  # Don't retry TokenLimitExceeded
-    )
+    @with_retry
     async def ask_with_images(
         self,
         messages: List[Union[dict, Message]],
@@ -492,6 +1130,8 @@ class LLM:
         system_msgs: Optional[List[Union[dict, Message]]] = None,
         stream: bool = False,
         temperature: Optional[float] = None,
+        cache: Optional[bool] = None,
+        priority: LLMPriority = LLMPriority.STEP,
     ) -> str:
         """
         Send a prompt with images to the LLM and get the response.
@@ -502,12 +1142,15 @@ class LLM:
             system_msgs: Optional system messages to prepend
             stream (bool): Whether to stream the response
             temperature (float): Sampling temperature for the response
+            cache (bool): Use the response cache; None follows llm_cache.call_sites
+            priority (LLMPriority): Rate limiter lane for this request
 
         Returns:
             str: The generated response
 
         Raises:
             TokenLimitExceeded: If token limits are exceeded
+            LLMCacheMiss: If replaying and the request was not recorded
             ValueError: If messages are invalid or response is empty
             OpenAIError: If API call fails after retries
             Exception: For unexpected errors
@@ -537,9 +1180,7 @@ class LLM:
             multimodal_content = (
                 [{"type": "text", "text": content}]
                 if isinstance(content, str)
-                else content
-                if isinstance(content, list)
-                else []
+                else content if isinstance(content, list) else []
             )
 
             # Add images to content
@@ -571,6 +1212,7 @@ class LLM:
             input_tokens = self.count_message_tokens(all_messages)
             if not self.check_token_limit(input_tokens):
                 raise TokenLimitExceeded(self.get_limit_error_message(input_tokens))
+            self.check_budget(input_tokens)
 
             # Set up API parameters
             params = {
@@ -588,35 +1230,77 @@ class LLM:
                     temperature if temperature is not None else self.temperature
                 )
 
+            response_cache, cache_key = self._cache_lookup(
+                "ask_with_images", cache, params
+            )
+            if cache_key is not None:
+                cached = response_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
             # Handle non-streaming request
             if not stream:
-                response = await self.client.chat.completions.create(**params)
+                response, reservation = await self._create(
+                    "ask_with_images", params, input_tokens, priority, hedge=True
+                )
+                reservation.record_usage(response.usage.total_tokens)
 
                 if not response.choices or not response.choices[0].message.content:
                     raise ValueError("Empty or invalid response from LLM")
 
-                self.update_token_count(response.usage.prompt_tokens)
-                return response.choices[0].message.content
+                self.update_token_count(
+                    response.usage.prompt_tokens,
+                    response.usage.completion_tokens,
+                    site="ask_with_images",
+                    usage=response.usage,
+                )
+                content = response.choices[0].message.content
+                if cache_key is not None:
+                    response_cache.put(cache_key, "ask_with_images", content)
+                return content
 
             # Handle streaming request
-            self.update_token_count(input_tokens)
-            response = await self.client.chat.completions.create(**params)
+            response, reservation = await self._create(
+                "ask_with_images", params, input_tokens, priority
+            )
 
             collected_messages = []
+            usage = None
             async for chunk in response:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
                 chunk_message = chunk.choices[0].delta.content or ""
                 collected_messages.append(chunk_message)
                 print(chunk_message, end="", flush=True)
 
             print()  # Newline after streaming
             full_response = "".join(collected_messages).strip()
+            if usage is not None:
+                reservation.record_usage(usage.total_tokens)
+                self.update_token_count(
+                    usage.prompt_tokens,
+                    usage.completion_tokens,
+                    site="ask_with_images",
+                    usage=usage,
+                )
+                self._record_prompt_cache(usage)
+            else:
+                completion_tokens = self.count_tokens(full_response)
+                reservation.record_usage(input_tokens + completion_tokens)
+                self.update_token_count(
+                    input_tokens, completion_tokens, site="ask_with_images"
+                )
 
             if not full_response:
                 raise ValueError("Empty response from streaming LLM")
 
+            if cache_key is not None:
+                response_cache.put(cache_key, "ask_with_images", full_response)
             return full_response
 
-        except TokenLimitExceeded:
+        except (TokenLimitExceeded, LLMCacheMiss):
             raise
         except ValueError as ve:
             logger.error(f"Validation error in ask_with_images: {ve}")
@@ -634,21 +1318,17 @@ class LLM:
             logger.error(f"Unexpected error in ask_with_images: {e}")
             raise
 
-    @retry(
-        wait=wait_random_exponential(min=1, max=60),
-        stop=stop_after_attempt(6),
-        retry=retry_if_exception_type(
-            (OpenAIError, Exception, ValueError)
-        ),  # Don't retry TokenLimitExceeded
-    )
+    @with_retry
     async def ask_tool(
         self,
         messages: List[Union[dict, Message]],
         system_msgs: Optional[List[Union[dict, Message]]] = None,
         timeout: int = 300,
-        tools: Optional[List[dict]] = None,
+        tools: Optional[Union[List[dict], "ToolCatalog"]] = None,
         tool_choice: TOOL_CHOICE_TYPE = ToolChoice.AUTO,  # type: ignore
         temperature: Optional[float] = None,
+        cache: Optional[bool] = None,
+        priority: LLMPriority = LLMPriority.STEP,
         **kwargs,
     ) -> ChatCompletionMessage | None:
         """
@@ -658,9 +1338,11 @@ class LLM:
             messages: List of conversation messages
             system_msgs: Optional system messages to prepend
             timeout: Request timeout in seconds
-            tools: List of tools to use
+            tools: List of tools to use, or a precompiled ToolCatalog
             tool_choice: Tool choice strategy
             temperature: Sampling temperature for the response
+            cache: Use the response cache; None follows llm_cache.call_sites
+            priority: Rate limiter lane for this request
             **kwargs: Additional completion arguments
 
         Returns:
@@ -668,70 +1350,28 @@ class LLM:
 
         Raises:
             TokenLimitExceeded: If token limits are exceeded
+            LLMCacheMiss: If replaying and the request was not recorded
             ValueError: If tools, tool_choice, or messages are invalid
             OpenAIError: If API call fails after retries
             Exception: For unexpected errors
         """
         try:
-            # Validate tool_choice
-            if tool_choice not in TOOL_CHOICE_VALUES:
-                raise ValueError(f"Invalid tool_choice: {tool_choice}")
-
-            # Check if the model supports images
-            supports_images = self.model in MULTIMODAL_MODELS
-
-            # Format messages
-            if system_msgs:
-                system_msgs = self.format_messages(system_msgs, supports_images)
-                messages = system_msgs + self.format_messages(messages, supports_images)
-            else:
-                messages = self.format_messages(messages, supports_images)
-
-            # Calculate input token count
-            input_tokens = self.count_message_tokens(messages)
-
-            # If there are tools, calculate token count for tool descriptions
-            tools_tokens = 0
-            if tools:
-                for tool in tools:
-                    tools_tokens += self.count_tokens(str(tool))
-
-            input_tokens += tools_tokens
-
-            # Check if token limits are exceeded
-            if not self.check_token_limit(input_tokens):
-                error_message = self.get_limit_error_message(input_tokens)
-                # Raise a special exception that won't be retried
-                raise TokenLimitExceeded(error_message)
-
-            # Validate tools if provided
-            if tools:
-                for tool in tools:
-                    if not isinstance(tool, dict) or "type" not in tool:
-                        raise ValueError("Each tool must be a dict with 'type' field")
-
-            # Set up the completion request
-            params = {
-                "model": self.model,
-                "messages": messages,
-                "tools": tools,
-                "tool_choice": tool_choice,
-                "timeout": timeout,
-                **kwargs,
-            }
+            params, input_tokens, catalog = self._prepare_tool_request(
+                messages, system_msgs, timeout, tools, tool_choice, temperature, kwargs
+            )
 
-            if self.model in REASONING_MODELS:
-                params["max_completion_tokens"] = self.max_tokens
-            else:
-                params["max_tokens"] = self.max_tokens
-                params["temperature"] = (
-                    temperature if temperature is not None else self.temperature
-                )
+            response_cache, cache_key = self._tool_cache_lookup(cache, params, catalog)
+            if cache_key is not None:
+                cached = response_cache.get(cache_key)
+                if cached is not None:
+                    return ChatCompletionMessage.model_validate_json(cached)
 
-            params["stream"] = False  # Always use non-streaming for tool requests
-            response: ChatCompletion = await self.client.chat.completions.create(
-                **params
+            response: ChatCompletion
+            response, reservation = await self._create(
+                "ask_tool", params, input_tokens, priority, hedge=True
             )
+            if response.usage is not None:
+                reservation.record_usage(response.usage.total_tokens)
 
             # Check if response is valid
             if not response.choices or not response.choices[0].message:
@@ -741,12 +1381,18 @@ class LLM:
 
             # Update token counts
             self.update_token_count(
-                response.usage.prompt_tokens, response.usage.completion_tokens
+                response.usage.prompt_tokens,
+                response.usage.completion_tokens,
+                site="ask_tool",
+                usage=response.usage,
             )
 
-            return response.choices[0].message
+            message = response.choices[0].message
+            if cache_key is not None:
+                response_cache.put(cache_key, "ask_tool", message.model_dump_json())
+            return message
 
-        except TokenLimitExceeded:
+        except (TokenLimitExceeded, LLMCacheMiss):
             # Re-raise token limit errors without logging
             raise
         except ValueError as ve:
@@ -764,3 +1410,167 @@ class LLM:
         except Exception as e:
             logger.error(f"Unexpected error in ask_tool: {e}")
             raise
+
+    async def ask_tool_stream(
+        self,
+        messages: List[Union[dict, Message]],
+        system_msgs: Optional[List[Union[dict, Message]]] = None,
+        timeout: int = 300,
+        tools: Optional[Union[List[dict], "ToolCatalog"]] = None,
+        tool_choice: TOOL_CHOICE_TYPE = ToolChoice.AUTO,  # type: ignore
+        temperature: Optional[float] = None,
+        on_content: Optional[Callable[[str], Any]] = None,
+        on_tool_call: Optional[Callable[[ToolCall], Any]] = None,
+        cache: Optional[bool] = None,
+        priority: LLMPriority = LLMPriority.STEP,
+        **kwargs,
+    ) -> ChatCompletionMessage | None:
+        """
+        Streaming variant of ask_tool that hands over tool calls early.
+
+        Text is passed to ``on_content`` as it arrives, and each tool call is
+        passed to ``on_tool_call`` as soon as its arguments are complete, while
+        the model may still be generating further calls. Callbacks may be
+        plain functions or coroutines. Only opening the stream is retried:
+        once a call has been handed over, a retry could run it twice.
+
+        Args:
+            messages: List of conversation messages
+            system_msgs: Optional system messages to prepend
+            timeout: Request timeout in seconds
+            tools: List of tools to use, or a precompiled ToolCatalog
+            tool_choice: Tool choice strategy
+            temperature: Sampling temperature for the response
+            on_content: Called with each streamed text fragment
+            on_tool_call: Called with each completed tool call
+            cache: Use the response cache; None follows llm_cache.call_sites
+            priority: Rate limiter lane for this request
+            **kwargs: Additional completion arguments
+
+        Returns:
+            ChatCompletionMessage: The assembled response, as ask_tool returns it
+
+        Raises:
+            TokenLimitExceeded: If token limits are exceeded
+            LLMCacheMiss: If replaying and the request was not recorded
+            ValueError: If tools, tool_choice, or messages are invalid
+            OpenAIError: If API call fails after retries
+            Exception: For unexpected errors
+        """
+
+        async def notify(callback, value):
+            if callback is not None:
+                result = callback(value)
+                if inspect.isawaitable(result):
+                    await result
+
+        try:
+            params, input_tokens, catalog = self._prepare_tool_request(
+                messages, system_msgs, timeout, tools, tool_choice, temperature, kwargs
+            )
+
+            response_cache, cache_key = self._tool_cache_lookup(cache, params, catalog)
+            if cache_key is not None:
+                cached = response_cache.get(cache_key)
+                if cached is not None:
+                    message = ChatCompletionMessage.model_validate_json(cached)
+                    await notify(on_content, message.content or "")
+                    for tool_call in message.tool_calls or []:
+                        await notify(
+                            on_tool_call,
+                            ToolCall.model_validate(tool_call.model_dump()),
+                        )
+                    return message
+
+            params["stream"] = True
+            response, reservation = await self.retry_policy.run(
+                lambda: self._create("ask_tool", params, input_tokens, priority),
+                name="ask_tool_stream",
+            )
+
+            if not hasattr(response, "__aiter__"):
+                # Clients without real streaming return the whole completion
+                if not response.choices or not response.choices[0].message:
+                    return None
+                message = response.choices[0].message
+                await notify(on_content, message.content or "")
+                for tool_call in message.tool_calls or []:
+                    await notify(
+                        on_tool_call, ToolCall.model_validate(tool_call.model_dump())
+                    )
+                usage = response.usage
+                if usage is not None:
+                    reservation.record_usage(usage.total_tokens)
+                    self.update_token_count(
+                        usage.prompt_tokens,
+                        usage.completion_tokens,
+                        site="ask_tool",
+                        usage=usage,
+                    )
+                    self._record_prompt_cache(usage)
+                return message
+
+            assembler = ToolCallAssembler()
+            content_parts = []
+            usage = None
+            async for chunk in response:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    content_parts.append(delta.content)
+                    await notify(on_content, delta.content)
+                if delta.tool_calls:
+                    for tool_call in assembler.add(delta.tool_calls):
+                        await notify(on_tool_call, tool_call)
+
+            tool_calls, pending = assembler.finish()
+            for tool_call in pending:
+                # Arguments that never parsed; the agent reports the error
+                await notify(on_tool_call, tool_call)
+
+            content = "".join(content_parts)
+            if usage is not None:
+                reservation.record_usage(usage.total_tokens)
+                self.update_token_count(
+                    usage.prompt_tokens,
+                    usage.completion_tokens,
+                    site="ask_tool",
+                    usage=usage,
+                )
+                self._record_prompt_cache(usage)
+            else:
+                completion_tokens = self.count_tokens(content) + sum(
+                    self.count_tokens(call.function.arguments) for call in tool_calls
+                )
+                reservation.record_usage(input_tokens + completion_tokens)
+                self.update_token_count(
+                    input_tokens, completion_tokens, site="ask_tool"
+                )
+
+            message = ChatCompletionMessage(
+                role="assistant",
+                content=content or None,
+                tool_calls=(
+                    [tool_call.model_dump() for tool_call in tool_calls]
+                    if tool_calls
+                    else None
+                ),
+            )
+            if cache_key is not None:
+                response_cache.put(cache_key, "ask_tool", message.model_dump_json())
+            return message
+
+        except (TokenLimitExceeded, LLMCacheMiss):
+            raise
+        except ValueError as ve:
+            logger.error(f"Validation error in ask_tool_stream: {ve}")
+            raise
+        except OpenAIError as oe:
+            logger.error(f"OpenAI API error in ask_tool_stream: {oe}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error in ask_tool_stream: {e}")
+            raise
@@ -0,0 +1,139 @@
+"""Shared HTTP connection pools for the OpenAI-compatible LLM clients.
+
+Every ``LLM`` config name used to get an ``AsyncOpenAI`` client with its own
+default httpx pool, so agents, tools and flows talking to the same provider
+each opened (and TLS-handshaked) their own connections. ``LLMHTTPClients``
+keeps one ``httpx.AsyncClient`` per endpoint origin instead, with the pool
+size, keep-alive expiry, HTTP/2 and timeouts from the ``[llm_http]`` config,
+and closes them on shutdown.
+"""
+
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.config import LLMHTTPSettings, config
+from app.logger import logger
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def endpoint_origin(base_url: Optional[str]) -> str:
+    """scheme://host:port of a base URL; clients for one origin share a pool."""
+    if not base_url:
+        return "default"
+    parts = urlsplit(base_url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return f"{parts.scheme}://{parts.hostname}:{port}"
+
+
+class LLMHTTPClients:
+    """Registry of pooled httpx clients, one per endpoint origin."""
+
+    def __init__(self, settings: Optional[LLMHTTPSettings] = None):
+        self._settings = settings
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._requests: Dict[str, int] = {}
+        self._created: Dict[str, float] = {}
+
+    @property
+    def settings(self) -> LLMHTTPSettings:
+        return self._settings or config.llm_http
+
+    def _build(self, origin: str) -> httpx.AsyncClient:
+        settings = self.settings
+        http2 = settings.http2
+        if http2 and not _http2_available():
+            logger.warning(
+                "llm_http.http2 needs the h2 package, falling back to HTTP/1.1"
+            )
+            http2 = False
+
+        async def count_request(request: httpx.Request) -> None:
+            self._requests[origin] = self._requests.get(origin, 0) + 1
+
+        return httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_keepalive_connections,
+                keepalive_expiry=settings.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                connect=settings.connect_timeout,
+                read=settings.read_timeout,
+                write=settings.write_timeout,
+                pool=settings.pool_timeout,
+            ),
+            event_hooks={"request": [count_request]},
+            follow_redirects=True,
+        )
+
+    def get(self, base_url: Optional[str]) -> httpx.AsyncClient:
+        """The shared client for the origin of ``base_url``."""
+        origin = endpoint_origin(base_url)
+        client = self._clients.get(origin)
+        if client is None or client.is_closed:
+            client = self._build(origin)
+            self._clients[origin] = client
+            self._created[origin] = time.time()
+        return client
+
+    async def aclose(self) -> None:
+        """Close every pool; later calls to ``get`` open new ones."""
+        clients, self._clients = self._clients, {}
+        for origin, client in clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing HTTP pool for {origin}: {e}")
+
+    @staticmethod
+    def _pool_state(client: httpx.AsyncClient) -> Dict[str, Any]:
+        # The httpcore pool behind the client's default transport
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", None) or [])
+        requests = list(getattr(pool, "_requests", None) or [])
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "connections": len(connections),
+            "active": len(connections) - idle,
+            "idle": idle,
+            "http2_connections": sum(
+                1 for connection in connections if "HTTP/2" in connection.info()
+            ),
+            "queued_requests": sum(1 for request in requests if request.is_queued()),
+        }
+
+    def metrics(self) -> list:
+        settings = self.settings
+        result = []
+        for origin, client in self._clients.items():
+            state = self._pool_state(client)
+            result.append(
+                {
+                    "origin": origin,
+                    "max_connections": settings.max_connections,
+                    "utilization": (
+                        round(state["active"] / settings.max_connections, 4)
+                        if settings.max_connections
+                        else None
+                    ),
+                    "requests": self._requests.get(origin, 0),
+                    "age_seconds": round(time.time() - self._created[origin], 1),
+                    **state,
+                }
+            )
+        return result
+
+
+# Shared pools for all LLM clients in this process
+LLM_HTTP_CLIENTS = LLMHTTPClients()
@@ -0,0 +1,154 @@
+"""Provider prompt-prefix caching: cache hints and cache hit accounting.
+
+Providers with prompt caching serve the longest previously seen prefix of a
+request from cache, so the request is laid out with its stable parts first:
+system messages, then the tool schemas (sent from the precompiled
+``ToolCatalog``, byte-identical between steps), then the history, which only
+grows at the end. OpenAI-compatible providers cache such prefixes
+automatically. Anthropic-style providers (e.g. Claude behind OpenRouter or
+LiteLLM) need explicit ``cache_control`` breakpoints; ``add_cache_control``
+marks the system prompt, the tool list and the latest history messages.
+
+Cached prompt tokens are read from the usage of each response and counted
+per LLM instance and, when one is bound with ``track_prompt_cache``, per web
+session.
+"""
+
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+
+EPHEMERAL = {"type": "ephemeral"}
+
+# Anthropic accepts at most four breakpoints per request
+MAX_BREAKPOINTS = 4
+
+_SESSION_STATS: contextvars.ContextVar[
+    Optional["PromptCacheStats"]
+] = contextvars.ContextVar("prompt_cache_stats", default=None)
+
+
+def _mark(message: dict) -> Optional[dict]:
+    """A copy of ``message`` with a breakpoint on its last text, or None."""
+    content = message.get("content")
+    if isinstance(content, str):
+        if not content:
+            return None
+        parts = [{"type": "text", "text": content}]
+    elif isinstance(content, list) and content:
+        parts = [
+            dict(part) if isinstance(part, dict) else {"type": "text", "text": part}
+            for part in content
+        ]
+        if parts[-1].get("type") != "text" or not parts[-1].get("text"):
+            return None
+    else:
+        return None
+    parts[-1]["cache_control"] = EPHEMERAL
+    return {**message, "content": parts}
+
+
+def add_cache_control(params: dict) -> dict:
+    """Request parameters with Anthropic-style cache breakpoints.
+
+    Marks the last system message, the last tool and the last two history
+    messages with text content: the newest one writes the cache for the next
+    step, the one before reads what the previous step wrote. The input is
+    not modified.
+    """
+    params = dict(params)
+    messages: List[dict] = list(params.get("messages") or [])
+    budget = MAX_BREAKPOINTS
+
+    tools = params.get("tools")
+    if tools:
+        params["tools"] = tools[:-1] + [{**tools[-1], "cache_control": EPHEMERAL}]
+        budget -= 1
+
+    system = [i for i, m in enumerate(messages) if m.get("role") == "system"]
+    history = [i for i, m in enumerate(messages) if m.get("role") != "system"]
+    for i in system[-1:]:
+        marked = _mark(messages[i])
+        if marked is not None:
+            messages[i] = marked
+            budget -= 1
+
+    history_marks = 0
+    for i in reversed(history):
+        if budget == 0 or history_marks == 2:
+            break
+        marked = _mark(messages[i])
+        if marked is not None:
+            messages[i] = marked
+            budget -= 1
+            history_marks += 1
+
+    params["messages"] = messages
+    return params
+
+
+def cached_prompt_tokens(usage: Any) -> int:
+    """Prompt tokens served from the provider's cache, 0 if not reported."""
+    if usage is None:
+        return 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details is not None else None
+    if cached is None:
+        # DeepSeek and Anthropic-style proxies report it at the top level
+        extra = getattr(usage, "model_extra", None) or {}
+        cached = extra.get(
+            "prompt_cache_hit_tokens", extra.get("cache_read_input_tokens")
+        )
+    try:
+        return int(cached or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class PromptCacheStats:
+    """Prompt and cached-prompt token totals of a series of requests."""
+
+    def __init__(self):
+        self.requests = 0
+        self.cache_hits = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, usage: Any) -> None:
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        if usage is None or prompt_tokens is None:
+            return
+        cached = cached_prompt_tokens(usage)
+        self.requests += 1
+        self.cache_hits += cached > 0
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached
+
+    @property
+    def hit_ratio(self) -> float:
+        """Share of prompt tokens served from cache."""
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "requests_with_cache_hit": self.cache_hits,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "hit_ratio": round(self.hit_ratio, 4),
+        }
+
+
+@contextmanager
+def track_prompt_cache(stats: Optional[PromptCacheStats]):
+    """Also count the prompt cache usage of every LLM call inside the block in ``stats``."""
+    token = _SESSION_STATS.set(stats)
+    try:
+        yield stats
+    finally:
+        _SESSION_STATS.reset(token)
+
+
+def current_prompt_cache_stats() -> Optional[PromptCacheStats]:
+    return _SESSION_STATS.get()
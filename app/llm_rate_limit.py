@@ -0,0 +1,303 @@
+"""Process-wide rate limiting of LLM requests.
+
+Every ``LLM`` instance shares one limiter per model endpoint (model and base
+URL, or each endpoint of a routed pool). A request is admitted once the requests-per-minute and tokens-per-minute
+token buckets can cover it; the token bucket is charged with the pre-call
+estimate and corrected with the actual usage afterwards. Waiting requests are
+served by priority, so planning and final summaries are not starved by
+executor steps, and a ``Retry-After`` from a 429 pauses the whole endpoint
+instead of each caller backing off at random.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Any, Dict, List, Optional
+
+from app.logger import logger
+
+
+# Used when a 429 carries no Retry-After header
+DEFAULT_RETRY_AFTER = 5.0
+MAX_RETRY_AFTER = 120.0
+
+
+class LLMPriority(IntEnum):
+    """Admission lanes, lower values are served first"""
+
+    PLANNING = 0  # plan creation and final summaries
+    STEP = 1  # regular agent think() steps
+    BACKGROUND = 2  # anything that can wait
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``capacity`` per minute.
+
+    The level may go negative when actual usage exceeds the estimate; the
+    debt is paid back by the refill before the next request is admitted.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` can be taken (0 if it can be taken now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= amount
+
+    def adjust(self, delta: float) -> None:
+        """Give back (negative delta) or charge extra tokens."""
+        self.level = min(self.capacity, self.level - delta)
+
+
+class Reservation:
+    """An admitted request; ``record_usage`` settles the token estimate."""
+
+    def __init__(self, limiter: "EndpointRateLimiter", estimated_tokens: int):
+        self.limiter = limiter
+        self.estimated_tokens = estimated_tokens
+        self.actual_tokens: Optional[int] = None
+
+    def record_usage(self, total_tokens: int) -> None:
+        if self.actual_tokens is not None:
+            return
+        self.actual_tokens = total_tokens
+        self.limiter.settle(self.estimated_tokens, total_tokens)
+
+
+def parse_retry_after(error: Exception) -> Optional[float]:
+    """Seconds to wait from the Retry-After headers of an API error."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+
+class EndpointRateLimiter:
+    """RPM/TPM limiter with a priority wait queue for one model endpoint."""
+
+    def __init__(
+        self,
+        endpoint: str,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+    ):
+        self.endpoint = endpoint
+        self.requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._blocked_until = 0.0
+        self._waiters: List[list] = []
+        self._sequence = itertools.count()
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop = None
+
+        # Metrics
+        self.admitted = 0
+        self.admitted_by_priority: Dict[str, int] = {p.name: 0 for p in LLMPriority}
+        self.throttled = 0
+        self.peak_queued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.estimated_tokens = 0
+        self.actual_tokens = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Conditions bind to one event loop; scripts may run several in turn
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._loop is not loop:
+            self._condition = asyncio.Condition()
+            self._loop = loop
+            self._waiters = []
+        return self._condition
+
+    def _wait_time(self, estimated_tokens: int, now: float) -> float:
+        wait = max(0.0, self._blocked_until - now)
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1, now))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(estimated_tokens, now))
+        return wait
+
+    async def acquire(
+        self, estimated_tokens: int, priority: LLMPriority = LLMPriority.STEP
+    ) -> Reservation:
+        """Wait until the request fits in both budgets and charge it."""
+        reservation = Reservation(self, estimated_tokens)
+        if not self.enabled:
+            return reservation
+
+        condition = self._get_condition()
+        started = time.monotonic()
+        entry = [int(priority), next(self._sequence)]
+        async with condition:
+            heapq.heappush(self._waiters, entry)
+            self.peak_queued = max(self.peak_queued, len(self._waiters))
+            try:
+                while True:
+                    now = time.monotonic()
+                    timeout = None
+                    if self._waiters[0] is entry:
+                        timeout = self._wait_time(estimated_tokens, now)
+                        if timeout <= 0:
+                            break
+                    try:
+                        await asyncio.wait_for(condition.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                heapq.heappop(self._waiters)
+                if self.requests is not None:
+                    self.requests.take(1, now)
+                if self.tokens is not None:
+                    self.tokens.take(estimated_tokens, now)
+            finally:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                # The next waiter may now be at the head of the queue
+                condition.notify_all()
+
+        self._record_admission(priority, time.monotonic() - started, estimated_tokens)
+        return reservation
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token bucket with the usage the API reported."""
+        self.actual_tokens += actual_tokens
+        if self.tokens is not None:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every request to this endpoint (after a 429)."""
+        seconds = min(max(seconds, 0.0), MAX_RETRY_AFTER)
+        self.throttled += 1
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        logger.warning(
+            f"LLM endpoint {self.endpoint} rate limited, pausing requests for {seconds:.1f}s"
+        )
+
+    def _record_admission(
+        self, priority: LLMPriority, waited: float, estimated_tokens: int
+    ) -> None:
+        self.admitted += 1
+        self.admitted_by_priority[LLMPriority(priority).name] += 1
+        self.estimated_tokens += estimated_tokens
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        if waited > 1.0:
+            logger.info(
+                f"LLM rate limiter for {self.endpoint} waited {waited:.2f}s "
+                f"(priority={LLMPriority(priority).name})"
+            )
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "endpoint": self.endpoint,
+            "requests_per_minute": self.requests.capacity if self.requests else None,
+            "tokens_per_minute": self.tokens.capacity if self.tokens else None,
+            "queue_depth": self.queued,
+            "peak_queue_depth": self.peak_queued,
+            "admitted": self.admitted,
+            "admitted_by_priority": dict(self.admitted_by_priority),
+            "throttled": self.throttled,
+            "paused_seconds": max(0.0, self._blocked_until - time.monotonic()),
+            "avg_wait_seconds": (
+                self.total_wait / self.admitted if self.admitted else 0.0
+            ),
+            "max_wait_seconds": self.max_wait,
+            "estimated_tokens": self.estimated_tokens,
+            "actual_tokens": self.actual_tokens,
+        }
+
+
+class LLMRateLimiters:
+    """Registry of per-endpoint limiters shared by the whole process."""
+
+    def __init__(self):
+        self._limiters: Dict[str, EndpointRateLimiter] = {}
+
+    def get_limiter(
+        self,
+        model: str,
+        base_url: str,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+    ) -> EndpointRateLimiter:
+        key = f"{model}@{base_url}"
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = EndpointRateLimiter(key, requests_per_minute, tokens_per_minute)
+            self._limiters[key] = limiter
+        return limiter
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        limiter: EndpointRateLimiter,
+        estimated_tokens: int,
+        priority: LLMPriority = LLMPriority.STEP,
+    ):
+        """Hold an admission for one API call; a 429 pauses the endpoint.
+
+        Callers report the actual usage with ``reservation.record_usage``.
+        """
+        reservation = await limiter.acquire(estimated_tokens, priority)
+        try:
+            yield reservation
+        except Exception as e:
+            if getattr(e, "status_code", None) == 429:
+                retry_after = parse_retry_after(e)
+                limiter.pause(
+                    retry_after if retry_after is not None else DEFAULT_RETRY_AFTER
+                )
+            raise
+
+    def metrics(self) -> List[dict]:
+        return [limiter.metrics() for limiter in self._limiters.values()]
+
+
+# Shared limiters for all LLM instances in this process
+LLM_RATE_LIMITERS = LLMRateLimiters()
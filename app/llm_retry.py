@@ -0,0 +1,248 @@
+"""Retry policy for LLM calls: error classification, deadlines and hedging.
+
+Only transient failures (timeouts, connection errors, 429 and 5xx responses)
+are retried; validation, authentication and token limit errors are raised at
+once. Retries stop when the attempt budget, the policy's total retry time or
+the caller's deadline runs out, whichever comes first. Deadlines are set by
+the flow or web session with ``llm_deadline`` and apply to every LLM call made
+inside it.
+
+Hedging, when enabled, sends a duplicate of a slow non-streaming request once
+it has run longer than the recent p95 latency and takes whichever answer
+arrives first.
+"""
+
+import asyncio
+import contextvars
+import functools
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    AuthenticationError,
+    BadRequestError,
+    NotFoundError,
+    PermissionDeniedError,
+    UnprocessableEntityError,
+)
+
+from app.exceptions import LLMCacheMiss, LLMDeadlineExceeded, TokenLimitExceeded
+from app.llm_rate_limit import parse_retry_after
+from app.logger import logger
+
+
+T = TypeVar("T")
+
+DEFAULT_MAX_ATTEMPTS = 6
+DEFAULT_MAX_RETRY_TIME = 120.0
+BASE_DELAY = 1.0
+MAX_DELAY = 30.0
+
+# Latency samples needed before hedging kicks in, and the window kept
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 200
+HEDGE_QUANTILE = 0.95
+
+_FATAL_ERRORS = (
+    TokenLimitExceeded,
+    LLMCacheMiss,
+    LLMDeadlineExceeded,
+    AuthenticationError,
+    PermissionDeniedError,
+    BadRequestError,
+    NotFoundError,
+    UnprocessableEntityError,
+    ValueError,
+    TypeError,
+    KeyError,
+    AttributeError,
+)
+
+_DEADLINE: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "llm_deadline", default=None
+)
+
+
+@contextmanager
+def llm_deadline(seconds: Optional[float]):
+    """Bound every LLM call (and its retries) inside the block.
+
+    Nested deadlines keep the earlier of the two.
+    """
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    outer = _DEADLINE.get()
+    token = _DEADLINE.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def deadline_remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one."""
+    deadline = _DEADLINE.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether retrying the same request can succeed."""
+    if isinstance(error, _FATAL_ERRORS):
+        return False
+    if isinstance(error, (APITimeoutError, APIConnectionError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    # Unknown errors (e.g. from the Bedrock client) are usually transport errors
+    return isinstance(error, Exception)
+
+
+class RetryPolicy:
+    """Retries transient LLM errors and optionally hedges slow calls."""
+
+    def __init__(
+        self,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        max_retry_time: float = DEFAULT_MAX_RETRY_TIME,
+        hedge: bool = False,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.max_retry_time = max_retry_time
+        self.hedge_enabled = hedge
+        self._latencies: Dict[str, Deque[float]] = {}
+
+        # Metrics
+        self.retries = 0
+        self.gave_up = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """Full-jitter exponential delay, at least the server's Retry-After."""
+        delay = random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** (attempt - 1)))
+        retry_after = parse_retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def run(self, call: Callable[[], Awaitable[T]], name: str = "llm") -> T:
+        """Run ``call``, retrying transient errors within the budgets.
+
+        Raises:
+            LLMDeadlineExceeded: If the deadline passed before an attempt.
+            Exception: The last error once it is fatal or a budget ran out.
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            remaining = deadline_remaining()
+            if remaining is not None and remaining <= 0:
+                raise LLMDeadlineExceeded(f"{name}: deadline exceeded before attempt")
+            attempt += 1
+            try:
+                return await call()
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                delay = self.backoff(attempt, e)
+                elapsed = time.monotonic() - started
+                remaining = deadline_remaining()
+                if (
+                    attempt >= self.max_attempts
+                    or elapsed + delay > self.max_retry_time
+                    or (remaining is not None and delay >= remaining)
+                ):
+                    self.gave_up += 1
+                    logger.error(
+                        f"{name} failed after {attempt} attempt(s) in {elapsed:.1f}s: {e}"
+                    )
+                    raise
+                self.retries += 1
+                logger.warning(
+                    f"{name} attempt {attempt} failed ({type(e).__name__}: {e}), "
+                    f"retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+    def _record_latency(self, site: str, seconds: float) -> None:
+        samples = self._latencies.setdefault(site, deque(maxlen=HEDGE_WINDOW))
+        samples.append(seconds)
+
+    def hedge_delay(self, site: str) -> Optional[float]:
+        """The p95 latency of the site, or None until enough samples exist."""
+        samples = self._latencies.get(site)
+        if not samples or len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * HEDGE_QUANTILE))]
+
+    async def hedge(self, site: str, call: Callable[[], Awaitable[T]]) -> T:
+        """Run ``call``, starting a duplicate if it outlives the p95 latency.
+
+        Only for idempotent requests: the slower of the two is cancelled.
+        """
+        started = time.monotonic()
+        delay = self.hedge_delay(site) if self.hedge_enabled else None
+        if delay is None:
+            result = await call()
+            self._record_latency(site, time.monotonic() - started)
+            return result
+
+        primary = asyncio.ensure_future(call())
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.hedged += 1
+                logger.info(f"{site} slower than p95 ({delay:.1f}s), sending hedge")
+                tasks.add(asyncio.ensure_future(call()))
+            error: Optional[BaseException] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        self._record_latency(site, time.monotonic() - started)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "retries": self.retries,
+            "gave_up": self.gave_up,
+            "hedging": self.hedge_enabled,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "p95_seconds": {site: self.hedge_delay(site) for site in self._latencies},
+        }
+
+
+def with_retry(func):
+    """Retry an ``LLM`` method with the instance's RetryPolicy."""
+
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        return await self.retry_policy.run(
+            lambda: func(self, *args, **kwargs), name=func.__name__
+        )
+
+    return wrapper
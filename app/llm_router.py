@@ -0,0 +1,222 @@
+"""Load balancing and failover across equivalent LLM endpoints.
+
+A model config may list several endpoints (base URLs or API keys) that serve
+the same model. ``RoutedClient`` exposes the ``chat.completions.create``
+interface of a single client, so ``LLM`` and the agents are unchanged, and
+picks an endpoint for every call by weighted least-outstanding-requests or by
+latency EWMA. An endpoint that fails several times in a row is ejected for a
+while; when the ejection ends it gets a single probe request and is readmitted
+only if the probe succeeds.
+
+Each endpoint may carry its own rate limiter; ``LLM`` admits a routed request
+on the limiter of the endpoint picked for it, so a 429 from one endpoint only
+pauses that endpoint.
+"""
+
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from app.logger import logger
+
+
+STRATEGIES = ("least_outstanding", "latency_ewma")
+
+# Consecutive transient failures that eject an endpoint
+EJECT_AFTER_FAILURES = 3
+EJECT_SECONDS = 30.0
+MAX_EJECT_SECONDS = 300.0
+EWMA_ALPHA = 0.3
+
+
+class Endpoint:
+    """One upstream endpoint with its client and health state."""
+
+    def __init__(
+        self,
+        name: str,
+        client: Any,
+        weight: float = 1.0,
+        rate_limiter: Optional[Any] = None,
+    ):
+        self.name = name
+        self.client = client
+        self.weight = max(weight, 0.01)
+        self.rate_limiter = rate_limiter
+        self.outstanding = 0
+        self.latency_ewma: Optional[float] = None
+        self.consecutive_failures = 0
+        self.last_failure = 0.0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.probing = False
+
+        # Metrics
+        self.requests = 0
+        self.failures = 0
+        self.cancelled = 0
+        self.total_latency = 0.0
+
+    @property
+    def ejected(self) -> bool:
+        return self.ejected_until > 0
+
+    def available(self, now: float) -> bool:
+        """Healthy, or due for its single recovery probe."""
+        if not self.ejected:
+            return True
+        return now >= self.ejected_until and not self.probing
+
+    def score(self, strategy: str, now: float) -> float:
+        """Lower is better; recent failures count as one queued request each."""
+        load = (self.outstanding + 1) / self.weight
+        if strategy == "latency_ewma":
+            # Untried endpoints score 0 so they get sampled
+            load *= self.latency_ewma or 0.0
+        if now - self.last_failure < EJECT_SECONDS:
+            load += self.consecutive_failures
+        return load
+
+    def metrics(self, now: float) -> Dict[str, Any]:
+        completed = self.requests - self.failures - self.cancelled - self.outstanding
+        return {
+            "endpoint": self.name,
+            "weight": self.weight,
+            "healthy": not self.ejected,
+            "ejected_for_seconds": max(0.0, self.ejected_until - now),
+            "ejections": self.ejections,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "cancelled": self.cancelled,
+            "error_rate": self.failures / self.requests if self.requests else 0.0,
+            "latency_ewma_seconds": self.latency_ewma,
+            "avg_latency_seconds": (
+                self.total_latency / completed if completed else None
+            ),
+        }
+
+
+class EndpointRouter:
+    """Picks endpoints and tracks their health."""
+
+    def __init__(
+        self,
+        endpoints: List[Endpoint],
+        strategy: str = "least_outstanding",
+        is_failure: Optional[Callable[[BaseException], bool]] = None,
+    ):
+        if not endpoints:
+            raise ValueError("EndpointRouter needs at least one endpoint")
+        if strategy not in STRATEGIES:
+            raise ValueError(
+                f"Invalid routing strategy: {strategy} (expected one of {STRATEGIES})"
+            )
+        self.endpoints = endpoints
+        self.strategy = strategy
+        # Errors caused by the request itself do not count against an endpoint
+        self.is_failure = is_failure or (lambda error: isinstance(error, Exception))
+
+    def select(self) -> Endpoint:
+        now = time.monotonic()
+        candidates = [e for e in self.endpoints if e.available(now)]
+        if not candidates:
+            # Everything is ejected: try the one that recovers first
+            endpoint = min(self.endpoints, key=lambda e: e.ejected_until)
+        else:
+            scores = [e.score(self.strategy, now) for e in candidates]
+            best = min(scores)
+            endpoint = random.choice(
+                [e for e, score in zip(candidates, scores) if score == best]
+            )
+        if endpoint.ejected:
+            endpoint.probing = True
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+        return endpoint
+
+    @asynccontextmanager
+    async def route(self):
+        """Pick an endpoint for the request made in the block and record its outcome."""
+        endpoint = self.select()
+        started = time.monotonic()
+        try:
+            yield endpoint
+        except BaseException as e:
+            self.record(endpoint, time.monotonic() - started, e)
+            raise
+        # For streams this is the time to the first response
+        self.record(endpoint, time.monotonic() - started)
+
+    def record(
+        self,
+        endpoint: Endpoint,
+        latency: float,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        endpoint.outstanding -= 1
+        was_probe, endpoint.probing = endpoint.probing, False
+        if isinstance(error, asyncio.CancelledError):
+            # Hedge losers, session cancels and timeouts say nothing about the
+            # endpoint; a cancelled probe leaves it ejected until the next one
+            endpoint.cancelled += 1
+            return
+        if error is not None and self.is_failure(error):
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            endpoint.last_failure = time.monotonic()
+            if was_probe or endpoint.consecutive_failures >= EJECT_AFTER_FAILURES:
+                self._eject(endpoint, error)
+            return
+
+        endpoint.total_latency += latency
+        endpoint.latency_ewma = (
+            latency
+            if endpoint.latency_ewma is None
+            else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * endpoint.latency_ewma
+        )
+        endpoint.consecutive_failures = 0
+        if endpoint.ejected:
+            logger.info(f"LLM endpoint {endpoint.name} recovered")
+            endpoint.ejected_until = 0.0
+            endpoint.ejections = 0
+
+    def _eject(self, endpoint: Endpoint, error: BaseException) -> None:
+        endpoint.ejections += 1
+        seconds = min(EJECT_SECONDS * 2 ** (endpoint.ejections - 1), MAX_EJECT_SECONDS)
+        endpoint.ejected_until = time.monotonic() + seconds
+        logger.warning(
+            f"LLM endpoint {endpoint.name} ejected for {seconds:.0f}s after "
+            f"{endpoint.consecutive_failures} consecutive failure(s): {error}"
+        )
+
+    def metrics(self) -> List[dict]:
+        now = time.monotonic()
+        return [endpoint.metrics(now) for endpoint in self.endpoints]
+
+
+class _Completions:
+    def __init__(self, router: EndpointRouter):
+        self._router = router
+
+    async def create(self, **params):
+        async with self._router.route() as endpoint:
+            return await endpoint.client.chat.completions.create(**params)
+
+
+class _Chat:
+    def __init__(self, router: EndpointRouter):
+        self.completions = _Completions(router)
+
+
+class RoutedClient:
+    """Drop-in for an OpenAI client that routes over an endpoint pool."""
+
+    def __init__(self, router: EndpointRouter):
+        self.router = router
+        self.chat = _Chat(router)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"strategy": self.router.strategy, "endpoints": self.router.metrics()}
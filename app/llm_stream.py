@@ -0,0 +1,125 @@
+"""Forwarding of streamed LLM tokens to a consumer other than stdout.
+
+``LLM.ask`` prints streamed tokens to the console unless a ``TokenStream`` is
+given or bound to the current context with ``stream_tokens``. The web app binds
+one per session so the final report reaches the browser as it is generated.
+Tokens are batched: the first fragment is sent at once, later ones are flushed
+when the batch is large enough or old enough, to keep the number of WebSocket
+messages low.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.logger import logger
+
+
+FLUSH_INTERVAL = 0.05
+FLUSH_CHARS = 512
+
+_TOKEN_STREAM: contextvars.ContextVar[Optional["TokenStream"]] = contextvars.ContextVar(
+    "llm_token_stream", default=None
+)
+
+
+class TokenStream:
+    """Batches streamed text for an async sink ``send(delta, final)``.
+
+    Each ``start``/``end`` pair is one streamed response; the time from
+    ``start`` to the first delta handed to the sink is recorded as the time to
+    first visible output.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, bool], Awaitable[Any]],
+        flush_interval: float = FLUSH_INTERVAL,
+        flush_chars: int = FLUSH_CHARS,
+    ):
+        self.send = send
+        self.flush_interval = flush_interval
+        self.flush_chars = flush_chars
+        self._buffer: List[str] = []
+        self._buffered = 0
+        self._started: Optional[float] = None
+        self._last_flush = 0.0
+        self._first_output: Optional[float] = None
+
+        # Metrics
+        self.responses = 0
+        self.messages = 0
+        self.chars = 0
+        self.first_output_seconds: List[float] = []
+
+    def start(self) -> None:
+        """Begin a new streamed response."""
+        self._buffer = []
+        self._buffered = 0
+        self._started = time.monotonic()
+        self._first_output = None
+        self.responses += 1
+
+    async def write(self, delta: str) -> None:
+        if not delta:
+            return
+        self._buffer.append(delta)
+        self._buffered += len(delta)
+        now = time.monotonic()
+        if (
+            self._first_output is None
+            or self._buffered >= self.flush_chars
+            or now - self._last_flush >= self.flush_interval
+        ):
+            await self.flush()
+
+    async def flush(self, final: bool = False) -> None:
+        if not self._buffer and not final:
+            return
+        text = "".join(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        if text and self._first_output is None and self._started is not None:
+            self._first_output = self._last_flush - self._started
+            self.first_output_seconds.append(self._first_output)
+            logger.info(f"First streamed output after {self._first_output:.2f}s")
+        self.messages += 1
+        self.chars += len(text)
+        try:
+            await self.send(text, final)
+        except Exception as e:
+            # A closed connection must not fail the LLM call
+            logger.warning(f"Token stream sink failed: {e}")
+
+    async def end(self) -> None:
+        """Send what is left and mark the response as complete."""
+        await self.flush(final=True)
+        self._started = None
+
+    def metrics(self) -> Dict[str, Any]:
+        samples = self.first_output_seconds
+        return {
+            "responses": self.responses,
+            "messages": self.messages,
+            "chars": self.chars,
+            "first_output_seconds": samples[-1] if samples else None,
+            "avg_first_output_seconds": (
+                sum(samples) / len(samples) if samples else None
+            ),
+        }
+
+
+@contextmanager
+def stream_tokens(stream: Optional[TokenStream]):
+    """Send the tokens of every streamed ``LLM.ask`` inside the block to ``stream``."""
+    token = _TOKEN_STREAM.set(stream)
+    try:
+        yield stream
+    finally:
+        _TOKEN_STREAM.reset(token)
+
+
+def current_token_stream() -> Optional[TokenStream]:
+    return _TOKEN_STREAM.get()
@@ -0,0 +1,215 @@
+"""Per-session token and cost accounting with budgets.
+
+``LLM`` instances are shared by every session of the process, so their
+``total_input_tokens``/``total_completion_tokens`` mix all sessions together.
+A ``UsageLedger`` bound with ``track_usage`` records the usage of every LLM
+call inside the block by agent (the innermost ``usage_scope``), call site and
+model, enforces the session's token and cost budgets before each request, and
+produces one warning per budget for the agent when it is nearly spent.
+"""
+
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import UsageSettings, config
+from app.exceptions import BudgetExceeded
+from app.prompt.usage import BUDGET_WARNING
+
+
+DEFAULT_SCOPE = "session"
+
+_LEDGER: contextvars.ContextVar[Optional["UsageLedger"]] = contextvars.ContextVar(
+    "llm_usage_ledger", default=None
+)
+_SCOPE: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "llm_usage_scope", default=DEFAULT_SCOPE
+)
+
+
+def usage_cost(
+    prompt_tokens: int,
+    completion_tokens: int,
+    input_price_per_million: float,
+    output_price_per_million: float,
+) -> float:
+    return (
+        prompt_tokens * input_price_per_million
+        + completion_tokens * output_price_per_million
+    ) / 1_000_000
+
+
+class UsageEntry:
+    """Usage of one (agent, call site, model) combination."""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.cost = 0.0
+
+    def add(self, other: "UsageEntry") -> None:
+        self.calls += other.calls
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cached_tokens += other.cached_tokens
+        self.cost += other.cost
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "total_tokens": self.total_tokens,
+            "cost": round(self.cost, 6),
+        }
+
+
+class UsageLedger:
+    """Token and cost usage of one session, with optional budgets."""
+
+    def __init__(self, settings: Optional[UsageSettings] = None):
+        settings = settings or config.usage
+        self.token_budget = settings.session_token_budget
+        self.cost_budget = settings.session_cost_budget
+        self.warn_ratio = settings.warn_ratio
+        self._entries: Dict[Tuple[str, str, str], UsageEntry] = {}
+        self._warned: set = set()
+
+    def record(
+        self,
+        model: str,
+        site: str,
+        prompt_tokens: int,
+        completion_tokens: int = 0,
+        cached_tokens: int = 0,
+        cost: float = 0.0,
+        calls: int = 1,
+    ) -> None:
+        """Add usage for the current agent scope.
+
+        ``calls=0`` adds tokens to a call already recorded, e.g. the completion
+        of a streamed response whose prompt was counted up front.
+        """
+        key = (_SCOPE.get(), site, model)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = UsageEntry()
+        entry.calls += calls
+        entry.prompt_tokens += prompt_tokens
+        entry.completion_tokens += completion_tokens
+        entry.cached_tokens += cached_tokens
+        entry.cost += cost
+
+    def _total(self, index: Optional[int] = None, value: str = "") -> UsageEntry:
+        total = UsageEntry()
+        for key, entry in self._entries.items():
+            if index is None or key[index] == value:
+                total.add(entry)
+        return total
+
+    @property
+    def total_tokens(self) -> int:
+        return self._total().total_tokens
+
+    @property
+    def cost(self) -> float:
+        return self._total().cost
+
+    def prompt_tokens(self, model: str) -> int:
+        """Prompt tokens this session sent to ``model``."""
+        return self._total(2, model).prompt_tokens
+
+    def check_budget(self, input_tokens: int) -> None:
+        """Raise ``BudgetExceeded`` if a request of ``input_tokens`` would overspend."""
+        total = self._total()
+        if (
+            self.token_budget is not None
+            and total.total_tokens + input_tokens > self.token_budget
+        ):
+            raise BudgetExceeded(
+                f"Session token budget exhausted (Used: {total.total_tokens}, "
+                f"Needed: {input_tokens}, Budget: {self.token_budget})"
+            )
+        if self.cost_budget is not None and total.cost >= self.cost_budget:
+            raise BudgetExceeded(
+                f"Session cost budget exhausted (Spent: {total.cost:.4f}, "
+                f"Budget: {self.cost_budget})"
+            )
+
+    def _budgets(self) -> List[Tuple[str, float, float, str]]:
+        total = self._total()
+        budgets = []
+        if self.token_budget:
+            budgets.append(
+                ("token", total.total_tokens, self.token_budget, "{:.0f} tokens")
+            )
+        if self.cost_budget:
+            budgets.append(("cost", total.cost, self.cost_budget, "{:.4f}"))
+        return budgets
+
+    def take_warning(self) -> Optional[str]:
+        """A note for the agent once a budget passes ``warn_ratio``, given once per budget."""
+        for name, spent, limit, unit in self._budgets():
+            if name in self._warned or spent < limit * self.warn_ratio:
+                continue
+            self._warned.add(name)
+            return BUDGET_WARNING.format(
+                spent=f"{spent / limit:.0%}",
+                budget_name="token" if name == "token" else "费用",
+                limit=unit.format(limit),
+                remaining=unit.format(max(limit - spent, 0)),
+            )
+        return None
+
+    def _breakdown(self, index: int) -> Dict[str, Dict[str, Any]]:
+        names = sorted({key[index] for key in self._entries})
+        return {name: self._total(index, name).metrics() for name in names}
+
+    def export(self) -> Dict[str, Any]:
+        """Totals, budgets and usage by agent, call site and model."""
+        return {
+            **self._total().metrics(),
+            "budgets": {
+                "tokens": self.token_budget,
+                "cost": self.cost_budget,
+                "warned": sorted(self._warned),
+            },
+            "by_agent": self._breakdown(0),
+            "by_site": self._breakdown(1),
+            "by_model": self._breakdown(2),
+            "entries": [
+                {"agent": agent, "site": site, "model": model, **entry.metrics()}
+                for (agent, site, model), entry in self._entries.items()
+            ],
+        }
+
+
+@contextmanager
+def track_usage(ledger: Optional[UsageLedger]):
+    """Record the usage of every LLM call inside the block in ``ledger``."""
+    token = _LEDGER.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _LEDGER.reset(token)
+
+
+def current_usage_ledger() -> Optional[UsageLedger]:
+    return _LEDGER.get()
+
+
+@contextmanager
+def usage_scope(name: str):
+    """Attribute the usage inside the block to ``name`` (an agent or flow step)."""
+    token = _SCOPE.set(name)
+    try:
+        yield name
+    finally:
+        _SCOPE.reset(token)
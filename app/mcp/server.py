@@ -1,6 +1,7 @@
 import logging
 import sys
 
+
 logging.basicConfig(level=logging.INFO, handlers=[logging.StreamHandler(sys.stderr)])
 
 import argparse
@@ -14,13 +15,21 @@ from mcp.server.fastmcp import FastMCP
 
 from app.logger import logger
 from app.tool import (
+    ArtifactStats,
     MySQLDescribeTable,
     MySQLGetDatabaseInfo,
+    MySQLIndexAdvisor,
+    MySQLJobResult,
+    MySQLJobStatus,
     MySQLListTables,
+    MySQLPivot,
     MySQLReadQuery,
     MySQLSaveQueryResults,
+    MySQLSearchTables,
     MySQLShowCreateTable,
     MySQLShowTableIndexes,
+    MySQLSubmitQuery,
+    MySQLTimeBucket,
 )
 from app.tool.base import BaseTool
 from app.tool.bash import Bash
@@ -44,12 +53,20 @@ class MCPServer:
         # Initialize database tools
         self.tools["python_execute"] = PythonExecute()
         self.tools["mysql_read_query"] = MySQLReadQuery()
+        self.tools["mysql_time_bucket"] = MySQLTimeBucket()
+        self.tools["mysql_pivot"] = MySQLPivot()
         self.tools["mysql_list_tables"] = MySQLListTables()
+        self.tools["mysql_search_tables"] = MySQLSearchTables()
         self.tools["mysql_describe_table"] = MySQLDescribeTable()
         self.tools["mysql_show_indexes"] = MySQLShowTableIndexes()
         self.tools["mysql_show_create_table"] = MySQLShowCreateTable()
         self.tools["mysql_get_database_info"] = MySQLGetDatabaseInfo()
         self.tools["mysql_save_query_results"] = MySQLSaveQueryResults()
+        self.tools["mysql_index_advisor"] = MySQLIndexAdvisor()
+        self.tools["mysql_submit_query"] = MySQLSubmitQuery()
+        self.tools["mysql_job_status"] = MySQLJobStatus()
+        self.tools["mysql_job_result"] = MySQLJobResult()
+        self.tools["artifact_stats"] = ArtifactStats()
 
     def register_tool(self, tool: BaseTool, method_name: Optional[str] = None) -> None:
         """Register a tool with parameter validation and documentation."""
@@ -0,0 +1,2 @@
+BUDGET_WARNING = """[预算提醒] 本次会话已使用 {spent} 的 {budget_name}预算（上限 {limit}），剩余约 {remaining}。
+请尽快收敛：避免重复或探索性的查询，优先利用已有结果完成分析并输出结论。"""
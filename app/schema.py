@@ -163,16 +163,25 @@ class Memory(BaseModel):
     def add_message(self, message: Message) -> None:
         """Add a message to memory"""
         self.messages.append(message)
-        # Optional: Implement message limit
-        if len(self.messages) > self.max_messages:
-            self.messages = self.messages[-self.max_messages :]
+        self._trim()
 
     def add_messages(self, messages: List[Message]) -> None:
         """Add multiple messages to memory"""
         self.messages.extend(messages)
-        # Optional: Implement message limit
-        if len(self.messages) > self.max_messages:
-            self.messages = self.messages[-self.max_messages :]
+        self._trim()
+
+    def _trim(self) -> None:
+        """Drop the oldest messages above max_messages.
+
+        Tool results whose assistant tool call was dropped are dropped too,
+        since the API rejects a tool message without its call.
+        """
+        if len(self.messages) <= self.max_messages:
+            return
+        start = len(self.messages) - self.max_messages
+        while start < len(self.messages) and self.messages[start].role == Role.TOOL:
+            start += 1
+        self.messages = self.messages[start:]
 
     def clear(self) -> None:
         """Clear all messages"""
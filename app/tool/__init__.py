@@ -1,3 +1,4 @@
+from app.tool.artifact_stats import ArtifactStats
 from app.tool.ask_human import AskHuman
 from app.tool.base import BaseTool
 from app.tool.bash import Bash
@@ -8,6 +9,7 @@ from app.tool.chart_visualization import (
 )
 from app.tool.create_chat_completion import CreateChatCompletion
 from app.tool.file_operators import FileOperator, LocalFileOperator, SandboxFileOperator
+from app.tool.mysql_aggregate import MySQLPivot, MySQLTimeBucket
 from app.tool.mysql_database import (
     MySQLDescribeTable,
     MySQLGetDatabaseInfo,
@@ -17,12 +19,16 @@ from app.tool.mysql_database import (
     MySQLShowCreateTable,
     MySQLShowTableIndexes,
 )
+from app.tool.mysql_index_advisor import MySQLIndexAdvisor
+from app.tool.mysql_jobs import MySQLJobResult, MySQLJobStatus, MySQLSubmitQuery
+from app.tool.mysql_schema import MySQLSearchTables
 from app.tool.planning import PlanningTool
 from app.tool.python_execute import PythonExecute
 from app.tool.str_replace_editor import StrReplaceEditor
 from app.tool.terminate import Terminate
 from app.tool.tool_collection import ToolCollection
 
+
 __all__ = [
     "BaseTool",
     "AskHuman",
@@ -46,4 +52,12 @@ __all__ = [
     "MySQLShowCreateTable",
     "MySQLGetDatabaseInfo",
     "MySQLSaveQueryResults",
+    "MySQLIndexAdvisor",
+    "MySQLSearchTables",
+    "MySQLSubmitQuery",
+    "MySQLJobStatus",
+    "MySQLJobResult",
+    "MySQLTimeBucket",
+    "MySQLPivot",
+    "ArtifactStats",
 ]
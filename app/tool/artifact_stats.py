@@ -0,0 +1,86 @@
+"""Approximate column statistics of Arrow result artifacts."""
+
+import asyncio
+from typing import List, Optional
+
+from app.exceptions import ToolError
+from app.tool.artifacts import ARTIFACT_STORE
+from app.tool.base import BaseTool, ToolResult
+from app.tool.sketches import DEFAULT_QUANTILES
+
+
+class ArtifactStats(BaseTool):
+    """查看Arrow结果文件各列的近似统计。"""
+
+    name: str = "artifact_stats"
+    read_only: bool = True
+    # Tools that write the artifacts it reads
+    depends_on: List[str] = [
+        "mysql_read_query",
+        "mysql_submit_query",
+        "mysql_save_query_results",
+        "python_execute",
+    ]
+    description: str = (
+        "查看Arrow结果文件（如mysql_job_result返回的句柄）各列的近似统计："
+        "非空行数、空值数、近似去重数、分位数（数值列）和高频值（带误差上界）。"
+        "统计来自导出时流式计算的草图，内存占用恒定，适合千万级结果；"
+        "只需要去重数、分位数或TopN时应使用此工具，而不是读取全部数据。"
+    )
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "artifact": {
+                "type": "string",
+                "description": "结果句柄（如art_3f2a9c1d04e5）或Arrow文件路径",
+            },
+            "columns": {
+                "type": "array",
+                "description": "要查看的列，默认全部列",
+                "items": {"type": "string"},
+            },
+            "quantiles": {
+                "type": "array",
+                "description": "要计算的分位点（0到1之间）",
+                "items": {"type": "number"},
+                "default": list(DEFAULT_QUANTILES),
+            },
+            "top_k": {
+                "type": "integer",
+                "description": "每列返回的高频值个数",
+                "default": 10,
+            },
+        },
+        "required": ["artifact"],
+    }
+
+    async def execute(
+        self,
+        artifact: str,
+        columns: Optional[List[str]] = None,
+        quantiles: Optional[List[float]] = None,
+        top_k: int = 10,
+    ) -> ToolResult:
+        """Summarize an artifact's sketch, building it first if missing."""
+        qs = quantiles or list(DEFAULT_QUANTILES)
+        if any(not 0 <= q <= 1 for q in qs):
+            return ToolResult(error="分位点必须在0到1之间")
+        try:
+            sketch = await asyncio.to_thread(ARTIFACT_STORE.load_sketch, artifact)
+            built = sketch is None
+            if built:
+                # Older artifacts and query results: sketch them once, batch by batch
+                sketch = await asyncio.to_thread(ARTIFACT_STORE.build_sketch, artifact)
+            summary = sketch.summary(columns, qs, max(0, top_k))
+        except KeyError as e:
+            return ToolResult(error=str(e.args[0]))
+        except ToolError as e:
+            return ToolResult(error=str(e))
+        except Exception as e:
+            return ToolResult(error=f"计算结果统计时出错: {str(e)}")
+
+        summary["artifact"] = artifact
+        summary["approximate"] = True
+        if built:
+            summary["note"] = "该结果此前没有统计草图，已扫描结果文件生成并保存"
+        return ToolResult(output=summary)
@@ -0,0 +1,380 @@
+"""Arrow IPC result artifacts shared between tools.
+
+Query results are written once as Arrow IPC files (the Feather v2 format)
+under ``workspace/artifacts`` and addressed by a short handle such as
+``art_3f2a9c1d04e5``. Readers memory-map the file instead of parsing JSON or
+CSV, so python_execute and the visualization tools can share large results
+without copying them through strings. JSON and CSV stay available as
+on-demand conversions via :meth:`ArtifactStore.export`.
+
+Writers can also maintain streaming sketches (distinct counts, quantiles,
+heavy hitters) while rows are written; they are stored next to the artifact
+as ``<handle>.sketch.json``.
+
+pyarrow is an optional dependency; it is imported lazily and a clear error
+is raised when an artifact is used without it.
+"""
+
+import json
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from pydantic import BaseModel, Field
+
+from app.config import config
+from app.exceptions import ToolError
+from app.tool.sketches import ResultSketch
+
+
+ARTIFACT_PREFIX = "art_"
+ARTIFACT_URI_SCHEME = "artifact://"
+ARTIFACT_SUFFIX = ".arrow"
+SKETCH_SUFFIX = ".sketch.json"
+
+_HANDLE_RE = re.compile(r"^art_[0-9a-f]{12}$")
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError as e:
+        raise ToolError(
+            "pyarrow is required for Arrow artifacts. Install it with: pip install pyarrow"
+        ) from e
+    return pyarrow
+
+
+class ArtifactMeta(BaseModel):
+    """Metadata stored next to an Arrow artifact"""
+
+    handle: str
+    path: str
+    row_count: int = 0
+    columns: List[str] = Field(default_factory=list)
+    schema_text: str = ""
+    size_bytes: int = 0
+    created_at: float = Field(default_factory=time.time)
+    query: Optional[str] = None
+    params: List[Any] = Field(default_factory=list)
+    name: Optional[str] = None
+    sketch_path: Optional[str] = None
+
+    @property
+    def uri(self) -> str:
+        return f"{ARTIFACT_URI_SCHEME}{self.handle}"
+
+
+class ArtifactWriter:
+    """Incremental writer that appends record batches to a new artifact.
+
+    Use it as a context manager; the metadata is written on close::
+
+        with ARTIFACT_STORE.writer(query=sql) as writer:
+            for rows in batches:
+                writer.write_rows(rows)
+        meta = writer.meta
+    """
+
+    def __init__(
+        self, store: "ArtifactStore", handle: str, sketch: bool = False, **meta_fields
+    ):
+        self.store = store
+        self.handle = handle
+        self.path = store.path_for(handle)
+        self.meta_fields = meta_fields
+        self.row_count = 0
+        self.meta: Optional[ArtifactMeta] = None
+        self.sketch = ResultSketch() if sketch else None
+        self._pa = _import_pyarrow()
+        self._schema = None
+        self._writer = None
+        # File currently being written; differs from ``path`` after a rewrite
+        self._target = self.path
+        self._rewrites = 0
+
+    def write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        """Append a batch of dict rows.
+
+        Column types are widened across batches (null -> T, int -> float,
+        narrower -> wider decimal). When a batch widens the schema, the
+        batches already written are rewritten with the unified schema.
+        """
+        if not rows:
+            return
+        pa = self._pa
+        rows = _normalize_rows(rows)
+        table = pa.Table.from_pylist(rows)
+        if self._schema is None:
+            self._schema = table.schema
+            self._writer = pa.ipc.new_file(str(self._target), self._schema)
+        else:
+            schema = pa.unify_schemas(
+                [self._schema, table.schema], promote_options="permissive"
+            )
+            if not schema.equals(self._schema):
+                self._widen(schema)
+            table = _conform_table(pa, table, self._schema)
+        self._writer.write_table(table)
+        self.row_count += table.num_rows
+        if self.sketch is not None:
+            self.sketch.update(rows)
+
+    def _widen(self, schema) -> None:
+        """Rewrite the batches written so far into a file with ``schema``.
+
+        An IPC file cannot be reopened for appending, so the rewrite goes to
+        a temporary file that replaces the artifact on close.
+        """
+        pa = self._pa
+        self._writer.close()
+        source_path = self._target
+        self._rewrites += 1
+        self._target = self.path.with_name(f"{self.path.name}.{self._rewrites}.tmp")
+        writer = pa.ipc.new_file(str(self._target), schema)
+        with pa.memory_map(str(source_path), "r") as source:
+            reader = pa.ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                batch = pa.Table.from_batches([reader.get_batch(index)])
+                writer.write_table(_conform_table(pa, batch, schema))
+        source_path.unlink()
+        self._schema = schema
+        self._writer = writer
+
+    def close(self) -> ArtifactMeta:
+        pa = self._pa
+        if self._writer is None:
+            # Empty result: still produce a readable (schema-less) file
+            self._schema = pa.schema([])
+            self._writer = pa.ipc.new_file(str(self._target), self._schema)
+        self._writer.close()
+        if self._target != self.path:
+            os.replace(self._target, self.path)
+            self._target = self.path
+        sketch_path = None
+        if self.sketch is not None:
+            sketch_path = str(self.store.write_sketch(self.path, self.sketch))
+        self.meta = ArtifactMeta(
+            handle=self.handle,
+            path=str(self.path),
+            row_count=self.row_count,
+            columns=list(self._schema.names),
+            schema_text=self._schema.to_string(),
+            size_bytes=os.path.getsize(self.path),
+            sketch_path=sketch_path,
+            **self.meta_fields,
+        )
+        self.store._write_meta(self.meta)
+        return self.meta
+
+    def abort(self) -> None:
+        """Discard a partially written artifact."""
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except Exception:
+                pass
+        for path in (
+            self._target,
+            self.path,
+            self.store.meta_path_for(self.handle),
+            self.store.sketch_path_for(self.path),
+        ):
+            if path.exists():
+                path.unlink()
+
+    def __enter__(self) -> "ArtifactWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+def _normalize_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop empty rows and make column names strings for Arrow."""
+    normalized = []
+    for row in rows:
+        if row is None:
+            continue
+        normalized.append({str(key): value for key, value in dict(row).items()})
+    return normalized
+
+
+def _conform_table(pa, table, schema):
+    """Reorder, pad and cast ``table`` to ``schema``."""
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            columns.append(table.column(field.name).cast(field.type))
+        else:
+            columns.append(pa.nulls(table.num_rows, field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+class ArtifactStore:
+    """Directory of Arrow IPC artifacts addressed by handle."""
+
+    def __init__(self, root: Optional[Union[str, Path]] = None):
+        self.root = Path(root) if root else config.workspace_root / "artifacts"
+
+    def _ensure_root(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def new_handle() -> str:
+        return f"{ARTIFACT_PREFIX}{uuid.uuid4().hex[:12]}"
+
+    def path_for(self, handle: str) -> Path:
+        return self.root / f"{handle}{ARTIFACT_SUFFIX}"
+
+    def meta_path_for(self, handle: str) -> Path:
+        return self.root / f"{handle}.json"
+
+    @staticmethod
+    def sketch_path_for(path: Union[str, Path]) -> Path:
+        path = Path(path)
+        return path.with_name(f"{path.stem}{SKETCH_SUFFIX}")
+
+    def resolve(self, ref: Union[str, Path]) -> Path:
+        """Resolve a handle, ``artifact://`` URI or file path to a file path."""
+        ref = str(ref).strip()
+        if ref.startswith(ARTIFACT_URI_SCHEME):
+            ref = ref[len(ARTIFACT_URI_SCHEME) :]
+        if _HANDLE_RE.match(ref):
+            path = self.path_for(ref)
+        else:
+            path = Path(ref)
+            if not path.is_absolute() and not path.exists():
+                path = config.workspace_root / path
+        if not path.exists():
+            raise ToolError(f"Artifact not found: {ref}")
+        return path
+
+    def writer(
+        self,
+        query: Optional[str] = None,
+        params: Optional[List[Any]] = None,
+        name: Optional[str] = None,
+        sketch: bool = False,
+    ) -> ArtifactWriter:
+        """Open a writer for a new artifact.
+
+        With ``sketch``, distinct-count, quantile and heavy-hitter sketches
+        are updated as batches are written and saved next to the artifact.
+        """
+        self._ensure_root()
+        return ArtifactWriter(
+            self,
+            self.new_handle(),
+            sketch=sketch,
+            query=query,
+            params=list(params or []),
+            name=name,
+        )
+
+    def write_rows(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        query: Optional[str] = None,
+        params: Optional[List[Any]] = None,
+        name: Optional[str] = None,
+    ) -> ArtifactMeta:
+        """Write a complete result set as a new artifact."""
+        with self.writer(query=query, params=params, name=name) as writer:
+            writer.write_rows(list(rows))
+        return writer.meta
+
+    def open_table(self, ref: Union[str, Path]):
+        """Memory-map an artifact and return it as a ``pyarrow.Table``.
+
+        The table's buffers point into the mapped file, so no data is copied
+        or parsed until it is actually touched.
+        """
+        pa = _import_pyarrow()
+        source = pa.memory_map(str(self.resolve(ref)), "r")
+        return pa.ipc.open_file(source).read_all()
+
+    def read_pandas(self, ref: Union[str, Path]):
+        """Load an artifact as a pandas DataFrame."""
+        return self.open_table(ref).to_pandas()
+
+    def get_meta(self, ref: Union[str, Path]) -> Optional[ArtifactMeta]:
+        path = self.resolve(ref)
+        meta_path = path.with_suffix(".json")
+        if not meta_path.exists():
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return ArtifactMeta(**json.load(f))
+
+    def write_sketch(self, path: Union[str, Path], sketch: ResultSketch) -> Path:
+        sketch_path = self.sketch_path_for(path)
+        with open(sketch_path, "w", encoding="utf-8") as f:
+            json.dump(sketch.to_dict(), f, ensure_ascii=False, default=str)
+        return sketch_path
+
+    def load_sketch(self, ref: Union[str, Path]) -> Optional[ResultSketch]:
+        sketch_path = self.sketch_path_for(self.resolve(ref))
+        if not sketch_path.exists():
+            return None
+        with open(sketch_path, "r", encoding="utf-8") as f:
+            return ResultSketch.from_dict(json.load(f))
+
+    def build_sketch(self, ref: Union[str, Path]) -> ResultSketch:
+        """Sketch an existing artifact batch by batch and save the sketch."""
+        pa = _import_pyarrow()
+        path = self.resolve(ref)
+        sketch = ResultSketch()
+        with pa.memory_map(str(path), "r") as source:
+            reader = pa.ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                sketch.update_columns(reader.get_batch(index).to_pydict())
+        self.write_sketch(path, sketch)
+        return sketch
+
+    def export(
+        self,
+        ref: Union[str, Path],
+        file_format: str,
+        path: Optional[Union[str, Path]] = None,
+    ) -> Path:
+        """Convert an artifact to CSV or JSON records on demand."""
+        source = self.resolve(ref)
+        # Note: <handle>.json is taken by the metadata file
+        target = (
+            Path(path)
+            if path
+            else source.with_name(f"{source.stem}_export.{file_format}")
+        )
+        df = self.read_pandas(source)
+        if file_format == "csv":
+            df.to_csv(target, index=False, encoding="utf-8")
+        elif file_format == "json":
+            df.to_json(target, orient="records", force_ascii=False, date_format="iso")
+        else:
+            raise ToolError(f"Unsupported export format: {file_format}")
+        return target
+
+    def _write_meta(self, meta: ArtifactMeta) -> None:
+        with open(self.meta_path_for(meta.handle), "w", encoding="utf-8") as f:
+            json.dump(meta.model_dump(), f, indent=2, ensure_ascii=False, default=str)
+
+
+# Shared artifact store under the workspace
+ARTIFACT_STORE = ArtifactStore()
+
+
+def load_artifact(ref: str, as_pandas: bool = True):
+    """Load an artifact by handle or path (made available in python_execute).
+
+    Returns a pandas DataFrame by default, or the memory-mapped
+    ``pyarrow.Table`` when ``as_pandas`` is False.
+    """
+    table = ARTIFACT_STORE.open_table(ref)
+    return table.to_pandas() if as_pandas else table
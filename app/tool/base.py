@@ -2,7 +2,7 @@ import datetime
 import decimal
 import json
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -11,6 +11,10 @@ class BaseTool(ABC, BaseModel):
     name: str
     description: str
     parameters: Optional[dict] = None
+    # Side-effect free tools may start before the model finishes its response
+    read_only: bool = False
+    # Tools whose results this tool may read; it never starts early after one
+    depends_on: List[str] = Field(default_factory=list)
 
     class Config:
         arbitrary_types_allowed = True
@@ -24,6 +24,7 @@ class VisualizationPrepare(NormalPythonExecute):
 2.1 Csv data (The data you want to visulazation, cleaning / transform from origin data, saved in .csv)
 2.2 Chart description of csv data (The chart title or description should be concise and clear. Examples: 'Product sales distribution', 'Monthly revenue trend'.)
 3. Save information in json file.( format: {"csvFilePath": string, "chartTitle": string}[])
+   If the data is already an Arrow artifact (from mysql_read_query output_artifact or load_artifact), use {"artifact": handle, "chartTitle": string} instead of writing a csv.
 ## Insight Type
 1. Select the insights from the data_visualization results that you want to add to the chart.
 2. Save information in json file.( format: {"chartPath": string, "insights_id": number[]}[])
@@ -9,6 +9,7 @@ from pydantic import Field, model_validator
 from app.config import config
 from app.llm import LLM
 from app.logger import logger
+from app.tool.artifacts import ARTIFACT_STORE
 from app.tool.base import BaseTool
 
 
@@ -91,22 +92,30 @@ class DataVisualization(BaseTool):
                 content += "\n"
         return f"Chart Generated Successful!\n{content}"
 
+    def load_dataframe(self, item: dict[str, str]) -> tuple[str, pd.DataFrame]:
+        """Load chart data from an Arrow artifact (memory-mapped) or a CSV file."""
+        if item.get("artifact"):
+            path = ARTIFACT_STORE.resolve(item["artifact"])
+            return str(path), ARTIFACT_STORE.read_pandas(path)
+        csv_path = self.get_file_path([item], "csvFilePath")[0]
+        return csv_path, pd.read_csv(csv_path, encoding="utf-8")
+
     async def data_visualization(
         self, json_info: list[dict[str, str]], output_type: str, language: str
     ) -> str:
         data_list = []
-        csv_file_path = self.get_file_path(json_info, "csvFilePath")
-        for index, item in enumerate(json_info):
-            df = pd.read_csv(csv_file_path[index], encoding="utf-8")
+        csv_file_path = []
+        for item in json_info:
+            data_path, df = self.load_dataframe(item)
+            csv_file_path.append(data_path)
             df = df.astype(object)
             df = df.where(pd.notnull(df), None)
+            # The Node renderer reads its dataset from stdin, so this hop stays JSON
             data_dict_list = df.to_json(orient="records", force_ascii=False)
 
             data_list.append(
                 {
-                    "file_name": os.path.basename(csv_file_path[index]).replace(
-                        ".csv", ""
-                    ),
+                    "file_name": os.path.splitext(os.path.basename(data_path))[0],
                     "dict_data": data_dict_list,
                     "chartTitle": item["chartTitle"],
                 }
@@ -0,0 +1,211 @@
+"""Process-wide admission control for queries issued by the MySQL tools.
+
+Every MySQL tool call takes a slot from the limiter of its endpoint
+(host:port/database) before it touches the database. Each endpoint allows a
+fixed number of concurrent queries; further callers wait in a bounded priority
+queue, and callers that cannot be queued or that wait too long get a
+``DatabaseBusyError`` instead of piling more load onto the server.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, Dict, List, Optional
+
+from app.config import config
+from app.exceptions import DatabaseBusyError
+from app.logger import logger
+
+
+DEFAULT_MAX_CONCURRENT_QUERIES = 8
+DEFAULT_MAX_QUEUED_QUERIES = 32
+DEFAULT_QUEUE_TIMEOUT = 30.0
+
+
+class QueryPriority(IntEnum):
+    """Admission priority classes, lower values are served first"""
+
+    INTERACTIVE = 0  # metadata lookups: list/describe/search tables
+    QUERY = 1  # regular agent read queries
+    BULK = 2  # exports and background jobs
+
+
+class EndpointLimiter:
+    """Concurrency limiter with a bounded priority wait queue for one endpoint."""
+
+    def __init__(
+        self,
+        endpoint: str,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT_QUERIES,
+        max_queued: int = DEFAULT_MAX_QUEUED_QUERIES,
+        queue_timeout: float = DEFAULT_QUEUE_TIMEOUT,
+    ):
+        self.endpoint = endpoint
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max(0, max_queued)
+        self.queue_timeout = queue_timeout
+
+        self._active = 0
+        self._queued = 0
+        self._waiters: List[list] = []
+        self._sequence = itertools.count()
+
+        # Metrics
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.peak_queued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.admitted_by_priority: Dict[str, int] = {p.name: 0 for p in QueryPriority}
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    async def acquire(self, priority: QueryPriority = QueryPriority.QUERY) -> None:
+        """Take a slot, waiting in the priority queue if necessary.
+
+        Raises:
+            DatabaseBusyError: If the queue is full or the wait times out.
+        """
+        if self._active < self.max_concurrent and self._queued == 0:
+            self._active += 1
+            self._record_admission(priority, 0.0)
+            return
+
+        if self._queued >= self.max_queued:
+            self.rejected += 1
+            raise DatabaseBusyError(
+                f"数据库繁忙：{self.endpoint} 已有 {self._active} 个查询在执行、"
+                f"{self._queued} 个在排队，请稍后重试"
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [int(priority), next(self._sequence), future])
+        self._queued += 1
+        self.peak_queued = max(self.peak_queued, self._queued)
+        started = time.monotonic()
+
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the timeout fired
+                self._record_admission(priority, time.monotonic() - started)
+                return
+            self._queued -= 1
+            self.timed_out += 1
+            raise DatabaseBusyError(
+                f"数据库繁忙：在 {self.endpoint} 上排队等待超过 {self.queue_timeout:g} 秒，请稍后重试"
+            )
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                self._queued -= 1
+            raise
+
+        self._record_admission(priority, time.monotonic() - started)
+
+    def release(self) -> None:
+        """Return a slot and hand it to the highest-priority waiter."""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                # Waiter gave up (timeout or cancellation) and is already uncounted
+                continue
+            self._queued -= 1
+            future.set_result(None)
+            return
+        self._active = max(0, self._active - 1)
+
+    def _record_admission(self, priority: QueryPriority, waited: float) -> None:
+        self.admitted += 1
+        self.admitted_by_priority[QueryPriority(priority).name] += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        if waited > 1.0:
+            logger.info(
+                f"MySQL admission for {self.endpoint} waited {waited:.2f}s "
+                f"(priority={QueryPriority(priority).name})"
+            )
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "endpoint": self.endpoint,
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "active": self._active,
+            "queue_depth": self._queued,
+            "peak_queue_depth": self.peak_queued,
+            "admitted": self.admitted,
+            "admitted_by_priority": dict(self.admitted_by_priority),
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_seconds": (
+                self.total_wait / self.admitted if self.admitted else 0.0
+            ),
+            "max_wait_seconds": self.max_wait,
+        }
+
+
+class AdmissionController:
+    """Registry of per-endpoint limiters shared by the whole process."""
+
+    def __init__(self):
+        self._limiters: Dict[str, EndpointLimiter] = {}
+
+    @staticmethod
+    def endpoint_key(db_config: Dict[str, Any]) -> str:
+        return (
+            f"{db_config.get('host')}:{db_config.get('port')}/"
+            f"{db_config.get('database')}"
+        )
+
+    def get_limiter(self, db_config: Dict[str, Any]) -> EndpointLimiter:
+        key = self.endpoint_key(db_config)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            mysql_settings = config.mysql
+            if mysql_settings is not None:
+                limiter = EndpointLimiter(
+                    key,
+                    max_concurrent=mysql_settings.max_concurrent_queries,
+                    max_queued=mysql_settings.max_queued_queries,
+                    queue_timeout=mysql_settings.queue_timeout,
+                )
+            else:
+                limiter = EndpointLimiter(key)
+            self._limiters[key] = limiter
+        return limiter
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        db_config: Dict[str, Any],
+        priority: QueryPriority = QueryPriority.QUERY,
+    ):
+        """Hold an admission slot for the duration of the context."""
+        limiter = self.get_limiter(db_config)
+        await limiter.acquire(priority)
+        try:
+            yield
+        finally:
+            limiter.release()
+
+    def metrics(self, db_config: Optional[Dict[str, Any]] = None) -> List[dict]:
+        if db_config is not None:
+            return [self.get_limiter(db_config).metrics()]
+        return [limiter.metrics() for limiter in self._limiters.values()]
+
+
+# Shared admission controller for all MySQL tools in this process
+ADMISSION_CONTROLLER = AdmissionController()
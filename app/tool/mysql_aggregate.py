@@ -0,0 +1,496 @@
+"""Aggregation pushdown tools: time bucketing and pivots computed in MySQL.
+
+Instead of pulling truncated raw rows into pandas, these tools build the
+equivalent ``GROUP BY`` (time-bucket expressions, conditional-aggregation
+pivots) from validated identifiers and return a compact aggregated result.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import pymysql
+
+from app.exceptions import DatabaseBusyError
+from app.tool.base import BaseTool, ToolResult
+from app.tool.mysql_database import (
+    get_db_config,
+    run_read_query,
+    validate_read_only_query,
+)
+from app.tool.mysql_lexer import TokenType, tokenize
+from app.tool.mysql_repair import closest_identifiers
+from app.tool.mysql_schema import get_schema_catalog
+
+
+DEFAULT_MAX_ROWS = 200
+MAX_ROWS_LIMIT = 500
+DEFAULT_MAX_PIVOT_VALUES = 20
+MAX_PIVOT_VALUES_LIMIT = 50
+
+# MySQL expressions producing a sortable string label for each bucket. The
+# queries always run with a params list, so literal percent signs are doubled.
+TIME_BUCKETS = {
+    "minute": "DATE_FORMAT({col}, '%%Y-%%m-%%d %%H:%%i:00')",
+    "hour": "DATE_FORMAT({col}, '%%Y-%%m-%%d %%H:00:00')",
+    "day": "DATE_FORMAT({col}, '%%Y-%%m-%%d')",
+    "week": "DATE_FORMAT({col}, '%%x-W%%v')",
+    "month": "DATE_FORMAT({col}, '%%Y-%%m')",
+    "quarter": "CONCAT(YEAR({col}), '-Q', QUARTER({col}))",
+    "year": "DATE_FORMAT({col}, '%%Y')",
+}
+
+AGGREGATE_FUNCTIONS = ("count", "sum", "avg", "min", "max", "count_distinct")
+
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_$]*$")
+_MEASURE_RE = re.compile(
+    r"^\s*(count_distinct|count|sum|avg|min|max)\s*\(\s*(\*|[A-Za-z_][A-Za-z0-9_$]*)\s*\)"
+    r"(?:\s+as\s+([A-Za-z_][A-Za-z0-9_$]*))?\s*$",
+    re.I,
+)
+
+
+def quote_identifier(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+
+class Measure:
+    """A parsed measure such as ``sum(amount)`` or ``count(*) as orders``."""
+
+    def __init__(self, function: str, column: Optional[str], alias: str):
+        self.function = function
+        self.column = column
+        self.alias = alias
+
+    @classmethod
+    def parse(cls, spec: str) -> "Measure":
+        match = _MEASURE_RE.match(spec or "")
+        if not match:
+            raise ValueError(
+                f"无法解析度量 '{spec}'，格式应为 函数(列) [as 别名]，"
+                f"函数可选: {', '.join(AGGREGATE_FUNCTIONS)}"
+            )
+        function, column, alias = match.groups()
+        function = function.lower()
+        if column == "*":
+            if function != "count":
+                raise ValueError(f"只有count可以使用*: '{spec}'")
+            column = None
+        default_alias = f"{function}_{column}" if column else "count"
+        return cls(function, column, alias or default_alias)
+
+    def expression(self, condition: Optional[str] = None) -> str:
+        """SQL aggregate, optionally restricted to rows matching ``condition``."""
+        column = quote_identifier(self.column) if self.column else None
+        if condition is None:
+            if self.function == "count_distinct":
+                return f"COUNT(DISTINCT {column})"
+            return f"{self.function.upper()}({column or '*'})"
+
+        if self.function == "count" and column is None:
+            return f"SUM(CASE WHEN {condition} THEN 1 ELSE 0 END)"
+        value = f"CASE WHEN {condition} THEN {column} END"
+        if self.function == "count_distinct":
+            return f"COUNT(DISTINCT {value})"
+        return f"{self.function.upper()}({value})"
+
+
+def validate_identifier(name: str, kind: str = "列") -> str:
+    if not name or not _IDENTIFIER_RE.match(name):
+        raise ValueError(f"无效的{kind}名 '{name}'")
+    return name
+
+
+def validate_filter(filter_sql: Optional[str]) -> Optional[str]:
+    """Check a WHERE condition against the read-only policy."""
+    if not filter_sql or not filter_sql.strip():
+        return None
+    filter_sql = filter_sql.strip()
+    if filter_sql.lower().startswith("where "):
+        filter_sql = filter_sql[6:].strip()
+    _, error = validate_read_only_query(f"SELECT 1 FROM t WHERE {filter_sql}")
+    if error:
+        raise ValueError(f"过滤条件不合法: {error}")
+    return filter_sql
+
+
+async def check_columns(
+    db_config: Dict[str, Any], table: str, columns: List[str]
+) -> None:
+    """Verify the table and columns exist in the cached schema catalog."""
+    catalog = await get_schema_catalog(db_config)
+    table_info = catalog.get_table(table)
+    if table_info is None:
+        similar = [name for name, _ in closest_identifiers(table, catalog.tables)]
+        hint = f"，你是不是想用: {', '.join(similar)}？" if similar else ""
+        raise ValueError(f"Table '{table}' does not exist{hint}")
+    known = {name.lower() for name in table_info.column_names()}
+    missing = [column for column in columns if column.lower() not in known]
+    if missing:
+        raise ValueError(
+            f"表 '{table}' 中不存在列: {', '.join(missing)}。"
+            f"可用列: {', '.join(table_info.column_names())}"
+        )
+
+
+def escape_percent(filter_sql: str) -> str:
+    """Double every ``%`` except ``%s`` placeholders.
+
+    The query always goes through pymysql's ``%``-formatting (the time range
+    adds parameters), so a literal such as ``LIKE 'pa%'`` must be escaped.
+    """
+    return "".join(
+        token.value
+        if token.type == TokenType.PLACEHOLDER
+        else token.value.replace("%", "%%")
+        for token in tokenize(filter_sql)
+    )
+
+
+def build_where(
+    filter_sql: Optional[str],
+    time_column: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+) -> Tuple[str, List[Any]]:
+    """WHERE clause for the filter plus an optional [start, end) time range."""
+    conditions: List[str] = []
+    params: List[Any] = []
+    if filter_sql:
+        conditions.append(f"({escape_percent(filter_sql)})")
+    if time_column and start:
+        conditions.append(f"{quote_identifier(time_column)} >= %s")
+        params.append(start)
+    if time_column and end:
+        conditions.append(f"{quote_identifier(time_column)} < %s")
+        params.append(end)
+    if not conditions:
+        return "", params
+    return " WHERE " + " AND ".join(conditions), params
+
+
+def _clamp(value: int, default: int, upper: int) -> int:
+    return max(1, min(int(value or default), upper))
+
+
+async def _run_aggregate(
+    db_config: Dict[str, Any],
+    query: str,
+    params: List[Any],
+    max_rows: int,
+    extra: Dict[str, Any],
+) -> ToolResult:
+    """Run an aggregate query and report truncation beyond ``max_rows``."""
+    rows, coalesced = await run_read_query(
+        db_config, f"{query} LIMIT {max_rows + 1}", params
+    )
+    truncated = len(rows) > max_rows
+    rows = rows[:max_rows]
+    metadata = {
+        "query": query,
+        "params": params,
+        "row_count": len(rows),
+        "truncated": truncated,
+        **extra,
+    }
+    if coalesced:
+        metadata["coalesced"] = True
+    if truncated:
+        metadata["note"] = f"聚合结果超过 {max_rows} 行已截断，请使用更粗的时间粒度、更少的维度或增加过滤条件"
+    return ToolResult(output={"data": rows, "metadata": metadata})
+
+
+class MySQLTimeBucket(BaseTool):
+    """在MySQL中按时间粒度聚合数据。"""
+
+    name: str = "mysql_time_bucket"
+    read_only: bool = True
+    description: str = (
+        "在数据库中按时间粒度（分钟/小时/天/周/月/季度/年）和可选维度对表做分组聚合，"
+        "直接返回紧凑的聚合结果（最多几百行）。按天/月统计趋势时应使用此工具，"
+        "而不是用mysql_read_query取原始行再在pandas中重采样（原始行会被LIMIT截断，结果不准确）。"
+    )
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "table": {"type": "string", "description": "表名"},
+            "time_column": {
+                "type": "string",
+                "description": "时间列（DATE/DATETIME/TIMESTAMP）",
+            },
+            "bucket": {
+                "type": "string",
+                "description": "时间粒度",
+                "enum": list(TIME_BUCKETS),
+                "default": "day",
+            },
+            "measures": {
+                "type": "array",
+                "description": "度量列表，格式 函数(列) [as 别名]，函数可选count/sum/avg/min/max/count_distinct，例如['count(*) as orders', 'sum(amount)']",
+                "items": {"type": "string"},
+                "default": ["count(*)"],
+            },
+            "dimensions": {
+                "type": "array",
+                "description": "可选的分组维度列，例如['status']",
+                "items": {"type": "string"},
+                "default": [],
+            },
+            "filter": {
+                "type": "string",
+                "description": "可选的WHERE条件（不含WHERE关键字），可使用%s占位符",
+            },
+            "params": {
+                "type": "array",
+                "description": "过滤条件中%s占位符的参数",
+                "items": {"type": "string"},
+                "default": [],
+            },
+            "start": {
+                "type": "string",
+                "description": "可选的起始时间（包含），例如'2024-01-01'",
+            },
+            "end": {
+                "type": "string",
+                "description": "可选的结束时间（不包含），例如'2024-07-01'",
+            },
+            "max_rows": {
+                "type": "integer",
+                "description": f"返回的最大行数（上限{MAX_ROWS_LIMIT}）",
+                "default": DEFAULT_MAX_ROWS,
+            },
+        },
+        "required": ["table", "time_column"],
+    }
+
+    async def execute(
+        self,
+        table: str,
+        time_column: str,
+        bucket: str = "day",
+        measures: Optional[List[str]] = None,
+        dimensions: Optional[List[str]] = None,
+        filter: Optional[str] = None,
+        params: Optional[List[Any]] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        max_rows: int = DEFAULT_MAX_ROWS,
+    ) -> ToolResult:
+        """Aggregate a table by time bucket and optional dimensions."""
+        try:
+            bucket = (bucket or "day").lower()
+            if bucket not in TIME_BUCKETS:
+                return ToolResult(
+                    error=f"不支持的时间粒度 '{bucket}'，可选: {', '.join(TIME_BUCKETS)}"
+                )
+            validate_identifier(table, "表")
+            validate_identifier(time_column)
+            dimensions = [validate_identifier(d) for d in dimensions or []]
+            parsed = [Measure.parse(m) for m in measures or ["count(*)"]]
+            filter_sql = validate_filter(filter)
+            db_config = get_db_config()
+            await check_columns(
+                db_config,
+                table,
+                [time_column, *dimensions, *(m.column for m in parsed if m.column)],
+            )
+
+            bucket_expr = TIME_BUCKETS[bucket].format(col=quote_identifier(time_column))
+            select_parts = [f"{bucket_expr} AS `bucket`"]
+            select_parts += [quote_identifier(d) for d in dimensions]
+            select_parts += [
+                f"{m.expression()} AS {quote_identifier(m.alias)}" for m in parsed
+            ]
+            group_by = ["`bucket`"] + [quote_identifier(d) for d in dimensions]
+            where, where_params = build_where(filter_sql, time_column, start, end)
+
+            query = (
+                f"SELECT {', '.join(select_parts)} FROM {quote_identifier(table)}"
+                f"{where} GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}"
+            )
+            return await _run_aggregate(
+                db_config,
+                query,
+                list(params or []) + where_params,
+                _clamp(max_rows, DEFAULT_MAX_ROWS, MAX_ROWS_LIMIT),
+                {"bucket": bucket},
+            )
+
+        except ValueError as e:
+            return ToolResult(error=str(e))
+        except DatabaseBusyError as e:
+            return ToolResult(error=str(e))
+        except pymysql.Error as e:
+            return ToolResult(error=f"MySQL错误: {str(e)}")
+        except Exception as e:
+            return ToolResult(error=f"执行时间聚合时出错: {str(e)}")
+
+
+class MySQLPivot(BaseTool):
+    """在MySQL中生成透视表（条件聚合）。"""
+
+    name: str = "mysql_pivot"
+    read_only: bool = True
+    description: str = (
+        "在数据库中用条件聚合生成透视表：行维度分组，pivot_column的每个取值成为一列，"
+        "单元格为度量值。可选按时间粒度作为行维度。直接返回紧凑结果，"
+        "应使用此工具代替取原始行后在pandas中pivot。"
+    )
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "table": {"type": "string", "description": "表名"},
+            "pivot_column": {
+                "type": "string",
+                "description": "其取值展开为列的列，例如'status'",
+            },
+            "measure": {
+                "type": "string",
+                "description": "单元格度量，格式 函数(列)，例如'sum(amount)'或'count(*)'",
+                "default": "count(*)",
+            },
+            "row_dimensions": {
+                "type": "array",
+                "description": "行分组维度列，例如['category']",
+                "items": {"type": "string"},
+                "default": [],
+            },
+            "time_column": {
+                "type": "string",
+                "description": "可选的时间列，与bucket一起作为第一个行维度",
+            },
+            "bucket": {
+                "type": "string",
+                "description": "time_column的时间粒度",
+                "enum": list(TIME_BUCKETS),
+                "default": "month",
+            },
+            "pivot_values": {
+                "type": "array",
+                "description": "要展开的取值；不传时自动选取出现最多的取值",
+                "items": {"type": "string"},
+            },
+            "max_pivot_values": {
+                "type": "integer",
+                "description": f"自动选取时最多展开的取值数（上限{MAX_PIVOT_VALUES_LIMIT}）",
+                "default": DEFAULT_MAX_PIVOT_VALUES,
+            },
+            "filter": {
+                "type": "string",
+                "description": "可选的WHERE条件（不含WHERE关键字），可使用%s占位符",
+            },
+            "params": {
+                "type": "array",
+                "description": "过滤条件中%s占位符的参数",
+                "items": {"type": "string"},
+                "default": [],
+            },
+            "max_rows": {
+                "type": "integer",
+                "description": f"返回的最大行数（上限{MAX_ROWS_LIMIT}）",
+                "default": DEFAULT_MAX_ROWS,
+            },
+        },
+        "required": ["table", "pivot_column"],
+    }
+
+    async def execute(
+        self,
+        table: str,
+        pivot_column: str,
+        measure: str = "count(*)",
+        row_dimensions: Optional[List[str]] = None,
+        time_column: Optional[str] = None,
+        bucket: str = "month",
+        pivot_values: Optional[List[Any]] = None,
+        max_pivot_values: int = DEFAULT_MAX_PIVOT_VALUES,
+        filter: Optional[str] = None,
+        params: Optional[List[Any]] = None,
+        max_rows: int = DEFAULT_MAX_ROWS,
+    ) -> ToolResult:
+        """Pivot a table with conditional aggregation."""
+        try:
+            validate_identifier(table, "表")
+            validate_identifier(pivot_column)
+            row_dimensions = [validate_identifier(d) for d in row_dimensions or []]
+            if time_column:
+                validate_identifier(time_column)
+                bucket = (bucket or "month").lower()
+                if bucket not in TIME_BUCKETS:
+                    return ToolResult(
+                        error=f"不支持的时间粒度 '{bucket}'，可选: {', '.join(TIME_BUCKETS)}"
+                    )
+            parsed = Measure.parse(measure or "count(*)")
+            filter_sql = validate_filter(filter)
+            columns = [pivot_column, *row_dimensions]
+            if time_column:
+                columns.append(time_column)
+            if parsed.column:
+                columns.append(parsed.column)
+            db_config = get_db_config()
+            await check_columns(db_config, table, columns)
+
+            where, where_params = build_where(filter_sql)
+            base_params = list(params or []) + where_params
+            table_sql = quote_identifier(table)
+            pivot_sql = quote_identifier(pivot_column)
+
+            if not pivot_values:
+                limit = _clamp(
+                    max_pivot_values, DEFAULT_MAX_PIVOT_VALUES, MAX_PIVOT_VALUES_LIMIT
+                )
+                value_rows, _ = await run_read_query(
+                    db_config,
+                    f"SELECT {pivot_sql} AS `value`, COUNT(*) AS `n` FROM {table_sql}"
+                    f"{where} GROUP BY {pivot_sql} ORDER BY `n` DESC LIMIT {limit}",
+                    base_params,
+                )
+                pivot_values = [row["value"] for row in value_rows]
+            if not pivot_values:
+                return ToolResult(output="没有满足条件的数据可供透视。")
+
+            select_parts: List[str] = []
+            group_by: List[str] = []
+            if time_column:
+                bucket_expr = TIME_BUCKETS[bucket].format(
+                    col=quote_identifier(time_column)
+                )
+                select_parts.append(f"{bucket_expr} AS `bucket`")
+                group_by.append("`bucket`")
+            for dimension in row_dimensions:
+                select_parts.append(quote_identifier(dimension))
+                group_by.append(quote_identifier(dimension))
+
+            pivot_params: List[Any] = []
+            for value in pivot_values:
+                label = "NULL" if value is None else str(value)
+                if value is None:
+                    condition = f"{pivot_sql} IS NULL"
+                else:
+                    condition = f"{pivot_sql} = %s"
+                    pivot_params.append(value)
+                select_parts.append(
+                    f"{parsed.expression(condition)} AS {quote_identifier(label[:64])}"
+                )
+            select_parts.append(f"{parsed.expression()} AS `total`")
+
+            query = f"SELECT {', '.join(select_parts)} FROM {table_sql}{where}"
+            if group_by:
+                query += (
+                    f" GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}"
+                )
+            return await _run_aggregate(
+                db_config,
+                query,
+                pivot_params + base_params,
+                _clamp(max_rows, DEFAULT_MAX_ROWS, MAX_ROWS_LIMIT),
+                {"pivot_column": pivot_column, "pivot_values": pivot_values},
+            )
+
+        except ValueError as e:
+            return ToolResult(error=str(e))
+        except DatabaseBusyError as e:
+            return ToolResult(error=str(e))
+        except pymysql.Error as e:
+            return ToolResult(error=f"MySQL错误: {str(e)}")
+        except Exception as e:
+            return ToolResult(error=f"执行透视聚合时出错: {str(e)}")
@@ -1,17 +1,44 @@
 """MySQL database tools for OpenManus framework."""
 
+import asyncio
 import csv
 import json
 import os
 import re
+import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 
 import pymysql
 import pymysql.cursors
 
-from app.config import Config
+from app.config import PROJECT_ROOT, Config
+from app.exceptions import DatabaseBusyError
+from app.tool.artifacts import ARTIFACT_STORE
 from app.tool.base import BaseTool, ToolResult
+from app.tool.mysql_admission import ADMISSION_CONTROLLER, QueryPriority
+from app.tool.mysql_singleflight import QUERY_SINGLE_FLIGHT, query_key
+from app.tool.mysql_snapshot import SNAPSHOT_SESSIONS
+from app.tool.mysql_sqlite_backend import connect as sqlite_connect
+from app.tool.mysql_workload import QUERY_WORKLOAD
+
+
+T = TypeVar("T")
+
+ARTIFACT_PREVIEW_ROWS = 20
+
+
+def _sqlite_db_config(path: str, database: Optional[str]) -> Dict[str, Any]:
+    """Connection settings for the offline SQLite stand-in backend."""
+    sqlite_path = path if os.path.isabs(path) else str(PROJECT_ROOT / path)
+    return {
+        "backend": "sqlite",
+        "sqlite_path": sqlite_path,
+        "host": sqlite_path,
+        "port": 0,
+        "database": database or "main",
+        "cursorclass": pymysql.cursors.DictCursor,
+    }
 
 
 def get_db_config():
@@ -19,6 +46,14 @@ def get_db_config():
     config_instance = Config()
     mysql_settings = config_instance.mysql
 
+    if mysql_settings and mysql_settings.backend == "sqlite":
+        return _sqlite_db_config(mysql_settings.sqlite_path, mysql_settings.database)
+    if not mysql_settings and os.getenv("MYSQL_BACKEND") == "sqlite":
+        return _sqlite_db_config(
+            os.getenv("MYSQL_SQLITE_PATH", "workspace/mysql_fake.db"),
+            os.getenv("MYSQL_DATABASE"),
+        )
+
     if mysql_settings:
         # Use configuration from config file
         config = {
@@ -66,6 +101,13 @@ def get_db_config():
         return config
 
 
+def open_connection(config: Dict[str, Any]):
+    """Open a connection on the configured backend."""
+    if config.get("backend") == "sqlite":
+        return sqlite_connect(**config)
+    return pymysql.connect(**config)
+
+
 class MySQLConnection:
     """Context manager for MySQL connections."""
 
@@ -74,7 +116,7 @@ class MySQLConnection:
         self.conn = None
 
     def __enter__(self):
-        self.conn = pymysql.connect(**self.config)
+        self.conn = open_connection(self.config)
         return self.conn
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -82,10 +124,197 @@ class MySQLConnection:
             self.conn.close()
 
 
+async def run_db_operation(
+    config: Dict[str, Any],
+    operation: Callable[[Any], T],
+    priority: QueryPriority = QueryPriority.QUERY,
+    cursorclass: Optional[type] = None,
+    use_snapshot: bool = False,
+) -> T:
+    """Run ``operation(cursor)`` on a new connection under admission control.
+
+    The blocking pymysql work runs in a worker thread once a slot for the
+    endpoint has been admitted, so queued callers never block the event loop.
+    Pass an unbuffered ``cursorclass`` (e.g. ``SSDictCursor``) to stream rows.
+    With ``use_snapshot``, the operation runs on the agent run's pinned
+    consistent-snapshot connection when snapshot sessions are enabled.
+
+    Raises:
+        DatabaseBusyError: If the endpoint's wait queue is full or the wait
+            for a slot times out.
+    """
+
+    def run() -> T:
+        with MySQLConnection(config) as conn:
+            cursor = conn.cursor(cursorclass) if cursorclass else conn.cursor()
+            return operation(cursor)
+
+    async with ADMISSION_CONTROLLER.slot(config, priority):
+        # Opening a snapshot (connect + START TRANSACTION) also takes the slot
+        session = None
+        if use_snapshot:
+            session = await SNAPSHOT_SESSIONS.acquire(
+                config, lambda: open_connection(config)
+            )
+        if session is not None:
+            return await asyncio.to_thread(session.run, operation, cursorclass)
+        return await asyncio.to_thread(run)
+
+
+def _contains_multiple_statements(sql: str) -> bool:
+    """Check if SQL contains multiple statements."""
+    in_single_quote = False
+    in_double_quote = False
+    escaped = False
+    for char in sql:
+        if escaped:
+            escaped = False
+            continue
+        if char == "\\":
+            escaped = True
+            continue
+        if char == "'" and not in_double_quote:
+            in_single_quote = not in_single_quote
+        elif char == '"' and not in_single_quote:
+            in_double_quote = not in_double_quote
+        elif char == ";" and not in_single_quote and not in_double_quote:
+            return True
+    return False
+
+
+def _contains_dangerous_keywords(sql: str) -> tuple[bool, str]:
+    """Check for dangerous keywords in SQL."""
+    dangerous_keywords = [
+        "insert",
+        "update",
+        "delete",
+        "drop",
+        "create",
+        "alter",
+        "truncate",
+        "replace",
+        "merge",
+        "call",
+        "exec",
+        "execute",
+        "grant",
+        "revoke",
+        "set",
+        "reset",
+        "flush",
+        "kill",
+        "load",
+        "import",
+        "outfile",
+        "dumpfile",
+        "into outfile",
+        "into dumpfile",
+        "load_file",
+    ]
+
+    # Remove string literals to avoid false positives
+    cleaned_sql = sql
+    cleaned_sql = re.sub(r"'[^']*'", "''", cleaned_sql)
+    cleaned_sql = re.sub(r'"[^"]*"', '""', cleaned_sql)
+    cleaned_sql = re.sub(r"`[^`]*`", "``", cleaned_sql)
+    cleaned_sql = " ".join(cleaned_sql.lower().split())
+
+    for keyword in dangerous_keywords:
+        pattern = r"\b" + re.escape(keyword) + r"\b"
+        if re.search(pattern, cleaned_sql):
+            return True, keyword
+    return False, ""
+
+
+def validate_read_only_query(query: str) -> Tuple[str, Optional[str]]:
+    """Clean a query and check it against the read-only policy.
+
+    Returns:
+        A tuple of (cleaned query, error message). The error is None when the
+        query is a single read-only statement.
+    """
+    # Clean and validate the query
+    query = query.strip()
+    if query.endswith(";"):
+        query = query[:-1].strip()
+
+    # Check for multiple statements
+    if _contains_multiple_statements(query):
+        return query, "不允许执行多个SQL语句"
+
+    # Normalize query for validation
+    query_normalized = " ".join(query.lower().split())
+
+    # List of allowed read-only statement prefixes
+    allowed_prefixes = ["select", "show", "describe", "desc", "explain", "with"]
+
+    if not any(query_normalized.startswith(prefix) for prefix in allowed_prefixes):
+        return query, "只允许执行SELECT、WITH、SHOW、DESCRIBE和EXPLAIN查询"
+
+    # Check for dangerous keywords
+    has_dangerous, dangerous_word = _contains_dangerous_keywords(query_normalized)
+    if has_dangerous:
+        return (
+            query,
+            f"查询包含潜在危险的关键词'{dangerous_word}'。只允许只读操作。",
+        )
+
+    return query, None
+
+
+async def run_read_query(
+    config: Dict[str, Any],
+    query: str,
+    params: Optional[List[Any]] = None,
+    fetch_all: bool = True,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """Execute a validated read-only query on the shared execution path.
+
+    Identical concurrent queries share one execution, and the query shape is
+    recorded for workload analysis (index advisor). Inside a snapshot session
+    the query runs on the pinned connection and is never shared, since other
+    callers read from a different snapshot.
+
+    Returns:
+        A tuple of (rows, coalesced).
+    """
+    params = params or []
+
+    def run_query(cursor):
+        started = time.perf_counter()
+        cursor.execute(query, params)
+
+        if fetch_all:
+            results = cursor.fetchall()
+        else:
+            results = [cursor.fetchone()]
+        # Convert results to list of dictionaries
+        result_data = [dict(row) for row in results if row is not None]
+        return result_data, time.perf_counter() - started
+
+    if SNAPSHOT_SESSIONS.enabled() and SNAPSHOT_SESSIONS.current_scope():
+        result_data, elapsed = await run_db_operation(
+            config, run_query, QueryPriority.QUERY, use_snapshot=True
+        )
+        coalesced = False
+    else:
+        # Identical concurrent queries share one execution
+        (result_data, elapsed), coalesced = await QUERY_SINGLE_FLIGHT.do(
+            query_key(config, query, params, fetch_all),
+            lambda: run_db_operation(config, run_query, QueryPriority.QUERY),
+        )
+
+    if not coalesced:
+        # Capture the query shape for workload analysis (index advisor)
+        QUERY_WORKLOAD.record(query, params, elapsed, len(result_data))
+    return result_data, coalesced
+
+
 class MySQLReadQuery(BaseTool):
     """在MySQL数据库上执行只读查询。"""
 
     name: str = "mysql_read_query"
+    read_only: bool = True
     description: str = (
         "在MySQL数据库上执行只读查询并返回结果（仅支持SELECT、SHOW、DESCRIBE、EXPLAIN）"
     )
@@ -109,9 +338,35 @@ class MySQLReadQuery(BaseTool):
             },
             "row_limit": {
                 "type": "integer",
-                "description": "返回的最大行数",
+                "description": "返回的最大行数（output_artifact为True时不限制写入结果文件的行数）",
                 "default": 1000,
             },
+            "output_artifact": {
+                "type": "boolean",
+                "description": (
+                    "如果为True，将完整结果写入Arrow结果文件并只返回前20行预览和结果句柄，"
+                    "后续可在python_execute中用load_artifact(句柄)读取，或传给可视化工具"
+                ),
+                "default": False,
+            },
+            "columns": {
+                "type": "array",
+                "description": "对单表的SELECT *，只查询这些列（会校验列名）",
+                "items": {"type": "string"},
+            },
+            "approximate": {
+                "type": "boolean",
+                "description": (
+                    "如果为True，单表的SELECT COUNT(*)改为读取information_schema中的行数估算值，"
+                    "适合只需要数量级的大表"
+                ),
+                "default": False,
+            },
+            "optimize": {
+                "type": "boolean",
+                "description": "如果为True，应用安全的查询改写（如删除子查询中无效的ORDER BY）并提示低效写法",
+                "default": False,
+            },
         },
         "required": ["query"],
     }
@@ -122,175 +377,200 @@ class MySQLReadQuery(BaseTool):
         params: Optional[List[Any]] = None,
         fetch_all: bool = True,
         row_limit: int = 1000,
+        output_artifact: bool = False,
+        columns: Optional[List[str]] = None,
+        approximate: bool = False,
+        optimize: bool = False,
     ) -> ToolResult:
         """Execute a read-only query on the MySQL database."""
         try:
             config = get_db_config()
 
-            # Clean and validate the query
-            query = query.strip()
-            if query.endswith(";"):
-                query = query[:-1].strip()
-
-            # Check for multiple statements
-            if self._contains_multiple_statements(query):
-                return ToolResult(error="不允许执行多个SQL语句")
+            query, error = validate_read_only_query(query)
+            if error:
+                return ToolResult(error=error)
 
             # Normalize query for validation
             query_normalized = " ".join(query.lower().split())
 
-            # List of allowed read-only statement prefixes
-            allowed_prefixes = ["select", "show", "describe", "desc", "explain", "with"]
-
-            if not any(
-                query_normalized.startswith(prefix) for prefix in allowed_prefixes
-            ):
-                return ToolResult(
-                    error="只允许执行SELECT、WITH、SHOW、DESCRIBE和EXPLAIN查询"
-                )
-
-            # Check for dangerous keywords
-            has_dangerous, dangerous_word = self._contains_dangerous_keywords(
-                query_normalized
-            )
-            if has_dangerous:
-                return ToolResult(
-                    error=f"查询包含潜在危险的关键词'{dangerous_word}'。只允许只读操作。"
-                )
-
             params = params or []
+            original_query = query
 
-            with MySQLConnection(config) as conn:
-                cursor = conn.cursor()
+            rewrite = None
+            if columns or approximate or optimize:
+                # Imported here: the rewriter depends on the schema catalog,
+                # which is built on this module
+                from app.tool.mysql_rewriter import rewrite_query
 
-                # Only add LIMIT if query doesn't already have one and it's a SELECT query
-                if "limit" not in query_normalized and query_normalized.startswith(
-                    "select"
-                ):
-                    query = f"{query} LIMIT {row_limit}"
-
-                cursor.execute(query, params)
-
-                if fetch_all:
-                    results = cursor.fetchall()
-                else:
-                    results = [cursor.fetchone()]
+                try:
+                    rewrite = await rewrite_query(
+                        config, query, columns, approximate, optimize
+                    )
+                except ValueError as e:
+                    return ToolResult(error=str(e))
+                if rewrite.changed:
+                    query, error = validate_read_only_query(rewrite.query)
+                    if error:
+                        return ToolResult(error=f"改写后的查询未通过校验: {error}")
+                    query_normalized = " ".join(query.lower().split())
+
+            # Only add LIMIT if query doesn't already have one and it's a SELECT query;
+            # artifacts hold the full result, only the returned preview is capped
+            if (
+                not output_artifact
+                and "limit" not in query_normalized
+                and query_normalized.startswith("select")
+            ):
+                query = f"{query} LIMIT {row_limit}"
 
-                # Convert results to list of dictionaries
-                result_data = [dict(row) for row in results if row is not None]
+            repairs: List[Dict[str, str]] = []
+            while True:
+                try:
+                    result_data, coalesced = await run_read_query(
+                        config, query, params, fetch_all
+                    )
+                    break
+                except pymysql.Error as e:
+                    # Imported here: mysql_repair depends on the schema catalog,
+                    # which is built on this module
+                    from app.tool.mysql_repair import (
+                        MAX_AUTO_REPAIRS,
+                        auto_repair_enabled,
+                        suggest_repair,
+                    )
 
-                return ToolResult(
-                    output={
-                        "data": result_data,
-                        "metadata": {
-                            "query": query,
-                            "params": params,
-                            "row_count": len(result_data),
-                            "fetch_all": fetch_all,
-                            "row_limit": row_limit,
-                            "timestamp": datetime.now().isoformat(),
-                        },
-                    }
+                    repair = await suggest_repair(config, query, e)
+                    if repair is None:
+                        raise
+                    repaired = None
+                    if (
+                        auto_repair_enabled()
+                        and repair.unambiguous
+                        and len(repairs) < MAX_AUTO_REPAIRS
+                    ):
+                        repaired = repair.apply(query)
+                    if repaired is None:
+                        return ToolResult(error=f"MySQL错误: {str(e)}\n{repair.hint()}")
+                    repairs.append(
+                        {
+                            "kind": repair.kind,
+                            "from": repair.identifier,
+                            "to": repair.candidates[0],
+                        }
+                    )
+                    query = repaired
+
+            metadata = {
+                "query": query,
+                "params": params,
+                "row_count": len(result_data),
+                "fetch_all": fetch_all,
+                "row_limit": row_limit,
+                "timestamp": datetime.now().isoformat(),
+            }
+            if coalesced:
+                metadata["coalesced"] = True
+            if rewrite is not None and rewrite.rewrites:
+                metadata["rewrites"] = [r.model_dump() for r in rewrite.rewrites]
+            if repairs:
+                metadata["repairs"] = repairs
+            if (rewrite is not None and rewrite.changed) or repairs:
+                metadata["original_query"] = original_query
+            if output_artifact:
+                artifact = await asyncio.to_thread(
+                    ARTIFACT_STORE.write_rows, result_data, query, params
                 )
+                metadata["artifact"] = artifact.handle
+                metadata["artifact_path"] = artifact.path
+                result_data = result_data[:ARTIFACT_PREVIEW_ROWS]
+
+            return ToolResult(output={"data": result_data, "metadata": metadata})
 
+        except DatabaseBusyError as e:
+            return ToolResult(error=str(e))
         except pymysql.Error as e:
             return ToolResult(error=f"MySQL错误: {str(e)}")
         except Exception as e:
             return ToolResult(error=f"执行查询时出错: {str(e)}")
 
-    def _contains_multiple_statements(self, sql: str) -> bool:
-        """Check if SQL contains multiple statements."""
-        in_single_quote = False
-        in_double_quote = False
-        escaped = False
-        for char in sql:
-            if escaped:
-                escaped = False
-                continue
-            if char == "\\":
-                escaped = True
-                continue
-            if char == "'" and not in_double_quote:
-                in_single_quote = not in_single_quote
-            elif char == '"' and not in_single_quote:
-                in_double_quote = not in_double_quote
-            elif char == ";" and not in_single_quote and not in_double_quote:
-                return True
-        return False
-
-    def _contains_dangerous_keywords(self, sql: str) -> tuple[bool, str]:
-        """Check for dangerous keywords in SQL."""
-        dangerous_keywords = [
-            "insert",
-            "update",
-            "delete",
-            "drop",
-            "create",
-            "alter",
-            "truncate",
-            "replace",
-            "merge",
-            "call",
-            "exec",
-            "execute",
-            "grant",
-            "revoke",
-            "set",
-            "reset",
-            "flush",
-            "kill",
-            "load",
-            "import",
-            "outfile",
-            "dumpfile",
-            "into outfile",
-            "into dumpfile",
-            "load_file",
-        ]
-
-        # Remove string literals to avoid false positives
-        cleaned_sql = sql
-        cleaned_sql = re.sub(r"'[^']*'", "''", cleaned_sql)
-        cleaned_sql = re.sub(r'"[^"]*"', '""', cleaned_sql)
-        cleaned_sql = re.sub(r"`[^`]*`", "``", cleaned_sql)
-        cleaned_sql = " ".join(cleaned_sql.lower().split())
-
-        for keyword in dangerous_keywords:
-            pattern = r"\b" + re.escape(keyword) + r"\b"
-            if re.search(pattern, cleaned_sql):
-                return True, keyword
-        return False, ""
-
 
 class MySQLListTables(BaseTool):
-    """列出MySQL数据库中的所有表。"""
+    """列出MySQL数据库中的表，支持分页和名称过滤。"""
 
     name: str = "mysql_list_tables"
-    description: str = "列出MySQL数据库中的所有表"
-    parameters: dict = {"type": "object", "properties": {}, "required": []}
+    read_only: bool = True
+    description: str = (
+        "列出MySQL数据库中的表，支持按名称模式过滤和分页。"
+        "表很多时请使用mysql_search_tables按问题检索相关表。"
+    )
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "pattern": {
+                "type": "string",
+                "description": "可选的表名过滤模式（SQL LIKE语法，例如'order%'）",
+            },
+            "offset": {
+                "type": "integer",
+                "description": "分页起始位置",
+                "default": 0,
+            },
+            "limit": {
+                "type": "integer",
+                "description": "本页返回的最大表数量",
+                "default": 100,
+            },
+        },
+        "required": [],
+    }
 
-    async def execute(self) -> ToolResult:
-        """List all tables in the database."""
+    async def execute(
+        self, pattern: Optional[str] = None, offset: int = 0, limit: int = 100
+    ) -> ToolResult:
+        """List tables in the database, one page at a time."""
         try:
             config = get_db_config()
 
-            with MySQLConnection(config) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SHOW TABLES")
-                results = cursor.fetchall()
+            def list_tables(cursor):
+                if pattern:
+                    cursor.execute("SHOW TABLES LIKE %s", [pattern])
+                else:
+                    cursor.execute("SHOW TABLES")
+                return cursor.fetchall()
 
-                # Extract table names from the results
-                table_names = []
-                for row in results:
-                    table_name = list(row.values())[0]
-                    table_names.append(table_name)
+            results = await run_db_operation(
+                config, list_tables, QueryPriority.INTERACTIVE
+            )
 
-                table_list = sorted(table_names)
-                result_text = f"数据库中共有 {len(table_list)} 个表：\n" + "\n".join(
-                    [f"  - {table}" for table in table_list]
+            # Extract table names from the results
+            table_names = []
+            for row in results:
+                table_name = list(row.values())[0]
+                table_names.append(table_name)
+
+            table_list = sorted(table_names)
+            offset = max(0, offset)
+            page = table_list[offset : offset + max(1, limit)]
+
+            filter_text = f"匹配 '{pattern}' 的" if pattern else ""
+            result_text = f"数据库中共有 {len(table_list)} 个{filter_text}表"
+            if len(page) < len(table_list):
+                result_text += (
+                    f"，显示第 {offset + 1}-{offset + len(page)} 个"
+                    if page
+                    else f"，offset {offset} 超出范围"
                 )
-                return ToolResult(output=result_text)
+            result_text += "：\n" + "\n".join([f"  - {table}" for table in page])
+            if offset + len(page) < len(table_list):
+                result_text += (
+                    f"\n（还有 {len(table_list) - offset - len(page)} 个表，"
+                    f"可使用 offset={offset + len(page)} 继续，"
+                    "或使用mysql_search_tables按问题检索）"
+                )
+            return ToolResult(output=result_text)
 
+        except DatabaseBusyError as e:
+            return ToolResult(error=str(e))
         except pymysql.Error as e:
             return ToolResult(error=f"MySQL error: {str(e)}")
         except Exception as e:
@@ -301,6 +581,7 @@ class MySQLDescribeTable(BaseTool):
     """获取表结构的详细信息。"""
 
     name: str = "mysql_describe_table"
+    read_only: bool = True
     description: str = "获取表结构的详细信息，包括列、类型和约束"
     parameters: dict = {
         "type": "object",
@@ -318,26 +599,32 @@ class MySQLDescribeTable(BaseTool):
         try:
             config = get_db_config()
 
-            with MySQLConnection(config) as conn:
-                cursor = conn.cursor()
-
+            def describe_table(cursor):
                 # Verify table exists
                 cursor.execute("SHOW TABLES LIKE %s", [table_name])
                 if not cursor.fetchone():
-                    return ToolResult(error=f"Table '{table_name}' does not exist")
+                    return None
 
                 # Get table schema
                 cursor.execute(f"DESCRIBE `{table_name}`")
-                columns = cursor.fetchall()
-
-                columns_data = [dict(row) for row in columns]
-                result_text = f"表 '{table_name}' 的结构信息：\n"
-                result_text += "列名\t\t类型\t\t\t允许空值\t键\t\t默认值\t\t额外信息\n"
-                result_text += "-" * 80 + "\n"
-                for col in columns_data:
-                    result_text += f"{col.get('Field', '')}\t\t{col.get('Type', '')}\t\t{col.get('Null', '')}\t\t{col.get('Key', '')}\t\t{col.get('Default', '')}\t\t{col.get('Extra', '')}\n"
-                return ToolResult(output=result_text)
+                return cursor.fetchall()
 
+            columns = await run_db_operation(
+                config, describe_table, QueryPriority.INTERACTIVE
+            )
+            if columns is None:
+                return ToolResult(error=f"Table '{table_name}' does not exist")
+
+            columns_data = [dict(row) for row in columns]
+            result_text = f"表 '{table_name}' 的结构信息：\n"
+            result_text += "列名\t\t类型\t\t\t允许空值\t键\t\t默认值\t\t额外信息\n"
+            result_text += "-" * 80 + "\n"
+            for col in columns_data:
+                result_text += f"{col.get('Field', '')}\t\t{col.get('Type', '')}\t\t{col.get('Null', '')}\t\t{col.get('Key', '')}\t\t{col.get('Default', '')}\t\t{col.get('Extra', '')}\n"
+            return ToolResult(output=result_text)
+
+        except DatabaseBusyError as e:
+            return ToolResult(error=str(e))
         except pymysql.Error as e:
             return ToolResult(error=f"MySQL error: {str(e)}")
         except Exception as e:
@@ -348,6 +635,7 @@ class MySQLShowTableIndexes(BaseTool):
     """显示特定表的索引。"""
 
     name: str = "mysql_show_table_indexes"
+    read_only: bool = True
     description: str = "显示特定表的索引"
     parameters: dict = {
         "type": "object",
@@ -365,20 +653,26 @@ class MySQLShowTableIndexes(BaseTool):
         try:
             config = get_db_config()
 
-            with MySQLConnection(config) as conn:
-                cursor = conn.cursor()
-
+            def show_indexes(cursor):
                 # Verify table exists
                 cursor.execute("SHOW TABLES LIKE %s", [table_name])
                 if not cursor.fetchone():
-                    return ToolResult(error=f"Table '{table_name}' does not exist")
+                    return None
 
                 # Get table indexes
                 cursor.execute(f"SHOW INDEX FROM `{table_name}`")
-                indexes = cursor.fetchall()
+                return cursor.fetchall()
+
+            indexes = await run_db_operation(
+                config, show_indexes, QueryPriority.INTERACTIVE
+            )
+            if indexes is None:
+                return ToolResult(error=f"Table '{table_name}' does not exist")
 
-                return ToolResult(output=[dict(row) for row in indexes])
+            return ToolResult(output=[dict(row) for row in indexes])
 
+        except DatabaseBusyError as e:
+            return ToolResult(error=str(e))
         except pymysql.Error as e:
             return ToolResult(error=f"MySQL error: {str(e)}")
         except Exception as e:
@@ -389,6 +683,7 @@ class MySQLShowCreateTable(BaseTool):
     """显示特定表的CREATE TABLE语句。"""
 
     name: str = "mysql_show_create_table"
+    read_only: bool = True
     description: str = "显示特定表的CREATE TABLE语句"
     parameters: dict = {
         "type": "object",
@@ -406,26 +701,32 @@ class MySQLShowCreateTable(BaseTool):
         try:
             config = get_db_config()
 
-            with MySQLConnection(config) as conn:
-                cursor = conn.cursor()
-
+            def show_create_table(cursor):
                 # Verify table exists
                 cursor.execute("SHOW TABLES LIKE %s", [table_name])
                 if not cursor.fetchone():
-                    return ToolResult(error=f"Table '{table_name}' does not exist")
+                    return False, None
 
                 # Get CREATE TABLE statement
                 cursor.execute(f"SHOW CREATE TABLE `{table_name}`")
-                result = cursor.fetchone()
+                return True, cursor.fetchone()
 
-                if result:
-                    create_statement = list(result.values())[1]
-                    return ToolResult(output=create_statement)
-                else:
-                    return ToolResult(
-                        error=f"Could not retrieve CREATE TABLE statement for '{table_name}'"
-                    )
+            exists, result = await run_db_operation(
+                config, show_create_table, QueryPriority.INTERACTIVE
+            )
+            if not exists:
+                return ToolResult(error=f"Table '{table_name}' does not exist")
 
+            if result:
+                create_statement = list(result.values())[1]
+                return ToolResult(output=create_statement)
+            else:
+                return ToolResult(
+                    error=f"Could not retrieve CREATE TABLE statement for '{table_name}'"
+                )
+
+        except DatabaseBusyError as e:
+            return ToolResult(error=str(e))
         except pymysql.Error as e:
             return ToolResult(error=f"MySQL error: {str(e)}")
         except Exception as e:
@@ -436,6 +737,7 @@ class MySQLGetDatabaseInfo(BaseTool):
     """获取MySQL数据库的基本信息。"""
 
     name: str = "mysql_get_database_info"
+    read_only: bool = True
     description: str = "获取MySQL数据库的基本信息，包括版本、用户和表数量"
     parameters: dict = {"type": "object", "properties": {}, "required": []}
 
@@ -444,9 +746,7 @@ class MySQLGetDatabaseInfo(BaseTool):
         try:
             config = get_db_config()
 
-            with MySQLConnection(config) as conn:
-                cursor = conn.cursor()
-
+            def database_info(cursor):
                 info = {}
 
                 # Get database name
@@ -467,14 +767,21 @@ class MySQLGetDatabaseInfo(BaseTool):
                 # Get table count
                 cursor.execute("SHOW TABLES")
                 info["table_count"] = len(cursor.fetchall())
+                return info
 
-                result_text = "数据库信息：\n"
-                result_text += f"  数据库名称: {info.get('database_name', 'N/A')}\n"
-                result_text += f"  MySQL版本: {info.get('mysql_version', 'N/A')}\n"
-                result_text += f"  当前用户: {info.get('current_user', 'N/A')}\n"
-                result_text += f"  表数量: {info.get('table_count', 0)}\n"
-                return ToolResult(output=result_text)
+            info = await run_db_operation(
+                config, database_info, QueryPriority.INTERACTIVE
+            )
+
+            result_text = "数据库信息：\n"
+            result_text += f"  数据库名称: {info.get('database_name', 'N/A')}\n"
+            result_text += f"  MySQL版本: {info.get('mysql_version', 'N/A')}\n"
+            result_text += f"  当前用户: {info.get('current_user', 'N/A')}\n"
+            result_text += f"  表数量: {info.get('table_count', 0)}\n"
+            return ToolResult(output=result_text)
 
+        except DatabaseBusyError as e:
+            return ToolResult(error=str(e))
         except pymysql.Error as e:
             return ToolResult(error=f"MySQL error: {str(e)}")
         except Exception as e:
@@ -482,10 +789,14 @@ class MySQLGetDatabaseInfo(BaseTool):
 
 
 class MySQLSaveQueryResults(BaseTool):
-    """将查询结果保存到文件（JSON或CSV格式）。"""
+    """将查询结果保存到文件（JSON、CSV或Arrow格式）。"""
 
     name: str = "mysql_save_query_results"
-    description: str = "将查询结果保存到temp_data文件夹，支持JSON或CSV格式"
+    description: str = (
+        "将查询结果保存到temp_data文件夹，支持JSON或CSV格式；"
+        "arrow格式写入Arrow结果文件并返回句柄，供python_execute和可视化工具直接读取。"
+        "也可以传入已有的结果句柄(artifact)，按需转换为JSON或CSV"
+    )
     parameters: dict = {
         "type": "object",
         "properties": {
@@ -498,10 +809,14 @@ class MySQLSaveQueryResults(BaseTool):
                 "description": "The query results to save",
                 "items": {"type": "object"},
             },
+            "artifact": {
+                "type": "string",
+                "description": "Handle of an existing Arrow artifact to convert instead of data",
+            },
             "file_format": {
                 "type": "string",
-                "description": "Format to save in ('json' or 'csv')",
-                "enum": ["json", "csv"],
+                "description": "Format to save in ('json', 'csv' or 'arrow')",
+                "enum": ["json", "csv", "arrow"],
             },
             "params": {
                 "type": "array",
@@ -513,19 +828,53 @@ class MySQLSaveQueryResults(BaseTool):
                 "description": "Custom filename (without extension). If None, auto-generates",
             },
         },
-        "required": ["query", "data", "file_format"],
+        "required": ["query", "file_format"],
     }
 
     async def execute(
         self,
         query: str,
-        data: List[Dict[str, Any]],
         file_format: str,
+        data: Optional[List[Dict[str, Any]]] = None,
         params: Optional[List[Any]] = None,
         custom_filename: Optional[str] = None,
+        artifact: Optional[str] = None,
     ) -> ToolResult:
         """Save query results to file."""
         try:
+            if data is None and not artifact:
+                return ToolResult(error="Either data or artifact must be provided")
+
+            if file_format.lower() == "arrow":
+                if data is None:
+                    # Already an Arrow artifact: nothing to convert
+                    meta = await asyncio.to_thread(ARTIFACT_STORE.get_meta, artifact)
+                    if meta is not None:
+                        return ToolResult(
+                            output={
+                                "artifact": meta.handle,
+                                "format": "arrow",
+                                "size": self._format_file_size(meta.size_bytes),
+                                "row_count": meta.row_count,
+                                "filepath": meta.path,
+                            }
+                        )
+                    data = await asyncio.to_thread(
+                        lambda: ARTIFACT_STORE.open_table(artifact).to_pylist()
+                    )
+                meta = await asyncio.to_thread(
+                    ARTIFACT_STORE.write_rows, data, query, params, custom_filename
+                )
+                return ToolResult(
+                    output={
+                        "artifact": meta.handle,
+                        "format": "arrow",
+                        "size": self._format_file_size(meta.size_bytes),
+                        "row_count": meta.row_count,
+                        "filepath": meta.path,
+                    }
+                )
+
             # Ensure temp_data directory exists
             os.makedirs("temp_data", exist_ok=True)
 
@@ -556,6 +905,47 @@ class MySQLSaveQueryResults(BaseTool):
 
             filepath = os.path.join("temp_data", filename)
 
+            if data is None:
+                if file_format.lower() not in ("json", "csv"):
+                    return ToolResult(
+                        error=f"Unsupported file format: {file_format}. Use 'json', 'csv' or 'arrow'."
+                    )
+                # On-demand conversion of an Arrow artifact
+                await asyncio.to_thread(
+                    ARTIFACT_STORE.export, artifact, file_format.lower(), filepath
+                )
+                meta = await asyncio.to_thread(ARTIFACT_STORE.get_meta, artifact)
+                row_count = (
+                    meta.row_count
+                    if meta is not None
+                    else ARTIFACT_STORE.open_table(artifact).num_rows
+                )
+                metadata_filepath = filepath.rsplit(".", 1)[0] + "_metadata.json"
+                with open(metadata_filepath, "w", encoding="utf-8") as f:
+                    json.dump(
+                        {
+                            "timestamp": datetime.now().isoformat(),
+                            "query": query,
+                            "params": params,
+                            "row_count": row_count,
+                            "artifact": artifact,
+                            f"{file_format.lower()}_file": filename,
+                        },
+                        f,
+                        indent=2,
+                        ensure_ascii=False,
+                        default=str,
+                    )
+                return ToolResult(
+                    output={
+                        "filename": filename,
+                        "format": file_format,
+                        "size": self._format_file_size(os.path.getsize(filepath)),
+                        "row_count": row_count,
+                        "filepath": filepath,
+                    }
+                )
+
             if file_format.lower() == "json":
                 # Save as JSON with metadata
                 output_data = {
@@ -595,7 +985,7 @@ class MySQLSaveQueryResults(BaseTool):
                         )
             else:
                 return ToolResult(
-                    error=f"Unsupported file format: {file_format}. Use 'json' or 'csv'."
+                    error=f"Unsupported file format: {file_format}. Use 'json', 'csv' or 'arrow'."
                 )
 
             # Get file size
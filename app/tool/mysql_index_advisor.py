@@ -0,0 +1,486 @@
+"""Index advisor for the query shapes captured from agent workloads."""
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import pymysql
+from pydantic import BaseModel, Field
+
+from app.exceptions import DatabaseBusyError
+from app.tool.base import BaseTool, ToolResult
+from app.tool.mysql_admission import QueryPriority
+from app.tool.mysql_database import (
+    get_db_config,
+    run_db_operation,
+    validate_read_only_query,
+)
+from app.tool.mysql_lexer import Token, TokenType, significant_tokens
+from app.tool.mysql_workload import QUERY_WORKLOAD, QueryFingerprintStats
+
+
+EQUALITY_OPERATORS = {"=", "<=>"}
+RANGE_OPERATORS = {"<", ">", "<=", ">="}
+MAX_INDEX_COLUMNS = 4
+
+
+class ColumnUsage(BaseModel):
+    """A column reference found in a filter, join or sort clause"""
+
+    qualifier: Optional[str] = None
+    column: str
+    kind: str = Field(..., description="equality, range, join or sort")
+
+
+class IndexCandidate(BaseModel):
+    """A suggested index together with the evidence behind it"""
+
+    table: str
+    columns: List[str]
+    fingerprints: List[str] = Field(default_factory=list)
+    executions: int = 0
+    table_rows: int = 0
+    examined_rows: int = 0
+    estimated_rows: int = 0
+    benefit: float = 0.0
+    reasons: List[str] = Field(default_factory=list)
+
+    @property
+    def index_name(self) -> str:
+        name = "idx_" + "_".join([self.table] + self.columns)
+        return name[:64]
+
+    @property
+    def statement(self) -> str:
+        columns = ", ".join(f"`{column}`" for column in self.columns)
+        return f"CREATE INDEX `{self.index_name}` ON `{self.table}` ({columns});"
+
+
+def extract_column_usage(sql: str) -> Tuple[Dict[str, str], List[ColumnUsage]]:
+    """Find table aliases and the columns used to filter, join and sort.
+
+    Returns:
+        A tuple of (alias -> table name mapping, column usages).
+    """
+    tokens = significant_tokens(sql)
+    aliases: Dict[str, str] = {}
+    usages: List[ColumnUsage] = []
+
+    clause = "select"
+    clause_stack: List[str] = []
+    expect_table = False
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        upper = token.upper
+
+        if token.value == "(":
+            clause_stack.append(clause)
+            expect_table = False
+            i += 1
+            continue
+        if token.value == ")":
+            clause = clause_stack.pop() if clause_stack else clause
+            i += 1
+            continue
+
+        if token.type == TokenType.KEYWORD:
+            next_upper = tokens[i + 1].upper if i + 1 < len(tokens) else ""
+            if upper == "SELECT":
+                clause = "select"
+            elif upper in ("FROM", "JOIN"):
+                clause = "from"
+                expect_table = True
+            elif upper in ("WHERE", "ON"):
+                clause = "filter"
+            elif upper == "HAVING":
+                clause = "having"
+            elif upper in ("GROUP", "ORDER") and next_upper == "BY":
+                clause = "sort"
+                i += 2
+                continue
+            elif upper == "LIMIT":
+                clause = "limit"
+            i += 1
+            continue
+
+        if clause == "from":
+            if token.value == ",":
+                expect_table = True
+            elif expect_table and token.is_identifier:
+                table, i = _read_qualified_name(tokens, i)
+                alias = table
+                if i < len(tokens) and tokens[i].upper == "AS":
+                    i += 1
+                if i < len(tokens) and tokens[i].is_identifier:
+                    alias = tokens[i].name
+                    i += 1
+                aliases[alias.lower()] = table
+                aliases.setdefault(table.lower(), table)
+                expect_table = False
+                continue
+            i += 1
+            continue
+
+        if clause in ("filter", "sort") and token.is_identifier:
+            start = i
+            name, i = _read_qualified_name(tokens, i)
+            # Function calls are not column references
+            if i < len(tokens) and tokens[i].value == "(":
+                continue
+            qualifier, _, column = name.rpartition(".")
+            if clause == "sort":
+                kind = "sort"
+            else:
+                kind = _classify_filter_usage(tokens, start, i)
+            if kind:
+                usages.append(
+                    ColumnUsage(qualifier=qualifier or None, column=column, kind=kind)
+                )
+            continue
+
+        i += 1
+
+    return aliases, usages
+
+
+def _read_qualified_name(tokens: List[Token], i: int) -> Tuple[str, int]:
+    """Read ``name`` or ``qualifier.name`` starting at ``tokens[i]``."""
+    parts = [tokens[i].name]
+    i += 1
+    while (
+        i + 1 < len(tokens) and tokens[i].value == "." and tokens[i + 1].is_identifier
+    ):
+        parts.append(tokens[i + 1].name)
+        i += 2
+    return ".".join(parts), i
+
+
+def _classify_filter_usage(tokens: List[Token], start: int, end: int) -> str:
+    """Classify how a column is used in a WHERE/ON condition."""
+    prev = tokens[start - 1] if start > 0 else None
+    nxt = tokens[end] if end < len(tokens) else None
+    after = tokens[end + 1] if end + 1 < len(tokens) else None
+
+    if nxt is not None:
+        if nxt.value in EQUALITY_OPERATORS:
+            if after is not None and after.is_identifier:
+                return "join"
+            return "equality"
+        if nxt.upper == "IN" or nxt.upper == "IS":
+            return "equality"
+        if nxt.value in RANGE_OPERATORS or nxt.upper == "BETWEEN":
+            return "range"
+        if nxt.upper == "LIKE":
+            # A leading wildcard cannot use a B-tree index
+            if after is not None and after.type == TokenType.STRING:
+                return "" if after.value[1:2] == "%" else "range"
+            return "range"
+    if prev is not None:
+        if prev.value in EQUALITY_OPERATORS:
+            before = tokens[start - 2] if start > 1 else None
+            if before is not None and before.is_identifier:
+                return "join"
+            return "equality"
+        if prev.value in RANGE_OPERATORS:
+            return "range"
+    return ""
+
+
+class MySQLIndexAdvisor(BaseTool):
+    """分析代理查询负载并给出候选索引建议（只读）。"""
+
+    name: str = "mysql_index_advisor"
+    read_only: bool = True
+    description: str = (
+        "分析已捕获的代理查询指纹及其EXPLAIN执行计划，找出缺少索引支持的过滤/连接/排序列，"
+        "基于表统计信息估算收益，并输出按收益排序的候选CREATE INDEX语句供DBA审核。"
+        "该工具只读，不会执行任何DDL。"
+    )
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "可选：只分析这一条SELECT查询，而不是已捕获的查询负载",
+            },
+            "params": {
+                "type": "array",
+                "description": "query的可选参数列表",
+                "items": {"type": "string"},
+                "default": [],
+            },
+            "top_n": {
+                "type": "integer",
+                "description": "分析的查询指纹数量（按累计耗时排序）",
+                "default": 10,
+            },
+            "min_executions": {
+                "type": "integer",
+                "description": "只分析执行次数不少于该值的查询指纹",
+                "default": 1,
+            },
+        },
+        "required": [],
+    }
+
+    async def execute(
+        self,
+        query: Optional[str] = None,
+        params: Optional[List[Any]] = None,
+        top_n: int = 10,
+        min_executions: int = 1,
+    ) -> ToolResult:
+        """Analyze captured query fingerprints and suggest indexes."""
+        try:
+            config = get_db_config()
+
+            if query:
+                workload = [
+                    QueryFingerprintStats(
+                        fingerprint_id="adhoc",
+                        fingerprint=query,
+                        sample_query=query,
+                        sample_params=params or [],
+                        executions=1,
+                    )
+                ]
+            else:
+                workload = QUERY_WORKLOAD.top(top_n, min_executions=min_executions)
+
+            workload = [
+                stats
+                for stats in workload
+                if stats.fingerprint.lower().startswith(("select", "with"))
+            ]
+            if not workload:
+                return ToolResult(output="没有可分析的SELECT查询指纹。请先通过mysql_read_query执行查询。")
+
+            candidates = await run_db_operation(
+                config,
+                lambda cursor: self._analyze_workload(cursor, workload),
+                QueryPriority.QUERY,
+            )
+
+            return ToolResult(output=self._format_report(workload, candidates))
+
+        except DatabaseBusyError as e:
+            return ToolResult(error=str(e))
+        except pymysql.Error as e:
+            return ToolResult(error=f"MySQL错误: {str(e)}")
+        except Exception as e:
+            return ToolResult(error=f"索引分析时出错: {str(e)}")
+
+    def _analyze_workload(
+        self, cursor, workload: List[QueryFingerprintStats]
+    ) -> List[IndexCandidate]:
+        candidates: Dict[Tuple[str, Tuple[str, ...]], IndexCandidate] = {}
+        table_cache: Dict[str, Dict[str, Any]] = {}
+
+        for stats in workload:
+            plan = self._explain(cursor, stats.sample_query, stats.sample_params)
+            if not plan:
+                continue
+
+            aliases, usages = extract_column_usage(stats.sample_query)
+            for row in plan:
+                alias = row.get("table")
+                table = aliases.get(str(alias).lower()) if alias else None
+                if not table or "." in table:
+                    continue
+
+                reasons = self._plan_problems(row)
+                if not reasons:
+                    continue
+
+                if table not in table_cache:
+                    table_cache[table] = self._table_info(cursor, table)
+                info = table_cache[table]
+                if not info["columns"]:
+                    continue
+
+                columns = self._candidate_columns(
+                    table, aliases, usages, info["columns"], info["unique"]
+                )
+                if not columns or self._is_covered(columns, info["indexes"]):
+                    continue
+
+                examined = int(row.get("rows") or info["rows"] or 0)
+                filtered = float(row.get("filtered") or 100.0)
+                estimated = max(1, int(examined * filtered / 100.0))
+                per_execution = max(0, examined - estimated)
+                if any("filesort" in reason for reason in reasons):
+                    per_execution += examined * 0.1
+
+                key = (table, tuple(columns))
+                candidate = candidates.get(key)
+                if candidate is None:
+                    candidate = IndexCandidate(
+                        table=table,
+                        columns=columns,
+                        table_rows=info["rows"],
+                        examined_rows=examined,
+                        estimated_rows=estimated,
+                    )
+                    candidates[key] = candidate
+                    for index_name, index_columns in info["indexes"].items():
+                        if index_columns and index_columns[0] == columns[0]:
+                            candidate.reasons.append(f"可扩展已有索引 {index_name}")
+                candidate.fingerprints.append(stats.fingerprint_id)
+                candidate.executions += stats.executions
+                candidate.benefit += per_execution * stats.executions
+                for reason in reasons:
+                    if reason not in candidate.reasons:
+                        candidate.reasons.append(reason)
+
+        return sorted(candidates.values(), key=lambda c: c.benefit, reverse=True)
+
+    def _explain(self, cursor, query: str, params: List[Any]) -> List[Dict[str, Any]]:
+        explain_query, error = validate_read_only_query(f"EXPLAIN {query}")
+        if error:
+            return []
+        try:
+            cursor.execute(explain_query, params or None)
+            return [dict(row) for row in cursor.fetchall()]
+        except pymysql.Error:
+            return []
+
+    @staticmethod
+    def _plan_problems(row: Dict[str, Any]) -> List[str]:
+        reasons = []
+        access_type = row.get("type")
+        extra = str(row.get("Extra") or "")
+        if access_type == "ALL":
+            reasons.append("全表扫描")
+        elif access_type == "index":
+            reasons.append("全索引扫描")
+        if "Using filesort" in extra:
+            reasons.append("Using filesort")
+        if "Using temporary" in extra:
+            reasons.append("Using temporary")
+        return reasons
+
+    def _table_info(self, cursor, table: str) -> Dict[str, Any]:
+        info: Dict[str, Any] = {
+            "rows": 0,
+            "columns": [],
+            "indexes": {},
+            "unique": set(),
+        }
+
+        cursor.execute(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            [table],
+        )
+        row = cursor.fetchone()
+        if not row:
+            return info
+        info["rows"] = int(list(row.values())[0] or 0)
+
+        cursor.execute(f"SHOW COLUMNS FROM `{table}`")
+        info["columns"] = [row["Field"] for row in cursor.fetchall()]
+
+        cursor.execute(f"SHOW INDEX FROM `{table}`")
+        indexes: Dict[str, List[Tuple[int, str]]] = {}
+        unique_keys = set()
+        for row in cursor.fetchall():
+            indexes.setdefault(row["Key_name"], []).append(
+                (int(row["Seq_in_index"]), row["Column_name"])
+            )
+            if not int(row["Non_unique"]):
+                unique_keys.add(row["Key_name"])
+        info["indexes"] = {
+            name: [column.lower() for _, column in sorted(columns)]
+            for name, columns in indexes.items()
+        }
+        # Columns that are a PRIMARY KEY or UNIQUE index on their own
+        info["unique"] = {
+            columns[0]
+            for name, columns in info["indexes"].items()
+            if name in unique_keys and len(columns) == 1
+        }
+        return info
+
+    @staticmethod
+    def _candidate_columns(
+        table: str,
+        aliases: Dict[str, str],
+        usages: List[ColumnUsage],
+        table_columns: List[str],
+        unique_columns: Optional[Set[str]] = None,
+    ) -> List[str]:
+        """Order columns as equality/join first, then one range or the sort keys.
+
+        Equality and join columns that are already unique on their own
+        (primary key or single-column unique index) are left out: they are
+        looked up by that index, and leading a new index with them is useless.
+        """
+        known = {column.lower(): column for column in table_columns}
+        unique_columns = unique_columns or set()
+
+        def belongs(usage: ColumnUsage) -> bool:
+            if usage.qualifier:
+                return aliases.get(usage.qualifier.lower()) == table
+            return usage.column.lower() in known
+
+        equality, ranges, sorts = [], [], []
+        for usage in usages:
+            if not belongs(usage) or usage.column.lower() not in known:
+                continue
+            column = known[usage.column.lower()]
+            if usage.kind in ("equality", "join"):
+                if column.lower() in unique_columns:
+                    continue
+                target = equality
+            elif usage.kind == "range":
+                target = ranges
+            else:
+                target = sorts
+            if column not in target:
+                target.append(column)
+
+        columns = list(equality)
+        if ranges:
+            if ranges[0] not in columns:
+                columns.append(ranges[0])
+        else:
+            columns.extend(column for column in sorts if column not in columns)
+        return columns[:MAX_INDEX_COLUMNS]
+
+    @staticmethod
+    def _is_covered(columns: List[str], indexes: Dict[str, List[str]]) -> bool:
+        wanted = [column.lower() for column in columns]
+        return any(
+            index_columns[: len(wanted)] == wanted for index_columns in indexes.values()
+        )
+
+    @staticmethod
+    def _format_report(
+        workload: List[QueryFingerprintStats], candidates: List[IndexCandidate]
+    ) -> str:
+        report = "索引建议报告（只读分析，以下语句未执行，请由DBA审核）\n"
+        report += f"分析的查询指纹数: {len(workload)}\n"
+        report += f"候选索引数: {len(candidates)}\n"
+        report += "=" * 60 + "\n"
+
+        if not candidates:
+            report += "未发现缺少索引支持的过滤、连接或排序列。\n"
+            return report
+
+        for rank, candidate in enumerate(candidates, 1):
+            report += f"{rank}. {candidate.statement}\n"
+            report += (
+                f"   预估收益: {candidate.benefit:,.0f} 行扫描/累计"
+                f" | 执行次数: {candidate.executions}"
+                f" | 表行数: {candidate.table_rows:,}"
+                f" | 扫描行数: {candidate.examined_rows:,} -> 约 {candidate.estimated_rows:,}\n"
+            )
+            report += f"   原因: {', '.join(candidate.reasons)}\n"
+            report += f"   相关指纹: {', '.join(candidate.fingerprints)}\n"
+
+        report += "\n查询指纹:\n"
+        for stats in workload:
+            report += (
+                f"  [{stats.fingerprint_id}] 执行 {stats.executions} 次, "
+                f"累计 {stats.total_time:.3f}s: {stats.fingerprint}\n"
+            )
+        return report
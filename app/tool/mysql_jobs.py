@@ -0,0 +1,384 @@
+"""Background execution of long-running read-only queries.
+
+``mysql_submit_query`` starts a query as a job and returns a job id right
+away, so a slow aggregation does not hold the agent step (or the web
+request timeout). The job streams its rows into an Arrow artifact; the agent
+polls ``mysql_job_status`` and collects the result with ``mysql_job_result``.
+
+Jobs belong to the agent run (or web session) that submitted them: status
+and result lookups only see jobs of the current ``job_owner`` block, so
+concurrent sessions cannot read each other's results.
+"""
+
+import asyncio
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import pymysql
+import pymysql.cursors
+from pydantic import BaseModel, Field
+
+from app.config import config as app_config
+from app.logger import logger
+from app.tool.artifacts import ARTIFACT_STORE
+from app.tool.base import BaseTool, ToolResult
+from app.tool.mysql_admission import QueryPriority
+from app.tool.mysql_database import (
+    get_db_config,
+    run_db_operation,
+    validate_read_only_query,
+)
+from app.tool.mysql_workload import QUERY_WORKLOAD
+
+
+DEFAULT_JOB_ROW_LIMIT = 1_000_000
+DEFAULT_JOB_READ_TIMEOUT = 3600
+JOB_FETCH_BATCH_SIZE = 5000
+MAX_RETAINED_JOBS = 200
+RESULT_PREVIEW_ROWS = 20
+
+_JOB_OWNER: ContextVar[Optional[str]] = ContextVar("mysql_job_owner", default=None)
+
+
+@contextmanager
+def job_owner(owner: Optional[str] = None):
+    """Own the jobs submitted inside the block; only the block can see them.
+
+    Nested blocks (e.g. agents run by a flow) keep the outer owner.
+    """
+    if _JOB_OWNER.get() is not None:
+        yield _JOB_OWNER.get()
+        return
+    owner = owner or uuid.uuid4().hex
+    token = _JOB_OWNER.set(owner)
+    try:
+        yield owner
+    finally:
+        _JOB_OWNER.reset(token)
+
+
+def current_job_owner() -> Optional[str]:
+    return _JOB_OWNER.get()
+
+
+class QueryJob(BaseModel):
+    """State of one background query job"""
+
+    job_id: str
+    query: str
+    owner: Optional[str] = None
+    params: List[Any] = Field(default_factory=list)
+    row_limit: int = DEFAULT_JOB_ROW_LIMIT
+    sketch: bool = True
+    status: str = "pending"  # pending, running, completed, failed
+    submitted_at: float = Field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    row_count: int = 0
+    artifact: Optional[str] = None
+    artifact_path: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class QueryJobManager:
+    """Runs query jobs as background tasks and keeps their state."""
+
+    def __init__(self, max_jobs: int = MAX_RETAINED_JOBS):
+        self.max_jobs = max_jobs
+        self._jobs: Dict[str, QueryJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(
+        self,
+        query: str,
+        params: Optional[List[Any]] = None,
+        row_limit: int = DEFAULT_JOB_ROW_LIMIT,
+        sketch: bool = True,
+    ) -> QueryJob:
+        """Validate a query and start it in the background.
+
+        With ``sketch``, distinct counts, quantiles and heavy hitters are
+        computed while the rows stream into the artifact.
+
+        Raises:
+            ValueError: If the query is not a single read-only statement.
+        """
+        query, error = validate_read_only_query(query)
+        if error:
+            raise ValueError(error)
+
+        query_normalized = " ".join(query.lower().split())
+        if "limit" not in query_normalized and query_normalized.startswith("select"):
+            query = f"{query} LIMIT {row_limit}"
+
+        job = QueryJob(
+            job_id=f"job_{uuid.uuid4().hex[:12]}",
+            query=query,
+            owner=current_job_owner(),
+            params=list(params or []),
+            row_limit=row_limit,
+            sketch=sketch,
+        )
+        self._prune()
+        self._jobs[job.job_id] = job
+        task = asyncio.create_task(self._run(job, self._job_db_config()))
+        self._tasks[job.job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.job_id, None))
+        return job
+
+    def get(self, job_id: str) -> Optional[QueryJob]:
+        """Return a job of the current owner; other owners' jobs do not exist."""
+        job = self._jobs.get(job_id)
+        if job is None or job.owner != current_job_owner():
+            return None
+        return job
+
+    def list_jobs(self) -> List[QueryJob]:
+        owner = current_job_owner()
+        return [job for job in self._jobs.values() if job.owner == owner]
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> QueryJob:
+        """Wait for a job to finish (mainly for tests and scripts)."""
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.wait_for(asyncio.shield(task), timeout)
+        return self._jobs[job_id]
+
+    @staticmethod
+    def _job_db_config() -> Dict[str, Any]:
+        db_config = dict(get_db_config())
+        mysql_settings = app_config.mysql
+        db_config["read_timeout"] = (
+            mysql_settings.job_read_timeout
+            if mysql_settings is not None
+            else DEFAULT_JOB_READ_TIMEOUT
+        )
+        return db_config
+
+    def _prune(self) -> None:
+        finished = sorted(
+            (job for job in self._jobs.values() if job.done),
+            key=lambda job: job.finished_at or 0,
+        )
+        while len(self._jobs) >= self.max_jobs and finished:
+            self._jobs.pop(finished.pop(0).job_id, None)
+
+    async def _run(self, job: QueryJob, db_config: Dict[str, Any]) -> None:
+        def stream_to_artifact(cursor):
+            job.status = "running"
+            job.started_at = time.time()
+            with ARTIFACT_STORE.writer(
+                query=job.query, params=job.params, sketch=job.sketch
+            ) as writer:
+                cursor.execute(job.query, job.params)
+                while True:
+                    rows = cursor.fetchmany(JOB_FETCH_BATCH_SIZE)
+                    if not rows:
+                        break
+                    writer.write_rows([dict(row) for row in rows])
+                    job.row_count = writer.row_count
+            return writer.meta
+
+        try:
+            meta = await run_db_operation(
+                db_config,
+                stream_to_artifact,
+                QueryPriority.BULK,
+                cursorclass=pymysql.cursors.SSDictCursor,
+            )
+            job.artifact = meta.handle
+            job.artifact_path = meta.path
+            job.row_count = meta.row_count
+            job.status = "completed"
+            QUERY_WORKLOAD.record(job.query, job.params, job.elapsed, job.row_count)
+        except pymysql.Error as e:
+            job.status = "failed"
+            job.error = f"MySQL错误: {str(e)}"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            logger.info(
+                f"Query job {job.job_id} {job.status} after {job.elapsed:.1f}s "
+                f"({job.row_count} rows)"
+            )
+
+
+# Shared job manager for all sessions in this process; jobs are kept apart by owner
+QUERY_JOBS = QueryJobManager()
+
+
+def _job_summary(job: QueryJob) -> Dict[str, Any]:
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "row_count": job.row_count,
+        "elapsed_seconds": round(job.elapsed, 2),
+        "artifact": job.artifact,
+        "error": job.error,
+    }
+
+
+class MySQLSubmitQuery(BaseTool):
+    """在后台提交耗时较长的只读查询。"""
+
+    name: str = "mysql_submit_query"
+    description: str = (
+        "在后台提交耗时较长的只读查询（如大表聚合、大量数据导出），立即返回job_id而不等待结果。"
+        "提交后可以继续执行其他步骤，之后用mysql_job_status查看进度，用mysql_job_result获取结果。"
+        "结果会保存为Arrow结果文件，并在读取过程中计算各列的近似统计（去重数、分位数、高频值），"
+        "可用artifact_stats查看，无需读取全部数据。"
+    )
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "要执行的只读SQL查询（仅支持SELECT、SHOW、DESCRIBE、EXPLAIN）",
+            },
+            "params": {
+                "type": "array",
+                "description": "查询的可选参数列表",
+                "items": {"type": "string"},
+                "default": [],
+            },
+            "row_limit": {
+                "type": "integer",
+                "description": "结果的最大行数",
+                "default": DEFAULT_JOB_ROW_LIMIT,
+            },
+            "sketch": {
+                "type": "boolean",
+                "description": "是否在读取时计算近似统计（去重数、分位数、高频值）",
+                "default": True,
+            },
+        },
+        "required": ["query"],
+    }
+
+    async def execute(
+        self,
+        query: str,
+        params: Optional[List[Any]] = None,
+        row_limit: int = DEFAULT_JOB_ROW_LIMIT,
+        sketch: bool = True,
+    ) -> ToolResult:
+        """Submit a query job."""
+        try:
+            job = QUERY_JOBS.submit(query, params, row_limit, sketch)
+            return ToolResult(
+                output=f"已提交后台查询任务 {job.job_id}，可以继续其他工作，"
+                f"稍后使用mysql_job_status或mysql_job_result查看。"
+            )
+        except ValueError as e:
+            return ToolResult(error=str(e))
+        except Exception as e:
+            return ToolResult(error=f"提交查询任务时出错: {str(e)}")
+
+
+class MySQLJobStatus(BaseTool):
+    """查看后台查询任务的状态。"""
+
+    name: str = "mysql_job_status"
+    read_only: bool = True
+    depends_on: List[str] = ["mysql_submit_query"]
+    description: str = (
+        "查看后台查询任务的状态（pending/running/completed/failed）、已读取行数和耗时。不传job_id时列出所有任务。"
+    )
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "job_id": {
+                "type": "string",
+                "description": "mysql_submit_query返回的任务ID",
+            },
+        },
+        "required": [],
+    }
+
+    async def execute(self, job_id: Optional[str] = None) -> ToolResult:
+        """Report the status of one job or of all jobs."""
+        if job_id:
+            job = QUERY_JOBS.get(job_id)
+            if job is None:
+                return ToolResult(error=f"Job '{job_id}' does not exist")
+            return ToolResult(output=_job_summary(job))
+        return ToolResult(output=[_job_summary(job) for job in QUERY_JOBS.list_jobs()])
+
+
+class MySQLJobResult(BaseTool):
+    """获取已完成的后台查询任务的结果。"""
+
+    name: str = "mysql_job_result"
+    read_only: bool = True
+    depends_on: List[str] = ["mysql_submit_query"]
+    description: str = (
+        "获取已完成的后台查询任务的结果：返回前若干行预览和Arrow结果句柄。"
+        "完整结果可在python_execute中用load_artifact(句柄)读取。"
+    )
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "job_id": {
+                "type": "string",
+                "description": "mysql_submit_query返回的任务ID",
+            },
+            "preview_rows": {
+                "type": "integer",
+                "description": "返回的预览行数",
+                "default": RESULT_PREVIEW_ROWS,
+            },
+        },
+        "required": ["job_id"],
+    }
+
+    async def execute(
+        self, job_id: str, preview_rows: int = RESULT_PREVIEW_ROWS
+    ) -> ToolResult:
+        """Return a preview and the artifact handle of a finished job."""
+        job = QUERY_JOBS.get(job_id)
+        if job is None:
+            return ToolResult(error=f"Job '{job_id}' does not exist")
+        if job.status == "failed":
+            return ToolResult(error=f"任务 {job_id} 执行失败: {job.error}")
+        if not job.done:
+            return ToolResult(
+                output=f"任务 {job_id} 仍在执行中（状态: {job.status}，"
+                f"已读取 {job.row_count} 行，耗时 {job.elapsed:.1f} 秒），请稍后再试。"
+            )
+
+        try:
+            table = await asyncio.to_thread(ARTIFACT_STORE.open_table, job.artifact)
+            preview = table.slice(0, max(0, preview_rows)).to_pylist()
+        except Exception as e:
+            return ToolResult(error=f"读取任务结果时出错: {str(e)}")
+
+        return ToolResult(
+            output={
+                "data": preview,
+                "metadata": {
+                    "job_id": job.job_id,
+                    "query": job.query,
+                    "params": job.params,
+                    "row_count": job.row_count,
+                    "elapsed_seconds": round(job.elapsed, 2),
+                    "artifact": job.artifact,
+                    "artifact_path": job.artifact_path,
+                    "sketch": job.sketch,
+                },
+            }
+        )
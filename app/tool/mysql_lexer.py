@@ -0,0 +1,172 @@
+"""A lightweight MySQL lexer shared by the MySQL tools.
+
+The lexer is not a full parser. It only splits a statement into tokens so that
+callers can reason about literals, identifiers and keywords without being
+fooled by string contents or comments.
+"""
+
+import hashlib
+import re
+from enum import Enum
+from typing import List, NamedTuple, Optional
+
+
+class TokenType(str, Enum):
+    """Token categories produced by the lexer"""
+
+    WHITESPACE = "whitespace"
+    COMMENT = "comment"
+    STRING = "string"
+    NUMBER = "number"
+    PLACEHOLDER = "placeholder"
+    KEYWORD = "keyword"
+    IDENTIFIER = "identifier"
+    QUOTED_IDENTIFIER = "quoted_identifier"
+    VARIABLE = "variable"
+    OPERATOR = "operator"
+    PUNCTUATION = "punctuation"
+    UNKNOWN = "unknown"
+
+
+class Token(NamedTuple):
+    type: TokenType
+    value: str
+    pos: int
+
+    @property
+    def upper(self) -> str:
+        return self.value.upper()
+
+    @property
+    def name(self) -> str:
+        """Identifier name with backtick quoting removed."""
+        if self.type == TokenType.QUOTED_IDENTIFIER:
+            return self.value[1:-1].replace("``", "`")
+        return self.value
+
+    @property
+    def is_identifier(self) -> bool:
+        return self.type in (TokenType.IDENTIFIER, TokenType.QUOTED_IDENTIFIER)
+
+    @property
+    def is_literal(self) -> bool:
+        return self.type in (
+            TokenType.STRING,
+            TokenType.NUMBER,
+            TokenType.PLACEHOLDER,
+        )
+
+
+KEYWORDS = frozenset(
+    """
+    ACCESSIBLE ALL AND ANY AS ASC BETWEEN BINARY BOTH BY CASE CAST COLLATE
+    CROSS CURRENT_DATE CURRENT_TIME CURRENT_TIMESTAMP DATABASE DAY DESC
+    DESCRIBE DISTINCT DISTINCTROW DIV ELSE END ESCAPE EXISTS EXPLAIN FALSE
+    FOR FORCE FORMAT FROM FULL GROUP HAVING HIGH_PRIORITY HOUR IF IGNORE IN
+    INDEX INNER INTERVAL INTO IS JOIN KEY LEADING LEFT LIKE LIMIT LOCK MINUTE
+    MOD MONTH NATURAL NOT NULL OFFSET ON OR ORDER OUTER OVER PARTITION
+    QUARTER REGEXP RIGHT RLIKE ROLLUP SECOND SELECT SHARE SHOW SOUNDS
+    SQL_CALC_FOUND_ROWS SQL_NO_CACHE STRAIGHT_JOIN TABLE TABLES THEN TRAILING
+    TRUE UNION UNIQUE UNKNOWN USE USING VALUES WEEK WHEN WHERE WINDOW WITH
+    XOR YEAR
+    """.split()
+)
+
+_TOKEN_PATTERNS = [
+    (TokenType.WHITESPACE, r"\s+"),
+    (TokenType.COMMENT, r"--[^\n]*|#[^\n]*|/\*.*?\*/"),
+    (TokenType.STRING, r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\""),
+    (TokenType.QUOTED_IDENTIFIER, r"`(?:[^`]|``)*`"),
+    (TokenType.PLACEHOLDER, r"%\([^)]+\)s|%s|\?"),
+    (
+        TokenType.NUMBER,
+        r"0[xX][0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?(?![\w$])",
+    ),
+    (TokenType.VARIABLE, r"@@?[\w.$]+"),
+    (TokenType.IDENTIFIER, r"[A-Za-z_$\u0080-\uffff][\w$\u0080-\uffff]*"),
+    (TokenType.OPERATOR, r"<=>|<>|!=|<=|>=|:=|->>|->|\|\||&&|[-+*/%=<>!~^&|]"),
+    (TokenType.PUNCTUATION, r"[(),.;]"),
+    (TokenType.UNKNOWN, r"."),
+]
+
+_TOKEN_RE = re.compile(
+    "|".join(f"(?P<{t.name}>{pattern})" for t, pattern in _TOKEN_PATTERNS),
+    re.DOTALL,
+)
+
+
+def tokenize(sql: str) -> List[Token]:
+    """Split a SQL statement into tokens, keeping whitespace and comments."""
+    tokens = []
+    for match in _TOKEN_RE.finditer(sql):
+        token_type = TokenType[match.lastgroup]
+        value = match.group()
+        if token_type == TokenType.IDENTIFIER and value.upper() in KEYWORDS:
+            token_type = TokenType.KEYWORD
+        tokens.append(Token(token_type, value, match.start()))
+    return tokens
+
+
+def significant_tokens(sql: str) -> List[Token]:
+    """Tokenize a statement and drop whitespace and comments."""
+    return [
+        token
+        for token in tokenize(sql)
+        if token.type not in (TokenType.WHITESPACE, TokenType.COMMENT)
+    ]
+
+
+def normalize(sql: str) -> str:
+    """Canonical text of a statement with its literals kept.
+
+    Whitespace and comments are collapsed and keywords upper-cased, so two
+    spellings of the same concrete query compare equal.
+    """
+    return " ".join(
+        token.upper if token.type == TokenType.KEYWORD else token.value
+        for token in significant_tokens(sql)
+    )
+
+
+def fingerprint(sql: str) -> str:
+    """Normalize a query to its shape.
+
+    Literals and placeholders become ``?``, ``IN`` lists collapse to ``(?+)``,
+    comments are removed and keywords/identifiers are lower-cased, so that
+    ``SELECT * FROM t WHERE id = 1`` and ``select * from t where id=2`` share
+    the same fingerprint.
+    """
+    parts: List[str] = []
+    for token in significant_tokens(sql):
+        if token.is_literal:
+            value = "?"
+        elif token.type == TokenType.QUOTED_IDENTIFIER:
+            value = token.name.lower()
+        else:
+            value = token.value.lower()
+        parts.append(value)
+
+    # Collapse value lists such as "in (?, ?, ?)" into "in (?+)"
+    collapsed: List[str] = []
+    i = 0
+    while i < len(parts):
+        if parts[i] == "(" and i + 1 < len(parts) and parts[i + 1] == "?":
+            j = i + 1
+            while j + 2 < len(parts) and parts[j + 1] == "," and parts[j + 2] == "?":
+                j += 2
+            if j + 1 < len(parts) and parts[j + 1] == ")":
+                collapsed.extend(["(", "?+", ")"])
+                i = j + 2
+                continue
+        collapsed.append(parts[i])
+        i += 1
+
+    text = " ".join(collapsed)
+    text = text.replace("( ", "(").replace(" )", ")").replace(" ,", ",")
+    return text.replace(" . ", ".")
+
+
+def fingerprint_id(sql: str, fingerprint_text: Optional[str] = None) -> str:
+    """Return a short stable identifier for a query fingerprint."""
+    text = fingerprint_text if fingerprint_text is not None else fingerprint(sql)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,244 @@
+"""Schema-aware repair of unknown table and column errors.
+
+When MySQL rejects a query with ``Unknown column`` (1054) or ``Table doesn't
+exist`` (1146), the cached schema catalog is searched for identifiers that
+look like the one the query used. The suggestions are returned with the
+error, so the agent can fix the query without another discovery round trip,
+and an unambiguous match can be applied and re-run automatically when
+``auto_repair`` is enabled.
+"""
+
+import difflib
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pymysql
+from pydantic import BaseModel, Field
+
+from app.config import config as app_config
+from app.logger import logger
+from app.tool.mysql_index_advisor import extract_column_usage
+from app.tool.mysql_lexer import TokenType, tokenize
+from app.tool.mysql_schema import SchemaCatalog, get_schema_catalog
+
+
+ER_BAD_FIELD_ERROR = 1054
+ER_NO_SUCH_TABLE = 1146
+
+MAX_SUGGESTIONS = 3
+MATCH_CUTOFF = 0.6
+# The best match must beat the runner-up by this much to be applied blindly
+UNAMBIGUOUS_MARGIN = 0.15
+MAX_AUTO_REPAIRS = 3
+
+_UNKNOWN_COLUMN_RE = re.compile(r"Unknown column '([^']+)' in '([^']+)'")
+_NO_SUCH_TABLE_RE = re.compile(r"Table '([^']+)' doesn't exist")
+_PLAIN_IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_$]*$")
+
+
+class IdentifierRepair(BaseModel):
+    """Candidate fixes for one unknown identifier"""
+
+    kind: str  # "column" or "table"
+    name: str
+    qualifier: Optional[str] = None
+    candidates: List[str] = Field(default_factory=list)
+    scores: List[float] = Field(default_factory=list)
+
+    @property
+    def identifier(self) -> str:
+        return f"{self.qualifier}.{self.name}" if self.qualifier else self.name
+
+    @property
+    def unambiguous(self) -> bool:
+        if not self.candidates:
+            return False
+        return len(self.scores) == 1 or self.scores[0] - self.scores[1] >= (
+            UNAMBIGUOUS_MARGIN
+        )
+
+    def hint(self) -> str:
+        kind = "列" if self.kind == "column" else "表"
+        if not self.candidates:
+            return f"在schema目录中没有找到与{kind} '{self.identifier}' 相近的名称"
+        return f"你是不是想用{kind}: {', '.join(self.candidates)}？"
+
+    def apply(self, query: str) -> Optional[str]:
+        """Rewrite the query with the best candidate, or None if nothing matched."""
+        if not self.candidates:
+            return None
+        return replace_identifier(
+            query, self.name, self.candidates[0], self.qualifier, self.kind
+        )
+
+
+def closest_identifiers(
+    name: str, pool: Iterable[str], limit: int = MAX_SUGGESTIONS
+) -> List[Tuple[str, float]]:
+    """Rank identifiers by similarity to ``name`` (case-insensitive)."""
+    lowered = name.lower()
+    scored = {}
+    for candidate in pool:
+        score = difflib.SequenceMatcher(None, lowered, candidate.lower()).ratio()
+        if score >= MATCH_CUTOFF and score > scored.get(candidate, 0.0):
+            scored[candidate] = score
+    ranked = sorted(scored.items(), key=lambda item: (-item[1], item[0]))
+    return ranked[:limit]
+
+
+def parse_identifier_error(error: pymysql.Error) -> Optional[Tuple[str, str]]:
+    """Extract ``(kind, identifier)`` from an unknown column/table error."""
+    if len(error.args) < 2:
+        return None
+    code, message = error.args[0], str(error.args[1])
+    if code == ER_BAD_FIELD_ERROR:
+        match = _UNKNOWN_COLUMN_RE.search(message)
+        if match:
+            return "column", match.group(1)
+    elif code == ER_NO_SUCH_TABLE:
+        match = _NO_SUCH_TABLE_RE.search(message)
+        if match:
+            return "table", match.group(1)
+    return None
+
+
+def diagnose(
+    catalog: SchemaCatalog, query: str, error: pymysql.Error
+) -> Optional[IdentifierRepair]:
+    """Suggest catalog identifiers for an unknown column/table error."""
+    parsed = parse_identifier_error(error)
+    if parsed is None:
+        return None
+    kind, identifier = parsed
+
+    if kind == "table":
+        # MySQL reports the table as "<database>.<table>"
+        name = identifier.rpartition(".")[2]
+        ranked = closest_identifiers(name, catalog.tables)
+        return IdentifierRepair(
+            kind=kind,
+            name=name,
+            candidates=[candidate for candidate, _ in ranked],
+            scores=[round(score, 3) for _, score in ranked],
+        )
+
+    qualifier, _, name = identifier.rpartition(".")
+    ranked = closest_identifiers(name, _column_pool(catalog, query, qualifier or None))
+    return IdentifierRepair(
+        kind=kind,
+        name=name,
+        qualifier=qualifier or None,
+        candidates=[candidate for candidate, _ in ranked],
+        scores=[round(score, 3) for _, score in ranked],
+    )
+
+
+def _column_pool(
+    catalog: SchemaCatalog, query: str, qualifier: Optional[str]
+) -> List[str]:
+    """Columns of the tables the query reads (or of the qualified table)."""
+    try:
+        aliases, _ = extract_column_usage(query)
+    except Exception:
+        aliases = {}
+    if qualifier:
+        tables = [aliases.get(qualifier.lower(), qualifier)]
+    else:
+        tables = list(dict.fromkeys(aliases.values()))
+
+    columns: List[str] = []
+    for table_name in tables:
+        table = catalog.get_table(table_name.rpartition(".")[2])
+        if table is not None:
+            columns.extend(table.column_names())
+    if not columns and not qualifier:
+        # Could not resolve the tables; fall back to every column
+        for table in catalog.tables.values():
+            columns.extend(table.column_names())
+    return list(dict.fromkeys(columns))
+
+
+def replace_identifier(
+    query: str,
+    name: str,
+    replacement: str,
+    qualifier: Optional[str] = None,
+    kind: str = "column",
+) -> Optional[str]:
+    """Replace references to an identifier, leaving strings and comments alone."""
+    tokens = tokenize(query)
+    significant = [
+        i
+        for i, token in enumerate(tokens)
+        if token.type not in (TokenType.WHITESPACE, TokenType.COMMENT)
+    ]
+    position = {token_index: n for n, token_index in enumerate(significant)}
+
+    def neighbour(token_index: int, offset: int):
+        n = position[token_index] + offset
+        if 0 <= n < len(significant):
+            return tokens[significant[n]]
+        return None
+
+    lowered = name.lower()
+    replaced = False
+    out = []
+    for i, token in enumerate(tokens):
+        if token.is_identifier and token.name.lower() == lowered:
+            before = neighbour(i, -1)
+            after = neighbour(i, 1)
+            qualified = before is not None and before.value == "."
+            if kind == "column":
+                if qualifier:
+                    owner = neighbour(i, -2)
+                    matches = (
+                        qualified
+                        and owner is not None
+                        and owner.is_identifier
+                        and owner.name.lower() == qualifier.lower()
+                    )
+                else:
+                    matches = not qualified
+                # Function calls and qualifiers are not column references
+                matches = matches and not (
+                    after is not None and after.value in ("(", ".")
+                )
+            else:
+                matches = not (after is not None and after.value == ".")
+            if matches:
+                out.append(_quote_like(token, replacement))
+                replaced = True
+                continue
+        out.append(token.value)
+    return "".join(out) if replaced else None
+
+
+def _quote_like(token, name: str) -> str:
+    if token.type == TokenType.QUOTED_IDENTIFIER or not _PLAIN_IDENTIFIER_RE.match(
+        name
+    ):
+        return "`" + name.replace("`", "``") + "`"
+    return name
+
+
+def auto_repair_enabled() -> bool:
+    mysql_settings = app_config.mysql
+    return bool(mysql_settings and mysql_settings.auto_repair)
+
+
+async def suggest_repair(
+    db_config: Dict[str, Any], query: str, error: pymysql.Error
+) -> Optional[IdentifierRepair]:
+    """Diagnose an error against the cached schema catalog.
+
+    Returns None when the error is not an unknown table/column error or the
+    catalog cannot be loaded.
+    """
+    if parse_identifier_error(error) is None:
+        return None
+    try:
+        catalog = await get_schema_catalog(db_config)
+    except Exception as e:
+        logger.warning(f"Schema catalog unavailable for query repair: {e}")
+        return None
+    return diagnose(catalog, query, error)
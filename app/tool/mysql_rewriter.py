@@ -0,0 +1,388 @@
+"""Rewrite stage for wasteful SQL patterns in agent queries.
+
+A registry of rules inspects a query with the lexer and the schema catalog.
+Rules either rewrite the statement into a cheaper equivalent (or, for
+approximate counts, a cheaper estimate the caller asked for) or only report
+a warning when no safe rewrite exists. Every applied rule is reported, so the
+caller can tell exactly what ran.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from app.logger import logger
+from app.tool.mysql_index_advisor import extract_column_usage
+from app.tool.mysql_lexer import Token, TokenType, significant_tokens
+from app.tool.mysql_repair import closest_identifiers
+from app.tool.mysql_schema import SchemaCatalog, TableInfo, get_schema_catalog
+
+
+# SELECT * on tables wider than this gets a warning
+WIDE_TABLE_COLUMNS = 20
+
+
+class RewriteContext(BaseModel):
+    """What the caller asked for, plus the schema to check it against"""
+
+    catalog: Optional[SchemaCatalog] = None
+    columns: List[str] = Field(default_factory=list)
+    approximate: bool = False
+    optimize: bool = False
+
+
+class AppliedRewrite(BaseModel):
+    """One rule that changed the query or produced a warning"""
+
+    rule: str
+    note: str
+    changed: bool = True
+
+
+class RewriteResult(BaseModel):
+    query: str
+    rewrites: List[AppliedRewrite] = Field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return any(rewrite.changed for rewrite in self.rewrites)
+
+    @property
+    def warnings(self) -> List[str]:
+        return [rewrite.note for rewrite in self.rewrites if not rewrite.changed]
+
+
+class RewriteRule(ABC):
+    """Base class of rewrite rules.
+
+    ``apply`` returns the new query (or the unchanged one for warnings) and a
+    note, or None when the rule does not apply.
+    """
+
+    name: str = ""
+
+    def enabled(self, context: RewriteContext) -> bool:
+        return context.optimize
+
+    @abstractmethod
+    def apply(self, query: str, context: RewriteContext) -> Optional[Tuple[str, str]]:
+        """Rewrite ``query``, or return None when the rule does not apply."""
+
+
+def _lookup_table(context: RewriteContext, name: str) -> Optional[TableInfo]:
+    if context.catalog is None:
+        return None
+    return context.catalog.get_table(name.rpartition(".")[2])
+
+
+def _single_table_select(
+    tokens: List[Token],
+) -> Optional[Tuple[int, int, str]]:
+    """Match ``SELECT [DISTINCT] <list> FROM <table> ...`` without joins.
+
+    Returns:
+        (index of the first select-list token, index of FROM, table name).
+    """
+    if not tokens or tokens[0].upper != "SELECT":
+        return None
+    start = 1
+    if start < len(tokens) and tokens[start].upper == "DISTINCT":
+        start += 1
+    depth = 0
+    from_index = None
+    for i in range(start, len(tokens)):
+        value = tokens[i].value
+        if value == "(":
+            depth += 1
+        elif value == ")":
+            depth -= 1
+        elif depth == 0 and tokens[i].upper == "FROM":
+            from_index = i
+            break
+    if from_index is None or from_index + 1 >= len(tokens):
+        return None
+    table_tokens = tokens[from_index + 1 :]
+    if not table_tokens[0].is_identifier:
+        return None
+    name = table_tokens[0].name
+    rest = table_tokens[1:]
+    if len(rest) >= 2 and rest[0].value == "." and rest[1].is_identifier:
+        name = f"{name}.{rest[1].name}"
+        rest = rest[2:]
+    depth = 0
+    for token in rest:
+        if token.value == "(":
+            depth += 1
+        elif token.value == ")":
+            depth -= 1
+        elif depth == 0 and (token.value == "," or token.upper == "JOIN"):
+            return None
+    return start, from_index, name
+
+
+def _quote(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+
+class ProjectColumns(RewriteRule):
+    """``SELECT *`` on one table becomes the columns the caller asked for."""
+
+    name = "project_columns"
+
+    def enabled(self, context: RewriteContext) -> bool:
+        return bool(context.columns)
+
+    def apply(self, query, context):
+        tokens = significant_tokens(query)
+        match = _single_table_select(tokens)
+        if match is None:
+            return None
+        start, from_index, table_name = match
+        if from_index != start + 1 or tokens[start].value != "*":
+            return None
+        table = _lookup_table(context, table_name)
+        if table is None:
+            return None
+
+        known = {column.lower(): column for column in table.column_names()}
+        unknown = [column for column in context.columns if column.lower() not in known]
+        if unknown:
+            hints = []
+            for column in unknown:
+                similar = [c for c, _ in closest_identifiers(column, known.values())]
+                hints.append(
+                    f"{column}（你是不是想用: {', '.join(similar)}）" if similar else column
+                )
+            raise ValueError(f"表 '{table.name}' 中不存在列: {'; '.join(hints)}")
+
+        columns = [known[column.lower()] for column in context.columns]
+        star = tokens[start]
+        projected = ", ".join(_quote(column) for column in columns)
+        rewritten = query[: star.pos] + projected + query[star.pos + 1 :]
+        return rewritten, (
+            f"SELECT * 改为只查询 {len(columns)}/{len(known)} 列: {', '.join(columns)}"
+        )
+
+
+class ApproximateCount(RewriteRule):
+    """Bare ``SELECT COUNT(*) FROM t`` is answered from table statistics."""
+
+    name = "approximate_count"
+
+    def enabled(self, context: RewriteContext) -> bool:
+        return context.approximate
+
+    def apply(self, query, context):
+        tokens = significant_tokens(query)
+        values = [token.value for token in tokens[:5]]
+        if (
+            len(tokens) < 7
+            or tokens[0].upper != "SELECT"
+            or tokens[1].upper != "COUNT"
+            or values[2:5] != ["(", "*", ")"]
+        ):
+            return None
+        rest = tokens[5:]
+        alias = "COUNT(*)"
+        if rest[0].upper == "AS" and len(rest) > 1 and rest[1].is_identifier:
+            alias = rest[1].name
+            rest = rest[2:]
+        elif rest[0].is_identifier:
+            alias = rest[0].name
+            rest = rest[1:]
+        if len(rest) not in (2, 4) or rest[0].upper != "FROM":
+            return None
+        if not rest[1].is_identifier or (
+            len(rest) == 4 and (rest[2].value != "." or not rest[3].is_identifier)
+        ):
+            return None
+        table = _lookup_table(context, rest[-1].name)
+        if table is None:
+            return None
+
+        rewritten = (
+            f"SELECT TABLE_ROWS AS {_quote(alias)} FROM information_schema.TABLES "
+            f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = "
+            f"'{table.name.replace(chr(39), chr(39) * 2)}'"
+        )
+        return rewritten, (
+            f"COUNT(*) 改为读取 information_schema.TABLES.TABLE_ROWS 的估算值"
+            f"（表 {table.name}，InnoDB统计值可能有较大误差）"
+        )
+
+
+class DropSubqueryOrderBy(RewriteRule):
+    """``ORDER BY`` without ``LIMIT`` inside a subquery does not affect results."""
+
+    name = "drop_subquery_order_by"
+
+    def apply(self, query, context):
+        tokens = significant_tokens(query)
+        removals: List[Tuple[int, int]] = []
+        stack: List[dict] = []
+        for i, token in enumerate(tokens):
+            if token.value == "(":
+                is_subquery = i + 1 < len(tokens) and tokens[i + 1].upper == "SELECT"
+                stack.append({"subquery": is_subquery, "order": None, "limit": False})
+            elif token.value == ")" and stack:
+                frame = stack.pop()
+                if (
+                    frame["subquery"]
+                    and frame["order"] is not None
+                    and not frame["limit"]
+                ):
+                    removals.append((tokens[frame["order"]].pos, token.pos))
+            elif stack and stack[-1]["subquery"]:
+                next_upper = tokens[i + 1].upper if i + 1 < len(tokens) else ""
+                if token.upper == "ORDER" and next_upper == "BY":
+                    stack[-1]["order"] = i
+                elif token.upper == "LIMIT":
+                    stack[-1]["limit"] = True
+        if not removals:
+            return None
+
+        rewritten = query
+        for start, end in sorted(removals, reverse=True):
+            rewritten = rewritten[:start].rstrip() + rewritten[end:]
+        return rewritten, f"删除了 {len(removals)} 个子查询中没有LIMIT的ORDER BY"
+
+
+class LeadingWildcardLike(RewriteRule):
+    """Warns about ``LIKE '%x'`` on indexed columns, which cannot use the index."""
+
+    name = "leading_wildcard_like"
+
+    def apply(self, query, context):
+        if context.catalog is None:
+            return None
+        tokens = significant_tokens(query)
+        aliases, _ = extract_column_usage(query)
+        flagged = []
+        for i, token in enumerate(tokens):
+            if (
+                token.upper != "LIKE"
+                or i == 0
+                or i + 1 >= len(tokens)
+                or tokens[i + 1].type != TokenType.STRING
+                or not tokens[i + 1].value[1:].startswith("%")
+                or not tokens[i - 1].is_identifier
+            ):
+                continue
+            column = tokens[i - 1].name
+            qualifier = None
+            if i >= 3 and tokens[i - 2].value == "." and tokens[i - 3].is_identifier:
+                qualifier = tokens[i - 3].name
+            if qualifier:
+                tables = [aliases.get(qualifier.lower(), qualifier)]
+            else:
+                tables = list(dict.fromkeys(aliases.values()))
+            for table_name in tables:
+                table = _lookup_table(context, table_name)
+                if table is None:
+                    continue
+                info = next(
+                    (c for c in table.columns if c.name.lower() == column.lower()), None
+                )
+                if info is not None and info.key:
+                    flagged.append(f"{table.name}.{info.name}")
+                    break
+        if not flagged:
+            return None
+        return query, (
+            f"以%开头的LIKE无法使用 {', '.join(flagged)} 上的索引，会扫描全部索引或全表；"
+            f"如可能请改为前缀匹配（LIKE 'x%'）或先用其他条件缩小范围"
+        )
+
+
+class WideSelectStar(RewriteRule):
+    """Warns about ``SELECT *`` on wide tables when no columns were requested."""
+
+    name = "wide_select_star"
+
+    def enabled(self, context: RewriteContext) -> bool:
+        return context.optimize and not context.columns
+
+    def apply(self, query, context):
+        tokens = significant_tokens(query)
+        match = _single_table_select(tokens)
+        if match is None:
+            return None
+        start, from_index, table_name = match
+        if from_index != start + 1 or tokens[start].value != "*":
+            return None
+        table = _lookup_table(context, table_name)
+        if table is None or len(table.columns) <= WIDE_TABLE_COLUMNS:
+            return None
+        return query, (
+            f"表 {table.name} 有 {len(table.columns)} 列，SELECT * 会传输大量无用数据；"
+            f"可通过columns参数只查询需要的列"
+        )
+
+
+class QueryRewriter:
+    """Applies the registered rules in order."""
+
+    def __init__(self, rules: Optional[List[RewriteRule]] = None):
+        self.rules: List[RewriteRule] = list(rules or [])
+
+    def register(self, rule: RewriteRule) -> RewriteRule:
+        self.rules.append(rule)
+        return rule
+
+    def rewrite(self, query: str, context: RewriteContext) -> RewriteResult:
+        """Run every enabled rule over the query.
+
+        Raises:
+            ValueError: If the caller's request (e.g. requested columns)
+                does not match the schema.
+        """
+        result = RewriteResult(query=query)
+        for rule in self.rules:
+            if not rule.enabled(context):
+                continue
+            applied = rule.apply(result.query, context)
+            if applied is None:
+                continue
+            rewritten, note = applied
+            result.rewrites.append(
+                AppliedRewrite(
+                    rule=rule.name, note=note, changed=rewritten != result.query
+                )
+            )
+            result.query = rewritten
+        return result
+
+
+# Default rule registry used by mysql_read_query
+QUERY_REWRITER = QueryRewriter(
+    [
+        ProjectColumns(),
+        ApproximateCount(),
+        DropSubqueryOrderBy(),
+        LeadingWildcardLike(),
+        WideSelectStar(),
+    ]
+)
+
+
+async def rewrite_query(
+    db_config: Dict[str, Any],
+    query: str,
+    columns: Optional[List[str]] = None,
+    approximate: bool = False,
+    optimize: bool = False,
+) -> RewriteResult:
+    """Rewrite a validated query using the cached schema catalog."""
+    try:
+        catalog = await get_schema_catalog(db_config)
+    except Exception as e:
+        logger.warning(f"Schema catalog unavailable for query rewriting: {e}")
+        catalog = None
+    context = RewriteContext(
+        catalog=catalog,
+        columns=list(columns or []),
+        approximate=approximate,
+        optimize=optimize,
+    )
+    return QUERY_REWRITER.rewrite(query, context)
@@ -0,0 +1,315 @@
+"""Cached schema catalog and relevance-ranked table search for MySQL."""
+
+import math
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import pymysql
+from pydantic import BaseModel, Field
+
+from app.config import config as app_config
+from app.exceptions import DatabaseBusyError
+from app.tool.base import BaseTool, ToolResult
+from app.tool.mysql_admission import QueryPriority
+from app.tool.mysql_database import get_db_config, run_db_operation
+
+
+DEFAULT_SCHEMA_CACHE_TTL = 600
+MAX_ONE_LINE_COLUMNS = 40
+
+
+class ColumnInfo(BaseModel):
+    """A column in the schema catalog"""
+
+    name: str
+    type: str = ""
+    key: str = ""
+    comment: str = ""
+
+
+class TableInfo(BaseModel):
+    """A table in the schema catalog"""
+
+    name: str
+    comment: str = ""
+    rows: int = 0
+    columns: List[ColumnInfo] = Field(default_factory=list)
+
+    def column_names(self) -> List[str]:
+        return [column.name for column in self.columns]
+
+    def one_line(self, max_columns: int = MAX_ONE_LINE_COLUMNS) -> str:
+        """Compact schema such as ``orders(id bigint PK, status varchar(16))``."""
+        parts = []
+        for column in self.columns[:max_columns]:
+            part = f"{column.name} {column.type}".strip()
+            if column.key == "PRI":
+                part += " PK"
+            parts.append(part)
+        if len(self.columns) > max_columns:
+            parts.append(f"...+{len(self.columns) - max_columns}")
+        line = f"{self.name}({', '.join(parts)})"
+        if self.comment:
+            line += f" -- {self.comment}"
+        return line
+
+
+class SchemaCatalog(BaseModel):
+    """Tables and columns of one database, loaded from information_schema"""
+
+    database: str
+    tables: Dict[str, TableInfo] = Field(default_factory=dict)
+    loaded_at: float = Field(default_factory=time.time)
+
+    def get_table(self, name: str) -> Optional[TableInfo]:
+        table = self.tables.get(name)
+        if table is None:
+            lowered = name.lower()
+            table = next(
+                (t for n, t in self.tables.items() if n.lower() == lowered), None
+            )
+        return table
+
+    @classmethod
+    def load(cls, cursor) -> "SchemaCatalog":
+        """Load the catalog of the current database."""
+        cursor.execute("SELECT DATABASE() AS db")
+        row = cursor.fetchone()
+        database = (list(row.values())[0] if row else "") or ""
+
+        cursor.execute(
+            "SELECT TABLE_NAME, TABLE_COMMENT, TABLE_ROWS "
+            "FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()"
+        )
+        tables = {
+            row["TABLE_NAME"]: TableInfo(
+                name=row["TABLE_NAME"],
+                comment=row.get("TABLE_COMMENT") or "",
+                rows=int(row.get("TABLE_ROWS") or 0),
+            )
+            for row in cursor.fetchall()
+        }
+
+        cursor.execute(
+            "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, COLUMN_KEY, COLUMN_COMMENT "
+            "FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() "
+            "ORDER BY TABLE_NAME, ORDINAL_POSITION"
+        )
+        for row in cursor.fetchall():
+            table = tables.get(row["TABLE_NAME"])
+            if table is None:
+                continue
+            table.columns.append(
+                ColumnInfo(
+                    name=row["COLUMN_NAME"],
+                    type=row.get("COLUMN_TYPE") or "",
+                    key=row.get("COLUMN_KEY") or "",
+                    comment=row.get("COLUMN_COMMENT") or "",
+                )
+            )
+        return cls(database=database, tables=tables)
+
+
+_TOKEN_RE = re.compile(r"[A-Za-z]+|\d+|[\u4e00-\u9fff]+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+")
+
+
+def tokenize_text(text: str) -> List[str]:
+    """Split identifiers and comments into lower-case search terms.
+
+    ``snake_case`` and ``camelCase`` identifiers are split into words; Chinese
+    text is indexed as single characters plus character bigrams.
+    """
+    terms: List[str] = []
+    for chunk in _TOKEN_RE.findall(text or ""):
+        if "\u4e00" <= chunk[0] <= "\u9fff":
+            terms.extend(chunk)
+            terms.extend(chunk[i : i + 2] for i in range(len(chunk) - 1))
+        elif chunk.isdigit():
+            terms.append(chunk)
+        else:
+            terms.extend(word.lower() for word in _CAMEL_RE.findall(chunk))
+    return terms
+
+
+class BM25Index:
+    """Okapi BM25 over table documents built from the schema catalog.
+
+    Each table becomes one document made of its name (weighted higher), its
+    column names and the table/column comments.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, name_weight: int = 3):
+        self.k1 = k1
+        self.b = b
+        self.name_weight = name_weight
+        self._docs: List[Tuple[str, Counter]] = []
+        self._doc_freq: Counter = Counter()
+        self._total_len = 0
+
+    @classmethod
+    def from_catalog(cls, catalog: SchemaCatalog, **kwargs) -> "BM25Index":
+        index = cls(**kwargs)
+        for table in catalog.tables.values():
+            index.add(table.name, index.table_terms(table))
+        return index
+
+    def table_terms(self, table: TableInfo) -> List[str]:
+        terms = tokenize_text(table.name) * self.name_weight
+        terms.append(table.name.lower())
+        terms.extend(tokenize_text(table.comment))
+        for column in table.columns:
+            terms.extend(tokenize_text(column.name))
+            terms.extend(tokenize_text(column.comment))
+        return terms
+
+    def add(self, doc_id: str, terms: List[str]) -> None:
+        counts = Counter(terms)
+        self._docs.append((doc_id, counts))
+        self._doc_freq.update(counts.keys())
+        self._total_len += len(terms)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """Return ``(doc_id, score)`` pairs for the best matching documents."""
+        query_terms = set(tokenize_text(query))
+        if not query_terms or not self._docs:
+            return []
+
+        n_docs = len(self._docs)
+        avg_len = self._total_len / n_docs
+        scored = []
+        for doc_id, counts in self._docs:
+            doc_len = sum(counts.values())
+            score = 0.0
+            for term in query_terms:
+                freq = counts.get(term)
+                if not freq:
+                    continue
+                df = self._doc_freq[term]
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * doc_len / avg_len)
+                score += idf * freq * (self.k1 + 1) / (freq + norm)
+            if score > 0:
+                scored.append((doc_id, score))
+
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:top_k]
+
+
+class _CatalogCache:
+    """Process-wide cache of schema catalogs and their search indexes."""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[Any, ...], Tuple[SchemaCatalog, BM25Index]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _ttl() -> int:
+        mysql_settings = app_config.mysql
+        if mysql_settings is not None:
+            return mysql_settings.schema_cache_ttl
+        return DEFAULT_SCHEMA_CACHE_TTL
+
+    @staticmethod
+    def _key(db_config: Dict[str, Any]) -> Tuple[Any, ...]:
+        return (db_config.get("host"), db_config.get("port"), db_config.get("database"))
+
+    async def get(
+        self, db_config: Dict[str, Any], refresh: bool = False
+    ) -> Tuple[SchemaCatalog, BM25Index]:
+        key = self._key(db_config)
+        with self._lock:
+            entry = self._entries.get(key)
+        if (
+            entry is not None
+            and not refresh
+            and time.time() - entry[0].loaded_at < self._ttl()
+        ):
+            return entry
+
+        catalog = await run_db_operation(
+            db_config, SchemaCatalog.load, QueryPriority.INTERACTIVE
+        )
+        entry = (catalog, BM25Index.from_catalog(catalog))
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+SCHEMA_CATALOG_CACHE = _CatalogCache()
+
+
+async def get_schema_catalog(
+    db_config: Optional[Dict[str, Any]] = None, refresh: bool = False
+) -> SchemaCatalog:
+    """Return the cached schema catalog for the configured database."""
+    catalog, _ = await SCHEMA_CATALOG_CACHE.get(db_config or get_db_config(), refresh)
+    return catalog
+
+
+class MySQLSearchTables(BaseTool):
+    """根据自然语言问题检索最相关的表。"""
+
+    name: str = "mysql_search_tables"
+    read_only: bool = True
+    description: str = (
+        "根据自然语言问题，在表名、列名、表注释和列注释上做相关性检索（BM25），"
+        "返回最相关的top_k个表及其单行结构。表很多时优先使用此工具而不是列出所有表。"
+    )
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "question": {
+                "type": "string",
+                "description": "自然语言问题或关键词，例如'每月订单退款金额'",
+            },
+            "top_k": {
+                "type": "integer",
+                "description": "返回的表数量",
+                "default": 10,
+            },
+            "refresh": {
+                "type": "boolean",
+                "description": "是否强制重新加载表结构目录",
+                "default": False,
+            },
+        },
+        "required": ["question"],
+    }
+
+    async def execute(
+        self, question: str, top_k: int = 10, refresh: bool = False
+    ) -> ToolResult:
+        """Search the schema catalog for tables relevant to a question."""
+        try:
+            catalog, index = await SCHEMA_CATALOG_CACHE.get(get_db_config(), refresh)
+            matches = index.search(question, top_k=max(1, top_k))
+            if not matches:
+                return ToolResult(
+                    output=f"在 {len(catalog.tables)} 个表中没有找到与问题相关的表，请尝试其他关键词。"
+                )
+
+            result_text = (
+                f"在 {len(catalog.tables)} 个表中找到 {len(matches)} 个相关表（按相关性排序）：\n"
+            )
+            for table_name, score in matches:
+                table = catalog.tables[table_name]
+                result_text += f"  - [{score:.2f}] {table.one_line()}\n"
+            return ToolResult(output=result_text)
+
+        except DatabaseBusyError as e:
+            return ToolResult(error=str(e))
+        except pymysql.Error as e:
+            return ToolResult(error=f"MySQL error: {str(e)}")
+        except Exception as e:
+            return ToolResult(error=f"Error searching tables: {str(e)}")
@@ -0,0 +1,108 @@
+"""Single-flight deduplication of identical in-flight MySQL queries.
+
+When several sessions issue the same query against the same endpoint at the
+same moment, only the first caller (the leader) executes it; the others join
+the in-flight execution and receive a deep copy of its result, so no caller
+can observe another caller's mutations.
+"""
+
+import asyncio
+import copy
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from app.tool.mysql_admission import ADMISSION_CONTROLLER
+from app.tool.mysql_lexer import normalize
+
+
+T = TypeVar("T")
+
+
+def query_key(
+    db_config: Dict[str, Any],
+    query: str,
+    params: Optional[List[Any]] = None,
+    *extra: Any,
+) -> str:
+    """Key identifying one concrete query on one endpoint."""
+    return json.dumps(
+        [
+            ADMISSION_CONTROLLER.endpoint_key(db_config),
+            normalize(query),
+            list(params or []),
+            list(extra),
+        ],
+        default=str,
+        ensure_ascii=False,
+    )
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution."""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._followers: Dict[str, int] = {}
+
+        # Metrics
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Run ``fn`` once per key among concurrent callers.
+
+        Returns:
+            A tuple of (result, shared). ``shared`` is True when the caller
+            joined another caller's execution instead of running ``fn``.
+        """
+        while True:
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            self._followers[key] = self._followers.get(key, 0) + 1
+            self.coalesced += 1
+            try:
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    # The leader was cancelled; retry (possibly as the new leader)
+                    self.coalesced -= 1
+                    continue
+                raise
+            return copy.deepcopy(result), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self._followers[key] = 0
+        self.executions += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an exception without followers is not logged
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            if self._followers.get(key):
+                # Followers deep-copy the shared result when they wake up;
+                # hand the leader its own copy so it cannot mutate theirs.
+                return copy.deepcopy(result), False
+            return result, False
+        finally:
+            self._inflight.pop(key, None)
+            self._followers.pop(key, None)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
+
+
+# Shared single-flight group for MySQL read queries
+QUERY_SINGLE_FLIGHT = SingleFlight()
@@ -0,0 +1,306 @@
+"""Consistent-snapshot read-only sessions for multi-query analyses.
+
+Every MySQL tool call normally runs on a fresh autocommit connection, so the
+queries of one analysis can see data change between steps. With
+``snapshot_sessions`` enabled, an agent run pins one connection per endpoint
+inside ``START TRANSACTION READ ONLY, WITH CONSISTENT SNAPSHOT``, so all of
+its read queries see the same point-in-time data (and InnoDB can skip the
+bookkeeping it needs for read-write transactions).
+
+A snapshot holds back InnoDB purge for as long as it is open, so sessions are
+closed after ``snapshot_idle_timeout`` seconds without use and replaced by a
+fresh snapshot once they are older than ``snapshot_max_age`` seconds.
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import pymysql
+
+from app.config import config as app_config
+from app.logger import logger
+from app.tool.mysql_admission import ADMISSION_CONTROLLER
+
+
+T = TypeVar("T")
+
+DEFAULT_SNAPSHOT_IDLE_TIMEOUT = 120.0
+DEFAULT_SNAPSHOT_MAX_AGE = 600.0
+MAX_REAPER_INTERVAL = 30.0
+
+SNAPSHOT_START_SQL = "START TRANSACTION READ ONLY, WITH CONSISTENT SNAPSHOT"
+
+# Server errors that roll back the snapshot transaction or end the connection:
+# server shutdown, deadlock, aborted/oversized packets, connection killed
+_SESSION_ENDING_ERRORS = frozenset({1053, 1152, 1153, 1154, 1156, 1213, 1927})
+
+# Scope id of the agent run the current task belongs to
+_SNAPSHOT_SCOPE: ContextVar[Optional[str]] = ContextVar(
+    "mysql_snapshot_scope", default=None
+)
+
+
+class SnapshotSession:
+    """One pinned connection inside a read-only consistent-snapshot transaction."""
+
+    def __init__(self, scope: str, endpoint: str, conn: Any):
+        self.scope = scope
+        self.endpoint = endpoint
+        self.conn = conn
+        self.opened_at = time.monotonic()
+        self.last_used = self.opened_at
+        self.queries = 0
+        self.closed = False
+        # pymysql connections are not thread-safe; serialize worker threads
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(
+        cls, scope: str, endpoint: str, connect: Callable[[], Any]
+    ) -> "SnapshotSession":
+        conn = connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(SNAPSHOT_START_SQL)
+            cursor.close()
+        except Exception:
+            conn.close()
+            raise
+        return cls(scope, endpoint, conn)
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.opened_at
+
+    @property
+    def idle(self) -> float:
+        return time.monotonic() - self.last_used
+
+    def expired(self, idle_timeout: float, max_age: float) -> bool:
+        return self.closed or self.idle > idle_timeout or self.age > max_age
+
+    def run(self, operation: Callable[[Any], T], cursorclass: Optional[type]) -> T:
+        """Run ``operation(cursor)`` on the pinned connection (blocking)."""
+        with self._lock:
+            if self.closed:
+                raise RuntimeError("Snapshot session expired, please retry the query")
+            self.last_used = time.monotonic()
+            cursor = (
+                self.conn.cursor(cursorclass) if cursorclass else self.conn.cursor()
+            )
+            try:
+                result = operation(cursor)
+            except Exception as e:
+                if not _is_query_error(e, self.conn):
+                    # The connection may be unusable; start over next time
+                    self._close_locked()
+                raise
+            finally:
+                if not self.closed:
+                    cursor.close()
+                self.last_used = time.monotonic()
+            self.queries += 1
+            return result
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_locked()
+
+    def _close_locked(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.conn.rollback()
+        except Exception:
+            pass
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+def _is_query_error(error: Exception, conn: Any) -> bool:
+    """True for errors in the statement itself, which leave the session usable.
+
+    pymysql raises OperationalError for ordinary statement mistakes such as
+    1054 (unknown column) or 1052 (ambiguous column), so the decision is
+    made on the error code rather than the exception class: server errors
+    keep the session while the connection is alive, client errors
+    (2000-2999) and errors that end the transaction or connection do not.
+    """
+    if not isinstance(error, pymysql.err.MySQLError) or isinstance(
+        error, pymysql.err.InterfaceError
+    ):
+        return False
+    code = error.args[0] if error.args else None
+    if not isinstance(code, int) or code < 1000 or 2000 <= code < 3000:
+        return False
+    if code in _SESSION_ENDING_ERRORS:
+        return False
+    return bool(getattr(conn, "open", True))
+
+
+class SnapshotSessionManager:
+    """Tracks the snapshot sessions of all agent runs in this process."""
+
+    def __init__(self):
+        self._sessions: Dict[Tuple[str, str], SnapshotSession] = {}
+        self._open_lock = asyncio.Lock()
+        self._reaper: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.opened = 0
+        self.expired = 0
+
+    @staticmethod
+    def enabled() -> bool:
+        mysql_settings = app_config.mysql
+        return bool(mysql_settings and mysql_settings.snapshot_sessions)
+
+    @staticmethod
+    def _limits() -> Tuple[float, float]:
+        mysql_settings = app_config.mysql
+        if mysql_settings is None:
+            return DEFAULT_SNAPSHOT_IDLE_TIMEOUT, DEFAULT_SNAPSHOT_MAX_AGE
+        return mysql_settings.snapshot_idle_timeout, mysql_settings.snapshot_max_age
+
+    @staticmethod
+    def current_scope() -> Optional[str]:
+        return _SNAPSHOT_SCOPE.get()
+
+    @asynccontextmanager
+    async def scope(self):
+        """Scope of one agent run; its snapshot sessions close on exit.
+
+        Nested scopes (e.g. agents run by a flow) share the outer scope.
+        """
+        if _SNAPSHOT_SCOPE.get() is not None:
+            yield
+            return
+        scope_id = uuid.uuid4().hex
+        token = _SNAPSHOT_SCOPE.set(scope_id)
+        try:
+            yield
+        finally:
+            _SNAPSHOT_SCOPE.reset(token)
+            await self.close_scope(scope_id)
+
+    async def acquire(
+        self, db_config: Dict[str, Any], connect: Callable[[], Any]
+    ) -> Optional[SnapshotSession]:
+        """Return the current scope's session for an endpoint, opening it if needed.
+
+        Returns None when snapshot sessions are disabled or the caller is not
+        running inside an agent scope.
+        """
+        scope_id = _SNAPSHOT_SCOPE.get()
+        if scope_id is None or not self.enabled():
+            return None
+
+        await self.reap()
+        key = (scope_id, ADMISSION_CONTROLLER.endpoint_key(db_config))
+        async with self._open_lock:
+            session = self._sessions.get(key)
+            if session is not None and not session.closed:
+                session.last_used = time.monotonic()
+                return session
+            session = await asyncio.to_thread(
+                SnapshotSession.open, scope_id, key[1], connect
+            )
+            self._sessions[key] = session
+            self.opened += 1
+            self._ensure_reaper()
+            return session
+
+    async def reap(self) -> int:
+        """Close sessions that are idle, too old or broken."""
+        idle_timeout, max_age = self._limits()
+        stale = [
+            (key, session)
+            for key, session in self._sessions.items()
+            if session.expired(idle_timeout, max_age)
+        ]
+        for key, session in stale:
+            if self._sessions.get(key) is session:
+                del self._sessions[key]
+            if not session.closed:
+                self.expired += 1
+                logger.info(
+                    f"Closing snapshot session on {session.endpoint} "
+                    f"(age {session.age:.0f}s, idle {session.idle:.0f}s)"
+                )
+                await asyncio.to_thread(session.close)
+        return len(stale)
+
+    async def close_scope(self, scope_id: str) -> None:
+        sessions = [
+            self._sessions.pop(key)
+            for key in list(self._sessions)
+            if key[0] == scope_id
+        ]
+        for session in sessions:
+            await asyncio.to_thread(session.close)
+        if not self._sessions:
+            self._stop_reaper()
+
+    async def close_all(self) -> None:
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        self._stop_reaper()
+        for session in sessions:
+            await asyncio.to_thread(session.close)
+
+    def _stop_reaper(self) -> None:
+        reaper = self._reaper
+        if (
+            reaper is not None
+            and not reaper.done()
+            and reaper.get_loop() is asyncio.get_running_loop()
+        ):
+            reaper.cancel()
+        self._reaper = None
+
+    def _ensure_reaper(self) -> None:
+        if (
+            self._reaper is None
+            or self._reaper.done()
+            or self._reaper.get_loop() is not asyncio.get_running_loop()
+        ):
+            self._reaper = asyncio.create_task(self._reap_loop())
+
+    async def _reap_loop(self) -> None:
+        while self._sessions:
+            idle_timeout, _ = self._limits()
+            await asyncio.sleep(max(1.0, min(idle_timeout, MAX_REAPER_INTERVAL)))
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.warning(f"Error closing snapshot sessions: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        sessions: List[Dict[str, Any]] = [
+            {
+                "endpoint": session.endpoint,
+                "age": round(session.age, 1),
+                "idle": round(session.idle, 1),
+                "queries": session.queries,
+            }
+            for session in self._sessions.values()
+        ]
+        return {
+            "enabled": self.enabled(),
+            "open": len(sessions),
+            "opened": self.opened,
+            "expired": self.expired,
+            "sessions": sessions,
+        }
+
+
+# Shared snapshot session manager for all agent runs in this process
+SNAPSHOT_SESSIONS = SnapshotSessionManager()
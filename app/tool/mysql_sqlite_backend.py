@@ -0,0 +1,1184 @@
+"""Offline MySQL stand-in backed by an embedded SQLite database.
+
+Implements the subset of the pymysql connection/cursor API used by the MySQL
+tools, so they can run in tests and benchmarks without a server:
+
+- ``%s`` / ``%(name)s`` placeholders, backtick-quoted identifiers
+- ``SHOW TABLES [LIKE ...]``, ``DESCRIBE``/``SHOW COLUMNS``, ``SHOW INDEX``,
+  ``SHOW CREATE TABLE``
+- ``information_schema.TABLES``/``COLUMNS``/``STATISTICS``
+- ``EXPLAIN`` mapped to MySQL-style plan rows
+- ``DATABASE()``, ``VERSION()``, ``USER()``, ``DATE_FORMAT()`` and a few
+  other MySQL functions
+- SQLite errors mapped to the pymysql exceptions (and MySQL error codes) the
+  tools already handle
+
+Select it with ``backend = "sqlite"`` in the ``[mysql]`` config section. The
+dataset generators at the bottom build deterministic synthetic databases for
+load tests::
+
+    python -m app.tool.mysql_sqlite_backend ecommerce --path workspace/mysql_fake.db --orders 1000000
+"""
+
+import argparse
+import random
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pymysql
+import pymysql.cursors
+
+
+SQLITE_VERSION_SUFFIX = "sqlite"
+COMMENTS_TABLE = "_mysql_comments"
+DEFAULT_BATCH_SIZE = 10_000
+
+_INFO_SCHEMA_DDL = """
+CREATE TABLE IF NOT EXISTS information_schema.TABLES (
+    TABLE_SCHEMA TEXT, TABLE_NAME TEXT, TABLE_TYPE TEXT, ENGINE TEXT,
+    TABLE_ROWS INTEGER, DATA_LENGTH INTEGER, INDEX_LENGTH INTEGER,
+    TABLE_COMMENT TEXT
+);
+CREATE TABLE IF NOT EXISTS information_schema.COLUMNS (
+    TABLE_SCHEMA TEXT, TABLE_NAME TEXT, COLUMN_NAME TEXT,
+    ORDINAL_POSITION INTEGER, COLUMN_DEFAULT TEXT, IS_NULLABLE TEXT,
+    DATA_TYPE TEXT, COLUMN_TYPE TEXT, COLUMN_KEY TEXT, EXTRA TEXT,
+    COLUMN_COMMENT TEXT
+);
+CREATE TABLE IF NOT EXISTS information_schema.STATISTICS (
+    TABLE_SCHEMA TEXT, TABLE_NAME TEXT, NON_UNIQUE INTEGER, INDEX_NAME TEXT,
+    SEQ_IN_INDEX INTEGER, COLUMN_NAME TEXT, CARDINALITY INTEGER,
+    NULLABLE TEXT, INDEX_TYPE TEXT
+);
+"""
+
+_IDENT = r"`?(?:[\w$]+`?\.`?)?([\w$]+)`?"
+_SHOW_TABLES_RE = re.compile(
+    r"^show\s+(?:full\s+)?tables(?:\s+like\s+(%s|'[^']*'|\"[^\"]*\"))?$", re.I
+)
+_DESCRIBE_RE = re.compile(
+    rf"^(?:describe|desc|show\s+(?:full\s+)?columns\s+(?:from|in))\s+{_IDENT}$", re.I
+)
+_SHOW_INDEX_RE = re.compile(
+    rf"^show\s+(?:index|indexes|keys)\s+(?:from|in)\s+{_IDENT}$", re.I
+)
+_SHOW_CREATE_RE = re.compile(rf"^show\s+create\s+table\s+{_IDENT}$", re.I)
+_EXPLAIN_RE = re.compile(r"^(?:explain|describe|desc)\s+(select|with)\b", re.I)
+_BEGIN_RE = re.compile(r"^(?:start\s+transaction|begin)\b", re.I)
+_SET_RE = re.compile(r"^set\s+", re.I)
+_TABLE_REF_RE = re.compile(
+    r"\b(?:from|join)\s+`?([\w$]+)`?(?:\s+(?:as\s+)?`?([\w$]+)`?)?", re.I
+)
+_PLAN_RE = re.compile(
+    r"^(SCAN|SEARCH)\s+(\S+)(?:\s+USING\s+(?:(COVERING)\s+)?"
+    r"(INDEX\s+(\S+)|INTEGER PRIMARY KEY|PRIMARY KEY))?(?:\s+\((.*)\))?",
+    re.I,
+)
+_NOT_A_TABLE_ALIAS = {
+    "where",
+    "join",
+    "left",
+    "right",
+    "inner",
+    "outer",
+    "cross",
+    "on",
+    "group",
+    "order",
+    "limit",
+    "having",
+    "union",
+    "natural",
+    "using",
+    "straight_join",
+}
+
+# MySQL DATE_FORMAT specifiers that map onto strftime
+_DATE_FORMAT_MAP = {
+    "%Y": "%Y",
+    "%y": "%y",
+    "%m": "%m",
+    "%c": "%-m",
+    "%d": "%d",
+    "%e": "%-d",
+    "%H": "%H",
+    "%k": "%-H",
+    "%i": "%M",
+    "%s": "%S",
+    "%S": "%S",
+    "%f": "%f",
+    "%j": "%j",
+    "%W": "%A",
+    "%a": "%a",
+    "%M": "%B",
+    "%b": "%b",
+    "%p": "%p",
+    "%T": "%H:%M:%S",
+    "%x": "%G",
+    "%v": "%V",
+    "%%": "%%",
+}
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value
+    text = str(value)
+    for fmt in (
+        "%Y-%m-%d %H:%M:%S.%f",
+        "%Y-%m-%d %H:%M:%S",
+        "%Y-%m-%dT%H:%M:%S",
+        "%Y-%m-%d",
+    ):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _date_format(value: Any, fmt: str) -> Optional[str]:
+    moment = _parse_datetime(value)
+    if moment is None or fmt is None:
+        return None
+    result = []
+    i = 0
+    while i < len(fmt):
+        spec = fmt[i : i + 2]
+        if fmt[i] == "%" and spec in _DATE_FORMAT_MAP:
+            mapped = _DATE_FORMAT_MAP[spec]
+            if mapped == "%%":
+                result.append("%")
+            elif mapped.startswith("%-"):
+                result.append(str(int(moment.strftime("%" + mapped[2:]))))
+            else:
+                result.append(moment.strftime(mapped))
+            i += 2
+        else:
+            result.append(fmt[i])
+            i += 1
+    return "".join(result)
+
+
+def _date_part(part: str) -> Callable[[Any], Optional[int]]:
+    def extract(value: Any) -> Optional[int]:
+        moment = _parse_datetime(value)
+        return getattr(moment, part) if moment else None
+
+    return extract
+
+
+def _quarter(value: Any) -> Optional[int]:
+    moment = _parse_datetime(value)
+    return (moment.month - 1) // 3 + 1 if moment else None
+
+
+def _concat(*values: Any) -> Optional[str]:
+    if any(value is None for value in values):
+        return None
+    return "".join(str(value) for value in values)
+
+
+def _floor(value: Any) -> Optional[int]:
+    if value is None:
+        return None
+    number = float(value)
+    return int(number) if number >= 0 or number == int(number) else int(number) - 1
+
+
+def _unix_timestamp(*args: Any) -> Optional[int]:
+    # UNIX_TIMESTAMP() is the current time, UNIX_TIMESTAMP(NULL) is NULL
+    if not args:
+        return int(time.time())
+    if args[0] is None:
+        return None
+    moment = _parse_datetime(args[0])
+    return int(moment.timestamp()) if moment else None
+
+
+def _from_unixtime(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return datetime.fromtimestamp(float(value)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def translate_placeholders(query: str, args: Any) -> str:
+    """Rewrite pymysql ``%s``/``%(name)s`` placeholders to SQLite parameters.
+
+    Matches pymysql exactly: without arguments (``args is None``) the query
+    is sent as is; otherwise the whole query goes through Python's
+    ``%``-formatting, so ``%%`` becomes ``%`` (also inside quoted literals
+    such as ``DATE_FORMAT(col, '%%Y-%%m')``) and a lone ``%`` raises the
+    same TypeError/ValueError pymysql would, even when ``args`` is empty.
+    """
+    if args is None:
+        return query
+    if isinstance(args, dict):
+        return query % {key: f":{key}" for key in args}
+    if isinstance(args, (list, tuple)):
+        return query % tuple("?" for _ in args)
+    return query % "?"
+
+
+def _sqlite_params(args: Any) -> Any:
+    """pymysql-style arguments as SQLite parameters."""
+    if args is None:
+        return ()
+    if isinstance(args, (list, tuple)):
+        return tuple(args)
+    if isinstance(args, dict):
+        return args
+    return (args,)
+
+
+def _translate_error(error: sqlite3.Error, database: str) -> pymysql.Error:
+    """Map a SQLite error to the pymysql exception MySQL would have raised."""
+    message = str(error)
+    match = re.search(r"no such table: (?:[\w$]+\.)?([\w$]+)", message)
+    if match:
+        return pymysql.err.ProgrammingError(
+            1146, f"Table '{database}.{match.group(1)}' doesn't exist"
+        )
+    match = re.search(r"no such column: ([\w$.]+)", message)
+    if match:
+        return pymysql.err.OperationalError(
+            1054, f"Unknown column '{match.group(1)}' in 'field list'"
+        )
+    if "syntax error" in message or "incomplete input" in message:
+        return pymysql.err.ProgrammingError(
+            1064, f"You have an error in your SQL syntax: {message}"
+        )
+    if isinstance(error, sqlite3.IntegrityError):
+        return pymysql.err.IntegrityError(1062, message)
+    if "readonly" in message or "read-only" in message:
+        return pymysql.err.OperationalError(1792, message)
+    return pymysql.err.OperationalError(1105, message)
+
+
+class SQLiteCursor:
+    """pymysql-compatible cursor over a SQLite connection."""
+
+    def __init__(self, connection: "SQLiteConnection", as_dict: bool = True):
+        self.connection = connection
+        self.as_dict = as_dict
+        self.description: Optional[Tuple[Tuple[Any, ...], ...]] = None
+        self.rowcount = -1
+        self.arraysize = 1
+        self.lastrowid: Optional[int] = None
+        self._columns: List[str] = []
+        self._rows: Iterator[tuple] = iter(())
+
+    # -- result handling -------------------------------------------------
+
+    def _set_result(self, columns: List[str], rows: Iterable[tuple], count=-1):
+        self._columns = columns
+        self.description = (
+            tuple((name, None, None, None, None, None, True) for name in columns)
+            if columns
+            else None
+        )
+        self._rows = iter(rows)
+        self.rowcount = count
+
+    def _convert(self, row: Optional[tuple]):
+        if row is None or not self.as_dict:
+            return row
+        return dict(zip(self._columns, row))
+
+    def fetchone(self):
+        return self._convert(next(self._rows, None))
+
+    def fetchmany(self, size: Optional[int] = None):
+        size = size or self.arraysize
+        rows = []
+        for row in self._rows:
+            rows.append(self._convert(row))
+            if len(rows) >= size:
+                break
+        return rows
+
+    def fetchall(self):
+        return [self._convert(row) for row in self._rows]
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self) -> None:
+        self._rows = iter(())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # -- execution ---------------------------------------------------------
+
+    def execute(self, query: str, args: Any = None) -> int:
+        conn = self.connection
+        statement = query.strip().rstrip(";").strip()
+        try:
+            with conn._lock:
+                handled = conn._dispatch_special(self, statement, args)
+                if handled:
+                    return self.rowcount
+                if "information_schema" in statement.lower():
+                    conn._refresh_information_schema()
+                sql = translate_placeholders(statement, args)
+                cursor = conn._sqlite.execute(sql, _sqlite_params(args))
+        except sqlite3.Error as e:
+            raise _translate_error(e, conn.database) from e
+
+        self.lastrowid = cursor.lastrowid
+        if cursor.description:
+            columns = [col[0] for col in cursor.description]
+            self._set_result(columns, _locked_iter(conn, cursor), -1)
+        else:
+            self._set_result([], (), cursor.rowcount)
+        return self.rowcount
+
+    def executemany(self, query: str, args: Iterable[Any]) -> int:
+        total = 0
+        for item in args:
+            total += max(0, self.execute(query, item))
+        self.rowcount = total
+        return total
+
+
+def _locked_iter(conn: "SQLiteConnection", cursor: sqlite3.Cursor) -> Iterator[tuple]:
+    """Stream rows from SQLite while holding the connection lock per batch."""
+    while True:
+        with conn._lock:
+            try:
+                batch = cursor.fetchmany(1000)
+            except sqlite3.Error as e:
+                raise _translate_error(e, conn.database) from e
+        if not batch:
+            return
+        yield from batch
+
+
+class SQLiteConnection:
+    """pymysql-compatible connection backed by a SQLite file."""
+
+    def __init__(
+        self,
+        path: str,
+        database: str = "main",
+        cursorclass: Any = pymysql.cursors.DictCursor,
+        timeout: float = 30.0,
+    ):
+        self.path = str(path)
+        self.database = database
+        self.cursorclass = cursorclass
+        self._lock = threading.RLock()
+        self._info_schema_version: Optional[int] = None
+        self._sqlite = sqlite3.connect(
+            self.path, timeout=timeout, check_same_thread=False, isolation_level=None
+        )
+        if self.path != ":memory:":
+            self._sqlite.execute("PRAGMA journal_mode=WAL")
+        self._sqlite.execute("ATTACH DATABASE ':memory:' AS information_schema")
+        self._sqlite.executescript(_INFO_SCHEMA_DDL)
+        self._register_functions()
+
+    def _register_functions(self) -> None:
+        db = self._sqlite
+        version = f"8.0.0-{SQLITE_VERSION_SUFFIX}-{sqlite3.sqlite_version}"
+        db.create_function("DATABASE", 0, lambda: self.database, deterministic=True)
+        db.create_function("SCHEMA", 0, lambda: self.database, deterministic=True)
+        db.create_function("VERSION", 0, lambda: version, deterministic=True)
+        db.create_function("USER", 0, lambda: "sqlite@localhost")
+        db.create_function("CURRENT_USER", 0, lambda: "sqlite@localhost")
+        db.create_function(
+            "NOW", 0, lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        )
+        db.create_function("CURDATE", 0, lambda: datetime.now().strftime("%Y-%m-%d"))
+        db.create_function("DATE_FORMAT", 2, _date_format, deterministic=True)
+        for part in ("year", "month", "day", "hour", "minute"):
+            db.create_function(part.upper(), 1, _date_part(part), deterministic=True)
+        db.create_function("QUARTER", 1, _quarter, deterministic=True)
+        db.create_function("CONCAT", -1, _concat, deterministic=True)
+        db.create_function("FLOOR", 1, _floor, deterministic=True)
+        db.create_function("UNIX_TIMESTAMP", -1, _unix_timestamp)
+        db.create_function("FROM_UNIXTIME", 1, _from_unixtime, deterministic=True)
+
+    # -- pymysql connection API -------------------------------------------
+
+    def cursor(self, cursor: Any = None) -> SQLiteCursor:
+        cursorclass = cursor or self.cursorclass
+        as_dict = isinstance(cursorclass, type) and issubclass(
+            cursorclass, pymysql.cursors.DictCursorMixin
+        )
+        return SQLiteCursor(self, as_dict=as_dict)
+
+    def begin(self) -> None:
+        with self._lock:
+            if not self._sqlite.in_transaction:
+                self._sqlite.execute("BEGIN")
+
+    def commit(self) -> None:
+        with self._lock:
+            if self._sqlite.in_transaction:
+                self._sqlite.execute("COMMIT")
+
+    def rollback(self) -> None:
+        with self._lock:
+            if self._sqlite.in_transaction:
+                self._sqlite.execute("ROLLBACK")
+
+    def ping(self, reconnect: bool = True) -> None:
+        if not self.open:
+            raise pymysql.err.InterfaceError(0, "Connection is closed")
+
+    @property
+    def open(self) -> bool:
+        return self._sqlite is not None
+
+    def close(self) -> None:
+        if self._sqlite is not None:
+            self._sqlite.close()
+            self._sqlite = None
+
+    def __enter__(self) -> "SQLiteConnection":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # -- MySQL statement emulation ---------------------------------------
+
+    def _dispatch_special(self, cursor: SQLiteCursor, statement: str, args) -> bool:
+        """Handle statements SQLite does not understand; True when handled."""
+        match = _SHOW_TABLES_RE.match(statement)
+        if match:
+            pattern = self._literal_or_arg(match.group(1), args)
+            names = self._table_names(pattern)
+            cursor._set_result(
+                [f"Tables_in_{self.database}"], [(n,) for n in names], len(names)
+            )
+            return True
+
+        match = _DESCRIBE_RE.match(statement)
+        if match and not _EXPLAIN_RE.match(statement):
+            rows = self._describe(match.group(1))
+            cursor._set_result(
+                ["Field", "Type", "Null", "Key", "Default", "Extra"], rows, len(rows)
+            )
+            return True
+
+        match = _SHOW_INDEX_RE.match(statement)
+        if match:
+            rows = self._show_index(match.group(1))
+            cursor._set_result(
+                [
+                    "Table",
+                    "Non_unique",
+                    "Key_name",
+                    "Seq_in_index",
+                    "Column_name",
+                    "Collation",
+                    "Cardinality",
+                    "Sub_part",
+                    "Packed",
+                    "Null",
+                    "Index_type",
+                    "Comment",
+                    "Index_comment",
+                ],
+                rows,
+                len(rows),
+            )
+            return True
+
+        match = _SHOW_CREATE_RE.match(statement)
+        if match:
+            table = match.group(1)
+            row = self._sqlite.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                (table,),
+            ).fetchone()
+            if row is None:
+                raise sqlite3.OperationalError(f"no such table: {table}")
+            cursor._set_result(["Table", "Create Table"], [(table, row[0])], 1)
+            return True
+
+        match = _EXPLAIN_RE.match(statement)
+        if match:
+            inner = statement[match.start(1) :]
+            rows = self._explain(inner, args)
+            cursor._set_result(
+                [
+                    "id",
+                    "select_type",
+                    "table",
+                    "partitions",
+                    "type",
+                    "possible_keys",
+                    "key",
+                    "key_len",
+                    "ref",
+                    "rows",
+                    "filtered",
+                    "Extra",
+                ],
+                rows,
+                len(rows),
+            )
+            return True
+
+        if _BEGIN_RE.match(statement):
+            if self._sqlite.in_transaction:
+                # MySQL implicitly commits the open transaction
+                self._sqlite.execute("COMMIT")
+            self._sqlite.execute("BEGIN")
+            if "consistent snapshot" in " ".join(statement.lower().split()):
+                # WAL readers see the snapshot taken at their first read
+                self._sqlite.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+            cursor._set_result([], (), 0)
+            return True
+
+        lowered = statement.lower()
+        if lowered in ("commit", "rollback"):
+            if self._sqlite.in_transaction:
+                self._sqlite.execute(lowered.upper())
+            cursor._set_result([], (), 0)
+            return True
+
+        if _SET_RE.match(statement):
+            # Session variables (isolation level, sql_mode, ...) are accepted as no-ops
+            cursor._set_result([], (), 0)
+            return True
+
+        if lowered.startswith("show "):
+            raise sqlite3.OperationalError(
+                f"syntax error: unsupported statement in sqlite backend: {statement}"
+            )
+        return False
+
+    @staticmethod
+    def _literal_or_arg(token: Optional[str], args: Any) -> Optional[str]:
+        if token is None:
+            return None
+        if token == "%s":
+            values = list(args or [])
+            return str(values[0]) if values else None
+        return token[1:-1]
+
+    def _table_names(self, pattern: Optional[str] = None) -> List[str]:
+        sql = (
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\' "
+            "AND name NOT LIKE '\\_%' ESCAPE '\\'"
+        )
+        params: Tuple[Any, ...] = ()
+        if pattern is not None:
+            sql += " AND name LIKE ? ESCAPE '\\'"
+            params = (pattern,)
+        return [row[0] for row in self._sqlite.execute(sql + " ORDER BY name", params)]
+
+    def _require_table(self, table: str) -> None:
+        if not self._sqlite.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone():
+            raise sqlite3.OperationalError(f"no such table: {table}")
+
+    def _index_list(self, table: str) -> List[Tuple[str, bool, List[str]]]:
+        """Return ``(name, unique, columns)`` for each index of a table."""
+        indexes = []
+        for row in self._sqlite.execute(f'PRAGMA index_list("{table}")').fetchall():
+            name, unique, origin = row[1], bool(row[2]), row[3]
+            if origin == "pk":
+                continue
+            columns = [
+                info[2] for info in self._sqlite.execute(f'PRAGMA index_info("{name}")')
+            ]
+            indexes.append((name, unique, columns))
+        return indexes
+
+    def _columns(self, table: str) -> List[tuple]:
+        return self._sqlite.execute(f'PRAGMA table_info("{table}")').fetchall()
+
+    def _comments(self, table: str) -> Dict[str, str]:
+        try:
+            rows = self._sqlite.execute(
+                f"SELECT column_name, comment FROM {COMMENTS_TABLE} WHERE table_name = ?",
+                (table,),
+            ).fetchall()
+        except sqlite3.OperationalError:
+            return {}
+        return {column or "": comment or "" for column, comment in rows}
+
+    def _column_keys(self, table: str) -> Dict[str, str]:
+        keys: Dict[str, str] = {}
+        for name, unique, columns in self._index_list(table):
+            if columns and columns[0] not in keys:
+                keys[columns[0]] = "UNI" if unique and len(columns) == 1 else "MUL"
+        for column in self._columns(table):
+            if column[5]:
+                keys[column[1]] = "PRI"
+        return keys
+
+    def _describe(self, table: str) -> List[tuple]:
+        self._require_table(table)
+        keys = self._column_keys(table)
+        rows = []
+        for cid, name, col_type, notnull, default, pk in self._columns(table):
+            col_type = (col_type or "").lower()
+            extra = "auto_increment" if pk and col_type == "integer" else ""
+            rows.append(
+                (
+                    name,
+                    col_type,
+                    "NO" if notnull or pk else "YES",
+                    keys.get(name, ""),
+                    default,
+                    extra,
+                )
+            )
+        return rows
+
+    def _stat(self, table: str, index: Optional[str]) -> List[int]:
+        try:
+            row = self._sqlite.execute(
+                "SELECT stat FROM sqlite_stat1 WHERE tbl = ? AND idx IS ?",
+                (table, index),
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return []
+        if not row or not row[0]:
+            return []
+        return [int(part) for part in str(row[0]).split() if part.isdigit()]
+
+    def _table_rows(self, table: str) -> int:
+        """Row estimate from ANALYZE statistics, counting only as a fallback."""
+        for index in [None] + [name for name, _, _ in self._index_list(table)]:
+            stat = self._stat(table, index)
+            if stat:
+                return stat[0]
+        return self._sqlite.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+    def _show_index(self, table: str) -> List[tuple]:
+        self._require_table(table)
+        total = self._table_rows(table)
+        nullable = {c[1]: "" if c[3] or c[5] else "YES" for c in self._columns(table)}
+        rows = []
+        pk_columns = sorted(
+            (c for c in self._columns(table) if c[5]), key=lambda c: c[5]
+        )
+        for seq, column in enumerate(pk_columns, 1):
+            rows.append(
+                (
+                    table,
+                    0,
+                    "PRIMARY",
+                    seq,
+                    column[1],
+                    "A",
+                    total,
+                    None,
+                    None,
+                    "",
+                    "BTREE",
+                    "",
+                    "",
+                )
+            )
+        for name, unique, columns in self._index_list(table):
+            stat = self._stat(table, name)
+            for seq, column in enumerate(columns, 1):
+                per_key = stat[seq] if len(stat) > seq and stat[seq] else 0
+                cardinality = int(stat[0] / per_key) if per_key else total
+                rows.append(
+                    (
+                        table,
+                        0 if unique else 1,
+                        name,
+                        seq,
+                        column,
+                        "A",
+                        cardinality,
+                        None,
+                        None,
+                        nullable.get(column, "YES"),
+                        "BTREE",
+                        "",
+                        "",
+                    )
+                )
+        return rows
+
+    def _refresh_information_schema(self) -> None:
+        """Rebuild the information_schema tables when the schema changed."""
+        version = self._sqlite.execute("PRAGMA main.schema_version").fetchone()[0]
+        if version == self._info_schema_version:
+            return
+        db = self._sqlite
+        for name in ("TABLES", "COLUMNS", "STATISTICS"):
+            db.execute(f"DELETE FROM information_schema.{name}")
+        for table in self._table_names():
+            comments = self._comments(table)
+            db.execute(
+                "INSERT INTO information_schema.TABLES VALUES (?, ?, 'BASE TABLE', "
+                "'InnoDB', ?, 0, 0, ?)",
+                (self.database, table, self._table_rows(table), comments.get("", "")),
+            )
+            for position, row in enumerate(self._describe(table), 1):
+                name, col_type, null, key, default, extra = row
+                db.execute(
+                    "INSERT INTO information_schema.COLUMNS "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        self.database,
+                        table,
+                        name,
+                        position,
+                        default,
+                        null,
+                        col_type.split("(")[0],
+                        col_type,
+                        key,
+                        extra,
+                        comments.get(name, ""),
+                    ),
+                )
+            for row in self._show_index(table):
+                db.execute(
+                    "INSERT INTO information_schema.STATISTICS "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'BTREE')",
+                    (
+                        self.database,
+                        table,
+                        row[1],
+                        row[2],
+                        row[3],
+                        row[4],
+                        row[6],
+                        row[9],
+                    ),
+                )
+        self._info_schema_version = version
+
+    def _explain(self, query: str, args: Any) -> List[tuple]:
+        """Run EXPLAIN QUERY PLAN and map it onto MySQL's EXPLAIN columns."""
+        aliases: Dict[str, str] = {}
+        for table, alias in _TABLE_REF_RE.findall(query):
+            aliases[table.lower()] = table
+            if alias and alias.lower() not in _NOT_A_TABLE_ALIAS:
+                aliases[alias.lower()] = table
+        has_where = bool(re.search(r"\bwhere\b", query, re.I))
+
+        sql = translate_placeholders(query, args)
+        plan = self._sqlite.execute(
+            f"EXPLAIN QUERY PLAN {sql}", _sqlite_params(args)
+        ).fetchall()
+
+        rows: List[list] = []
+        for _, parent, _, detail in plan:
+            match = _PLAN_RE.match(detail)
+            if match:
+                kind, alias, covering, using, index_name, condition = match.groups()
+                table = aliases.get(alias.lower(), alias)
+                try:
+                    table_rows = self._table_rows(table)
+                except sqlite3.Error:
+                    table_rows = 0
+                extra = []
+                if kind.upper() == "SCAN":
+                    access = "index" if using else "ALL"
+                    examined = table_rows
+                    filtered = 10.0 if has_where and access == "ALL" else 100.0
+                    if has_where and access == "ALL":
+                        extra.append("Using where")
+                else:
+                    if using and "PRIMARY KEY" in using.upper():
+                        access, index_name = "const", "PRIMARY"
+                        examined = 1
+                    else:
+                        access = (
+                            "range"
+                            if condition and (">" in condition or "<" in condition)
+                            else "ref"
+                        )
+                        stat = self._stat(table, index_name)
+                        examined = (
+                            stat[1] if len(stat) > 1 else max(1, table_rows // 10)
+                        )
+                    filtered = 100.0
+                if covering:
+                    extra.append("Using index")
+                rows.append(
+                    [
+                        1 if parent == 0 else 2,
+                        "SIMPLE" if parent == 0 else "SUBQUERY",
+                        alias,
+                        None,
+                        access,
+                        index_name,
+                        index_name,
+                        None,
+                        "const" if condition else None,
+                        examined,
+                        filtered,
+                        extra,
+                    ]
+                )
+            elif rows and "TEMP B-TREE" in detail.upper():
+                note = (
+                    "Using filesort"
+                    if "ORDER BY" in detail.upper()
+                    else "Using temporary"
+                )
+                rows[-1][11].append(note)
+
+        return [tuple(row[:11]) + ("; ".join(row[11]) or None,) for row in rows]
+
+
+def connect(
+    sqlite_path: str = ":memory:",
+    database: str = "main",
+    cursorclass: Any = pymysql.cursors.DictCursor,
+    connect_timeout: float = 30.0,
+    **_: Any,
+) -> SQLiteConnection:
+    """Open a stand-in connection; accepts (and ignores) pymysql-only kwargs."""
+    return SQLiteConnection(
+        sqlite_path, database=database, cursorclass=cursorclass, timeout=connect_timeout
+    )
+
+
+# -- deterministic synthetic datasets -----------------------------------------
+
+_CITIES = [
+    "北京",
+    "上海",
+    "广州",
+    "深圳",
+    "杭州",
+    "成都",
+    "武汉",
+    "西安",
+    "南京",
+    "重庆",
+]
+_CATEGORIES = [
+    "electronics",
+    "books",
+    "clothing",
+    "home",
+    "sports",
+    "toys",
+    "food",
+    "beauty",
+]
+_STATUSES = ["pending", "paid", "shipped", "completed", "refunded", "cancelled"]
+_STATUS_WEIGHTS = [5, 15, 20, 50, 5, 5]
+_BASE_TIME = datetime(2023, 1, 1)
+
+_ECOMMERCE_DDL = """
+DROP TABLE IF EXISTS customers;
+DROP TABLE IF EXISTS products;
+DROP TABLE IF EXISTS orders;
+CREATE TABLE customers (
+    id INTEGER PRIMARY KEY,
+    name varchar(64) NOT NULL,
+    city varchar(32),
+    created_at datetime NOT NULL
+);
+CREATE TABLE products (
+    id INTEGER PRIMARY KEY,
+    name varchar(128) NOT NULL,
+    category varchar(32) NOT NULL,
+    price decimal(10,2) NOT NULL
+);
+CREATE TABLE orders (
+    id INTEGER PRIMARY KEY,
+    customer_id bigint NOT NULL,
+    product_id bigint NOT NULL,
+    quantity int NOT NULL,
+    amount decimal(12,2) NOT NULL,
+    status varchar(16) NOT NULL,
+    created_at datetime NOT NULL
+);
+"""
+
+
+def _insert_batches(
+    conn: sqlite3.Connection,
+    table: str,
+    columns: List[str],
+    rows: Iterable[tuple],
+    batch_size: int,
+    progress: Optional[Callable[[str, int], None]] = None,
+) -> int:
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+    total = 0
+    batch: List[tuple] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.executemany(sql, batch)
+            total += len(batch)
+            batch.clear()
+            if progress:
+                progress(table, total)
+    if batch:
+        conn.executemany(sql, batch)
+        total += len(batch)
+        if progress:
+            progress(table, total)
+    return total
+
+
+def _open_for_load(path: str) -> sqlite3.Connection:
+    if path != ":memory:":
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {COMMENTS_TABLE} "
+        "(table_name TEXT, column_name TEXT, comment TEXT)"
+    )
+    return conn
+
+
+def _set_comments(conn: sqlite3.Connection, table: str, comments: Dict[str, str]):
+    conn.execute(f"DELETE FROM {COMMENTS_TABLE} WHERE table_name = ?", (table,))
+    conn.executemany(
+        f"INSERT INTO {COMMENTS_TABLE} VALUES (?, ?, ?)",
+        [(table, column, comment) for column, comment in comments.items()],
+    )
+
+
+def generate_ecommerce_dataset(
+    path: str,
+    orders: int = 100_000,
+    customers: Optional[int] = None,
+    products: Optional[int] = None,
+    seed: int = 42,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress: Optional[Callable[[str, int], None]] = None,
+) -> Dict[str, int]:
+    """Build a deterministic e-commerce database (customers, products, orders).
+
+    The same arguments always produce the same rows. Rows are generated and
+    inserted in batches, so ``orders`` can go up to tens of millions without
+    holding the data in memory. ``orders.status`` and ``orders.created_at`` are
+    deliberately left unindexed so the index advisor has work to do.
+    """
+    customers = customers or max(1, orders // 10)
+    products = products or max(1, min(10_000, orders // 100))
+    conn = _open_for_load(path)
+    try:
+        conn.executescript(_ECOMMERCE_DDL)
+        _set_comments(
+            conn,
+            "customers",
+            {
+                "": "客户",
+                "name": "客户名称",
+                "city": "所在城市",
+                "created_at": "注册时间",
+            },
+        )
+        _set_comments(
+            conn,
+            "products",
+            {"": "商品", "name": "商品名称", "category": "商品类目", "price": "单价"},
+        )
+        _set_comments(
+            conn,
+            "orders",
+            {
+                "": "订单",
+                "customer_id": "客户ID",
+                "product_id": "商品ID",
+                "quantity": "购买数量",
+                "amount": "订单金额",
+                "status": "订单状态",
+                "created_at": "下单时间",
+            },
+        )
+
+        rng = random.Random(seed)
+        span = 730 * 86400
+
+        def customer_rows():
+            for i in range(1, customers + 1):
+                created = _BASE_TIME + timedelta(seconds=rng.randrange(span))
+                yield (
+                    i,
+                    f"customer_{i:08d}",
+                    rng.choice(_CITIES),
+                    created.strftime("%Y-%m-%d %H:%M:%S"),
+                )
+
+        prices: List[float] = []
+
+        def product_rows():
+            for i in range(1, products + 1):
+                price = round(rng.uniform(1, 2000), 2)
+                prices.append(price)
+                yield (i, f"product_{i:06d}", rng.choice(_CATEGORIES), price)
+
+        def order_rows():
+            for i in range(1, orders + 1):
+                product_id = rng.randrange(products) + 1
+                quantity = rng.randint(1, 5)
+                created = _BASE_TIME + timedelta(seconds=rng.randrange(span))
+                yield (
+                    i,
+                    rng.randrange(customers) + 1,
+                    product_id,
+                    quantity,
+                    round(prices[product_id - 1] * quantity, 2),
+                    rng.choices(_STATUSES, _STATUS_WEIGHTS)[0],
+                    created.strftime("%Y-%m-%d %H:%M:%S"),
+                )
+
+        conn.execute("BEGIN")
+        counts = {
+            "customers": _insert_batches(
+                conn,
+                "customers",
+                ["id", "name", "city", "created_at"],
+                customer_rows(),
+                batch_size,
+                progress,
+            ),
+            "products": _insert_batches(
+                conn,
+                "products",
+                ["id", "name", "category", "price"],
+                product_rows(),
+                batch_size,
+                progress,
+            ),
+            "orders": _insert_batches(
+                conn,
+                "orders",
+                [
+                    "id",
+                    "customer_id",
+                    "product_id",
+                    "quantity",
+                    "amount",
+                    "status",
+                    "created_at",
+                ],
+                order_rows(),
+                batch_size,
+                progress,
+            ),
+        }
+        conn.execute("CREATE INDEX idx_orders_customer ON orders (customer_id)")
+        conn.execute("CREATE INDEX idx_products_category ON products (category)")
+        conn.execute("COMMIT")
+        conn.execute("ANALYZE")
+        return counts
+    finally:
+        conn.close()
+
+
+def generate_wide_catalog(
+    path: str,
+    tables: int = 1000,
+    columns: int = 12,
+    rows_per_table: int = 0,
+    seed: int = 42,
+) -> Dict[str, int]:
+    """Build a deterministic database with many tables for schema-search tests."""
+    rng = random.Random(seed)
+    domains = [
+        "order",
+        "customer",
+        "invoice",
+        "shipment",
+        "refund",
+        "payment",
+        "inventory",
+        "supplier",
+        "campaign",
+        "ticket",
+        "device",
+        "flight",
+    ]
+    suffixes = ["log", "history", "daily", "snapshot", "detail", "summary", "archive"]
+    conn = _open_for_load(path)
+    try:
+        conn.execute("BEGIN")
+        for t in range(tables):
+            table = f"{rng.choice(domains)}_{rng.choice(suffixes)}_{t:05d}"
+            column_names = ["id"] + [
+                f"{rng.choice(domains)}_{rng.choice(['id', 'code', 'amount', 'status', 'at'])}_{c}"
+                for c in range(1, columns)
+            ]
+            definitions = ["id INTEGER PRIMARY KEY"] + [
+                f"{name} varchar(32)" for name in column_names[1:]
+            ]
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(f"CREATE TABLE {table} ({', '.join(definitions)})")
+            _set_comments(conn, table, {"": f"{table.split('_')[0]} 数据表 {t}"})
+            if rows_per_table:
+                _insert_batches(
+                    conn,
+                    table,
+                    column_names,
+                    (
+                        (r,)
+                        + tuple(f"v{rng.randrange(1000)}" for _ in column_names[1:])
+                        for r in range(1, rows_per_table + 1)
+                    ),
+                    DEFAULT_BATCH_SIZE,
+                )
+        conn.execute("COMMIT")
+        return {"tables": tables}
+    finally:
+        conn.close()
+
+
+DATASET_GENERATORS: Dict[str, Callable[..., Dict[str, int]]] = {
+    "ecommerce": generate_ecommerce_dataset,
+    "catalog": generate_wide_catalog,
+}
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Generate a deterministic SQLite database for the MySQL stand-in"
+    )
+    parser.add_argument("dataset", choices=sorted(DATASET_GENERATORS))
+    parser.add_argument("--path", default="workspace/mysql_fake.db")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--orders", type=int, default=100_000, help="ecommerce: orders")
+    parser.add_argument("--tables", type=int, default=1000, help="catalog: tables")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    started = time.perf_counter()
+    if args.dataset == "ecommerce":
+        result = generate_ecommerce_dataset(
+            args.path,
+            orders=args.orders,
+            seed=args.seed,
+            progress=lambda table, n: print(f"\r{table}: {n}", end="", flush=True),
+        )
+    else:
+        result = generate_wide_catalog(args.path, tables=args.tables, seed=args.seed)
+    print(
+        f"\nGenerated {result} in {time.perf_counter() - started:.1f}s -> {args.path}"
+    )
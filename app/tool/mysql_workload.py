@@ -0,0 +1,99 @@
+"""Process-wide capture of the query shapes executed by the MySQL tools."""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.tool.mysql_lexer import fingerprint, fingerprint_id
+
+
+class QueryFingerprintStats(BaseModel):
+    """Aggregated execution statistics for one query fingerprint"""
+
+    fingerprint_id: str
+    fingerprint: str
+    sample_query: str = Field(..., description="Most recent concrete query text")
+    sample_params: List[Any] = Field(default_factory=list)
+    executions: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    total_rows: int = 0
+    first_seen: float = Field(default_factory=time.time)
+    last_seen: float = Field(default_factory=time.time)
+
+    @property
+    def avg_time(self) -> float:
+        return self.total_time / self.executions if self.executions else 0.0
+
+
+class QueryWorkload:
+    """Thread-safe registry of query fingerprints and their statistics.
+
+    The registry is bounded: once ``max_fingerprints`` distinct shapes have
+    been seen, the least recently used one is evicted.
+    """
+
+    def __init__(self, max_fingerprints: int = 1000):
+        self.max_fingerprints = max_fingerprints
+        self._stats: Dict[str, QueryFingerprintStats] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        query: str,
+        params: Optional[List[Any]],
+        duration: float,
+        row_count: int = 0,
+    ) -> QueryFingerprintStats:
+        """Record one execution of a query."""
+        text = fingerprint(query)
+        key = fingerprint_id(query, text)
+        now = time.time()
+
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    oldest = min(self._stats.values(), key=lambda s: s.last_seen)
+                    del self._stats[oldest.fingerprint_id]
+                stats = QueryFingerprintStats(
+                    fingerprint_id=key, fingerprint=text, sample_query=query
+                )
+                self._stats[key] = stats
+
+            stats.sample_query = query
+            stats.sample_params = list(params or [])
+            stats.executions += 1
+            stats.total_time += duration
+            stats.max_time = max(stats.max_time, duration)
+            stats.total_rows += row_count
+            stats.last_seen = now
+            return stats
+
+    def top(
+        self, limit: int = 10, min_executions: int = 1, order_by: str = "total_time"
+    ) -> List[QueryFingerprintStats]:
+        """Return the heaviest fingerprints, ordered by ``order_by``."""
+        with self._lock:
+            candidates = [
+                stats.model_copy()
+                for stats in self._stats.values()
+                if stats.executions >= min_executions
+            ]
+        candidates.sort(key=lambda s: getattr(s, order_by), reverse=True)
+        return candidates[:limit]
+
+    def get(self, key: str) -> Optional[QueryFingerprintStats]:
+        with self._lock:
+            stats = self._stats.get(key)
+            return stats.model_copy() if stats else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+# Shared workload registry used by the MySQL tools
+QUERY_WORKLOAD = QueryWorkload()
@@ -3,6 +3,7 @@ import sys
 from io import StringIO
 from typing import Dict
 
+from app.tool.artifacts import load_artifact
 from app.tool.base import BaseTool
 
 
@@ -12,6 +13,7 @@ class PythonExecute(BaseTool):
     name: str = "python_execute"
     description: str = (
         "执行Python代码字符串。注意：只有打印输出可见，函数返回值不会被捕获。使用print语句查看结果。"
+        "可直接调用load_artifact(句柄)将查询结果文件读取为pandas DataFrame（内存映射，无需解析）。"
     )
     parameters: dict = {
         "type": "object",
@@ -94,6 +96,7 @@ class PythonExecute(BaseTool):
                 safe_globals = {"__builtins__": __builtins__}
             else:
                 safe_globals = {"__builtins__": __builtins__.__dict__.copy()}
+            safe_globals["load_artifact"] = load_artifact
             proc = multiprocessing.Process(
                 target=self._run_code, args=(code, result, safe_globals)
             )
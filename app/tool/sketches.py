@@ -0,0 +1,431 @@
+"""Mergeable streaming sketches for large query results.
+
+The sketches are updated batch by batch while rows stream into an artifact,
+so statistics over tens of millions of rows need constant memory:
+
+- :class:`HyperLogLog` estimates distinct counts (about 0.8% relative error
+  with the default precision).
+- :class:`QuantileSketch` is a KLL sketch for approximate quantiles of
+  numeric columns.
+- :class:`HeavyHitters` is a mergeable Misra-Gries summary (the deterministic
+  counterpart of space-saving) for the most frequent values, with a per-value
+  error bound.
+
+All sketches serialize to plain JSON so they can be stored next to the
+artifact they describe.
+"""
+
+import base64
+import hashlib
+import math
+import random
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+
+DEFAULT_HLL_PRECISION = 14
+DEFAULT_QUANTILE_K = 200
+DEFAULT_HEAVY_HITTERS = 64
+DEFAULT_QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.99)
+
+_JSON_SCALARS = (str, int, float, bool, type(None))
+
+
+def _hash64(value: Any) -> int:
+    """Stable 64-bit hash (Python's ``hash`` is salted per process)."""
+    if isinstance(value, bytes):
+        data = value
+    else:
+        data = str(value).encode("utf-8", "surrogatepass")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def _as_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        number = float(value)
+        return None if math.isnan(number) else number
+    return None
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, _JSON_SCALARS):
+        return value
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    if isinstance(value, (Decimal, timedelta)):
+        return str(value)
+    return str(value)
+
+
+class HyperLogLog:
+    """HyperLogLog distinct-count estimator."""
+
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+
+    def add(self, value: Any) -> None:
+        self.add_hash(_hash64(value))
+
+    def add_hash(self, hashed: int) -> None:
+        index = hashed & (self.m - 1)
+        remaining = hashed >> self.precision
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[Any]) -> None:
+        for value in values:
+            self.add_hash(_hash64(value))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def estimate(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        harmonic = sum(2.0**-register for register in self.registers)
+        estimate = alpha * self.m * self.m / harmonic
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Small-range correction (linear counting)
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "precision": self.precision,
+            "registers": base64.b64encode(bytes(self.registers)).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HyperLogLog":
+        sketch = cls(data["precision"])
+        sketch.registers = bytearray(base64.b64decode(data["registers"]))
+        return sketch
+
+
+class QuantileSketch:
+    """KLL sketch for approximate quantiles of a numeric stream.
+
+    Items live in a hierarchy of compactors; an item at level ``h`` stands for
+    ``2**h`` input values. Full compactors are sorted and every other item is
+    promoted, which keeps the rank error around ``1.7 / k`` with roughly
+    ``3k`` retained items.
+    """
+
+    def __init__(self, k: int = DEFAULT_QUANTILE_K, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.compactors: List[List[float]] = [[]]
+        self._rng = random.Random(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def _size(self) -> int:
+        return sum(len(compactor) for compactor in self.compactors)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def update(self, values: Iterable[float]) -> None:
+        batch = [float(value) for value in values]
+        if not batch:
+            return
+        self.n += len(batch)
+        low, high = min(batch), max(batch)
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        self.compactors[0].extend(batch)
+        self._compress()
+
+    def _compress(self) -> None:
+        while self._size() >= self._max_size():
+            for level in range(len(self.compactors)):
+                compactor = self.compactors[level]
+                if len(compactor) < self._capacity(level):
+                    continue
+                if level + 1 == len(self.compactors):
+                    self.compactors.append([])
+                compactor.sort()
+                leftover = compactor.pop() if len(compactor) % 2 else None
+                offset = self._rng.randint(0, 1)
+                self.compactors[level + 1].extend(compactor[offset::2])
+                self.compactors[level] = [] if leftover is None else [leftover]
+                if self._size() < self._max_size():
+                    break
+
+    def merge(self, other: "QuantileSketch") -> None:
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.n += other.n
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        """Approximate values at the given ranks (0 <= q <= 1)."""
+        if self.n == 0:
+            return [None for _ in qs]
+        weighted = sorted(
+            (item, 1 << level)
+            for level, compactor in enumerate(self.compactors)
+            for item in compactor
+        )
+        total = sum(weight for _, weight in weighted)
+        results = []
+        for q in qs:
+            if q <= 0:
+                results.append(self.min)
+                continue
+            if q >= 1:
+                results.append(self.max)
+                continue
+            target = q * total
+            cumulative = 0
+            value = weighted[-1][0]
+            for item, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    value = item
+                    break
+            results.append(value)
+        return results
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "k": self.k,
+            "n": self.n,
+            "min": self.min,
+            "max": self.max,
+            "compactors": self.compactors,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(data["k"])
+        sketch.n = data["n"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        sketch.compactors = [list(items) for items in data["compactors"]] or [[]]
+        return sketch
+
+
+class HeavyHitters:
+    """Mergeable Misra-Gries summary of the most frequent values.
+
+    Stored counts never overestimate; the true count of a value lies in
+    ``[count, count + decrement]``, and ``decrement`` is at most
+    ``n / (capacity + 1)``.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_HEAVY_HITTERS):
+        self.capacity = capacity
+        self.counts: Counter = Counter()
+        self.n = 0
+        self.decrement = 0
+
+    def update(self, values: Iterable[Any]) -> None:
+        batch = Counter(values)
+        self.n += sum(batch.values())
+        self.counts.update(batch)
+        self._prune()
+
+    def _prune(self) -> None:
+        if len(self.counts) <= self.capacity:
+            return
+        cutoff = sorted(self.counts.values(), reverse=True)[self.capacity]
+        self.decrement += cutoff
+        self.counts = Counter(
+            {
+                value: count - cutoff
+                for value, count in self.counts.items()
+                if count > cutoff
+            }
+        )
+
+    def merge(self, other: "HeavyHitters") -> None:
+        self.n += other.n
+        self.decrement += other.decrement
+        self.counts.update(other.counts)
+        self._prune()
+
+    def top(self, k: int = 10) -> List[Dict[str, Any]]:
+        return [
+            {
+                "value": _json_value(value),
+                "count": count,
+                "max_count": count + self.decrement,
+            }
+            for value, count in self.counts.most_common(k)
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "n": self.n,
+            "decrement": self.decrement,
+            "counts": [[_json_value(v), c] for v, c in self.counts.most_common()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HeavyHitters":
+        sketch = cls(data["capacity"])
+        sketch.n = data["n"]
+        sketch.decrement = data["decrement"]
+        sketch.counts = Counter({value: count for value, count in data["counts"]})
+        return sketch
+
+
+class ColumnSketch:
+    """Distinct count, heavy hitters and (for numbers) quantiles of one column."""
+
+    def __init__(self):
+        self.count = 0
+        self.nulls = 0
+        self.distinct = HyperLogLog()
+        self.heavy_hitters = HeavyHitters()
+        self.quantiles: Optional[QuantileSketch] = None
+
+    def update(self, values: List[Any]) -> None:
+        present = [value for value in values if value is not None]
+        self.nulls += len(values) - len(present)
+        self.count += len(present)
+        if not present:
+            return
+        self.distinct.update(present)
+        self.heavy_hitters.update(
+            value if isinstance(value, _JSON_SCALARS) else _json_value(value)
+            for value in present
+        )
+        numbers = [n for n in map(_as_number, present) if n is not None]
+        if numbers:
+            if self.quantiles is None:
+                self.quantiles = QuantileSketch()
+            self.quantiles.update(numbers)
+
+    def summary(
+        self, qs: Sequence[float] = DEFAULT_QUANTILES, top_k: int = 10
+    ) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "count": self.count,
+            "nulls": self.nulls,
+            "distinct_estimate": self.distinct.estimate(),
+            "distinct_relative_error": round(self.distinct.relative_error, 4),
+            "top_values": self.heavy_hitters.top(top_k),
+        }
+        if self.quantiles is not None and self.quantiles.n:
+            result["min"] = self.quantiles.min
+            result["max"] = self.quantiles.max
+            result["quantiles"] = {
+                f"p{q * 100:g}": value
+                for q, value in zip(qs, self.quantiles.quantiles(qs))
+            }
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "nulls": self.nulls,
+            "distinct": self.distinct.to_dict(),
+            "heavy_hitters": self.heavy_hitters.to_dict(),
+            "quantiles": self.quantiles.to_dict() if self.quantiles else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ColumnSketch":
+        sketch = cls()
+        sketch.count = data["count"]
+        sketch.nulls = data["nulls"]
+        sketch.distinct = HyperLogLog.from_dict(data["distinct"])
+        sketch.heavy_hitters = HeavyHitters.from_dict(data["heavy_hitters"])
+        if data.get("quantiles"):
+            sketch.quantiles = QuantileSketch.from_dict(data["quantiles"])
+        return sketch
+
+
+class ResultSketch:
+    """Per-column sketches of a result set, updated batch by batch."""
+
+    def __init__(self):
+        self.row_count = 0
+        self.columns: Dict[str, ColumnSketch] = {}
+
+    def update(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        self.row_count += len(rows)
+        names = list(self.columns) or list(rows[0].keys())
+        for name in names:
+            column = self.columns.get(name)
+            if column is None:
+                column = self.columns[name] = ColumnSketch()
+            column.update([row.get(name) for row in rows])
+
+    def update_columns(self, columns: Dict[str, List[Any]]) -> None:
+        """Update from column-oriented data (e.g. ``RecordBatch.to_pydict()``)."""
+        if not columns:
+            return
+        self.row_count += len(next(iter(columns.values())))
+        for name, values in columns.items():
+            column = self.columns.get(name)
+            if column is None:
+                column = self.columns[name] = ColumnSketch()
+            column.update(values)
+
+    def summary(
+        self,
+        columns: Optional[List[str]] = None,
+        qs: Sequence[float] = DEFAULT_QUANTILES,
+        top_k: int = 10,
+    ) -> Dict[str, Any]:
+        names = columns or list(self.columns)
+        unknown = [name for name in names if name not in self.columns]
+        if unknown:
+            raise KeyError(
+                f"Unknown columns: {', '.join(unknown)}. "
+                f"Available: {', '.join(self.columns)}"
+            )
+        return {
+            "row_count": self.row_count,
+            "columns": {name: self.columns[name].summary(qs, top_k) for name in names},
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "row_count": self.row_count,
+            "columns": {
+                name: column.to_dict() for name, column in self.columns.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ResultSketch":
+        sketch = cls()
+        sketch.row_count = data["row_count"]
+        sketch.columns = {
+            name: ColumnSketch.from_dict(column)
+            for name, column in data["columns"].items()
+        }
+        return sketch
@@ -1,11 +1,43 @@
 """Collection classes for managing multiple tools."""
-from typing import Any, Dict, List
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Sequence
 
 from app.exceptions import ToolError
 from app.logger import logger
 from app.tool.base import BaseTool, ToolFailure, ToolResult
 
 
+class ToolCatalog:
+    """Serialized tool schemas as they are sent to the LLM.
+
+    Built once per tool set: the wire JSON, its hash (stable across
+    processes, usable as a prompt-cache key) and token counts per tokenizer.
+    """
+
+    def __init__(self, params: Sequence[Dict[str, Any]], version: int = 0):
+        self.params: List[Dict[str, Any]] = list(params)
+        self.version = version
+        self.schema = json.dumps(
+            self.params, ensure_ascii=False, separators=(",", ":"), sort_keys=True
+        )
+        self.hash = hashlib.sha256(self.schema.encode("utf-8")).hexdigest()[:16]
+        self._token_counts: Dict[Any, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.params)
+
+    def token_count(self, tokenizer) -> int:
+        """Tokens of the serialized schema, encoded once per tokenizer."""
+        if not self.params:
+            return 0
+        key = getattr(tokenizer, "name", None) or id(tokenizer)
+        if key not in self._token_counts:
+            self._token_counts[key] = len(tokenizer.encode(self.schema))
+        return self._token_counts[key]
+
+
 class ToolCollection:
     """A collection of defined tools."""
 
@@ -15,12 +47,34 @@ class ToolCollection:
     def __init__(self, *tools: BaseTool):
         self.tools = tools
         self.tool_map = {tool.name: tool for tool in tools}
+        self._catalog: Optional[ToolCatalog] = None
+        self._catalog_tools: Optional[tuple] = None
+        self._catalog_version = 0
 
     def __iter__(self):
         return iter(self.tools)
 
+    @property
+    def catalog(self) -> ToolCatalog:
+        """The precompiled catalog, rebuilt when the tool set changes.
+
+        Every change (add_tool, MCP connect/disconnect) replaces the ``tools``
+        tuple, so comparing its identity is enough to detect a stale catalog.
+        """
+        if self._catalog is None or self._catalog_tools is not self.tools:
+            self._catalog_version += 1
+            self._catalog = ToolCatalog(
+                [tool.to_param() for tool in self.tools], self._catalog_version
+            )
+            self._catalog_tools = self.tools
+        return self._catalog
+
+    def invalidate_catalog(self) -> None:
+        """Force a rebuild after a tool's schema was edited in place."""
+        self._catalog = None
+
     def to_params(self) -> List[Dict[str, Any]]:
-        return [tool.to_param() for tool in self.tools]
+        return self.catalog.params
 
     async def execute(
         self, *, name: str, tool_input: Dict[str, Any] = None
@@ -28,6 +28,19 @@ from pydantic import BaseModel
 # 导入OpenManus引擎
 from app.agent.manus import SimpleManus
 from app.flow.flow_factory import FlowFactory, FlowType
+from app.llm import LLM
+from app.llm_rate_limit import LLM_RATE_LIMITERS
+from app.llm_retry import llm_deadline
+from app.llm_http import LLM_HTTP_CLIENTS
+from app.llm_prompt_cache import PromptCacheStats, track_prompt_cache
+from app.llm_router import RoutedClient
+from app.llm_stream import TokenStream, stream_tokens
+from app.llm_usage import UsageLedger, track_usage
+from app.tool.mysql_admission import ADMISSION_CONTROLLER
+from app.tool.mysql_jobs import job_owner
+from app.tool.mysql_singleflight import QUERY_SINGLE_FLIGHT
+from app.tool.mysql_snapshot import SNAPSHOT_SESSIONS
+
 
 app = FastAPI(title="智能分析平台Web - 数据库分析界面", version="1.0.0")
 
@@ -292,6 +305,12 @@ def update_session_progress(progress: int, step_info: str):
         pass
 
 
+@app.on_event("shutdown")
+async def close_llm_http_pools():
+    """关闭LLM客户端共享的HTTP连接池"""
+    await LLM_HTTP_CLIENTS.aclose()
+
+
 @app.get("/health")
 async def health_check():
     """健康检查"""
@@ -396,18 +415,54 @@ async def process_prompt(prompt: str, session_id: str, flow_type: str = "plannin
         update_session_progress(20, "开始执行数据库分析...")
         sessions[session_id]["log"].append("🔄 正在执行分析任务...")
 
+        # 流式输出的LLM回答（如最终报告）通过WebSocket实时推送给该会话
+        async def send_tokens(delta: str, final: bool):
+            await manager.send_personal_message(
+                {
+                    "type": "llm_token",
+                    "delta": delta,
+                    "final": final,
+                    # 每次流式回答的编号，前端据此区分新旧回答
+                    "stream_id": token_stream.responses,
+                    "timestamp": asyncio.get_event_loop().time(),
+                },
+                session_id,
+            )
+
+        token_stream = TokenStream(send_tokens)
+        prompt_cache = PromptCacheStats()
+        # 本会话的token与费用账本及预算，与其他会话互不影响
+        usage_ledger = UsageLedger()
+
         try:
             # Add timeout for the entire flow execution
-            async with asyncio.timeout(300.0):  # 5 minute timeout
-                result = await flow.execute(prompt)
+            # LLM retries stop at the same deadline instead of being cut off by it
+            with llm_deadline(300.0), stream_tokens(token_stream), track_prompt_cache(
+                prompt_cache
+            ), track_usage(usage_ledger), job_owner(session_id):
+                async with asyncio.timeout(300.0):  # 5 minute timeout
+                    result = await flow.execute(prompt)
         except asyncio.TimeoutError:
             raise Exception("分析任务超时(5分钟)，请尝试简化分析需求")
         except asyncio.CancelledError:
             # Handle cancellation gracefully
             sessions[session_id]["log"].append("⚠️ 任务被取消")
             raise Exception("分析任务被取消")
+        finally:
+            # Failed and cancelled sessions report what they spent as well
+            sessions[session_id]["usage"] = usage_ledger.export()
 
         # 完成
+        sessions[session_id]["streaming"] = token_stream.metrics()
+        sessions[session_id]["prompt_cache"] = prompt_cache.metrics()
+        loguru_logger.info(
+            f"Prompt cache hit ratio for session {session_id}: "
+            f"{prompt_cache.hit_ratio:.1%} of {prompt_cache.prompt_tokens} prompt tokens"
+        )
+        loguru_logger.info(
+            f"Usage for session {session_id}: {usage_ledger.total_tokens} tokens, "
+            f"cost {usage_ledger.cost:.4f}"
+        )
         sessions[session_id]["status"] = "completed"
         sessions[session_id]["result"] = str(result)
         sessions[session_id]["log"].append("🎉 智能分析平台分析任务完成!")
@@ -418,6 +473,7 @@ async def process_prompt(prompt: str, session_id: str, flow_type: str = "plannin
             {
                 "type": "task_completed",
                 "result": str(result),
+                "usage": sessions[session_id].get("usage"),
                 "timestamp": asyncio.get_event_loop().time(),
             },
             session_id,
@@ -463,6 +519,7 @@ async def process_prompt(prompt: str, session_id: str, flow_type: str = "plannin
             {
                 "type": "task_failed",
                 "error": str(e),
+                "usage": sessions[session_id].get("usage"),
                 "timestamp": asyncio.get_event_loop().time(),
             },
             session_id,
@@ -552,9 +609,42 @@ async def debug_chat_session(session_id: str):
             "step_info": session_data.get("step_info", ""),
             "error": session_data.get("error"),
             "result": session_data.get("result"),
+            "streaming": session_data.get("streaming"),
+            "prompt_cache": session_data.get("prompt_cache"),
+            "usage": session_data.get("usage"),
         }
 
 
+@app.get("/api/debug/mysql")
+async def debug_mysql_admission():
+    """调试：获取各数据库端点的并发准入指标（执行数、队列深度、等待时间）、查询合并统计和快照会话"""
+    return {
+        "endpoints": ADMISSION_CONTROLLER.metrics(),
+        "single_flight": QUERY_SINGLE_FLIGHT.metrics(),
+        "snapshot_sessions": SNAPSHOT_SESSIONS.metrics(),
+    }
+
+
+@app.get("/api/debug/llm")
+async def debug_llm_rate_limits():
+    """调试：获取各模型端点的速率限制指标（RPM/TPM额度、排队深度、等待时间、429次数）、重试/对冲统计、多端点路由状态、HTTP连接池使用率和提示词缓存命中率"""
+    return {
+        "endpoints": LLM_RATE_LIMITERS.metrics(),
+        "retry": {
+            name: llm.retry_policy.metrics() for name, llm in LLM._instances.items()
+        },
+        "http_pools": LLM_HTTP_CLIENTS.metrics(),
+        "prompt_cache": {
+            name: llm.prompt_cache.metrics() for name, llm in LLM._instances.items()
+        },
+        "routing": {
+            name: llm.client.metrics()
+            for name, llm in LLM._instances.items()
+            if isinstance(llm.client, RoutedClient)
+        },
+    }
+
+
 @app.post("/api/chat/{session_id}/cancel")
 async def cancel_chat_session(session_id: str):
     """取消会话"""
@@ -29,6 +29,11 @@ class ChatComponent {
             this.appendAssistantDetail(data.content);
         });
 
+        // 监听流式输出的回答
+        window.eventBus.on('analysis:stream', (data) => {
+            this.appendAssistantStream(data.delta, data.final, data.streamId);
+        });
+
         // 监听最终结果
         window.eventBus.on('analysis:final', (data) => {
             this.finalizeAssistantMessage(data.content, data.timestamp);
@@ -360,6 +365,35 @@ class ChatComponent {
         }
     }
 
+    /**
+     * 在助手思考气泡中逐步显示流式输出的回答
+     * 新的流式回答（编号变化或上一次回答已结束）会替换而不是接在旧内容后面
+     */
+    appendAssistantStream(delta, final = false, streamId = undefined) {
+        const message = this.pendingAssistant;
+        if (!message) return;
+
+        if (message.streamEnded || (streamId !== undefined && streamId !== message.streamId)) {
+            message.streamed = '';
+            message.streamEnded = false;
+        }
+        message.streamId = streamId;
+        if (delta) {
+            message.streamed = (message.streamed || '') + delta;
+        }
+        if (final) {
+            // 本次回答结束，下一段流式输出重新开始
+            message.streamEnded = true;
+        }
+        if (!delta) return;
+
+        const summaryDiv = document.querySelector(`[data-message-id="${message.id}"] .assistant-summary`);
+        if (summaryDiv) {
+            summaryDiv.innerHTML = this.formatMessageContent(message.streamed);
+            this.scrollToBottom();
+        }
+    }
+
     /**
      * 完成助手消息，将最终结果显示，并保留可展开的思考过程
      */
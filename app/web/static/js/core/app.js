@@ -168,6 +168,10 @@ class AnalysisPlatformApp {
                 this.handleLogMessage(message);
                 break;
 
+            case 'llm_token':
+                this.handleTokenMessage(message);
+                break;
+
             case 'result':
             case 'task_completed':
                 this.handleResultMessage(message);
@@ -230,6 +234,17 @@ class AnalysisPlatformApp {
         });
     }
 
+    /**
+     * 处理流式输出的回答片段
+     */
+    handleTokenMessage(data) {
+        window.eventBus.emit('analysis:stream', {
+            delta: data.delta || '',
+            final: !!data.final,
+            streamId: data.stream_id
+        });
+    }
+
     /**
      * 处理结果消息
      */
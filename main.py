@@ -2,6 +2,7 @@ import argparse
 import asyncio
 
 from app.agent.manus import Manus
+from app.llm_http import LLM_HTTP_CLIENTS
 from app.logger import logger
 
 
@@ -30,6 +31,7 @@ async def main():
     finally:
         # Ensure agent resources are cleaned up before exiting
         await agent.cleanup()
+        await LLM_HTTP_CLIENTS.aclose()
 
 
 if __name__ == "__main__":
@@ -5,6 +5,9 @@ from app.agent.data_analysis import DataAnalysis
 from app.agent.manus import Manus
 from app.config import config
 from app.flow.flow_factory import FlowFactory, FlowType
+from app.llm_http import LLM_HTTP_CLIENTS
+from app.llm_retry import llm_deadline
+from app.llm_usage import UsageLedger, track_usage
 from app.logger import logger
 
 
@@ -29,13 +32,16 @@ async def run_flow():
 
         try:
             start_time = time.time()
-            result = await asyncio.wait_for(
-                flow.execute(prompt),
-                timeout=3600,  # 60 minute timeout for the entire execution
-            )
+            usage_ledger = UsageLedger()
+            with llm_deadline(3600), track_usage(usage_ledger):
+                result = await asyncio.wait_for(
+                    flow.execute(prompt),
+                    timeout=3600,  # 60 minute timeout for the entire execution
+                )
             elapsed_time = time.time() - start_time
             logger.info(f"Request processed in {elapsed_time:.2f} seconds")
             logger.info(result)
+            logger.info(f"Token usage: {usage_ledger.export()}")
         except asyncio.TimeoutError:
             logger.error("Request processing timed out after 1 hour")
             logger.info(
@@ -46,6 +52,8 @@ async def run_flow():
         logger.info("Operation cancelled by user.")
     except Exception as e:
         logger.error(f"Error: {str(e)}")
+    finally:
+        await LLM_HTTP_CLIENTS.aclose()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.agent.toolcall import ToolCallAgent
+from app.exceptions import BudgetExceeded
+from app.schema import AgentState, Function, ToolCall
+from app.tool import ToolCollection
+from app.tool.base import BaseTool, ToolResult
+
+
+class FakeTool(BaseTool):
+    description: str = "fake tool"
+
+    async def execute(self, **kwargs) -> str:
+        return self.name
+
+
+class ImageTool(BaseTool):
+    """Returns its own name as the image after ``delay`` seconds."""
+
+    description: str = "image tool"
+    read_only: bool = True
+    delay: float = 0.0
+    cancelled: bool = False
+
+    async def execute(self, **kwargs) -> ToolResult:
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return ToolResult(output=self.name, base64_image=self.name)
+
+
+def call(id, name):
+    return ToolCall(id=id, function=Function(name=name, arguments="{}"))
+
+
+@pytest.mark.asyncio
+async def test_early_dispatch_keeps_dependent_calls_in_order():
+    """Tests that calls only start early behind earlier calls that already started."""
+    # No LLM is needed to dispatch tool calls
+    agent = ToolCallAgent.model_construct(
+        llm=None,
+        available_tools=ToolCollection(
+            FakeTool(name="lookup", read_only=True),
+            FakeTool(name="produce", read_only=True),
+            FakeTool(name="stats", read_only=True, depends_on=["produce"]),
+            FakeTool(name="submit"),
+        ),
+    )
+
+    agent._dispatch_early(call("c1", "lookup"))
+    agent._dispatch_early(call("c2", "produce"))
+    # Reads what c2 produces
+    agent._dispatch_early(call("c3", "stats"))
+    agent._dispatch_early(call("c4", "lookup"))
+    assert list(agent._early_tasks) == ["c1", "c2"]
+    await agent._cancel_early_tasks()
+
+    agent._early_calls = []
+    agent._dispatch_early(call("c1", "submit"))
+    agent._dispatch_early(call("c2", "lookup"))
+    assert agent._early_tasks == {}
+
+
+@pytest.mark.asyncio
+async def test_early_calls_keep_their_own_images():
+    """Tests that concurrent early calls do not swap the images they return."""
+    agent = ToolCallAgent.model_construct(
+        llm=None,
+        available_tools=ToolCollection(
+            ImageTool(name="slow", delay=0.05), ImageTool(name="fast")
+        ),
+    )
+    agent.tool_calls = [call("c1", "slow"), call("c2", "fast")]
+    for command in agent.tool_calls:
+        agent._dispatch_early(command)
+
+    await agent.act()
+    images = {m.tool_call_id: m.base64_image for m in agent.memory.messages}
+    assert images == {"c1": "slow", "c2": "fast"}
+
+
+@pytest.mark.asyncio
+async def test_failed_think_stops_early_calls():
+    """Tests that early calls are cancelled and awaited when think() gives up."""
+    tool = ImageTool(name="slow", delay=60)
+
+    async def ask_tool_stream(on_tool_call, **kwargs):
+        on_tool_call(call("c1", "slow"))
+        await asyncio.sleep(0)
+        raise BudgetExceeded("budget spent")
+
+    agent = ToolCallAgent.model_construct(
+        llm=SimpleNamespace(stream_tool_calls=True, ask_tool_stream=ask_tool_stream),
+        available_tools=ToolCollection(tool),
+        next_step_prompt="",
+    )
+
+    assert await agent.think() is False
+    assert agent.state == AgentState.FINISHED
+    assert agent._early_tasks == {} and tool.cancelled
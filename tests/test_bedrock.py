@@ -0,0 +1,134 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.bedrock import ChatCompletions
+from app.llm import ToolCallAssembler
+
+
+class FakeBedrockRuntime:
+    """Blocking stand-in for the boto3 bedrock-runtime client."""
+
+    def __init__(self, events, delay=0.0):
+        self.events = events
+        self.delay = delay
+        self.requests = []
+
+    def converse(self, **request):
+        self.requests.append(request)
+        time.sleep(self.delay)
+        return {
+            "output": {"message": {"role": "assistant", "content": [{"text": "hi"}]}},
+            "stopReason": "end_turn",
+            "usage": {"inputTokens": 3, "outputTokens": 1, "totalTokens": 4},
+        }
+
+    def converse_stream(self, **request):
+        self.requests.append(request)
+
+        def events():
+            for event in self.events:
+                time.sleep(self.delay)
+                yield event
+
+        return {"stream": events()}
+
+
+STREAM_EVENTS = [
+    {"messageStart": {"role": "assistant"}},
+    {"contentBlockDelta": {"contentBlockIndex": 0, "delta": {"text": "Checking"}}},
+    {"contentBlockStop": {"contentBlockIndex": 0}},
+    {
+        "contentBlockStart": {
+            "contentBlockIndex": 1,
+            "start": {"toolUse": {"toolUseId": "t1", "name": "mysql_list_tables"}},
+        }
+    },
+    {
+        "contentBlockDelta": {
+            "contentBlockIndex": 1,
+            "delta": {"toolUse": {"input": "{}"}},
+        }
+    },
+    {"contentBlockStop": {"contentBlockIndex": 1}},
+    {"messageStop": {"stopReason": "tool_use"}},
+    {"metadata": {"usage": {"inputTokens": 10, "outputTokens": 5, "totalTokens": 15}}},
+]
+
+
+def completions(runtime):
+    return ChatCompletions(runtime, ThreadPoolExecutor(max_workers=2))
+
+
+def test_tool_results_keep_their_own_ids():
+    """Tests that parallel tool calls map to results by id in one user turn."""
+    messages = [
+        {"role": "system", "content": "sys"},
+        {"role": "user", "content": "go"},
+        {
+            "role": "assistant",
+            "content": "",
+            "tool_calls": [
+                {"id": f"c{i}", "function": {"name": "q", "arguments": "{}"}}
+                for i in (1, 2)
+            ],
+        },
+        {"role": "tool", "content": "a", "tool_call_id": "c1"},
+        {"role": "tool", "content": "b", "tool_call_id": "c2"},
+    ]
+    system, converted = completions(None)._convert_openai_messages_to_bedrock_format(
+        messages
+    )
+
+    assert system == [{"text": "sys"}]
+    assert [block["toolUse"]["toolUseId"] for block in converted[1]["content"]] == [
+        "c1",
+        "c2",
+    ]
+    assert len(converted) == 3
+    assert [block["toolResult"]["toolUseId"] for block in converted[2]["content"]] == [
+        "c1",
+        "c2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_openai_chunks_without_blocking_the_loop():
+    """Tests async streaming of text, tool calls and usage off the event loop."""
+    runtime = FakeBedrockRuntime(STREAM_EVENTS, delay=0.02)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.005)
+            ticks += 1
+
+    ticking = asyncio.create_task(ticker())
+    stream = await completions(runtime).create(
+        model="m",
+        messages=[{"role": "user", "content": "go"}],
+        max_tokens=10,
+        temperature=0.0,
+        stream=True,
+    )
+    assembler = ToolCallAssembler()
+    content, finish, usage = "", None, None
+    async for chunk in stream:
+        delta = chunk.choices[0].delta
+        content += delta.content or ""
+        assembler.add(delta.tool_calls or [])
+        finish = chunk.choices[0].finish_reason or finish
+        usage = chunk.usage or usage
+    ticking.cancel()
+
+    calls, pending = assembler.finish()
+    assert content == "Checking"
+    assert [(c.id, c.function.name, c.function.arguments) for c in calls] == [
+        ("t1", "mysql_list_tables", "{}")
+    ]
+    assert not pending and finish == "tool_calls" and usage.total_tokens == 15
+    assert "toolConfig" not in runtime.requests[0]
+    assert ticks > 5
@@ -0,0 +1,98 @@
+import pytest
+
+from app.compaction import ContextCompactor
+from app.config import CompactionSettings
+from app.llm import LLM, TokenCounter
+from app.schema import Memory, Message, Role, ToolCall
+
+
+class WhitespaceTokenizer:
+    def encode(self, text):
+        return text.split()
+
+
+class CountingLLM:
+    """Just enough of LLM for counting tokens."""
+
+    format_messages = staticmethod(LLM.format_messages)
+
+    def __init__(self):
+        self.counter = TokenCounter(WhitespaceTokenizer())
+
+    def count_message_tokens(self, messages):
+        return self.counter.count_message_tokens(messages)
+
+
+def tool_turn(i, output):
+    call = ToolCall(
+        id=f"c{i}",
+        function={"name": "mysql_read_query", "arguments": '{"sql": "SELECT 1"}'},
+    )
+    return [
+        Message.from_tool_calls(tool_calls=[call], content=f"step {i}"),
+        Message.tool_message(output, name="mysql_read_query", tool_call_id=f"c{i}"),
+    ]
+
+
+def history(turns):
+    messages = [Message.user_message("analyze orders")]
+    for i in range(turns):
+        messages += tool_turn(i, "row " * 500)
+    return messages
+
+
+def assert_pairs_consistent(messages):
+    called = set()
+    for message in messages:
+        for call in message.tool_calls or []:
+            called.add(call.id)
+        if message.role == Role.TOOL:
+            assert message.tool_call_id in called
+
+
+@pytest.mark.asyncio
+async def test_digests_old_tool_outputs_first():
+    """Tests that digests alone are used when they reach the target."""
+    compactor = ContextCompactor(
+        CompactionSettings(trigger_tokens=2000, keep_recent_messages=2)
+    )
+    messages = history(4)
+    llm = CountingLLM()
+
+    assert await compactor.compact(llm, messages[:3], force=False) is None
+    result = await compactor.compact(llm, messages)
+    assert result.digested == 3 and result.summarized == 0
+    assert result.tokens_after < 1000 < result.tokens_before
+    assert messages[-1].content == "row " * 500
+    assert_pairs_consistent(messages)
+
+
+@pytest.mark.asyncio
+async def test_summarizes_older_turns_keeping_pairs(monkeypatch):
+    """Tests that older turns collapse into one summary without orphaned results."""
+
+    async def summarize(self, older):
+        return f"{len(older)} messages"
+
+    monkeypatch.setattr(ContextCompactor, "_summarize", summarize)
+    compactor = ContextCompactor(
+        CompactionSettings(trigger_tokens=100, keep_recent_messages=3, digest_chars=50)
+    )
+    messages = history(4)
+
+    result = await compactor.compact(CountingLLM(), messages)
+    # The third most recent message is a tool result, so its call is kept too
+    assert result.summarized == 4
+    assert messages[0].content == "analyze orders"
+    assert messages[1].content.endswith("4 messages")
+    assert [m.role for m in messages[2:]] == ["assistant", "tool"] * 2
+    assert_pairs_consistent(messages)
+    assert compactor.metrics()["tokens_saved"] == result.tokens_saved > 0
+
+
+def test_memory_trim_drops_orphaned_tool_results():
+    """Tests that trimming memory never starts with a tool result."""
+    memory = Memory(max_messages=4)
+    memory.add_messages(history(3))
+    assert memory.messages[0].role == Role.ASSISTANT
+    assert_pairs_consistent(memory.messages)
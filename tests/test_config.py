@@ -0,0 +1,26 @@
+from app.config import Config
+
+
+def load_config(monkeypatch, raw_config):
+    """Builds a Config from a raw TOML dict without touching the singleton."""
+    monkeypatch.setattr(Config, "_load_config", lambda self: raw_config)
+    loaded = object.__new__(Config)
+    loaded._load_initial_config()
+    return loaded
+
+
+def test_llm_flags_are_read_from_the_llm_table(monkeypatch):
+    """Tests that optional [llm] flags such as stream_usage are not dropped."""
+    llm = {
+        "model": "gpt-4o",
+        "base_url": "https://api.openai.com/v1",
+        "api_key": "sk-test",
+        "stream_usage": False,
+        "stream_tool_calls": True,
+    }
+    loaded = load_config(monkeypatch, {"llm": llm})
+    assert loaded.llm["default"].stream_usage is False
+    assert loaded.llm["default"].stream_tool_calls is True
+
+    del llm["stream_usage"]
+    assert load_config(monkeypatch, {"llm": llm}).llm["default"].stream_usage is True
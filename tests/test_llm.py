@@ -0,0 +1,97 @@
+import pytest
+from openai.types.chat.chat_completion_chunk import (
+    ChoiceDeltaToolCall,
+    ChoiceDeltaToolCallFunction,
+)
+
+from app.config import LLMCacheSettings
+from app.exceptions import LLMCacheMiss
+from app.llm import LLM, ResponseCache, TokenCounter, ToolCallAssembler
+from app.schema import Message
+
+
+class CountingTokenizer:
+    """Whitespace tokenizer that records how much text it encoded."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, text):
+        self.encoded.append(text)
+        return text.split()
+
+
+def test_token_counter_reuses_unchanged_messages():
+    """Tests that only new or edited messages are re-encoded across steps."""
+    tokenizer = CountingTokenizer()
+    counter = TokenCounter(tokenizer)
+    history = [
+        Message.system_message("you are an agent"),
+        Message.user_message("count the orders"),
+        Message.tool_message("x " * 5000, name="mysql_read_query", tool_call_id="c1"),
+    ]
+
+    first = counter.count_message_tokens(LLM.format_messages(history))
+    encoded = len(tokenizer.encoded)
+    assert counter.count_message_tokens(LLM.format_messages(history)) == first
+    assert len(tokenizer.encoded) == encoded
+
+    history.append(Message.assistant_message("done"))
+    second = counter.count_message_tokens(LLM.format_messages(history))
+    assert tokenizer.encoded[encoded:] == ["assistant", "done"]
+    assert second == first + TokenCounter.BASE_MESSAGE_TOKENS + 2
+
+    history[1].content = "count the orders by month"
+    assert counter.count_message_tokens(LLM.format_messages(history)) == second + 2
+
+
+def test_response_cache_modes_and_eviction(tmp_path):
+    """Tests record/replay, hit counting and size-bounded LRU eviction."""
+    path = str(tmp_path / "cache.sqlite")
+    request = {"model": "m", "messages": [{"role": "user", "content": "plan"}]}
+    key = ResponseCache.make_key("ask", **request)
+    assert key == ResponseCache.make_key("ask", **dict(reversed(request.items())))
+
+    recorder = ResponseCache(LLMCacheSettings(enabled=True, mode="record", path=path))
+    assert recorder.get(key) is None
+    recorder.put(key, "ask", "step 1")
+    recorder.close()
+
+    replay = ResponseCache(LLMCacheSettings(enabled=True, mode="replay", path=path))
+    assert replay.get(key) == "step 1"
+    with pytest.raises(LLMCacheMiss):
+        replay.get(ResponseCache.make_key("ask", **request, temperature=0.5))
+    assert (replay.hits, replay.misses) == (1, 1)
+    replay.close()
+
+    small = ResponseCache(
+        LLMCacheSettings(enabled=True, path=path, max_size_mb=20 / 1024 / 1024)
+    )
+    small.put("a", "ask", "x" * 10)
+    assert small.get(key) == "step 1"  # now more recently used than "a"
+    small.put("b", "ask", "y" * 10)
+    assert small.get("a") is None and small.get("b") == "y" * 10
+    assert small.stats()["entries"] == 2 and small.evictions == 1
+
+
+def test_tool_call_assembler_completes_calls_early():
+    """Tests that each streamed tool call is released once its arguments parse."""
+
+    def delta(index, arguments, id=None, name=None):
+        return ChoiceDeltaToolCall(
+            index=index,
+            id=id,
+            function=ChoiceDeltaToolCallFunction(name=name, arguments=arguments),
+        )
+
+    assembler = ToolCallAssembler()
+    assert assembler.add([delta(0, '{"sql": "SELECT', id="c1", name="q")]) == []
+    done = assembler.add([delta(0, ' 1"}'), delta(1, '{"path', id="c2", name="e")])
+    assert [(c.id, c.function.arguments) for c in done] == [
+        ("c1", '{"sql": "SELECT 1"}')
+    ]
+    assert assembler.add([delta(1, '": "a"')]) == []
+
+    calls, pending = assembler.finish()
+    assert [c.id for c in calls] == ["c1", "c2"]
+    assert [c.function.arguments for c in pending] == ['{"path": "a"']
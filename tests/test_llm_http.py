@@ -0,0 +1,23 @@
+import pytest
+
+from app.config import LLMHTTPSettings
+from app.llm_http import LLMHTTPClients, endpoint_origin
+
+
+@pytest.mark.asyncio
+async def test_clients_are_shared_per_origin_and_closed():
+    """Tests one pooled client per origin with the configured limits."""
+    clients = LLMHTTPClients(LLMHTTPSettings(max_connections=4, connect_timeout=2))
+    openai = clients.get("https://api.openai.com/v1")
+    assert clients.get("https://api.openai.com:443/v1/") is openai
+    assert clients.get("http://localhost:11434/v1") is not openai
+    assert endpoint_origin("http://localhost:11434/v1") == "http://localhost:11434"
+    assert openai.timeout.connect == 2
+
+    metrics = {m["origin"]: m for m in clients.metrics()}
+    assert metrics["https://api.openai.com:443"]["max_connections"] == 4
+    assert metrics["https://api.openai.com:443"]["utilization"] == 0
+
+    await clients.aclose()
+    assert openai.is_closed and clients.metrics() == []
+    assert not clients.get("https://api.openai.com/v1").is_closed
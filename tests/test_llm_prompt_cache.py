@@ -0,0 +1,180 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import APITimeoutError
+from openai.types import CompletionUsage
+
+from app.llm import LLM, TokenCounter
+from app.llm_prompt_cache import (
+    PromptCacheStats,
+    add_cache_control,
+    cached_prompt_tokens,
+    current_prompt_cache_stats,
+    track_prompt_cache,
+)
+from app.llm_rate_limit import LLM_RATE_LIMITERS
+from app.llm_retry import RetryPolicy
+from app.llm_stream import TokenStream
+
+
+def test_cache_control_marks_stable_prefix_and_latest_turns():
+    """Tests breakpoints on system, last tool and the two latest text messages."""
+    tools = [{"type": "function", "function": {"name": n}} for n in ("a", "b")]
+    params = {
+        "messages": [
+            {"role": "system", "content": "you are an agent"},
+            {"role": "user", "content": "count orders"},
+            {"role": "assistant", "content": "", "tool_calls": [{"id": "c1"}]},
+            {"role": "tool", "content": "42", "tool_call_id": "c1"},
+            {"role": "user", "content": "continue"},
+        ],
+        "tools": tools,
+    }
+
+    marked = add_cache_control(params)
+    assert "cache_control" not in tools[-1] and params["messages"][0]["content"]
+    assert marked["tools"][-1]["cache_control"] == {"type": "ephemeral"}
+    marks = [
+        i
+        for i, message in enumerate(marked["messages"])
+        if isinstance(message["content"], list)
+        and "cache_control" in message["content"][-1]
+    ]
+    assert marks == [0, 3, 4]
+
+
+def test_cached_tokens_are_counted_per_session():
+    """Tests reading cached tokens from usage and the session hit ratio."""
+    usage = CompletionUsage.model_validate(
+        {
+            "prompt_tokens": 1000,
+            "completion_tokens": 10,
+            "total_tokens": 1010,
+            "prompt_tokens_details": {"cached_tokens": 800},
+        }
+    )
+    deepseek = CompletionUsage.model_validate(
+        {
+            "prompt_tokens": 1000,
+            "completion_tokens": 10,
+            "total_tokens": 1010,
+            "prompt_cache_hit_tokens": 200,
+        }
+    )
+    assert cached_prompt_tokens(usage) == 800
+    assert cached_prompt_tokens(deepseek) == 200
+
+    stats = PromptCacheStats()
+    with track_prompt_cache(stats):
+        for item in (usage, deepseek):
+            current_prompt_cache_stats().record(item)
+    assert current_prompt_cache_stats() is None
+    assert stats.metrics()["hit_ratio"] == 0.5
+    assert stats.metrics()["requests_with_cache_hit"] == 2
+
+
+class WhitespaceTokenizer:
+    def encode(self, text):
+        return text.split()
+
+
+class StreamingClient:
+    """Streams two text chunks and, when asked, a final usage chunk."""
+
+    def __init__(self):
+        self.params = None
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, **params):
+        self.params = params
+
+        async def chunks():
+            for text in ("hello ", "world"):
+                delta = SimpleNamespace(content=text, tool_calls=None)
+                yield SimpleNamespace(
+                    choices=[SimpleNamespace(delta=delta)], usage=None
+                )
+            if params.get("stream_options", {}).get("include_usage"):
+                usage = CompletionUsage.model_validate(
+                    {
+                        "prompt_tokens": 100,
+                        "completion_tokens": 2,
+                        "total_tokens": 102,
+                        "prompt_tokens_details": {"cached_tokens": 80},
+                    }
+                )
+                yield SimpleNamespace(choices=[], usage=usage)
+
+        return chunks()
+
+
+def streaming_llm(stream_usage=True):
+    llm = object.__new__(LLM)
+    llm.model = "test-model"
+    llm.max_tokens = 100
+    llm.temperature = 0.0
+    llm.max_input_tokens = None
+    llm.total_input_tokens = llm.total_completion_tokens = 0
+    llm.input_price_per_million = llm.output_price_per_million = 0.0
+    llm.prompt_cache_control = False
+    llm.prompt_cache = PromptCacheStats()
+    llm.stream_usage = stream_usage
+    llm.tokenizer = WhitespaceTokenizer()
+    llm.token_counter = TokenCounter(llm.tokenizer)
+    llm.retry_policy = RetryPolicy()
+    llm.rate_limiter = LLM_RATE_LIMITERS.get_limiter("test-model", "local", None, None)
+    llm.client = StreamingClient()
+    return llm
+
+
+@pytest.mark.asyncio
+async def test_streamed_calls_request_and_use_usage():
+    """Tests that streamed calls ask for usage and report its cached tokens."""
+    llm = streaming_llm()
+    response = await llm.ask([{"role": "user", "content": "hi"}], cache=False)
+    assert response == "hello world"
+    assert llm.client.params["stream_options"] == {"include_usage": True}
+    assert llm.total_input_tokens == 100 and llm.total_completion_tokens == 2
+    assert llm.prompt_cache.cached_tokens == 80
+
+    llm = streaming_llm(stream_usage=False)
+    await llm.ask([{"role": "user", "content": "hi"}], cache=False)
+    assert "stream_options" not in llm.client.params
+    assert llm.total_completion_tokens == 2 and llm.prompt_cache.cached_tokens == 0
+
+
+class BrokenStreamingClient(StreamingClient):
+    """Sends one chunk and then loses the connection."""
+
+    calls = 0
+
+    async def create(self, **params):
+        self.calls += 1
+
+        async def chunks():
+            delta = SimpleNamespace(content="hello ", tool_calls=None)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+            raise APITimeoutError(request=httpx.Request("POST", "http://llm/v1"))
+
+        return chunks()
+
+
+@pytest.mark.asyncio
+async def test_interrupted_stream_is_not_retried_and_is_ended():
+    """Tests that a stream failing after output is raised once and closed."""
+    sent = []
+
+    async def send(delta, final):
+        sent.append((delta, final))
+
+    llm = streaming_llm()
+    llm.client = BrokenStreamingClient()
+    with pytest.raises(APITimeoutError):
+        await llm.ask(
+            [{"role": "user", "content": "hi"}],
+            cache=False,
+            token_stream=TokenStream(send),
+        )
+    assert llm.client.calls == 1
+    assert sent == [("hello ", False), ("", True)]
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import RateLimitError
+
+from app.llm import LLM
+from app.llm_prompt_cache import PromptCacheStats
+from app.llm_rate_limit import (
+    LLM_RATE_LIMITERS,
+    EndpointRateLimiter,
+    LLMPriority,
+    LLMRateLimiters,
+)
+from app.llm_retry import RetryPolicy
+from app.llm_router import Endpoint, EndpointRouter, RoutedClient
+
+
+@pytest.mark.asyncio
+async def test_priority_lanes_and_token_settlement():
+    """Tests that planning requests overtake queued steps and usage is settled."""
+    limiter = EndpointRateLimiter(
+        "m@url", requests_per_minute=600, tokens_per_minute=6000
+    )
+    limiter.requests.level = 0  # empty bucket: one request every 0.1s
+    order = []
+
+    async def request(name, priority):
+        reservation = await limiter.acquire(100, priority)
+        order.append(name)
+        reservation.record_usage(40)
+
+    steps = [
+        asyncio.create_task(request(f"step{i}", LLMPriority.STEP)) for i in range(2)
+    ]
+    await asyncio.sleep(0.01)
+    await asyncio.gather(request("plan", LLMPriority.PLANNING), *steps)
+
+    # Nothing was admitted yet, so the planning request goes first
+    assert order == ["plan", "step0", "step1"]
+    metrics = limiter.metrics()
+    assert metrics["admitted_by_priority"]["PLANNING"] == 1
+    assert metrics["estimated_tokens"] == 300 and metrics["actual_tokens"] == 120
+    assert metrics["max_wait_seconds"] > 0.25
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_error_pauses_endpoint():
+    """Tests that a 429 with Retry-After holds back the next request."""
+    limiters = LLMRateLimiters()
+    limiter = limiters.get_limiter("m", "url", requests_per_minute=1000)
+    response = httpx.Response(
+        429,
+        headers={"retry-after-ms": "200"},
+        request=httpx.Request("POST", "http://llm/v1/chat/completions"),
+    )
+
+    with pytest.raises(RateLimitError):
+        async with limiters.admit(limiter, 10):
+            raise RateLimitError("slow down", response=response, body=None)
+
+    started = time.monotonic()
+    async with limiters.admit(limiter, 10):
+        pass
+    assert time.monotonic() - started >= 0.15
+    assert limiter.metrics()["throttled"] == 1
+
+
+class ThrottledClient:
+    """Answers with a 429 while ``throttled`` is set."""
+
+    def __init__(self, throttled=False):
+        self.throttled = throttled
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, **params):
+        if self.throttled:
+            response = httpx.Response(
+                429,
+                headers={"retry-after": "30"},
+                request=httpx.Request("POST", "http://llm/v1/chat/completions"),
+            )
+            raise RateLimitError("slow down", response=response, body=None)
+        return SimpleNamespace(usage=None)
+
+
+@pytest.mark.asyncio
+async def test_routed_requests_are_admitted_on_the_picked_endpoint():
+    """Tests that a 429 from one routed endpoint only pauses that endpoint."""
+    limiters = [
+        LLM_RATE_LIMITERS.get_limiter("routed-model", name, 1000)
+        for name in ("primary", "busy", "spare")
+    ]
+    llm = object.__new__(LLM)
+    llm.prompt_cache_control = False
+    llm.stream_usage = True
+    llm.prompt_cache = PromptCacheStats()
+    llm.retry_policy = RetryPolicy()
+    llm.rate_limiter = limiters[0]
+    llm.client = RoutedClient(
+        EndpointRouter(
+            [
+                Endpoint("busy", ThrottledClient(True), 2.0, limiters[1]),
+                Endpoint("spare", ThrottledClient(), 1.0, limiters[2]),
+            ]
+        )
+    )
+
+    # The heavier endpoint is picked first and answers with a 429
+    with pytest.raises(RateLimitError):
+        await llm._create("ask", {}, 10, LLMPriority.STEP)
+    started = time.monotonic()
+    await llm._create("ask", {}, 10, LLMPriority.STEP)
+    assert time.monotonic() - started < 1.0
+
+    assert [limiter.throttled for limiter in limiters] == [0, 1, 0]
+    assert [limiter.admitted for limiter in limiters] == [0, 1, 1]
@@ -0,0 +1,81 @@
+import asyncio
+
+import httpx
+import pytest
+from openai import APIConnectionError, AuthenticationError
+
+from app.exceptions import LLMDeadlineExceeded
+from app.llm import LLM
+from app.llm_retry import RetryPolicy, is_retryable, llm_deadline
+
+
+REQUEST = httpx.Request("POST", "http://llm/v1/chat/completions")
+
+
+def test_error_classification():
+    """Tests that only transient errors are retryable."""
+    auth = AuthenticationError(
+        "bad key", response=httpx.Response(401, request=REQUEST), body=None
+    )
+    assert not is_retryable(auth)
+    assert not is_retryable(ValueError("Invalid tool_choice"))
+    assert is_retryable(APIConnectionError(request=REQUEST))
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_at_fatal_errors_and_deadlines(monkeypatch):
+    """Tests retrying transient errors, not fatal ones, within the deadline."""
+    monkeypatch.setattr(RetryPolicy, "backoff", lambda self, attempt, error: 0.05)
+    policy = RetryPolicy(max_attempts=5)
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise APIConnectionError(request=REQUEST)
+        return "ok"
+
+    assert await policy.run(flaky) == "ok" and len(calls) == 3
+
+    async def invalid():
+        calls.append(1)
+        raise ValueError("Empty or invalid response from LLM")
+
+    calls.clear()
+    with pytest.raises(ValueError):
+        await policy.run(invalid)
+    assert len(calls) == 1
+
+    async def down():
+        raise APIConnectionError(request=REQUEST)
+
+    # The second retry would end past the deadline
+    with llm_deadline(0.08), pytest.raises(APIConnectionError):
+        await policy.run(down)
+    with llm_deadline(0), pytest.raises(LLMDeadlineExceeded):
+        await policy.run(down)
+    assert policy.gave_up == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_takes_the_first_response():
+    """Tests that a call slower than p95 is duplicated and the faster wins."""
+    policy = RetryPolicy(hedge=True)
+    for _ in range(20):
+        policy._record_latency("ask_tool", 0.02)
+    delays = [0.5, 0.01]
+
+    async def call():
+        delay = delays.pop(0)
+        await asyncio.sleep(delay)
+        return delay
+
+    assert await policy.hedge("ask_tool", call) == 0.01
+    assert (policy.hedged, policy.hedge_wins) == (1, 1)
+
+
+def test_sdk_clients_do_not_retry():
+    """Tests that RetryPolicy is the only retry layer for OpenAI clients."""
+    for api_type in ("openai", "azure"):
+        client = LLM._build_client(api_type, "http://llm/v1", "key", "2024-06-01")
+        assert client.max_retries == 0
@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+
+from app.llm_router import Endpoint, EndpointRouter, RoutedClient
+
+
+class FakeClient:
+    """Stands in for an OpenAI client; fails while ``down`` is set."""
+
+    def __init__(self, name, delay=0.0):
+        self.name = name
+        self.delay = delay
+        self.down = False
+        self.calls = 0
+        self.chat = self
+        self.completions = self
+
+    async def create(self, **params):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.down:
+            raise ConnectionError(f"{self.name} unavailable")
+        return self.name
+
+
+@pytest.mark.asyncio
+async def test_weighted_least_outstanding_spreads_concurrent_calls():
+    """Tests that concurrent calls are split by weight."""
+    heavy, light = FakeClient("heavy", 0.05), FakeClient("light", 0.05)
+    client = RoutedClient(
+        EndpointRouter([Endpoint("heavy", heavy, 2.0), Endpoint("light", light, 1.0)])
+    )
+    await asyncio.gather(*(client.chat.completions.create() for _ in range(6)))
+    assert (heavy.calls, light.calls) == (4, 2)
+
+
+@pytest.mark.asyncio
+async def test_failover_after_an_error():
+    """Tests that traffic moves off an endpoint right after it fails."""
+    primary, backup = FakeClient("primary"), FakeClient("backup", 0.01)
+    client = RoutedClient(
+        EndpointRouter(
+            [Endpoint("primary", primary), Endpoint("backup", backup)],
+            strategy="latency_ewma",
+        )
+    )
+    primary.down = True
+    results = []
+    for _ in range(4):
+        try:
+            results.append(await client.chat.completions.create())
+        except ConnectionError:
+            pass
+    # The untried primary is sampled once, then traffic stays on the backup
+    assert primary.calls == 1 and results == ["backup"] * 3
+
+
+def test_ejects_after_error_burst_and_probes_recovery(monkeypatch):
+    """Tests ejection after consecutive failures and readmission by a probe."""
+    monkeypatch.setattr("app.llm_router.EJECT_SECONDS", 0.05)
+    router = EndpointRouter([Endpoint("a", None), Endpoint("b", None)])
+    a = router.endpoints[0]
+    for _ in range(3):
+        a.outstanding += 1  # as if selected for concurrent requests
+        router.record(a, 0.1, ConnectionError("down"))
+    assert router.metrics()[0]["healthy"] is False
+    assert {router.select().name for _ in range(3)} == {"b"}
+
+    time.sleep(0.06)
+    probe = router.select()
+    assert probe is a and probe.probing
+    # Only one probe at a time
+    assert router.select().name == "b"
+    router.record(a, 0.1)
+    assert router.metrics()[0]["healthy"] is True
+
+
+def test_cancelled_requests_leave_health_untouched(monkeypatch):
+    """Tests that cancellation neither readmits, resets failures nor skews latency."""
+    monkeypatch.setattr("app.llm_router.EJECT_SECONDS", 0.05)
+    router = EndpointRouter([Endpoint("a", None), Endpoint("b", None)])
+    a = router.endpoints[0]
+    a.outstanding += 1
+    router.record(a, 1.0)
+    a.outstanding += 1
+    router.record(a, 0.01, asyncio.CancelledError())
+    assert a.latency_ewma == 1.0 and a.outstanding == 0
+
+    for _ in range(3):
+        a.outstanding += 1
+        router.record(a, 0.1, ConnectionError("down"))
+    time.sleep(0.06)
+    router.endpoints[1].outstanding += 5  # keep b busy so a gets the probe
+    probe = router.select()
+    assert probe is a and a.probing
+    router.record(a, 0.01, asyncio.CancelledError())
+    metrics = router.metrics()[0]
+    assert metrics["healthy"] is False and metrics["cancelled"] == 2
+    assert not a.probing and a.consecutive_failures == 3
+    # Another probe may be sent
+    assert a.available(time.monotonic())
@@ -0,0 +1,34 @@
+import pytest
+
+from app.llm_stream import TokenStream, current_token_stream, stream_tokens
+
+
+@pytest.mark.asyncio
+async def test_token_stream_batches_after_first_output():
+    """Tests that the first delta is sent at once and later ones are batched."""
+    sent = []
+
+    async def send(delta, final):
+        sent.append((delta, final))
+
+    stream = TokenStream(send, flush_interval=60, flush_chars=6)
+    stream.start()
+    for delta in ["# ", "Re", "po", "rt", "\n", "ok"]:
+        await stream.write(delta)
+    await stream.end()
+
+    assert sent == [("# ", False), ("Report", False), ("\nok", True)]
+    assert stream.metrics()["responses"] == 1
+    assert stream.metrics()["first_output_seconds"] is not None
+
+
+def test_stream_tokens_binds_the_context():
+    """Tests that the bound stream is visible only inside the block."""
+
+    async def send(delta, final):
+        pass
+
+    stream = TokenStream(send)
+    with stream_tokens(stream):
+        assert current_token_stream() is stream
+    assert current_token_stream() is None
@@ -0,0 +1,76 @@
+import pytest
+
+from app.config import UsageSettings
+from app.exceptions import BudgetExceeded, TokenLimitExceeded
+from app.llm import LLM
+from app.llm_usage import UsageLedger, track_usage, usage_cost, usage_scope
+
+
+class LimitedLLM:
+    """Just the token limit logic of LLM, without a client or tokenizer."""
+
+    model = "m"
+    max_input_tokens = 100
+    total_input_tokens = 1000
+
+    _used_input_tokens = LLM._used_input_tokens
+    check_token_limit = LLM.check_token_limit
+
+
+def test_usage_is_broken_down_by_agent_site_and_model():
+    """Tests attribution to the innermost scope and the exported totals."""
+    ledger = UsageLedger(UsageSettings())
+    with track_usage(ledger):
+        ledger.record("m", "ask_tool", 100, 20, cached_tokens=50, cost=0.5)
+        with usage_scope("planning"):
+            ledger.record("m", "ask", 30)
+            ledger.record("m", "ask", 0, 10, calls=0)
+        with usage_scope("manus"):
+            ledger.record("n", "ask_tool", 10, 5)
+
+    usage = ledger.export()
+    assert usage["calls"] == 3 and usage["total_tokens"] == 175
+    assert usage["cached_tokens"] == 50 and usage["cost"] == 0.5
+    assert usage["by_agent"]["planning"]["total_tokens"] == 40
+    assert usage["by_agent"]["planning"]["calls"] == 1
+    assert usage["by_site"]["ask_tool"]["calls"] == 2
+    assert ledger.prompt_tokens("m") == 130
+    assert usage_cost(1_000_000, 500_000, 3.0, 15.0) == 10.5
+
+
+def test_budgets_warn_once_then_stop_the_session():
+    """Tests the warning at warn_ratio and BudgetExceeded at the limit."""
+    ledger = UsageLedger(
+        UsageSettings(session_token_budget=1000, session_cost_budget=1.0)
+    )
+    ledger.record("m", "ask_tool", 500, 100, cost=0.2)
+    assert ledger.take_warning() is None
+    ledger.check_budget(300)
+
+    ledger.record("m", "ask_tool", 150, 50, cost=0.1)
+    warning = ledger.take_warning()
+    assert warning and "80%" in warning
+    assert ledger.take_warning() is None
+
+    with pytest.raises(BudgetExceeded, match="token budget") as raised:
+        ledger.check_budget(300)
+    # Agents treat it like any other token limit
+    assert isinstance(raised.value, TokenLimitExceeded)
+
+    ledger.record("m", "ask", 0, 0, cost=0.7)
+    with pytest.raises(BudgetExceeded, match="cost budget"):
+        ledger.check_budget(0)
+
+
+def test_input_token_limit_is_per_session():
+    """Tests that max_input_tokens counts only the bound session's usage."""
+    llm = LimitedLLM()
+    assert not llm.check_token_limit(10)
+
+    ledger = UsageLedger(UsageSettings())
+    with track_usage(ledger):
+        assert llm.check_token_limit(100)
+        ledger.record("m", "ask", 95)
+        assert not llm.check_token_limit(10)
+    with track_usage(UsageLedger(UsageSettings())):
+        assert llm.check_token_limit(10)
@@ -0,0 +1,60 @@
+from app.tool.artifacts import ArtifactStore
+
+
+def test_artifact_round_trip(tmp_path):
+    """Tests writing batches, memory-mapped reads and on-demand export."""
+    store = ArtifactStore(tmp_path)
+
+    with store.writer(query="SELECT id, name FROM users") as writer:
+        writer.write_rows([{"id": 1, "name": "用户1"}, {"id": 2, "name": "用户2"}])
+        writer.write_rows([{"id": 3, "name": None}])
+    meta = writer.meta
+
+    assert meta.row_count == 3
+    assert meta.columns == ["id", "name"]
+    assert store.get_meta(meta.uri).query == "SELECT id, name FROM users"
+
+    table = store.open_table(meta.handle)
+    assert table.column("id").to_pylist() == [1, 2, 3]
+
+    csv_path = store.export(meta.handle, "csv")
+    assert csv_path.read_text(encoding="utf-8").splitlines()[1] == "1,用户1"
+
+
+def test_empty_artifact(tmp_path):
+    """Tests that an empty result still produces a readable artifact."""
+    store = ArtifactStore(tmp_path)
+    meta = store.write_rows([])
+
+    assert meta.row_count == 0
+    assert store.open_table(meta.handle).num_rows == 0
+
+
+def test_null_first_batch_is_widened(tmp_path):
+    """Tests that an all-NULL column in the first batch accepts later values."""
+    store = ArtifactStore(tmp_path)
+
+    with store.writer() as writer:
+        writer.write_rows([{"id": 1, "city": None}, {"id": 2, "city": None}])
+        writer.write_rows([{"id": 3, "city": "上海"}])
+    meta = writer.meta
+
+    table = store.open_table(meta.handle)
+    assert meta.row_count == 3
+    assert table.column("city").to_pylist() == [None, None, "上海"]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_int_batch_widened_to_float(tmp_path):
+    """Tests that floats after an int-only batch are not truncated."""
+    store = ArtifactStore(tmp_path)
+
+    with store.writer() as writer:
+        writer.write_rows([{"amount": 1}, {"amount": 2}])
+        writer.write_rows([{"amount": 2.5}])
+        writer.write_rows([{"amount": 4}])
+    meta = writer.meta
+
+    table = store.open_table(meta.handle)
+    assert table.column("amount").to_pylist() == [1.0, 2.0, 2.5, 4.0]
+    assert "double" in meta.schema_text
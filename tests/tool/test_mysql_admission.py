@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from app.exceptions import DatabaseBusyError
+from app.tool.mysql_admission import EndpointLimiter, QueryPriority
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_admitted_by_priority():
+    """Tests that released slots go to the highest-priority waiter first."""
+    limiter = EndpointLimiter("test", max_concurrent=1, max_queued=4)
+    await limiter.acquire(QueryPriority.QUERY)
+
+    order = []
+
+    async def waiter(name, priority):
+        await limiter.acquire(priority)
+        order.append(name)
+        limiter.release()
+
+    tasks = [
+        asyncio.create_task(waiter("bulk", QueryPriority.BULK)),
+        asyncio.create_task(waiter("query", QueryPriority.QUERY)),
+        asyncio.create_task(waiter("interactive", QueryPriority.INTERACTIVE)),
+    ]
+    await asyncio.sleep(0)
+    assert limiter.queued == 3
+
+    limiter.release()
+    await asyncio.gather(*tasks)
+
+    assert order == ["interactive", "query", "bulk"]
+    assert limiter.active == 0
+    assert limiter.metrics()["peak_queue_depth"] == 3
+
+
+@pytest.mark.asyncio
+async def test_saturated_queue_fails_fast():
+    """Tests rejection when the queue is full and timeout while waiting."""
+    limiter = EndpointLimiter(
+        "test", max_concurrent=1, max_queued=1, queue_timeout=0.05
+    )
+    await limiter.acquire()
+
+    waiting = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(DatabaseBusyError):
+        await limiter.acquire()
+    with pytest.raises(DatabaseBusyError):
+        await waiting
+
+    metrics = limiter.metrics()
+    assert metrics["rejected"] == 1
+    assert metrics["timed_out"] == 1
+    assert metrics["queue_depth"] == 0
+
+    limiter.release()
+    assert limiter.active == 0
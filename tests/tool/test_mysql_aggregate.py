@@ -0,0 +1,110 @@
+import pytest
+
+from app.tool import mysql_aggregate
+from app.tool.mysql_aggregate import Measure, MySQLPivot, MySQLTimeBucket
+from app.tool.mysql_database import _sqlite_db_config
+from app.tool.mysql_sqlite_backend import connect, generate_ecommerce_dataset
+
+
+@pytest.fixture(scope="module")
+def fake_db(tmp_path_factory):
+    """Creates a small deterministic e-commerce database."""
+    path = str(tmp_path_factory.mktemp("mysql") / "shop.db")
+    generate_ecommerce_dataset(path, orders=1500, seed=3)
+    return path
+
+
+@pytest.fixture
+def sqlite_config(fake_db, monkeypatch):
+    """Points the aggregation tools at the SQLite stand-in."""
+    config = _sqlite_db_config(fake_db, "shop")
+    monkeypatch.setattr(mysql_aggregate, "get_db_config", lambda: config)
+    return config
+
+
+def test_measure_parsing():
+    """Tests measure specs and their conditional-aggregation form."""
+    assert Measure.parse("count(*)").expression() == "COUNT(*)"
+    measure = Measure.parse("sum(amount) as revenue")
+    assert measure.alias == "revenue"
+    assert measure.expression("`status` = %s") == (
+        "SUM(CASE WHEN `status` = %s THEN `amount` END)"
+    )
+    assert Measure.parse("count(*)").expression("x = 1") == (
+        "SUM(CASE WHEN x = 1 THEN 1 ELSE 0 END)"
+    )
+    with pytest.raises(ValueError):
+        Measure.parse("sum(amount); DROP TABLE orders")
+
+
+@pytest.mark.asyncio
+async def test_time_bucket_matches_raw_totals(fake_db, sqlite_config):
+    """Tests that monthly buckets add up to the table totals."""
+    result = await MySQLTimeBucket().execute(
+        table="orders",
+        time_column="created_at",
+        bucket="month",
+        measures=["count(*) as orders", "sum(amount) as revenue"],
+    )
+    assert result.error is None
+    rows = result.output["data"]
+    assert rows and not result.output["metadata"]["truncated"]
+    assert all(len(row["bucket"]) == 7 for row in rows)
+    assert sum(row["orders"] for row in rows) == 1500
+
+    with connect(fake_db) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT SUM(amount) AS total FROM orders")
+        total = cursor.fetchone()["total"]
+    assert sum(row["revenue"] for row in rows) == pytest.approx(total)
+
+
+@pytest.mark.asyncio
+async def test_time_bucket_rejects_unknown_columns(sqlite_config):
+    """Tests identifier validation against the schema catalog."""
+    result = await MySQLTimeBucket().execute(
+        table="orders", time_column="created_at", measures=["sum(price)"]
+    )
+    assert "price" in result.error
+
+
+@pytest.mark.asyncio
+async def test_pivot_by_status(sqlite_config):
+    """Tests conditional-aggregation pivot with discovered pivot values."""
+    result = await MySQLPivot().execute(
+        table="orders",
+        pivot_column="status",
+        measure="count(*)",
+        time_column="created_at",
+        bucket="quarter",
+        filter="amount > %s",
+        params=[0],
+    )
+    assert result.error is None
+    values = result.output["metadata"]["pivot_values"]
+    assert values
+    for row in result.output["data"]:
+        assert "-Q" in row["bucket"]
+        assert sum(row[value] for value in values) == row["total"]
+
+
+@pytest.mark.asyncio
+async def test_filter_with_like_pattern(fake_db, sqlite_config):
+    """Tests that a literal % in the filter survives pymysql formatting."""
+    result = await MySQLTimeBucket().execute(
+        table="orders",
+        time_column="created_at",
+        bucket="year",
+        measures=["count(*) as orders"],
+        filter="status LIKE 'pa%' AND amount > %s",
+        params=[0],
+    )
+    assert result.error is None
+
+    with connect(fake_db) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT COUNT(*) AS n FROM orders WHERE status LIKE 'pa%' AND amount > 0"
+        )
+        expected = cursor.fetchone()["n"]
+    assert expected and sum(row["orders"] for row in result.output["data"]) == expected
@@ -0,0 +1,55 @@
+import pytest
+
+from app.tool import mysql_index_advisor
+from app.tool.mysql_database import _sqlite_db_config
+from app.tool.mysql_index_advisor import MySQLIndexAdvisor, extract_column_usage
+from app.tool.mysql_sqlite_backend import generate_ecommerce_dataset
+
+
+def usage_kinds(sql):
+    aliases, usages = extract_column_usage(sql)
+    return aliases, {(u.qualifier, u.column): u.kind for u in usages}
+
+
+def test_join_and_filter_classification():
+    """Tests that join, equality, range and sort columns are told apart."""
+    aliases, kinds = usage_kinds(
+        "SELECT c.name FROM orders o JOIN customers AS c ON o.customer_id = c.id "
+        "WHERE c.city = 'Paris' AND o.created_at >= %s AND o.status LIKE 'pa%' "
+        "ORDER BY o.amount"
+    )
+    assert aliases["o"] == "orders" and aliases["c"] == "customers"
+    assert kinds == {
+        ("o", "customer_id"): "join",
+        ("c", "id"): "join",
+        ("c", "city"): "equality",
+        ("o", "created_at"): "range",
+        ("o", "status"): "range",
+        ("o", "amount"): "sort",
+    }
+
+
+def test_unusable_predicates_are_skipped():
+    """Tests that leading wildcards and function-wrapped columns are ignored."""
+    _, kinds = usage_kinds(
+        "SELECT * FROM customers WHERE name LIKE '%son' AND LOWER(city) = 'x' "
+        "AND 5 < id"
+    )
+    assert kinds == {(None, "id"): "range"}
+
+
+@pytest.mark.asyncio
+async def test_primary_key_does_not_lead_suggestions(tmp_path, monkeypatch):
+    """Tests that a join on the primary key yields an index on the filter column."""
+    path = str(tmp_path / "shop.db")
+    generate_ecommerce_dataset(path, orders=300, seed=2)
+    config = _sqlite_db_config(path, "shop")
+    monkeypatch.setattr(mysql_index_advisor, "get_db_config", lambda: config)
+
+    result = await MySQLIndexAdvisor().execute(
+        query="SELECT o.id FROM customers c JOIN orders o ON o.customer_id = c.id "
+        "WHERE c.city = 'Paris'"
+    )
+    assert result.error is None
+    assert "idx_customers_city" in result.output
+    assert "idx_customers_id" not in result.output
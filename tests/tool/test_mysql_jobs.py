@@ -0,0 +1,93 @@
+import pytest
+
+from app.tool import mysql_jobs
+from app.tool.artifacts import ArtifactStore
+from app.tool.mysql_database import _sqlite_db_config
+from app.tool.mysql_jobs import (
+    MySQLJobResult,
+    MySQLJobStatus,
+    QueryJobManager,
+    job_owner,
+)
+from app.tool.mysql_sqlite_backend import generate_ecommerce_dataset
+
+
+@pytest.fixture
+def job_manager(tmp_path, monkeypatch):
+    """Creates a job manager backed by the SQLite stand-in."""
+    path = str(tmp_path / "shop.db")
+    generate_ecommerce_dataset(path, orders=3000, seed=3)
+    monkeypatch.setattr(
+        mysql_jobs, "get_db_config", lambda: _sqlite_db_config(path, "shop")
+    )
+    monkeypatch.setattr(mysql_jobs, "ARTIFACT_STORE", ArtifactStore(tmp_path / "art"))
+    manager = QueryJobManager()
+    monkeypatch.setattr(mysql_jobs, "QUERY_JOBS", manager)
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_job_streams_result_to_artifact(job_manager):
+    """Tests that a submitted job completes and its result can be collected."""
+    job = job_manager.submit("SELECT id, amount FROM orders ORDER BY id")
+    assert job.status in ("pending", "running")
+
+    job = await job_manager.wait(job.job_id, timeout=30)
+    assert job.status == "completed", job.error
+    assert job.row_count == 3000
+
+    result = await MySQLJobResult().execute(job.job_id, preview_rows=3)
+    assert [row["id"] for row in result.output["data"]] == [1, 2, 3]
+    assert result.output["metadata"]["artifact"] == job.artifact
+
+
+@pytest.mark.asyncio
+async def test_job_failure_and_validation(job_manager):
+    """Tests failed jobs and rejection of non read-only statements."""
+    job = job_manager.submit("SELECT * FROM missing_table")
+    job = await job_manager.wait(job.job_id, timeout=30)
+    assert job.status == "failed"
+    assert "1146" in job.error
+
+    with pytest.raises(ValueError):
+        job_manager.submit("DELETE FROM orders")
+
+
+@pytest.mark.asyncio
+async def test_job_widens_types_across_batches(job_manager, monkeypatch):
+    """Tests a multi-batch job whose first batch has only NULLs and ints."""
+    monkeypatch.setattr(mysql_jobs, "JOB_FETCH_BATCH_SIZE", 10)
+    job = job_manager.submit(
+        "SELECT id, CASE WHEN id > 10 THEN 'late' END AS tag, "
+        "CASE WHEN id > 20 THEN id + 0.5 ELSE id END AS score "
+        "FROM orders WHERE id <= 30 ORDER BY id"
+    )
+    job = await job_manager.wait(job.job_id, timeout=30)
+    assert job.status == "completed", job.error
+    assert job.row_count == 30
+
+    table = mysql_jobs.ARTIFACT_STORE.open_table(job.artifact)
+    assert table.column("tag").to_pylist()[9:11] == [None, "late"]
+    assert table.column("score").to_pylist()[19:21] == [20.0, 21.5]
+
+
+@pytest.mark.asyncio
+async def test_jobs_are_visible_only_to_their_owner(job_manager):
+    """Tests that one session cannot see or collect another session's jobs."""
+    with job_owner("session-a"):
+        job = job_manager.submit("SELECT id FROM orders WHERE id <= 5")
+        await job_manager.wait(job.job_id, timeout=30)
+        # Nested runs (agents of a flow) share the session's jobs
+        with job_owner():
+            assert job_manager.get(job.job_id) is job
+
+    with job_owner("session-b"):
+        assert job_manager.get(job.job_id) is None
+        assert job_manager.list_jobs() == []
+        result = await MySQLJobResult().execute(job.job_id)
+        assert result.error == f"Job '{job.job_id}' does not exist"
+        assert (await MySQLJobStatus().execute()).output == []
+
+    with job_owner("session-a"):
+        result = await MySQLJobResult().execute(job.job_id)
+        assert result.output["metadata"]["row_count"] == 5
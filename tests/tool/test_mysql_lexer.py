@@ -0,0 +1,41 @@
+from app.tool.mysql_lexer import (
+    TokenType,
+    fingerprint,
+    fingerprint_id,
+    normalize,
+    significant_tokens,
+)
+
+
+def test_tokens_ignore_string_contents():
+    """Tests that keywords and comments inside literals stay literals."""
+    tokens = significant_tokens(
+        "SELECT 'a -- b; DROP' AS x, `from` FROM t /* where */ WHERE id = %s"
+    )
+    assert [t.type for t in tokens[:2]] == [TokenType.KEYWORD, TokenType.STRING]
+    assert tokens[5].type == TokenType.QUOTED_IDENTIFIER and tokens[5].name == "from"
+    assert tokens[-1].type == TokenType.PLACEHOLDER
+    assert all(t.type != TokenType.COMMENT for t in tokens)
+
+
+def test_fingerprint_is_stable_across_spellings():
+    """Tests that literal values, IN lists, case and spacing share one shape."""
+    queries = [
+        "SELECT * FROM orders WHERE id = 1 AND status IN ('a', 'b')",
+        "select *  from `orders` where id=42 and status in ('c')  -- note",
+        "SELECT * FROM orders WHERE id = %s AND status IN (%s, %s, %s)",
+    ]
+    shapes = {fingerprint(query) for query in queries}
+    assert shapes == {"select * from orders where id = ? and status in (?+)"}
+    assert len({fingerprint_id(query) for query in queries}) == 1
+    assert fingerprint_id(queries[0]) != fingerprint_id(
+        "SELECT * FROM orders WHERE customer_id = 1"
+    )
+
+
+def test_normalize_keeps_literals():
+    """Tests that normalize only canonicalizes whitespace, comments and keywords."""
+    assert normalize("select id\n  from t -- x\n where id = 1") == (
+        "SELECT id FROM t WHERE id = 1"
+    )
+    assert normalize("SELECT 1") != normalize("SELECT 2")
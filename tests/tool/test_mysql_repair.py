@@ -0,0 +1,68 @@
+import pymysql
+import pytest
+
+from app.tool import mysql_database, mysql_repair
+from app.tool.mysql_database import MySQLReadQuery, _sqlite_db_config
+from app.tool.mysql_repair import replace_identifier
+from app.tool.mysql_sqlite_backend import generate_ecommerce_dataset
+
+
+@pytest.fixture(scope="module")
+def fake_db(tmp_path_factory):
+    """Creates a small deterministic e-commerce database."""
+    path = str(tmp_path_factory.mktemp("mysql") / "shop.db")
+    generate_ecommerce_dataset(path, orders=300, seed=11)
+    return path
+
+
+@pytest.fixture
+def sqlite_config(fake_db, monkeypatch):
+    """Points the MySQL tools at the SQLite stand-in."""
+    config = _sqlite_db_config(fake_db, "shop")
+    monkeypatch.setattr(mysql_database, "get_db_config", lambda: config)
+    return config
+
+
+def test_replace_identifier_respects_qualifiers_and_strings():
+    """Tests that only real references to the identifier are rewritten."""
+    query = "SELECT o.statu, 'statu' FROM orders o JOIN t ON t.statu = o.statu"
+    assert replace_identifier(query, "statu", "status", "o") == (
+        "SELECT o.status, 'statu' FROM orders o JOIN t ON t.statu = o.status"
+    )
+    assert replace_identifier(
+        "SELECT * FROM `ordrs`", "ordrs", "orders", kind="table"
+    ) == ("SELECT * FROM `orders`")
+    assert replace_identifier("SELECT 1", "x", "y") is None
+
+
+@pytest.mark.asyncio
+async def test_unknown_column_returns_suggestions(sqlite_config):
+    """Tests did-you-mean suggestions when auto-repair is off."""
+    result = await MySQLReadQuery().execute(
+        "SELECT o.statu, COUNT(*) FROM orders o GROUP BY o.statu"
+    )
+    assert "Unknown column" in result.error
+    assert "status" in result.error
+
+
+@pytest.mark.asyncio
+async def test_auto_repair_reruns_query(sqlite_config, monkeypatch):
+    """Tests that unambiguous table and column fixes are applied and reported."""
+    monkeypatch.setattr(mysql_repair, "auto_repair_enabled", lambda: True)
+    result = await MySQLReadQuery().execute(
+        "SELECT custmer_id, SUM(amount) AS total FROM ordrs GROUP BY custmer_id"
+    )
+    assert result.error is None
+    metadata = result.output["metadata"]
+    assert {(r["kind"], r["to"]) for r in metadata["repairs"]} == {
+        ("table", "orders"),
+        ("column", "customer_id"),
+    }
+    assert "FROM orders" in metadata["query"]
+    assert result.output["data"]
+
+
+def test_other_errors_are_not_diagnosed():
+    """Tests that unrelated MySQL errors are left alone."""
+    error = pymysql.err.ProgrammingError(1064, "You have an error in your SQL syntax")
+    assert mysql_repair.parse_identifier_error(error) is None
@@ -0,0 +1,87 @@
+import pytest
+
+from app.tool import mysql_database
+from app.tool.mysql_database import MySQLReadQuery, _sqlite_db_config
+from app.tool.mysql_rewriter import QUERY_REWRITER, RewriteContext
+from app.tool.mysql_schema import ColumnInfo, SchemaCatalog, TableInfo
+from app.tool.mysql_sqlite_backend import generate_ecommerce_dataset
+
+
+CATALOG = SchemaCatalog(
+    database="shop",
+    tables={
+        "orders": TableInfo(
+            name="orders",
+            rows=1000,
+            columns=[
+                ColumnInfo(name="id", type="bigint", key="PRI"),
+                ColumnInfo(name="status", type="varchar(16)"),
+                ColumnInfo(name="email", type="varchar(64)", key="MUL"),
+            ],
+        )
+    },
+)
+
+
+def rewrite(query, **options):
+    return QUERY_REWRITER.rewrite(query, RewriteContext(catalog=CATALOG, **options))
+
+
+def test_subquery_order_by_is_dropped_only_without_limit():
+    """Tests that ORDER BY is removed from subqueries but kept where it matters."""
+    result = rewrite(
+        "SELECT * FROM (SELECT id FROM orders ORDER BY id) t "
+        "WHERE id IN (SELECT id FROM orders ORDER BY id LIMIT 5) ORDER BY id",
+        optimize=True,
+    )
+    assert result.query == (
+        "SELECT * FROM (SELECT id FROM orders) t "
+        "WHERE id IN (SELECT id FROM orders ORDER BY id LIMIT 5) ORDER BY id"
+    )
+    assert [r.rule for r in result.rewrites] == ["drop_subquery_order_by"]
+
+    window = "SELECT ROW_NUMBER() OVER (ORDER BY id) FROM orders"
+    assert rewrite(window, optimize=True).query == window
+
+
+def test_caller_requested_rewrites():
+    """Tests column projection, approximate counts and their validation."""
+    result = rewrite("SELECT * FROM orders WHERE id > 5", columns=["ID", "status"])
+    assert result.query == "SELECT `id`, `status` FROM orders WHERE id > 5"
+
+    result = rewrite("SELECT COUNT(*) AS n FROM orders", approximate=True)
+    assert "information_schema.TABLES" in result.query
+    assert "AS `n`" in result.query
+    assert (
+        rewrite("SELECT COUNT(*) FROM orders WHERE id > 1", approximate=True).rewrites
+        == []
+    )
+
+    with pytest.raises(ValueError, match="statu"):
+        rewrite("SELECT * FROM orders", columns=["statu"])
+
+
+def test_leading_wildcard_like_is_only_reported():
+    """Tests that the advisory rule warns without changing the query."""
+    query = "SELECT id FROM orders o WHERE o.email LIKE '%@example.com'"
+    result = rewrite(query, optimize=True)
+    assert result.query == query and not result.changed
+    assert "orders.email" in result.warnings[0]
+
+
+@pytest.mark.asyncio
+async def test_read_query_reports_rewrites(tmp_path, monkeypatch):
+    """Tests the rewrite stage end to end on the SQLite stand-in."""
+    path = str(tmp_path / "shop.db")
+    generate_ecommerce_dataset(path, orders=100, seed=4)
+    config = _sqlite_db_config(path, "shop")
+    monkeypatch.setattr(mysql_database, "get_db_config", lambda: config)
+
+    result = await MySQLReadQuery().execute(
+        "SELECT * FROM orders", columns=["id", "status"], row_limit=3
+    )
+    assert result.error is None
+    assert list(result.output["data"][0]) == ["id", "status"]
+    metadata = result.output["metadata"]
+    assert metadata["original_query"] == "SELECT * FROM orders"
+    assert metadata["rewrites"][0]["rule"] == "project_columns"
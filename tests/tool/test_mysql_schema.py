@@ -0,0 +1,68 @@
+from app.tool.mysql_schema import (
+    BM25Index,
+    ColumnInfo,
+    SchemaCatalog,
+    TableInfo,
+    tokenize_text,
+)
+
+
+def build_catalog() -> SchemaCatalog:
+    """Creates a small catalog with English and Chinese metadata."""
+    tables = [
+        TableInfo(
+            name="order_refunds",
+            comment="订单退款记录",
+            columns=[
+                ColumnInfo(name="id", type="bigint", key="PRI"),
+                ColumnInfo(name="order_id", type="bigint"),
+                ColumnInfo(name="refundAmount", type="decimal(10,2)", comment="退款金额"),
+            ],
+        ),
+        TableInfo(
+            name="orders",
+            comment="订单",
+            columns=[
+                ColumnInfo(name="id", type="bigint", key="PRI"),
+                ColumnInfo(name="customer_id", type="bigint"),
+                ColumnInfo(name="created_at", type="datetime"),
+            ],
+        ),
+        TableInfo(
+            name="aircraft_maintenance",
+            comment="飞机维修日志",
+            columns=[ColumnInfo(name="tail_number", type="varchar(16)")],
+        ),
+    ]
+    return SchemaCatalog(database="demo", tables={t.name: t for t in tables})
+
+
+def test_tokenize_splits_identifiers_and_chinese():
+    """Tests snake_case, camelCase and CJK tokenization."""
+    assert tokenize_text("order_refunds") == ["order", "refunds"]
+    assert tokenize_text("refundAmount") == ["refund", "amount"]
+    assert tokenize_text("退款") == ["退", "款", "退款"]
+
+
+def test_bm25_ranks_relevant_tables_first():
+    """Tests that the most relevant table is ranked first."""
+    index = BM25Index.from_catalog(build_catalog())
+
+    results = index.search("refund amount per order", top_k=2)
+    assert [name for name, _ in results][0] == "order_refunds"
+
+    results = index.search("飞机维修", top_k=5)
+    assert results[0][0] == "aircraft_maintenance"
+
+    assert index.search("nothing matches this", top_k=5) == []
+
+
+def test_one_line_schema():
+    """Tests the compact single-line schema rendering."""
+    table = build_catalog().get_table("ORDERS")
+    assert table is not None
+    assert (
+        table.one_line()
+        == "orders(id bigint PK, customer_id bigint, created_at datetime) -- 订单"
+    )
+    assert table.one_line(max_columns=1) == "orders(id bigint PK, ...+2) -- 订单"
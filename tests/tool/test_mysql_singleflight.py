@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from app.tool.mysql_singleflight import SingleFlight, query_key
+
+
+CONFIG = {"host": "db", "port": 3306, "database": "shop"}
+
+
+def test_query_key_normalizes_sql():
+    """Tests that formatting differences map to the same key."""
+    assert query_key(CONFIG, "select *  from t -- c\nwhere id = %s", [1]) == (
+        query_key(CONFIG, "SELECT * FROM t WHERE id = %s", [1])
+    )
+    assert query_key(CONFIG, "SELECT * FROM t WHERE id = %s", [1]) != (
+        query_key(CONFIG, "SELECT * FROM t WHERE id = %s", [2])
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    """Tests coalescing and copy-on-read of the shared result."""
+    group = SingleFlight()
+    calls = 0
+
+    async def run():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return [{"n": 1}]
+
+    results = await asyncio.gather(*(group.do("k", run) for _ in range(5)))
+
+    assert calls == 1
+    assert [shared for _, shared in results].count(True) == 4
+    assert group.metrics() == {"executions": 1, "coalesced": 4, "in_flight": 0}
+
+    results[0][0][0]["n"] = 99
+    assert all(result[0] == {"n": 1} for result, _ in results[1:])
@@ -0,0 +1,73 @@
+import sqlite3
+
+import pymysql
+import pytest
+
+from app.tool.mysql_database import _sqlite_db_config, run_read_query
+from app.tool.mysql_snapshot import SNAPSHOT_SESSIONS
+from app.tool.mysql_sqlite_backend import generate_ecommerce_dataset
+
+
+COUNT_ORDERS = "SELECT COUNT(*) AS n FROM orders"
+
+
+@pytest.fixture
+def sqlite_config(tmp_path, monkeypatch):
+    """Creates a writable database and enables snapshot sessions."""
+    path = str(tmp_path / "shop.db")
+    generate_ecommerce_dataset(path, orders=200, seed=5)
+    monkeypatch.setattr(SNAPSHOT_SESSIONS, "enabled", lambda: True)
+    return _sqlite_db_config(path, "shop")
+
+
+def insert_order(config):
+    with sqlite3.connect(config["sqlite_path"]) as conn:
+        conn.execute(
+            "INSERT INTO orders (customer_id, product_id, quantity, amount, status, "
+            "created_at) VALUES (1, 1, 1, 9.99, 'paid', '2024-01-01 00:00:00')"
+        )
+
+
+async def count_orders(config) -> int:
+    rows, _ = await run_read_query(config, COUNT_ORDERS)
+    return rows[0]["n"]
+
+
+@pytest.mark.asyncio
+async def test_reads_in_scope_share_one_snapshot(sqlite_config):
+    """Tests that concurrent writes are invisible until the scope ends."""
+    async with SNAPSHOT_SESSIONS.scope():
+        assert await count_orders(sqlite_config) == 200
+        insert_order(sqlite_config)
+        assert await count_orders(sqlite_config) == 200
+        assert SNAPSHOT_SESSIONS.metrics()["open"] == 1
+
+    assert SNAPSHOT_SESSIONS.metrics()["open"] == 0
+    assert await count_orders(sqlite_config) == 201
+
+
+@pytest.mark.asyncio
+async def test_expired_snapshot_is_replaced(sqlite_config, monkeypatch):
+    """Tests that a snapshot older than the maximum age is not reused."""
+    async with SNAPSHOT_SESSIONS.scope():
+        assert await count_orders(sqlite_config) == 200
+        insert_order(sqlite_config)
+
+        monkeypatch.setattr(SNAPSHOT_SESSIONS, "_limits", lambda: (120.0, 0.0))
+        assert await count_orders(sqlite_config) == 201
+        assert SNAPSHOT_SESSIONS.expired >= 1
+
+
+@pytest.mark.asyncio
+async def test_statement_error_keeps_the_snapshot(sqlite_config):
+    """Tests that an unknown column (OperationalError 1054) keeps the session."""
+    async with SNAPSHOT_SESSIONS.scope():
+        assert await count_orders(sqlite_config) == 200
+        insert_order(sqlite_config)
+
+        with pytest.raises(pymysql.err.OperationalError) as excinfo:
+            await run_read_query(sqlite_config, "SELECT missing_column FROM orders")
+        assert excinfo.value.args[0] == 1054
+
+        assert await count_orders(sqlite_config) == 200
+        assert SNAPSHOT_SESSIONS.metrics()["sessions"][0]["queries"] == 2
@@ -0,0 +1,141 @@
+import pymysql
+import pytest
+
+from app.tool import mysql_database
+from app.tool.artifacts import ArtifactStore
+from app.tool.mysql_database import (
+    ARTIFACT_PREVIEW_ROWS,
+    MySQLDescribeTable,
+    MySQLListTables,
+    MySQLReadQuery,
+    MySQLSaveQueryResults,
+    _sqlite_db_config,
+)
+from app.tool.mysql_sqlite_backend import (
+    connect,
+    generate_ecommerce_dataset,
+    translate_placeholders,
+)
+
+
+@pytest.fixture(scope="module")
+def fake_db(tmp_path_factory):
+    """Creates a small deterministic e-commerce database."""
+    path = str(tmp_path_factory.mktemp("mysql") / "shop.db")
+    generate_ecommerce_dataset(path, orders=2000, seed=7)
+    return path
+
+
+@pytest.fixture
+def sqlite_config(fake_db, monkeypatch):
+    """Points the MySQL tools at the SQLite stand-in."""
+    config = _sqlite_db_config(fake_db, "shop")
+    monkeypatch.setattr(mysql_database, "get_db_config", lambda: config)
+    return config
+
+
+def test_generator_is_deterministic(tmp_path):
+    """Tests that the same seed produces the same rows."""
+    rows = []
+    for name in ("a.db", "b.db"):
+        path = str(tmp_path / name)
+        generate_ecommerce_dataset(path, orders=500, seed=1)
+        with connect(path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM orders ORDER BY id DESC LIMIT 5")
+            rows.append(cursor.fetchall())
+    assert rows[0] == rows[1]
+
+
+def test_mysql_statements_and_errors(fake_db):
+    """Tests SHOW/information_schema emulation and MySQL error mapping."""
+    with connect(fake_db, database="shop") as conn:
+        cursor = conn.cursor()
+        cursor.execute("SHOW TABLES LIKE %s", ["ord%"])
+        assert cursor.fetchall() == [{"Tables_in_shop": "orders"}]
+
+        cursor.execute(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            ["orders"],
+        )
+        assert cursor.fetchone() == {"TABLE_ROWS": 2000}
+
+        cursor.execute("EXPLAIN SELECT * FROM orders o WHERE o.status = %s", ["paid"])
+        assert cursor.fetchone()["type"] == "ALL"
+
+        with pytest.raises(pymysql.err.ProgrammingError) as excinfo:
+            cursor.execute("SELECT * FROM missing_table")
+        assert excinfo.value.args[0] == 1146
+        with pytest.raises(pymysql.err.OperationalError) as excinfo:
+            cursor.execute("SELECT missing_column FROM orders")
+        assert excinfo.value.args[0] == 1054
+
+
+@pytest.mark.asyncio
+async def test_tools_run_against_sqlite(sqlite_config):
+    """Tests the MySQL tools end to end on the stand-in backend."""
+    result = await MySQLListTables().execute()
+    assert "orders" in result.output
+
+    result = await MySQLDescribeTable().execute("orders")
+    assert "customer_id" in result.output
+
+    result = await MySQLReadQuery().execute(
+        "SELECT status, COUNT(*) AS n FROM orders WHERE amount > %s GROUP BY status",
+        params=["0"],
+    )
+    assert result.error is None
+    assert sum(row["n"] for row in result.output["data"]) == 2000
+
+
+@pytest.mark.asyncio
+async def test_artifact_holds_full_result(sqlite_config, tmp_path, monkeypatch):
+    """Tests that artifacts skip the automatic LIMIT and export without pandas JSON."""
+    monkeypatch.setattr(
+        mysql_database, "ARTIFACT_STORE", ArtifactStore(tmp_path / "art")
+    )
+    monkeypatch.chdir(tmp_path)
+
+    result = await MySQLReadQuery().execute(
+        "SELECT id, amount FROM orders", row_limit=100, output_artifact=True
+    )
+    assert result.error is None
+    handle = result.output["metadata"]["artifact"]
+    assert mysql_database.ARTIFACT_STORE.open_table(handle).num_rows == 2000
+    assert len(result.output["data"]) == ARTIFACT_PREVIEW_ROWS
+
+    result = await MySQLSaveQueryResults().execute(
+        "SELECT id, amount FROM orders",
+        "csv",
+        artifact=handle,
+        custom_filename="orders",
+    )
+    assert result.error is None
+    assert result.output["row_count"] == 2000
+    lines = (tmp_path / "temp_data" / "orders.csv").read_text().splitlines()
+    assert lines[0] == "id,amount" and len(lines) == 2001
+
+
+def test_placeholders_match_pymysql():
+    """Tests that % handling follows pymysql, including empty argument lists."""
+    assert translate_placeholders("SELECT 'pa%' FROM t", None) == "SELECT 'pa%' FROM t"
+    assert translate_placeholders(
+        "SELECT DATE_FORMAT(d, '%%Y') FROM t WHERE a = %s AND b = %s", [1, 2]
+    ) == ("SELECT DATE_FORMAT(d, '%Y') FROM t WHERE a = ? AND b = ?")
+    assert translate_placeholders("WHERE a = %(a)s", {"a": 1}) == "WHERE a = :a"
+    with pytest.raises(TypeError):
+        translate_placeholders("SELECT * FROM t WHERE name LIKE 'pa%'", [])
+    with pytest.raises(TypeError):
+        translate_placeholders("SELECT * FROM t WHERE a = %s", [])
+
+
+def test_unix_timestamp_of_null_is_null(fake_db):
+    """Tests that UNIX_TIMESTAMP(NULL) is NULL like in MySQL, not the current time."""
+    with connect(fake_db) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT UNIX_TIMESTAMP(NULL) AS n, UNIX_TIMESTAMP() > 0 AS now_ok, "
+            "UNIX_TIMESTAMP('1970-01-02 00:00:00') IS NOT NULL AS parsed"
+        )
+        assert cursor.fetchone() == {"n": None, "now_ok": 1, "parsed": 1}
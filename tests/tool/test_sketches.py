@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from app.tool.artifact_stats import ArtifactStats
+from app.tool.artifacts import ArtifactStore
+from app.tool.sketches import HeavyHitters, HyperLogLog, QuantileSketch, ResultSketch
+
+
+def test_hyperloglog_estimate_and_merge():
+    """Tests distinct-count accuracy and that merging equals a union."""
+    left, right = HyperLogLog(), HyperLogLog()
+    left.update(range(0, 60_000))
+    right.update(range(40_000, 100_000))
+    assert left.estimate() == pytest.approx(60_000, rel=0.03)
+
+    left.merge(right)
+    assert left.estimate() == pytest.approx(100_000, rel=0.03)
+    assert HyperLogLog.from_dict(left.to_dict()).estimate() == left.estimate()
+
+
+def test_quantile_sketch_rank_error():
+    """Tests KLL quantiles on a shuffled stream fed in batches."""
+    values = list(range(100_000))
+    random.Random(1).shuffle(values)
+    sketch = QuantileSketch()
+    for start in range(0, len(values), 5000):
+        sketch.update(values[start : start + 5000])
+
+    p01, p50, p99 = sketch.quantiles([0.01, 0.5, 0.99])
+    assert p01 == pytest.approx(1_000, abs=2_000)
+    assert p50 == pytest.approx(50_000, abs=2_000)
+    assert p99 == pytest.approx(99_000, abs=2_000)
+    assert sum(len(c) for c in sketch.compactors) < 1_000
+
+
+def test_heavy_hitters_bounds():
+    """Tests that true counts lie within the reported bounds."""
+    rng = random.Random(2)
+    stream = (
+        ["a"] * 5000
+        + ["b"] * 3000
+        + [f"x{rng.randrange(10**6)}" for _ in range(20_000)]
+    )
+    rng.shuffle(stream)
+    sketch = HeavyHitters(capacity=32)
+    for start in range(0, len(stream), 1000):
+        sketch.update(stream[start : start + 1000])
+
+    top = {item["value"]: item for item in sketch.top(2)}
+    assert set(top) == {"a", "b"}
+    assert top["a"]["count"] <= 5000 <= top["a"]["max_count"]
+    assert sketch.decrement <= len(stream) / 33
+
+
+@pytest.mark.asyncio
+async def test_writer_sketch_and_stats_tool(tmp_path, monkeypatch):
+    """Tests sketches written alongside an artifact and read by the tool."""
+    from app.tool import artifact_stats
+
+    store = ArtifactStore(tmp_path)
+    monkeypatch.setattr(artifact_stats, "ARTIFACT_STORE", store)
+    with store.writer(sketch=True) as writer:
+        for start in range(0, 10_000, 2500):
+            writer.write_rows(
+                [
+                    {"id": i, "status": "paid" if i % 4 else "refunded", "note": None}
+                    for i in range(start, start + 2500)
+                ]
+            )
+    assert writer.meta.sketch_path.endswith(".sketch.json")
+
+    result = await ArtifactStats().execute(writer.meta.handle, columns=["id", "status"])
+    stats = result.output["columns"]
+    assert result.output["row_count"] == 10_000
+    assert stats["id"]["distinct_estimate"] == pytest.approx(10_000, rel=0.03)
+    assert stats["id"]["quantiles"]["p50"] == pytest.approx(5_000, abs=300)
+    assert stats["status"]["top_values"][0] == {
+        "value": "paid",
+        "count": 7500,
+        "max_count": 7500,
+    }
+
+    plain = store.write_rows([{"id": 1}, {"id": 2}])
+    result = await ArtifactStats().execute(plain.handle)
+    assert "note" in result.output
+    assert isinstance(store.load_sketch(plain.handle), ResultSketch)
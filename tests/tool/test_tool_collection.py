@@ -0,0 +1,35 @@
+from app.tool.terminate import Terminate
+from app.tool.tool_collection import ToolCatalog, ToolCollection
+
+
+class CountingTokenizer:
+    name = "whitespace"
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text):
+        self.calls += 1
+        return text.split()
+
+
+def test_catalog_is_cached_until_the_tool_set_changes():
+    """Tests catalog reuse, rebuild on add_tool and one encode per tokenizer."""
+    collection = ToolCollection()
+    empty = collection.catalog
+    assert collection.catalog is empty and empty.token_count(CountingTokenizer()) == 0
+
+    collection.add_tool(Terminate())
+    catalog = collection.catalog
+    assert catalog is not empty and catalog.version == empty.version + 1
+    assert collection.to_params() is catalog.params
+    assert catalog.hash == ToolCatalog([Terminate().to_param()]).hash
+
+    tokenizer = CountingTokenizer()
+    assert catalog.token_count(tokenizer) == len(catalog.schema.split())
+    catalog.token_count(tokenizer)
+    assert tokenizer.calls == 1
+
+    # Direct reassignment, as MCP refreshes do, is detected too
+    collection.tools = ()
+    assert collection.catalog.hash == empty.hash